@@ -2,23 +2,36 @@
 FastAPI application with async background plan generation.
 """
 
-import asyncio, json, time, os
-from contextlib import asynccontextmanager
-from typing import Dict, Any, Optional
+import asyncio, time, os
+from contextlib import asynccontextmanager, aclosing
+from typing import Dict, Any, Optional, Tuple
 
-from datetime import datetime, timedelta, timezone
+from datetime import datetime, timedelta
 
-from fastapi import FastAPI, HTTPException, BackgroundTasks, Request, Header
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Request, Header, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, StreamingResponse
 
 from config.settings import settings
 from config.logging_config import logger, log_api_request, log_api_response, log_error
 from models.quiz import Calculations, Macros, UnifiedGeneratePlansRequest, QuickOnboardingData
+from models.plans import BulkUserIdsRequest
+from models.exports import DataExportRequest
 from services.ai_service import ai_service
 from services.database import db_service
+from services.data_export import data_export_service
+from services.food_index import food_index
+from services.plan_status_hub import TERMINAL_STATUSES
+from services.macro_verifier import normalize_food_name, verify_meal_plan
+from services.meal_plan_solver import dietary_tags, food_exclusions, solve_meal_plan
+from services.workout_assembler import assemble_workout_plan
 from services.prompt_builder import MealPlanPromptBuilder, MealUserProfileData
 from services.workout_prompt_builder import WorkoutPlanPromptBuilder, WorkoutUserProfileData
-from services.profile_completeness import ProfileCompletenessService, UserProfileData
+from services.profile_completeness import ProfileCompletenessService
+from services.profile_repository import ProfileSnapshot
+from services.regeneration_quota import billing_period_start
+from services.tdee_estimator import TdeeState, estimate_tdee
+from utils import json_codec
 from utils.calculations import calculate_bmr, calculate_tdee, calculate_goal_calories, calculate_macros
 
 
@@ -106,9 +119,13 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.warning(f"Database initialization failed: {e}. Continuing without database.")
 
+    await food_index.start()
+
     yield
 
     logger.info("Shutting down application...")
+    await food_index.close()
+    await data_export_service.close()
     await db_service.close()
     logger.info("Application shutdown complete")
 
@@ -143,63 +160,110 @@ async def health_check() -> Dict[str, Any]:
     }
 
 
-async def _track_tier_unlock_if_changed(
-    user_id: str,
-    plan_type: str,
-    new_tier: str,
-    completeness: float,
-    regeneration_reason: str
-):
-    """Track tier unlock events when user's plan tier changes"""
-    try:
-        if not db_service.pool:
-            return
-
-        # Get current tier from most recent plan
-        table = "ai_meal_plans" if plan_type == "meal" else "ai_workout_plans"
-
-        async with db_service.get_connection() as conn:
-            # Get previous plan tier from metadata
-            prev_plan = await conn.fetchrow(
-                f"""SELECT plan_data
-                    FROM {table}
-                    WHERE user_id = $1
-                    ORDER BY created_at DESC
-                    LIMIT 1 OFFSET 1""",
-                user_id
-            )
+@app.get("/metrics/db-pool")
+async def db_pool_metrics() -> Dict[str, Any]:
+    """
+    Connection pool metrics: sizes, acquire latency, checkout duration,
+    waits/timeouts and per-query timings, to tell pool starvation apart
+    from slow queries.
+    """
+    if not db_service.pool:
+        raise HTTPException(status_code=503, detail="Database not initialized")
+    return db_service.pool_stats()
 
-            old_tier = "BASIC"  # Default for new users
-            if prev_plan and prev_plan['plan_data']:
-                plan_json = json.loads(prev_plan['plan_data']) if isinstance(prev_plan['plan_data'], str) else prev_plan['plan_data']
-                old_tier = plan_json.get('_metadata', {}).get('tier', 'BASIC')
 
-            # Only track if tier actually changed and it's not initial generation
-            if old_tier != new_tier and regeneration_reason != 'initial_generation':
-                logger.info(f"[Tier Unlock] User {user_id} {plan_type} plan: {old_tier} → {new_tier}")
+@app.get("/metrics/food-index")
+async def food_index_metrics() -> Dict[str, Any]:
+    """Size, memory footprint and freshness of the in-memory food/recipe index"""
+    return food_index.stats()
 
-                # Insert tier unlock event
-                meal_regen = plan_type == "meal"
-                workout_regen = plan_type == "workout"
 
-                await conn.execute(
-                    """INSERT INTO tier_unlock_events
-                       (user_id, old_tier, new_tier, completeness_percentage,
-                        meal_plan_regenerated, workout_plan_regenerated, regeneration_accepted_at)
-                       VALUES ($1, $2, $3, $4, $5, $6, NOW())""",
-                    user_id,
-                    old_tier,
-                    new_tier,
-                    completeness,
-                    meal_regen,
-                    workout_regen
-                )
+async def _verify_meal_macros(
+    meal_plan: Dict[str, Any],
+    nutrition: Dict[str, Any],
+    user_id: str
+) -> Optional[Dict[str, Any]]:
+    """
+    Recompute a generated meal plan's macros from food_database and rescale
+    portions towards the nutrition targets, in place.
 
-                logger.info(f"[Tier Unlock] Tracked tier unlock event for user {user_id}")
+    With the food index loaded, foods are also linked to their
+    food_database/recipe_database rows; otherwise they are looked up by
+    exact name in the database.
 
+    Returns the verification report, or None when verification is disabled
+    or fails (the plan is then saved as generated).
+    """
+    if not settings.MEAL_MACRO_VERIFICATION:
+        return None
+    try:
+        foods = [
+            food
+            for meal in meal_plan.get("meals") or [] if isinstance(meal, dict)
+            for food in meal.get("foods") or [] if isinstance(food, dict)
+        ]
+        if food_index.loaded:
+            reference = {}
+            for food in foods:
+                found = food_index.ground(food)
+                per_gram = found.per_gram() if found else None
+                if per_gram:
+                    reference[normalize_food_name(food.get("name"))] = per_gram
+        else:
+            reference = await db_service.get_food_references([normalize_food_name(food.get("name")) for food in foods])
+        report = verify_meal_plan(meal_plan, nutrition, reference)
+        logger.info(
+            f"Meal plan macros for user {user_id}: {report['method']}, "
+            f"{report['scaled_foods']}/{report['foods']} foods rescaled, deviation {report['deviation_after']}"
+        )
+        return report
     except Exception as e:
-        # Don't fail the whole generation if tier tracking fails
-        logger.error(f"[Tier Unlock] Failed to track tier unlock: {str(e)}")
+        log_error(e, "Meal plan macro verification", user_id)
+        return None
+
+
+async def _solve_basic_meal_plan(
+    meal_profile: MealUserProfileData,
+    nutrition: Dict[str, Any],
+    user_id: str
+) -> Optional[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """
+    Assemble a BASIC meal plan from the recipe library without a model call.
+
+    Uses the BASIC prompt's defaults for the user's goal. Returns the plan
+    and the solver report, or None when the solver is disabled, the user
+    has an allergy the solver does not know, the library has no fitting
+    meal for some slot, the best day misses the targets by more than the
+    tolerance, or solving fails; the plan is then generated by the model.
+    """
+    if not settings.BASIC_MEAL_SOLVER:
+        return None
+    try:
+        exclusions = food_exclusions(meal_profile.food_allergies, meal_profile.disliked_foods)
+        if exclusions is None:
+            logger.info(f"Meal plan for user {user_id} left to the model: allergy outside the solver's list")
+            return None
+
+        defaults = MealPlanPromptBuilder._get_defaults_for_goal(meal_profile.main_goal)
+        candidates = await db_service.get_meal_candidates(
+            user_id,
+            dietary_tags(meal_profile.dietary_style or defaults["dietary_style"]),
+            *exclusions
+        )
+        started = time.perf_counter()
+        solved = solve_meal_plan(candidates, nutrition, defaults["meals_per_day"], seed=user_id)
+        if not solved:
+            return None
+        report = solved[1]
+        report["solve_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        logger.info(
+            f"Meal plan for user {user_id} solved from {report['candidates']} candidates "
+            f"in {report['solve_ms']}ms, deviation {report['deviation']}"
+        )
+        return solved if report["within_tolerance"] else None
+    except Exception as e:
+        log_error(e, "BASIC meal plan solver", user_id)
+        return None
 
 
 async def _generate_meal_plan_background_unified(
@@ -235,13 +299,26 @@ async def _generate_meal_plan_background_unified(
             f"Missing {len(prompt_response.metadata.missing_fields)} fields"
         )
 
-        # Generate meal plan with AI
-        meal_plan = await ai_service.generate_plan(
-            prompt_response.prompt,
-            ai_provider,
-            model_name,
-            user_id
-        )
+        # BASIC plans come from the recipe library when it covers every meal
+        solved = None
+        if prompt_response.metadata.personalization_level == "BASIC":
+            solved = await _solve_basic_meal_plan(meal_profile, nutrition, user_id)
+
+        if solved:
+            meal_plan, solver_report = solved
+            macro_verification = None
+        else:
+            # Generate meal plan with AI
+            meal_plan = await ai_service.generate_plan(
+                prompt_response.prompt,
+                ai_provider,
+                model_name,
+                user_id
+            )
+            solver_report = None
+
+            # Correct macros and portions locally before saving
+            macro_verification = await _verify_meal_macros(meal_plan, nutrition, user_id)
 
         # Add tier metadata to plan
         meal_plan["_metadata"] = {
@@ -250,33 +327,70 @@ async def _generate_meal_plan_background_unified(
             "used_defaults": prompt_response.metadata.used_defaults,
             "missing_fields": prompt_response.metadata.missing_fields,
             "generated_at": datetime.now().isoformat(),
-            "regeneration_reason": regeneration_reason
+            "regeneration_reason": regeneration_reason,
+            "generation_method": "solver" if solved else "ai",
+            "solver": solver_report,
+            "macro_verification": macro_verification
         }
 
-        # Track tier unlock if tier changed
-        await _track_tier_unlock_if_changed(
-            user_id,
-            "meal",
-            prompt_response.metadata.personalization_level,
-            prompt_response.metadata.data_completeness,
-            regeneration_reason
-        )
-
-        # Save meal plan to database
+        # Save meal plan, completed status and tier unlock in one transaction
         await db_service.save_meal_plan(
             user_id,
             quiz_result_id,
             meal_plan,
-            nutrition["goalCalories"]
+            nutrition["goalCalories"],
+            regeneration_reason=regeneration_reason
         )
 
-        await db_service.update_plan_status(user_id, "meal", "completed")
         logger.info(f"[Unified] Meal plan generated successfully for user {user_id}")
 
     except Exception as e:
         log_error(e, "[Unified] Background meal plan generation", user_id)
         await db_service.update_plan_status(user_id, "meal", "failed", str(e))
 
+async def _assemble_workout_plan(
+    workout_profile: WorkoutUserProfileData,
+    user_id: str,
+    fallback: bool = False
+) -> Optional[Dict[str, Any]]:
+    """
+    Assemble a workout plan from exercise_library without a model call.
+
+    Used first for BASIC plans, and with fallback=True for any tier when the
+    model call fails; fallbacks are skipped for users with injuries or health
+    conditions, which the rules do not account for. Returns None when
+    disabled, skipped, the library cannot fill every day, or assembly fails.
+    """
+    enabled = settings.WORKOUT_ASSEMBLER_FALLBACK if fallback else settings.BASIC_WORKOUT_ASSEMBLER
+    if not enabled:
+        return None
+    if fallback and (workout_profile.injuries_limitations or workout_profile.health_conditions):
+        return None
+    try:
+        exercises = await db_service.get_exercise_library()
+        started = time.perf_counter()
+        plan = assemble_workout_plan(
+            exercises,
+            workout_profile.main_goal,
+            WorkoutPlanPromptBuilder._get_defaults_for_goal(workout_profile.main_goal),
+            frequency=workout_profile.exercise_frequency,
+            experience=workout_profile.fitness_experience,
+            gym_access=workout_profile.gym_access if isinstance(workout_profile.gym_access, bool) else None,
+            equipment=workout_profile.equipment_available or (),
+            weight_kg=workout_profile.current_weight,
+            seed=user_id
+        )
+        if plan:
+            logger.info(
+                f"Workout plan for user {user_id} assembled from {len(exercises)} exercises "
+                f"in {(time.perf_counter() - started) * 1000:.1f}ms"
+            )
+        return plan
+    except Exception as e:
+        log_error(e, "Workout plan assembler", user_id)
+        return None
+
+
 async def _generate_workout_plan_background_unified(
     user_id: str,
     quiz_result_id: str,
@@ -313,13 +427,28 @@ async def _generate_workout_plan_background_unified(
             f"Missing {len(meta['missing_fields'])} fields"
         )
 
-        # Generate workout plan with AI
-        workout_plan = await ai_service.generate_plan(
-            prompt_response["prompt"],
-            ai_provider,
-            model_name,
-            user_id
-        )
+        # BASIC plans come from the exercise library when it covers every day
+        workout_plan = None
+        generation_method = "assembler"
+        if meta["personalization_level"] == "BASIC":
+            workout_plan = await _assemble_workout_plan(workout_profile, user_id)
+
+        if workout_plan is None:
+            try:
+                # Generate workout plan with AI
+                workout_plan = await ai_service.generate_plan(
+                    prompt_response["prompt"],
+                    ai_provider,
+                    model_name,
+                    user_id
+                )
+                generation_method = "ai"
+            except Exception as e:
+                workout_plan = await _assemble_workout_plan(workout_profile, user_id, fallback=True)
+                if workout_plan is None:
+                    raise
+                logger.warning(f"Workout plan generation failed for user {user_id}, using assembled plan: {e}")
+                generation_method = "assembler_fallback"
 
         # Add tier metadata to plan
         workout_plan["_metadata"] = {
@@ -328,26 +457,18 @@ async def _generate_workout_plan_background_unified(
             "used_defaults": meta["used_defaults"],
             "missing_fields": meta["missing_fields"],
             "generated_at": datetime.now().isoformat(),
-            "regeneration_reason": regeneration_reason
+            "regeneration_reason": regeneration_reason,
+            "generation_method": generation_method
         }
 
-        # Track tier unlock if tier changed
-        await _track_tier_unlock_if_changed(
-            user_id,
-            "workout",
-            meta["personalization_level"],
-            meta["data_completeness"],
-            regeneration_reason
-        )
-
-        # Save workout plan to database
+        # Save workout plan, completed status and tier unlock in one transaction
         await db_service.save_workout_plan(
             user_id,
             quiz_result_id,
             workout_plan,
+            regeneration_reason=regeneration_reason
         )
 
-        await db_service.update_plan_status(user_id, "workout", "completed")
         logger.info(f"[Unified] Workout plan generated successfully for user {user_id}")
 
     except Exception as e:
@@ -406,11 +527,15 @@ async def generate_plans_unified(
             gender=quiz_data.gender
         )
 
-        # Calculate TDEE (Total Daily Energy Expenditure)
-        tdee = calculate_tdee(
-            bmr=bmr,
-            exercise_freq=quiz_data.exercise_frequency,
-            occupation='Desk job'  # Default
+        # Calculate TDEE (Total Daily Energy Expenditure), adapted to logged
+        # intake and weight trend once the user has enough history
+        tdee = estimate_tdee(
+            await db_service.get_tdee_state(request.user_id),
+            calculate_tdee(
+                bmr=bmr,
+                exercise_freq=quiz_data.exercise_frequency,
+                occupation='Desk job'  # Default
+            )
         )
 
         # Calculate goal calories based on user's goal
@@ -454,15 +579,12 @@ async def generate_plans_unified(
         # ===================================================================
         logger.info(f"[Unified] Saving calculations for user {request.user_id}")
 
-        # 2a. Save to quiz_results.calculations (JSONB)
-        await db_service.update_quiz_calculations(
-            request.quiz_result_id,
-            calculations.model_dump()
-        )
-
-        # 2b. Save to user_macro_targets (SOURCE OF TRUTH for current macros!)
-        await db_service.save_macro_targets(
+        # quiz_results.calculations, user_macro_targets (SOURCE OF TRUTH for
+        # current macros!) and the plan status placeholders in one round-trip
+        saved = await db_service.save_onboarding(
             user_id=request.user_id,
+            quiz_result_id=request.quiz_result_id,
+            calculations=calculations.model_dump(),
             daily_calories=calculations.goalCalories,
             daily_protein_g=macros_result['protein_g'],
             daily_carbs_g=macros_result['carbs_g'],
@@ -471,12 +593,9 @@ async def generate_plans_unified(
             source='ai_generated',
             notes=f'Generated from QuickOnboarding - Goal: {quiz_data.main_goal}'
         )
-
-        # 2c. Initialize plan generation status
-        await db_service.initialize_plan_status(
-            request.user_id,
-            request.quiz_result_id
-        )
+        if not saved:
+            # No status rows exist, so background generation could not report progress
+            raise RuntimeError("Failed to save onboarding results")
 
         # ===================================================================
         # STEP 3: Background - Generate BOTH Plans (Meal + Workout)
@@ -540,13 +659,7 @@ async def get_plan_status(user_id: str) -> Dict[str, Any]:
         if not status:
             raise HTTPException(status_code=404, detail="No plan generation found for user")
         
-        return {
-            "success": True,
-            "meal_plan_status": status["meal_plan_status"],
-            "workout_plan_status": status["workout_plan_status"],
-            "meal_plan_error": status.get("meal_plan_error"),
-            "workout_plan_error": status.get("workout_plan_error")
-        }
+        return {"success": True, **_plan_status_response(status)}
         
     except HTTPException:
         raise
@@ -555,21 +668,186 @@ async def get_plan_status(user_id: str) -> Dict[str, Any]:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _plan_status_response(status: Dict[str, Any]) -> Dict[str, Any]:
+    """Public fields of a plan status"""
+    return {
+        "meal_plan_status": status["meal_plan_status"],
+        "workout_plan_status": status["workout_plan_status"],
+        "meal_plan_error": status.get("meal_plan_error"),
+        "workout_plan_error": status.get("workout_plan_error")
+    }
+
+
+# User lines per chunk written to bulk NDJSON responses
+NDJSON_CHUNK_LINES = 500
+
+
+def _ndjson_response(rows: Dict[str, Dict[str, Any]], render) -> StreamingResponse:
+    """Stream one JSON line per user, in request order, batching lines into chunks"""
+    async def lines():
+        chunk = []
+        for user_id, row in rows.items():
+            chunk.append(json_codec.dumps_bytes({"user_id": user_id, **render(row)}))
+            if len(chunk) >= NDJSON_CHUNK_LINES:
+                yield b"\n".join(chunk) + b"\n"
+                chunk = []
+        if chunk:
+            yield b"\n".join(chunk) + b"\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@app.post("/plan-status/bulk")
+async def get_plan_status_bulk(request: BulkUserIdsRequest) -> StreamingResponse:
+    """
+    Plan generation status of many users (coach dashboards, admin tools).
+
+    Answers with one set-based query and streams one NDJSON line per
+    requested user, in request order; users without plans are not_started.
+    """
+    user_ids = request.unique_user_ids()
+    try:
+        statuses = await db_service.get_plan_statuses(user_ids)
+    except Exception as e:
+        log_error(e, f"Bulk plan status check ({len(user_ids)} users)")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return _ndjson_response(statuses, _plan_status_response)
+
+
+def _apply_status_event(snapshot: Dict[str, Any], event: Dict[str, Any]) -> Dict[str, Any]:
+    """Merge a NOTIFY status event into a plan status snapshot"""
+    plan_type = event.get("plan_type")
+    if plan_type not in ("meal", "workout"):
+        return snapshot
+
+    snapshot[f"{plan_type}_plan_status"] = event.get("status")
+    snapshot[f"{plan_type}_plan_error"] = event.get("error_message")
+    if event.get("generated_at"):
+        snapshot[f"{plan_type}_plan_generated_at"] = event["generated_at"]
+    return snapshot
+
+
+# Statuses after which no event is coming without a new request from the
+# client: finished plans, and plans never generated
+SETTLED_STATUSES = TERMINAL_STATUSES + ("not_started",)
+
+
+def _is_generation_finished(snapshot: Dict[str, Any]) -> bool:
+    """Neither plan is still generating"""
+    return (
+        snapshot.get("meal_plan_status") in SETTLED_STATUSES
+        and snapshot.get("workout_plan_status") in SETTLED_STATUSES
+    )
+
+
+async def _open_status_subscription(user_id: str):
+    """
+    Subscribe to status events, then read the current snapshot.
+
+    Subscribing first guarantees no event between the snapshot read and the
+    first queue read is lost.
+    """
+    queue = db_service.status_hub.subscribe(user_id)
+    try:
+        status = await db_service.get_plan_status(user_id)
+    except Exception:
+        db_service.status_hub.unsubscribe(user_id, queue)
+        raise
+
+    if not status:
+        db_service.status_hub.unsubscribe(user_id, queue)
+        raise HTTPException(status_code=404, detail="No plan generation found for user")
+
+    return queue, status
+
+
+async def _plan_status_updates(user_id: str, queue: asyncio.Queue, snapshot: Dict[str, Any]):
+    """
+    Yield the snapshot, then every status change until no plan is
+    generating any more or STATUS_STREAM_MAX_SECONDS have passed.
+
+    Yields None when no event arrived within the heartbeat interval so that
+    transports can keep idle connections alive.
+    """
+    deadline = time.monotonic() + settings.STATUS_STREAM_MAX_SECONDS
+    try:
+        yield dict(snapshot)
+
+        while not _is_generation_finished(snapshot):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                logger.info(f"Plan status stream for user {user_id} reached its maximum duration")
+                return
+            try:
+                event = await asyncio.wait_for(
+                    queue.get(),
+                    timeout=min(settings.STATUS_STREAM_HEARTBEAT_SECONDS, remaining)
+                )
+            except asyncio.TimeoutError:
+                yield None
+                continue
+
+            snapshot = _apply_status_event(snapshot, event)
+            yield dict(snapshot)
+    finally:
+        db_service.status_hub.unsubscribe(user_id, queue)
+
+
+@app.get("/plan-status/{user_id}/stream")
+async def stream_plan_status(user_id: str) -> StreamingResponse:
+    """
+    Stream plan generation status as Server-Sent Events.
+
+    Sends the current status immediately, then one event per status change
+    until no plan is generating (or STATUS_STREAM_MAX_SECONDS have passed).
+    Replaces polling /plan-status.
+    """
+    queue, snapshot = await _open_status_subscription(user_id)
+
+    async def event_stream():
+        async with aclosing(_plan_status_updates(user_id, queue, snapshot)) as updates:
+            async for update in updates:
+                if update is None:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: status\ndata: {json_codec.dumps({'success': True, **update})}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.websocket("/ws/plan-status/{user_id}")
+async def plan_status_websocket(websocket: WebSocket, user_id: str):
+    """WebSocket variant of the plan status stream"""
+    await websocket.accept()
+
+    try:
+        queue, snapshot = await _open_status_subscription(user_id)
+    except HTTPException as e:
+        await websocket.send_json({"success": False, "error": e.detail})
+        await websocket.close(code=1008)
+        return
+
+    try:
+        async with aclosing(_plan_status_updates(user_id, queue, snapshot)) as updates:
+            async for update in updates:
+                if update is None:
+                    await websocket.send_json({"type": "heartbeat"})
+                    continue
+                await websocket.send_json({"success": True, **update})
+        await websocket.close()
+    except WebSocketDisconnect:
+        logger.debug(f"Plan status websocket closed by client for user {user_id}")
+
+
 # ============================================================================
 # PROFILE COMPLETENESS ENDPOINT
 # ============================================================================
 
-def ensure_dict(value):
-    if isinstance(value, dict):
-        return value
-    if isinstance(value, str):
-        try:
-            return json.loads(value)
-        except Exception:
-            return {}
-    return {}
-
-
 @app.get("/user/{user_id}/profile-completeness")
 async def get_profile_completeness(user_id: str) -> Dict[str, Any]:
     """
@@ -579,62 +857,13 @@ async def get_profile_completeness(user_id: str) -> Dict[str, Any]:
     missing fields, and suggested next questions.
     """
     try:
-        # Fetch user profile data from database
-        profile_query = """
-            SELECT
-                p.*,
-                upe.*,
-                qr.answers as quiz_answers
-            FROM profiles p
-            LEFT JOIN user_profile_extended upe ON p.id = upe.user_id
-            LEFT JOIN LATERAL (
-                SELECT answers FROM quiz_results
-                WHERE user_id = p.id
-                ORDER BY created_at DESC
-                LIMIT 1
-            ) qr ON true
-            WHERE p.id = $1
-        """
-
-        profile_data = await db_service.pool.fetchrow(profile_query, user_id)
+        # Fetch user profile snapshot (served from memory on repeated hits)
+        profile = await db_service.profiles.get(user_id)
 
-        if not profile_data:
+        if not profile:
             raise HTTPException(status_code=404, detail="User profile not found")
 
-        # Build MealUserProfileData from database
-        quiz_answers = ensure_dict(profile_data.get('quiz_answers') or {})
-
-        user_profile = UserProfileData(
-            # Core from quiz
-            main_goal=quiz_answers.get('mainGoal'),
-            current_weight=profile_data.get('weight'),
-            target_weight=profile_data.get('target_weight'),
-            age=profile_data.get('age'),
-            gender=profile_data.get('gender'),
-            height=profile_data.get('height'),
-            dietary_style=quiz_answers.get('dietaryStyle'),
-            activity_level=quiz_answers.get('activityLevel'),
-            exercise_frequency=quiz_answers.get('exerciseFrequency'),
-
-            # From user_profile_extended
-            cooking_skill=profile_data.get('cooking_skill'),
-            cooking_time=profile_data.get('cooking_time'),
-            grocery_budget=profile_data.get('grocery_budget'),
-            meals_per_day=profile_data.get('meals_per_day'),
-            food_allergies=profile_data.get('food_allergies'),
-            disliked_foods=profile_data.get('disliked_foods'),
-            meal_prep_preference=profile_data.get('meal_prep_preference'),
-            gym_access=profile_data.get('gym_access'),
-            equipment_available=profile_data.get('equipment_available'),
-            workout_location_preference=profile_data.get('workout_location_preference'),
-            injuries_limitations=profile_data.get('injuries_limitations'),
-            fitness_experience=profile_data.get('fitness_experience'),
-            health_conditions=profile_data.get('health_conditions'),
-            medications=profile_data.get('medications'),
-            sleep_quality=profile_data.get('sleep_quality'),
-            stress_level=profile_data.get('stress_level'),
-            dietary_restrictions=profile_data.get('dietary_restrictions'),
-        )
+        user_profile = profile.to_profile_data()
 
         # Analyze with ProfileCompletenessService
         report = ProfileCompletenessService.analyze(user_profile)
@@ -665,19 +894,18 @@ async def get_profile_completeness(user_id: str) -> Dict[str, Any]:
 # PLAN REGENERATION ENDPOINT
 # ============================================================================
 
-def _convert_full_to_meal_profile(profile_data: UserProfileData, nutrition: Dict[str, Any]) -> MealUserProfileData:
-    quiz_answers = ensure_dict(profile_data.get('quiz_answers') or {})
+def _convert_full_to_meal_profile(profile: ProfileSnapshot, nutrition: Dict[str, Any]) -> MealUserProfileData:
     return MealUserProfileData(
         # Core from quiz
-        main_goal=quiz_answers.get('mainGoal'),
-        current_weight=profile_data.get('weight'),
-        target_weight=profile_data.get('target_weight'),
-        age=profile_data.get('age'),
-        gender=profile_data.get('gender'),
-        height=profile_data.get('height'),
-        dietary_style=quiz_answers.get('dietaryStyle'),
-        activity_level=quiz_answers.get('activityLevel'),
-        exercise_frequency=quiz_answers.get('exerciseFrequency'),
+        main_goal=profile.main_goal,
+        current_weight=profile.weight,
+        target_weight=profile.target_weight,
+        age=profile.age,
+        gender=profile.gender,
+        height=profile.height,
+        dietary_style=profile.dietary_style,
+        activity_level=profile.activity_level,
+        exercise_frequency=profile.exercise_frequency,
 
         # Nutrition targets (from calculations)
         daily_calories=nutrition['goalCalories'],
@@ -685,31 +913,30 @@ def _convert_full_to_meal_profile(profile_data: UserProfileData, nutrition: Dict
         carbs=nutrition['macros'].get('carbs_g'),
         fats=nutrition['macros'].get('fat_g'),
 
-        food_allergies=profile_data.get('food_allergies'),
-        cooking_skill=profile_data.get('cooking_skill'),
-        cooking_time=profile_data.get('cooking_time'),
-        grocery_budget=profile_data.get('grocery_budget'),
-        meals_per_day=profile_data.get('meals_per_day'),
-        health_conditions=profile_data.get('health_conditions'),
-        medications=profile_data.get('medications'),
-        sleep_quality=profile_data.get('sleep_quality'),
-        stress_level=profile_data.get('stress_level'),
-        disliked_foods=profile_data.get('disliked_foods'),
-        meal_prep_preference=profile_data.get('meal_prep_preference'),
-        dietary_restrictions=profile_data.get('dietary_restrictions')
+        food_allergies=profile.food_allergies,
+        cooking_skill=profile.cooking_skill,
+        cooking_time=profile.cooking_time,
+        grocery_budget=profile.grocery_budget,
+        meals_per_day=profile.meals_per_day,
+        health_conditions=profile.health_conditions,
+        medications=profile.medications,
+        sleep_quality=profile.sleep_quality,
+        stress_level=profile.stress_level,
+        disliked_foods=profile.disliked_foods,
+        meal_prep_preference=profile.meal_prep_preference,
+        dietary_restrictions=profile.dietary_restrictions
     )
 
-def _convert_full_to_workout_profile(profile_data: UserProfileData, nutrition: Dict[str, Any]) -> WorkoutUserProfileData:
-    quiz_answers = ensure_dict(profile_data.get('quiz_answers') or {})
+def _convert_full_to_workout_profile(profile: ProfileSnapshot, nutrition: Dict[str, Any]) -> WorkoutUserProfileData:
     return WorkoutUserProfileData(
-        main_goal=quiz_answers.get('mainGoal'),
-        current_weight=profile_data.get('weight'),
-        target_weight=profile_data.get('target_weight'),
-        age=profile_data.get('age'),
-        gender=profile_data.get('gender'),
-        height=profile_data.get('height'),
-        activity_level=quiz_answers.get('activityLevel'),
-        exercise_frequency=quiz_answers.get('exerciseFrequency'),
+        main_goal=profile.main_goal,
+        current_weight=profile.weight,
+        target_weight=profile.target_weight,
+        age=profile.age,
+        gender=profile.gender,
+        height=profile.height,
+        activity_level=profile.activity_level,
+        exercise_frequency=profile.exercise_frequency,
         
         # Nutrition targets (from calculations)
         daily_calories=nutrition['goalCalories'],
@@ -717,53 +944,55 @@ def _convert_full_to_workout_profile(profile_data: UserProfileData, nutrition: D
         carbs=nutrition['macros'].get('carbs_g'),
         fats=nutrition['macros'].get('fat_g'),
 
-        gym_access=profile_data.get('gym_access'),
-        equipment_available=profile_data.get('equipment_available'),
-        workout_location_preference=profile_data.get('workout_location_preference'),
-        injuries_limitations=profile_data.get('injuries_limitations'),
-        fitness_experience=profile_data.get('fitness_experience'),
-        health_conditions=profile_data.get('health_conditions'),
-        medications=profile_data.get('medications'),
-        sleep_quality=profile_data.get('sleep_quality'),
-        stress_level=profile_data.get('stress_level')
+        gym_access=profile.gym_access,
+        equipment_available=profile.equipment_available,
+        workout_location_preference=profile.workout_location_preference,
+        injuries_limitations=profile.injuries_limitations,
+        fitness_experience=profile.fitness_experience,
+        health_conditions=profile.health_conditions,
+        medications=profile.medications,
+        sleep_quality=profile.sleep_quality,
+        stress_level=profile.stress_level
     )
 
-def _calculate_nutrition(profile_data: UserProfileData) -> Dict[str, Any]:
-    quiz_answers = ensure_dict(profile_data.get('quiz_answers') or {})
-
+def _calculate_nutrition(profile: ProfileSnapshot, tdee_state: Optional[TdeeState] = None) -> Dict[str, Any]:
     # Calculate BMI
-    height_m = profile_data.get('height') / 100
-    bmi = profile_data.get('weight') / (height_m ** 2)
+    height_m = profile.height / 100
+    bmi = profile.weight / (height_m ** 2)
 
     # Calculate BMR (Basal Metabolic Rate)
     bmr = calculate_bmr(
-        weight=profile_data.get('weight'),
-        height=profile_data.get('height'),
-        age=profile_data.get('age'),
-        gender=profile_data.get('gender')
+        weight=profile.weight,
+        height=profile.height,
+        age=profile.age,
+        gender=profile.gender
     )
 
-    # Calculate TDEE (Total Daily Energy Expenditure)
-    tdee = calculate_tdee(
-        bmr=bmr,
-        exercise_freq=quiz_answers.get('exerciseFrequency'),
-        occupation='Desk job'  # Default
+    # Calculate TDEE (Total Daily Energy Expenditure), adapted to logged
+    # intake and weight trend once the user has enough history
+    tdee = estimate_tdee(
+        tdee_state,
+        calculate_tdee(
+            bmr=bmr,
+            exercise_freq=profile.exercise_frequency,
+            occupation='Desk job'  # Default
+        )
     )
 
     # Calculate goal calories based on user's goal
     goal_calories = calculate_goal_calories(
         tdee=tdee,
-        goal=quiz_answers.get('mainGoal'),
+        goal=profile.main_goal,
         bmr=bmr,
-        gender=profile_data.get('gender')
+        gender=profile.gender
     )
 
     # Calculate macros
     macros_result = calculate_macros(
         goal_calories=goal_calories,
-        weight=profile_data.get('weight'),
-        goal=quiz_answers.get('mainGoal'),
-        dietary_style=quiz_answers.get('dietaryStyle')
+        weight=profile.weight,
+        goal=profile.main_goal,
+        dietary_style=profile.dietary_style
     )
 
     # Build Calculations object
@@ -773,7 +1002,7 @@ def _calculate_nutrition(profile_data: UserProfileData) -> Dict[str, Any]:
         tdee=round(tdee, 2),
         macros=Macros(**macros_result),
         goalCalories=goal_calories,
-        goalWeight=profile_data.get('target_weight'),
+        goalWeight=profile.target_weight,
     )
 
     # Prepare nutrition dict for background tasks
@@ -790,7 +1019,7 @@ def _calculate_nutrition(profile_data: UserProfileData) -> Dict[str, Any]:
 async def _generate_premium_meal_plan(
     user_id: str,
     quiz_result_id: str,
-    profile_data: UserProfileData,
+    profile_data: ProfileSnapshot,
     nutrition: Dict[str, Any],
     ai_provider: str = "openai",
     model_name: str = "gpt-4o-mini",
@@ -820,13 +1049,26 @@ async def _generate_premium_meal_plan(
             f"Missing {len(prompt_response.metadata.missing_fields)} fields"
         )
 
-        # Generate meal plan with AI
-        meal_plan = await ai_service.generate_plan(
-            prompt_response.prompt,
-            ai_provider,
-            model_name,
-            user_id
-        )
+        # BASIC plans come from the recipe library when it covers every meal
+        solved = None
+        if prompt_response.metadata.personalization_level == "BASIC":
+            solved = await _solve_basic_meal_plan(meal_profile, nutrition, user_id)
+
+        if solved:
+            meal_plan, solver_report = solved
+            macro_verification = None
+        else:
+            # Generate meal plan with AI
+            meal_plan = await ai_service.generate_plan(
+                prompt_response.prompt,
+                ai_provider,
+                model_name,
+                user_id
+            )
+            solver_report = None
+
+            # Correct macros and portions locally before saving
+            macro_verification = await _verify_meal_macros(meal_plan, nutrition, user_id)
 
         # Add tier metadata to plan
         meal_plan["_metadata"] = {
@@ -835,27 +1077,21 @@ async def _generate_premium_meal_plan(
             "used_defaults": prompt_response.metadata.used_defaults,
             "missing_fields": prompt_response.metadata.missing_fields,
             "generated_at": datetime.now().isoformat(),
-            "regeneration_reason": regeneration_reason
+            "regeneration_reason": regeneration_reason,
+            "generation_method": "solver" if solved else "ai",
+            "solver": solver_report,
+            "macro_verification": macro_verification
         }
 
-        # Track tier unlock if tier changed
-        await _track_tier_unlock_if_changed(
-            user_id,
-            "meal",
-            prompt_response.metadata.personalization_level,
-            prompt_response.metadata.data_completeness,
-            regeneration_reason
-        )
-
-        # Save meal plan to database
+        # Save meal plan, completed status and tier unlock in one transaction
         await db_service.save_meal_plan(
             user_id,
             quiz_result_id,
             meal_plan,
-            nutrition["goalCalories"]
+            nutrition["goalCalories"],
+            regeneration_reason=regeneration_reason
         )
 
-        await db_service.update_plan_status(user_id, "meal", "completed")
         logger.info(f"Meal plan regenerated successfully for user {user_id}")
 
     except Exception as e:
@@ -865,7 +1101,7 @@ async def _generate_premium_meal_plan(
 async def _generate_premium_workout_plan(
     user_id: str,
     quiz_result_id: str,
-    profile_data: UserProfileData,
+    profile_data: ProfileSnapshot,
     nutrition: Dict[str, Any],
     ai_provider: str = "openai",
     model_name: str = "gpt-4o",
@@ -898,13 +1134,28 @@ async def _generate_premium_workout_plan(
             f"Missing {len(meta['missing_fields'])} fields"
         )
 
-        # Generate workout plan with AI
-        workout_plan = await ai_service.generate_plan(
-            prompt_response["prompt"],
-            ai_provider,
-            model_name,
-            user_id
-        )
+        # BASIC plans come from the exercise library when it covers every day
+        workout_plan = None
+        generation_method = "assembler"
+        if meta["personalization_level"] == "BASIC":
+            workout_plan = await _assemble_workout_plan(workout_profile, user_id)
+
+        if workout_plan is None:
+            try:
+                # Generate workout plan with AI
+                workout_plan = await ai_service.generate_plan(
+                    prompt_response["prompt"],
+                    ai_provider,
+                    model_name,
+                    user_id
+                )
+                generation_method = "ai"
+            except Exception as e:
+                workout_plan = await _assemble_workout_plan(workout_profile, user_id, fallback=True)
+                if workout_plan is None:
+                    raise
+                logger.warning(f"Workout plan generation failed for user {user_id}, using assembled plan: {e}")
+                generation_method = "assembler_fallback"
 
         # Add tier metadata to plan
         workout_plan["_metadata"] = {
@@ -913,26 +1164,18 @@ async def _generate_premium_workout_plan(
             "used_defaults": meta["used_defaults"],
             "missing_fields": meta["missing_fields"],
             "generated_at": datetime.now().isoformat(),
-            "regeneration_reason": regeneration_reason
+            "regeneration_reason": regeneration_reason,
+            "generation_method": generation_method
         }
 
-        # Track tier unlock if tier changed
-        await _track_tier_unlock_if_changed(
-            user_id,
-            "workout",
-            meta["personalization_level"],
-            meta["data_completeness"],
-            regeneration_reason
-        )
-
-        # Save workout plan to database
+        # Save workout plan, completed status and tier unlock in one transaction
         await db_service.save_workout_plan(
             user_id,
             quiz_result_id,
             workout_plan,
+            regeneration_reason=regeneration_reason
         )
 
-        await db_service.update_plan_status(user_id, "workout", "completed")
         logger.info(f"Workout plan regenerated successfully for user {user_id}")
 
     except Exception as e:
@@ -966,57 +1209,12 @@ async def regenerate_plans(request: Dict[str, Any]) -> Dict[str, Any]:
     try:
         logger.info(f"[Regenerate] Request for {user_id}: meal={regenerate_meal}, workout={regenerate_workout}, reason={reason}")
 
-        # Fetch user profile data from database
-        profile_query = """
-            SELECT
-                p.*,
-                upe.*,
-                qr.answers as quiz_answers
-            FROM profiles p
-            LEFT JOIN user_profile_extended upe ON p.id = upe.user_id
-            LEFT JOIN LATERAL (
-                SELECT answers FROM quiz_results
-                WHERE user_id = p.id
-                ORDER BY created_at DESC
-                LIMIT 1
-            ) qr ON true
-            WHERE p.id = $1
-        """
-
-        profile_data = await db_service.pool.fetchrow(profile_query, user_id)
+        # Fetch user profile snapshot
+        profile_data = await db_service.profiles.get(user_id)
 
         if not profile_data:
             raise HTTPException(status_code=404, detail="User profile not found")
 
-        # Build MealUserProfileData from database
-        quiz_answers = ensure_dict(profile_data.get('quiz_answers') or {})
-
-        # Check if user can regenerate (based on subscription tier)
-        if reason == 'manual_request':
-            # Check limits for meal plan
-            if regenerate_meal:
-                can_regen_meal = await db_service.pool.fetchval(
-                    "SELECT can_regenerate_plan($1, 'meal', 'manual')",
-                    user_id
-                )
-                if not can_regen_meal:
-                    raise HTTPException(
-                        status_code=403,
-                        detail="Regeneration limit reached. Upgrade to Pro for unlimited regenerations."
-                    )
-
-            # Check limits for workout plan
-            if regenerate_workout:
-                can_regen_workout = await db_service.pool.fetchval(
-                    "SELECT can_regenerate_plan($1, 'workout', 'manual')",
-                    user_id
-                )
-                if not can_regen_workout:
-                    raise HTTPException(
-                        status_code=403,
-                        detail="Regeneration limit reached. Upgrade to Pro for unlimited regenerations."
-                    )
-
         latest_quiz = await db_service.pool.fetchrow(
             "SELECT id FROM quiz_results WHERE user_id = $1 ORDER BY created_at DESC LIMIT 1",
             user_id
@@ -1025,6 +1223,19 @@ async def regenerate_plans(request: Dict[str, Any]) -> Dict[str, Any]:
         if not latest_quiz:
             raise HTTPException(status_code=404, detail="No quiz data found for user")
 
+        # Everything that can fail runs before the quota is used
+        nutrition_dict = _calculate_nutrition(profile_data, await db_service.get_tdee_state(user_id))
+
+        # Check and count manual regenerations against the subscription tier's
+        # monthly limit in one atomic step, for both plan types at once
+        if reason == 'manual_request' and (regenerate_meal or regenerate_workout):
+            quota = await db_service.reserve_regenerations(user_id, regenerate_meal, regenerate_workout)
+            if not quota["reserved"]:
+                raise HTTPException(
+                    status_code=403,
+                    detail="Regeneration limit reached. Upgrade to Pro for unlimited regenerations."
+                )
+
         # Update status to "generating" before starting regeneration
         if regenerate_meal:
             await db_service.update_plan_status(user_id, "meal", "generating")
@@ -1032,8 +1243,6 @@ async def regenerate_plans(request: Dict[str, Any]) -> Dict[str, Any]:
         if regenerate_workout:
             await db_service.update_plan_status(user_id, "workout", "generating")
 
-        nutrition_dict = _calculate_nutrition(profile_data)
-
         # Fire regeneration tasks
         if regenerate_meal:
             asyncio.create_task(
@@ -1048,13 +1257,6 @@ async def regenerate_plans(request: Dict[str, Any]) -> Dict[str, Any]:
                 )
             )
 
-            # Track usage if manual request
-            if reason == 'manual_request':
-                await db_service.pool.execute(
-                    "SELECT track_regeneration($1, 'meal', 'manual')",
-                    user_id
-                )
-
         if regenerate_workout:
             asyncio.create_task(
                 _generate_premium_workout_plan(
@@ -1068,13 +1270,6 @@ async def regenerate_plans(request: Dict[str, Any]) -> Dict[str, Any]:
                 )
             )
 
-            # Track usage if manual request
-            if reason == 'manual_request':
-                await db_service.pool.execute(
-                    "SELECT track_regeneration($1, 'workout', 'manual')",
-                    user_id
-                )
-
         return {
             "success": True,
             "message": "Plan regeneration started",
@@ -1101,32 +1296,13 @@ async def check_can_regenerate(user_id: str) -> Dict[str, Any]:
     Returns eligibility status and remaining regenerations for the current month.
     """
     try:
-        # Get user's subscription tier
-        tier_query = """
-            SELECT s.tier, st.ai_generations_per_month
-            FROM subscriptions s
-            JOIN subscription_tiers st ON s.tier = st.tier
-            WHERE s.user_id = $1 AND s.status = 'active'
-        """
-        tier_data = await db_service.pool.fetchrow(tier_query, user_id)
-
-        tier = tier_data['tier'] if tier_data else 'free'
-        monthly_limit = tier_data['ai_generations_per_month'] if tier_data else 1
-
-        # Get current month's usage
-        period_start = datetime.now(timezone.utc).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-
-        usage_query = """
-            SELECT
-                COALESCE(meal_plan_regenerations, 0) as meal_regens,
-                COALESCE(workout_plan_regenerations, 0) as workout_regens
-            FROM plan_regeneration_usage
-            WHERE user_id = $1 AND period_start = $2
-        """
-        usage_data = await db_service.pool.fetchrow(usage_query, user_id, period_start)
-
-        meal_usage = usage_data['meal_regens'] if usage_data else 0
-        workout_usage = usage_data['workout_regens'] if usage_data else 0
+        # Get user's subscription tier and current month's usage
+        usage = await db_service.get_regeneration_usage(user_id, billing_period_start())
+
+        tier = usage['tier']
+        monthly_limit = usage['monthly_limit']
+        meal_usage = usage['meal_usage']
+        workout_usage = usage['workout_usage']
 
         # Pro/Premium have unlimited (999999)
         can_regenerate_meal = meal_usage < monthly_limit
@@ -1153,60 +1329,110 @@ async def check_can_regenerate(user_id: str) -> Dict[str, Any]:
 async def get_plan_tiers(user_id: str) -> Dict[str, Any]:
     """
     Get current tier levels for user's meal and workout plans.
-    Returns tier from plan metadata to show/hide upgrade buttons.
+    Returns tier from the plan tier columns to show/hide upgrade buttons.
     """
     try:
-        async with db_service.get_connection() as conn:
-            # Get meal plan tier
-            meal_plan = await conn.fetchrow(
-                """SELECT plan_data
-                   FROM ai_meal_plans
-                   WHERE user_id = $1
-                   ORDER BY created_at DESC
-                   LIMIT 1""",
-                user_id
-            )
+        tiers = await db_service.get_plan_tiers(user_id)
+        return _plan_tiers_response(tiers)
 
-            # Get workout plan tier
-            workout_plan = await conn.fetchrow(
-                """SELECT plan_data
-                   FROM ai_workout_plans
-                   WHERE user_id = $1
-                   ORDER BY created_at DESC
-                   LIMIT 1""",
-                user_id
-            )
+    except Exception as e:
+        log_error(e, "Get plan tiers", user_id)
+        raise HTTPException(status_code=500, detail=str(e))
 
-            meal_tier = "BASIC"
-            meal_completeness = 0.0
-            if meal_plan and meal_plan['plan_data']:
-                plan_json = json.loads(meal_plan['plan_data']) if isinstance(meal_plan['plan_data'], str) else meal_plan['plan_data']
-                metadata = plan_json.get('_metadata', {})
-                meal_tier = metadata.get('tier', 'BASIC')
-                meal_completeness = metadata.get('completeness', 0.0)
-
-            workout_tier = "BASIC"
-            workout_completeness = 0.0
-            if workout_plan and workout_plan['plan_data']:
-                plan_json = json.loads(workout_plan['plan_data']) if isinstance(workout_plan['plan_data'], str) else workout_plan['plan_data']
-                metadata = plan_json.get('_metadata', {})
-                workout_tier = metadata.get('tier', 'BASIC')
-                workout_completeness = metadata.get('completeness', 0.0)
-
-            return {
-                "meal_tier": meal_tier,
-                "workout_tier": workout_tier,
-                "meal_completeness": meal_completeness,
-                "workout_completeness": workout_completeness,
-                "can_upgrade_to_standard": meal_completeness >= 50 and meal_tier == "BASIC",
-                "can_upgrade_to_premium": meal_completeness == 70 and meal_tier != "PREMIUM"
-            }
 
+@app.post("/plan-tiers/bulk")
+async def get_plan_tiers_bulk(request: BulkUserIdsRequest) -> StreamingResponse:
+    """
+    Plan tiers of many users with a single query, streamed as one NDJSON
+    line per requested user in request order.
+    """
+    user_ids = request.unique_user_ids()
+    try:
+        tiers = await db_service.get_plan_tiers_bulk(user_ids)
     except Exception as e:
-        log_error(e, "Get plan tiers", user_id)
+        log_error(e, f"Get plan tiers in bulk ({len(user_ids)} users)")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return _ndjson_response(tiers, _plan_tiers_response)
+
+
+def _plan_tiers_response(tiers: Dict[str, Any]) -> Dict[str, Any]:
+    """Plan tiers plus the upgrade button flags"""
+    meal_tier = tiers["meal_tier"]
+    meal_completeness = tiers["meal_completeness"]
+
+    return {
+        "meal_tier": meal_tier,
+        "workout_tier": tiers["workout_tier"],
+        "meal_completeness": meal_completeness,
+        "workout_completeness": tiers["workout_completeness"],
+        "can_upgrade_to_standard": meal_completeness >= 50 and meal_tier == "BASIC",
+        "can_upgrade_to_premium": meal_completeness == 70 and meal_tier != "PREMIUM"
+    }
+
+
+# ============================================================================
+# DATA EXPORTS
+# ============================================================================
+
+@app.post("/exports")
+async def create_data_export(request: DataExportRequest) -> Dict[str, Any]:
+    """
+    Start exporting a user's data.
+
+    Creates a data_exports row and builds the archive in the background;
+    poll GET /exports/{export_id} for progress.
+    """
+    if not db_service.pool:
+        raise HTTPException(status_code=503, detail="Database not initialized")
+
+    try:
+        export_id = await data_export_service.create_export(
+            request.user_id,
+            export_type=request.export_type,
+            export_format=request.export_format,
+            date_range_start=request.date_range_start,
+            date_range_end=request.date_range_end,
+            include_photos=request.include_photos,
+            include_analytics=request.include_analytics,
+        )
+        return {"success": True, "export_id": export_id, "status": "pending"}
+
+    except Exception as e:
+        log_error(e, "Create data export", request.user_id)
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/exports/{export_id}")
+async def get_data_export(export_id: str) -> Dict[str, Any]:
+    """Status, progress and download details of a data export"""
+    export = await data_export_service.get_export(export_id)
+    if not export:
+        raise HTTPException(status_code=404, detail="Export not found")
+    return {"success": True, **export}
+
+
+@app.get("/exports/{export_id}/download")
+async def download_data_export(export_id: str) -> FileResponse:
+    """Download a completed, unexpired export archive"""
+    export = await data_export_service.get_export(export_id)
+    if not export:
+        raise HTTPException(status_code=404, detail="Export not found")
+
+    expires_at = export["expires_at"]
+    if export["status"] == "expired" or (expires_at and expires_at < datetime.now(expires_at.tzinfo)):
+        raise HTTPException(status_code=410, detail="Export has expired")
+    if export["status"] != "completed":
+        raise HTTPException(status_code=409, detail=f"Export is {export['status']}")
+
+    path = data_export_service.archive_path(export_id)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Export file not found")
+
+    await data_export_service.record_download(export_id)
+    return FileResponse(path, media_type="application/zip", filename=f"greenlean-export-{export_id}.zip")
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
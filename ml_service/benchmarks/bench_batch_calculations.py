@@ -0,0 +1,88 @@
+"""
+Benchmark nutrition target recomputation: scalar utils.calculations loop vs
+the vectorized utils.batch_calculations engine.
+
+The scalar path is timed on a sample and extrapolated; the batch path runs
+on the full population, including string encoding.
+
+    python -m benchmarks.bench_batch_calculations [--users 1000000] [--scalar-sample 50000]
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from utils.batch_calculations import (
+    EXERCISE_FREQUENCIES,
+    GOAL_KEYS,
+    calculate_nutrition_profiles,
+    encode_dietary_styles,
+    encode_exercise_frequencies,
+    encode_genders,
+    encode_goals,
+    encode_occupations,
+)
+from utils.calculations import calculate_bmr, calculate_goal_calories, calculate_macros, calculate_tdee
+
+
+def _population(users: int):
+    rng = np.random.default_rng(0)
+    return {
+        "weight": np.round(rng.uniform(45, 160, users), 1),
+        "height": np.round(rng.uniform(145, 205, users), 0),
+        "age": rng.integers(16, 80, users),
+        "gender": rng.choice(["male", "female", "other"], users).astype(object),
+        "frequency": rng.choice(list(EXERCISE_FREQUENCIES), users).astype(object),
+        "occupation": rng.choice(["desk job", "on feet", "student"], users).astype(object),
+        "goal": rng.choice(list(GOAL_KEYS), users).astype(object),
+        "diet": rng.choice(["balanced", "keto", "vegan"], users).astype(object),
+    }
+
+
+def _scalar(data, count: int) -> None:
+    for i in range(count):
+        weight = float(data["weight"][i])
+        bmr = calculate_bmr(weight, float(data["height"][i]), int(data["age"][i]), data["gender"][i])
+        tdee = calculate_tdee(bmr, data["frequency"][i], data["occupation"][i])
+        goal_calories = calculate_goal_calories(tdee, data["goal"][i], bmr, data["gender"][i])
+        calculate_macros(goal_calories, weight, data["goal"][i], data["diet"][i])
+
+
+def _batch(data) -> None:
+    calculate_nutrition_profiles(
+        data["weight"],
+        data["height"],
+        data["age"],
+        encode_genders(data["gender"]),
+        encode_exercise_frequencies(data["frequency"]),
+        encode_occupations(data["occupation"]),
+        encode_goals(data["goal"]),
+        encode_dietary_styles(data["diet"]),
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--scalar-sample", type=int, default=50_000)
+    args = parser.parse_args()
+
+    data = _population(args.users)
+    sample = min(args.scalar_sample, args.users)
+
+    start = time.perf_counter()
+    _scalar(data, sample)
+    scalar_seconds = (time.perf_counter() - start) * args.users / sample
+
+    start = time.perf_counter()
+    _batch(data)
+    batch_seconds = time.perf_counter() - start
+
+    print(f"{args.users:,} users")
+    print(f"{'scalar loop (extrapolated)':<28} {scalar_seconds:>8.2f} s")
+    print(f"{'batch engine':<28} {batch_seconds:>8.2f} s  ({scalar_seconds / batch_seconds:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Benchmark "current plan" lookups as per-user plan history grows.
+
+Builds TEMP copies of the plan table layout (indexed on user_id only, like
+ai_meal_plans) plus a user_current_plans pointer table, then times:
+
+- scan:    WHERE user_id = $1 ORDER BY created_at DESC LIMIT 1
+- pointer: user_current_plans JOIN plans ON id = meal_plan_id
+
+Uses the same database settings as the service; nothing outside pg_temp is
+touched.
+
+    python -m benchmarks.bench_current_plan_lookup [--users 200] [--lookups 2000]
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+import asyncpg
+
+from services.database import db_service
+
+HISTORY_SIZES = [1, 10, 100, 1000]
+
+SCAN_SQL = """
+    SELECT id, status, tier FROM bench_plans
+    WHERE user_id = $1
+    ORDER BY created_at DESC
+    LIMIT 1
+"""
+
+POINTER_SQL = """
+    SELECT p.id, p.status, p.tier
+    FROM bench_current_plans c
+    JOIN bench_plans p ON p.id = c.meal_plan_id
+    WHERE c.user_id = $1
+"""
+
+
+async def _setup(conn: asyncpg.Connection, users: int, history: int) -> list:
+    await conn.execute("""
+        DROP TABLE IF EXISTS bench_current_plans, bench_plans;
+        CREATE TEMP TABLE bench_plans (
+            id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+            user_id uuid NOT NULL,
+            plan_data jsonb,
+            tier text,
+            status text,
+            created_at timestamptz NOT NULL
+        );
+        CREATE INDEX ON bench_plans (user_id);
+        CREATE TEMP TABLE bench_current_plans (
+            user_id uuid PRIMARY KEY,
+            meal_plan_id uuid
+        );
+    """)
+    await conn.execute("""
+        INSERT INTO bench_plans (user_id, plan_data, tier, status, created_at)
+        SELECT u.user_id,
+               jsonb_build_object('meals', repeat('x', 2000)),
+               'BASIC', 'completed',
+               now() - make_interval(days => g)
+        FROM (SELECT gen_random_uuid() AS user_id FROM generate_series(1, $1)) u
+        CROSS JOIN generate_series(1, $2) g
+    """, users, history)
+    await conn.execute("""
+        INSERT INTO bench_current_plans
+        SELECT DISTINCT ON (user_id) user_id, id
+        FROM bench_plans
+        ORDER BY user_id, created_at DESC;
+        ANALYZE bench_plans;
+        ANALYZE bench_current_plans;
+    """)
+    return [r["user_id"] for r in await conn.fetch("SELECT user_id FROM bench_current_plans")]
+
+
+async def _time_lookups(conn: asyncpg.Connection, sql: str, user_ids: list, lookups: int) -> float:
+    rng = random.Random(0)
+    start = time.perf_counter()
+    for _ in range(lookups):
+        await conn.fetchrow(sql, rng.choice(user_ids))
+    return (time.perf_counter() - start) / lookups * 1e6
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--lookups", type=int, default=2000)
+    args = parser.parse_args()
+
+    conn = await asyncpg.connect(**db_service._connect_kwargs())
+    try:
+        print(f"{args.users} users, {args.lookups} lookups per run")
+        print(f"{'plans/user':>10} {'scan µs':>10} {'pointer µs':>11}")
+        for history in HISTORY_SIZES:
+            user_ids = await _setup(conn, args.users, history)
+            scan = await _time_lookups(conn, SCAN_SQL, user_ids, args.lookups)
+            pointer = await _time_lookups(conn, POINTER_SQL, user_ids, args.lookups)
+            print(f"{history:>10} {scan:>10.1f} {pointer:>11.1f}")
+    finally:
+        await conn.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
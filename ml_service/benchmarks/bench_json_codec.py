@@ -0,0 +1,50 @@
+"""
+Benchmark plan_data serialization: stdlib json vs the pool's JSONB codec.
+
+Compares the old path (json.dumps → str parameter, str result → json.loads)
+with utils.json_codec's binary JSONB encoder/decoder on ~50 KB meal plans.
+
+    python -m benchmarks.bench_json_codec [--iterations 2000]
+"""
+
+import argparse
+import json
+import time
+
+from benchmarks.sample_plans import make_meal_plan
+from utils import json_codec
+
+
+def _time_per_call(fn, arg, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn(arg)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    plan = make_meal_plan(target_kb=50)
+    text = json.dumps(plan)
+    # asyncpg sends str parameters as UTF-8 and hands back str results
+    wire_text = text.encode()
+    wire_binary = json_codec._encode_jsonb(plan)
+
+    print(f"Plan size: {len(wire_text) / 1024:.1f} KB, {args.iterations} iterations")
+    print(f"Backend: {'orjson' if json_codec.orjson else 'stdlib json'}")
+
+    rows = [
+        ("encode  json.dumps + utf-8", lambda p: json.dumps(p).encode(), plan),
+        ("encode  jsonb codec", json_codec._encode_jsonb, plan),
+        ("decode  utf-8 + json.loads", lambda b: json.loads(b.decode()), wire_text),
+        ("decode  jsonb codec", json_codec._decode_jsonb, wire_binary),
+    ]
+    for label, fn, arg in rows:
+        print(f"{label:<30} {_time_per_call(fn, arg, args.iterations):>9.1f} µs/plan")
+
+
+if __name__ == "__main__":
+    main()
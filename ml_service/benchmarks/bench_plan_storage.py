@@ -0,0 +1,54 @@
+"""
+Benchmark chunked plan storage: bytes written per plan with and without
+content-addressed sections.
+
+Simulates N plans whose shared sections come from a small pool of variants
+(as with boilerplate LLM output) and compares plan_data bytes, raw and
+zlib-compressed as a stand-in for TOAST compression.
+
+    python -m benchmarks.bench_plan_storage [--plans 1000] [--variants 20]
+"""
+
+import argparse
+import random
+import zlib
+
+from benchmarks.sample_plans import make_meal_plan
+from services.plan_storage import split_plan
+from utils import json_codec
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--plans", type=int, default=1000)
+    parser.add_argument("--variants", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    base = make_meal_plan(seed=0, target_kb=20)
+    shared = [make_meal_plan(seed=1000 + i, target_kb=1)["meal_prep_strategy"] for i in range(args.variants)]
+
+    raw = compressed = chunked_raw = chunked_compressed = 0
+    chunk_store = {}
+    for i in range(args.plans):
+        plan = dict(base, notes=f"plan {i}", meal_prep_strategy=rng.choice(shared))
+        data = json_codec.dumps_bytes(plan)
+        raw += len(data)
+        compressed += len(zlib.compress(data))
+
+        stored, chunks = split_plan("meal", plan)
+        data = json_codec.dumps_bytes(stored)
+        chunked_raw += len(data)
+        chunked_compressed += len(zlib.compress(data))
+        chunk_store.update(chunks)
+
+    chunk_bytes = sum(len(json_codec.dumps_bytes(c["content"])) for c in chunk_store.values())
+    print(f"{args.plans} plans, {args.variants} shared section variants")
+    print(f"{'inline':<10} {raw / args.plans / 1024:>8.2f} KB/plan raw  {compressed / args.plans / 1024:>8.2f} KB/plan compressed")
+    print(f"{'chunked':<10} {chunked_raw / args.plans / 1024:>8.2f} KB/plan raw  "
+          f"{chunked_compressed / args.plans / 1024:>8.2f} KB/plan compressed  "
+          f"+ {len(chunk_store)} chunks ({chunk_bytes / 1024:.1f} KB total)")
+
+
+if __name__ == "__main__":
+    main()
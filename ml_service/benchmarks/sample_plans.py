@@ -0,0 +1,75 @@
+"""Synthetic plan documents shaped like the LLM output stored in plan_data"""
+
+import random
+from typing import Any, Dict
+
+MEAL_TYPES = ["breakfast", "snack", "lunch", "snack", "dinner"]
+FOODS = [
+    "Chicken breast", "Brown rice", "Broccoli", "Rolled oats", "Greek yogurt",
+    "Salmon fillet", "Sweet potato", "Spinach", "Whole-wheat pasta", "Eggs",
+    "Avocado", "Almonds", "Banana", "Blueberries", "Tofu", "Quinoa", "Lentils",
+]
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    vocab = ["cook", "until", "golden", "season", "with", "salt", "pepper", "serve", "fresh",
+             "stir", "gently", "minutes", "medium", "heat", "olive", "oil", "garlic", "lemon"]
+    return " ".join(rng.choice(vocab) for _ in range(words)).capitalize() + "."
+
+
+def make_meal_plan(seed: int = 0, target_kb: int = 50) -> Dict[str, Any]:
+    """Build a meal plan of roughly target_kb kilobytes once serialized"""
+    rng = random.Random(seed)
+    meals = []
+    while True:
+        meal_type = MEAL_TYPES[len(meals) % len(MEAL_TYPES)]
+        foods = [
+            {
+                "name": rng.choice(FOODS),
+                "portion": f"{rng.randint(50, 250)}g",
+                "grams": rng.randint(50, 250),
+                "calories": rng.randint(40, 400),
+                "protein": round(rng.uniform(0, 40), 1),
+                "carbs": round(rng.uniform(0, 60), 1),
+                "fats": round(rng.uniform(0, 25), 1),
+                "fiber": round(rng.uniform(0, 8), 1),
+            }
+            for _ in range(rng.randint(3, 6))
+        ]
+        meals.append({
+            "meal_type": meal_type,
+            "meal_name": f"{meal_type.title()} bowl {len(meals) + 1}",
+            "prep_time_minutes": rng.randint(10, 30),
+            "difficulty": rng.choice(["easy", "medium"]),
+            "meal_timing": "7:00 AM - 8:00 AM",
+            "total_calories": sum(f["calories"] for f in foods),
+            "total_protein": round(sum(f["protein"] for f in foods), 1),
+            "total_carbs": round(sum(f["carbs"] for f in foods), 1),
+            "total_fats": round(sum(f["fats"] for f in foods), 1),
+            "total_fiber": round(sum(f["fiber"] for f in foods), 1),
+            "tags": ["high-protein", "quick"],
+            "foods": foods,
+            "recipe": " ".join(_sentence(rng, 14) for _ in range(8)),
+            "tips": [_sentence(rng, 12) for _ in range(3)],
+        })
+        plan = {
+            "meals": meals,
+            "daily_totals": {"calories": 2200, "protein": 160, "carbs": 230, "fats": 70, "fiber": 32},
+            "shopping_list": {"proteins": FOODS[:6], "vegetables": FOODS[6:12], "estimated_cost": "$50-70"},
+            "meal_prep_strategy": {
+                "batch_cooking": [_sentence(rng, 10) for _ in range(4)],
+                "storage_tips": [_sentence(rng, 10) for _ in range(4)],
+                "time_saving_hacks": [_sentence(rng, 10) for _ in range(4)],
+            },
+            "notes": _sentence(rng, 20),
+            "_metadata": {
+                "tier": "PREMIUM",
+                "completeness": 80.0,
+                "used_defaults": [],
+                "missing_fields": [],
+                "generated_at": "2026-01-01T08:00:00",
+                "regeneration_reason": "initial_generation",
+            },
+        }
+        if len(str(plan)) >= target_kb * 1024:
+            return plan
@@ -44,6 +44,105 @@ class Settings:
         self.DB_POOL_MIN_SIZE: int = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
         self.DB_POOL_MAX_SIZE: int = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
 
+        # Pooler Configuration
+        # "auto" selects transaction mode for the Supabase transaction pooler port (6543)
+        self.DB_POOL_MODE: str = os.getenv("DB_POOL_MODE", "auto").lower()
+        self.DB_STATEMENT_CACHE_SIZE: int = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))
+        self.DB_MAX_QUERIES: int = int(os.getenv("DB_MAX_QUERIES", "50000"))
+        self.DB_MAX_INACTIVE_CONNECTION_LIFETIME: float = float(os.getenv("DB_MAX_INACTIVE_CONNECTION_LIFETIME", "240"))
+        self.DB_HEALTH_CHECK_IDLE_SECONDS: float = float(os.getenv("DB_HEALTH_CHECK_IDLE_SECONDS", "30"))
+        self.DB_HEALTH_CHECK_TIMEOUT: float = float(os.getenv("DB_HEALTH_CHECK_TIMEOUT", "2"))
+        # LISTEN needs a session-level connection (direct or session pooler port)
+        self.DB_LISTEN_HOST: Optional[str] = os.getenv("DB_LISTEN_HOST")
+        self.DB_LISTEN_PORT: Optional[str] = os.getenv("DB_LISTEN_PORT")
+
+        # Pool Instrumentation and Adaptive Sizing
+        self.DB_ACQUIRE_TIMEOUT: float = float(os.getenv("DB_ACQUIRE_TIMEOUT", "10"))
+        self.DB_QUERY_METRICS: bool = os.getenv("DB_QUERY_METRICS", "true").lower() == "true"
+        # Adaptive sizing moves the in-use connection limit between
+        # DB_POOL_MIN_SIZE and DB_POOL_ADAPTIVE_MAX_SIZE, starting at DB_POOL_MAX_SIZE
+        self.DB_POOL_ADAPTIVE: bool = os.getenv("DB_POOL_ADAPTIVE", "false").lower() == "true"
+        self.DB_POOL_ADAPTIVE_MAX_SIZE: int = int(os.getenv("DB_POOL_ADAPTIVE_MAX_SIZE", "20"))
+        self.DB_POOL_ADAPTIVE_INTERVAL_SECONDS: float = float(os.getenv("DB_POOL_ADAPTIVE_INTERVAL_SECONDS", "10"))
+        self.DB_POOL_ADAPTIVE_GROW_WAIT_MS: float = float(os.getenv("DB_POOL_ADAPTIVE_GROW_WAIT_MS", "25"))
+
+        # Read Replica Configuration (optional; same credentials as the primary)
+        self.DB_REPLICA_HOST: Optional[str] = os.getenv("DB_REPLICA_HOST")
+        self.DB_REPLICA_PORT: Optional[str] = os.getenv("DB_REPLICA_PORT")
+        self.DB_REPLICA_MAX_LAG_SECONDS: float = float(os.getenv("DB_REPLICA_MAX_LAG_SECONDS", "10"))
+        self.DB_REPLICA_LAG_CHECK_SECONDS: float = float(os.getenv("DB_REPLICA_LAG_CHECK_SECONDS", "5"))
+        # Users read from the primary for this long after their own writes. Never
+        # shorter than the worst replica lag still served (the lag limit plus one
+        # check interval, as lag is only sampled), or a user could read a replica
+        # that has not replayed their write yet
+        self.DB_READ_YOUR_WRITES_SECONDS: float = max(
+            float(os.getenv("DB_READ_YOUR_WRITES_SECONDS", "15")),
+            self.DB_REPLICA_MAX_LAG_SECONDS + self.DB_REPLICA_LAG_CHECK_SECONDS
+        )
+
+        # Plan Status Streaming Configuration
+        self.STATUS_STREAM_HEARTBEAT_SECONDS: float = float(os.getenv("STATUS_STREAM_HEARTBEAT_SECONDS", "15"))
+        # Streams end after this long even if a plan is still generating
+        self.STATUS_STREAM_MAX_SECONDS: float = float(os.getenv("STATUS_STREAM_MAX_SECONDS", "600"))
+        self.PLAN_STATUS_CACHE_SIZE: int = int(os.getenv("PLAN_STATUS_CACHE_SIZE", "10000"))
+        self.PLAN_STATUS_CACHE_TTL_SECONDS: float = float(os.getenv("PLAN_STATUS_CACHE_TTL_SECONDS", "300"))
+
+        # Plan storage: with chunked storage, shared plan sections are stored once
+        # in plan_chunks (needs the plan_chunks migration; plans are read back
+        # through plan_document / assemble_plan_data, never raw plan_data)
+        self.PLAN_CHUNKED_STORAGE: bool = os.getenv("PLAN_CHUNKED_STORAGE", "false").lower() == "true"
+        self.PLAN_CHUNK_MIN_BYTES: int = int(os.getenv("PLAN_CHUNK_MIN_BYTES", "256"))
+
+        # Generated meal plans: recompute macros from food_database and rescale
+        # portions towards the calorie/macro targets before saving
+        self.MEAL_MACRO_VERIFICATION: bool = os.getenv("MEAL_MACRO_VERIFICATION", "true").lower() == "true"
+
+        # BASIC meal plans: assemble from recipe_database and the user's meal
+        # templates instead of calling the model (falls back to the model when
+        # the library has no fitting meal for some slot)
+        self.BASIC_MEAL_SOLVER: bool = os.getenv("BASIC_MEAL_SOLVER", "true").lower() == "true"
+
+        # Workout plans from exercise_library: BASIC plans are assembled by rules
+        # instead of the model, and any tier falls back to them when the model
+        # call fails
+        self.BASIC_WORKOUT_ASSEMBLER: bool = os.getenv("BASIC_WORKOUT_ASSEMBLER", "true").lower() == "true"
+        self.WORKOUT_ASSEMBLER_FALLBACK: bool = os.getenv("WORKOUT_ASSEMBLER_FALLBACK", "true").lower() == "true"
+
+        # In-memory food/recipe index used to ground generated meal plan foods
+        self.FOOD_INDEX_ENABLED: bool = os.getenv("FOOD_INDEX_ENABLED", "true").lower() == "true"
+        self.FOOD_INDEX_REFRESH_SECONDS: float = float(os.getenv("FOOD_INDEX_REFRESH_SECONDS", "300"))
+
+        # Bulk plan status/tier endpoints accept at most this many user IDs
+        self.BULK_MAX_USER_IDS: int = int(os.getenv("BULK_MAX_USER_IDS", "5000"))
+
+        # Data Export Configuration
+        self.EXPORT_DIR: str = os.getenv("EXPORT_DIR", "exports")
+        self.EXPORT_MAX_CONCURRENT: int = int(os.getenv("EXPORT_MAX_CONCURRENT", "2"))
+        self.EXPORT_COMPRESSION_LEVEL: int = int(os.getenv("EXPORT_COMPRESSION_LEVEL", "6"))
+
+        # Batch Job Configuration (users per keyset batch)
+        self.MACRO_RECOMPUTE_BATCH_SIZE: int = int(os.getenv("MACRO_RECOMPUTE_BATCH_SIZE", "5000"))
+        self.TDEE_UPDATE_BATCH_SIZE: int = int(os.getenv("TDEE_UPDATE_BATCH_SIZE", "5000"))
+        # Oldest unseen day the TDEE update folds in (bounds the first run and catch-up)
+        self.TDEE_LOOKBACK_DAYS: int = int(os.getenv("TDEE_LOOKBACK_DAYS", "28"))
+        self.NUTRITION_ANALYTICS_BATCH_SIZE: int = int(os.getenv("NUTRITION_ANALYTICS_BATCH_SIZE", "2000"))
+        # Changed days older than this are not reanalyzed
+        self.NUTRITION_ANALYTICS_LOOKBACK_DAYS: int = int(os.getenv("NUTRITION_ANALYTICS_LOOKBACK_DAYS", "90"))
+        self.STRENGTH_ANALYTICS_BATCH_SIZE: int = int(os.getenv("STRENGTH_ANALYTICS_BATCH_SIZE", "1000"))
+        # Changed sessions older than this are not reanalyzed
+        self.STRENGTH_ANALYTICS_LOOKBACK_DAYS: int = int(os.getenv("STRENGTH_ANALYTICS_LOOKBACK_DAYS", "90"))
+        self.PLAN_ADHERENCE_BATCH_SIZE: int = int(os.getenv("PLAN_ADHERENCE_BATCH_SIZE", "2000"))
+        # Changed logs older than this are not rescored
+        self.PLAN_ADHERENCE_LOOKBACK_DAYS: int = int(os.getenv("PLAN_ADHERENCE_LOOKBACK_DAYS", "90"))
+
+        # Regeneration Quota Cache Configuration
+        self.REGENERATION_QUOTA_CACHE_SIZE: int = int(os.getenv("REGENERATION_QUOTA_CACHE_SIZE", "10000"))
+        self.REGENERATION_QUOTA_CACHE_TTL_SECONDS: float = float(os.getenv("REGENERATION_QUOTA_CACHE_TTL_SECONDS", "60"))
+
+        # Profile Snapshot Cache Configuration
+        self.PROFILE_CACHE_SIZE: int = int(os.getenv("PROFILE_CACHE_SIZE", "10000"))
+        self.PROFILE_CACHE_TTL_SECONDS: float = float(os.getenv("PROFILE_CACHE_TTL_SECONDS", "300"))
+
         # AI Model Configuration
         self.DEFAULT_AI_PROVIDER: str = os.getenv("DEFAULT_AI_PROVIDER", "openai")
         self.DEFAULT_MODEL_NAME: str = os.getenv("DEFAULT_MODEL_NAME", "gpt-4o-mini")
@@ -79,6 +178,32 @@ class Settings:
             return f"postgresql://{self.DB_USER}:{self.DB_PASSWORD}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
         return None
 
+    @property
+    def db_pool_mode(self) -> str:
+        """Resolve the pool mode: 'direct' or 'transaction'"""
+        if self.DB_POOL_MODE in ("direct", "transaction"):
+            return self.DB_POOL_MODE
+        return "transaction" if self.DB_PORT == "6543" else "direct"
+
+    @property
+    def db_listen_port(self) -> Optional[str]:
+        """Port for the LISTEN connection (session mode behind the Supabase pooler)"""
+        if self.DB_LISTEN_PORT:
+            return self.DB_LISTEN_PORT
+        return "5432" if self.db_pool_mode == "transaction" else self.DB_PORT
+
+    @property
+    def db_replica_port(self) -> Optional[str]:
+        """Read replica port, defaulting to the primary's port"""
+        return self.DB_REPLICA_PORT or self.DB_PORT
+
+    @property
+    def db_replica_pool_mode(self) -> str:
+        """Pool mode for the read replica, resolving "auto" from the replica port"""
+        if self.DB_POOL_MODE in ("direct", "transaction"):
+            return self.DB_POOL_MODE
+        return "transaction" if self.db_replica_port == "6543" else "direct"
+
     def validate_ai_provider(self, provider: str) -> bool:
         """
         Validate if the requested AI provider is available.
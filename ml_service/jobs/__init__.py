@@ -0,0 +1 @@
+"""Batch jobs run outside the API process (e.g. nightly from cron)"""
@@ -0,0 +1,129 @@
+"""Restartable batch job runs recorded in batch_job_checkpoints"""
+
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Optional
+
+import asyncpg
+
+# Starts a new run unless the job has an unfinished run from the same day.
+# The watermark is the start of the last completed run: rows changed after
+# it have not been seen by any completed run
+START_RUN_SQL = """
+    INSERT INTO batch_job_checkpoints AS c (job_name, run_date)
+    VALUES ($1, CURRENT_DATE)
+    ON CONFLICT (job_name) DO UPDATE SET
+        run_date = EXCLUDED.run_date,
+        last_user_id = NULL,
+        users_processed = 0,
+        rows_written = 0,
+        started_at = now(),
+        updated_at = now(),
+        completed_at = NULL,
+        watermark = CASE WHEN c.completed_at IS NOT NULL THEN c.started_at ELSE c.watermark END
+    WHERE c.completed_at IS NOT NULL OR c.run_date <> EXCLUDED.run_date
+"""
+
+CHECKPOINT_SQL = """
+    SELECT job_name, run_date, last_user_id, users_processed, rows_written, watermark
+    FROM batch_job_checkpoints
+    WHERE job_name = $1
+"""
+
+ADVANCE_SQL = """
+    UPDATE batch_job_checkpoints
+    SET last_user_id = $2,
+        users_processed = users_processed + $3,
+        rows_written = rows_written + $4,
+        updated_at = now()
+    WHERE job_name = $1
+"""
+
+# Change logs of deleted rows and the jobs reading them; entries are pruned
+# once every one of those jobs has completed a run after them
+DELETION_LOGS = {
+    "nutrition_log_deletions": ("nutrition_analytics", "plan_adherence"),
+    "workout_session_deletions": ("strength_analytics", "plan_adherence"),
+}
+
+PRUNE_DELETIONS_SQL = """
+    DELETE FROM {table}
+    WHERE deleted_at <= (
+        SELECT min(watermark) FROM batch_job_checkpoints WHERE job_name = ANY($1::text[])
+    )
+"""
+
+COMPLETE_SQL = """
+    UPDATE batch_job_checkpoints
+    SET completed_at = now(), updated_at = now()
+    WHERE job_name = $1
+"""
+
+
+@dataclass
+class JobCheckpoint:
+    """Progress of a job's current run; users are processed in id order"""
+    job_name: str
+    run_date: date
+    last_user_id: Optional[str] = None
+    users_processed: int = 0
+    rows_written: int = 0
+    watermark: Optional[datetime] = None
+
+    @property
+    def resumed(self) -> bool:
+        """Whether the run had already committed batches before this process"""
+        return self.last_user_id is not None
+
+
+async def start_run(conn: asyncpg.Connection, job_name: str) -> JobCheckpoint:
+    """
+    Begin a run of a job, or resume today's unfinished run.
+
+    A run left unfinished on an earlier day is abandoned and a new one
+    starts from the first user.
+    """
+    await conn.execute(START_RUN_SQL, job_name)
+    row = await conn.fetchrow(CHECKPOINT_SQL, job_name)
+    return JobCheckpoint(
+        job_name=row["job_name"],
+        run_date=row["run_date"],
+        last_user_id=str(row["last_user_id"]) if row["last_user_id"] else None,
+        users_processed=row["users_processed"],
+        rows_written=row["rows_written"],
+        watermark=row["watermark"],
+    )
+
+
+async def advance(
+    conn: asyncpg.Connection,
+    checkpoint: JobCheckpoint,
+    last_user_id: str,
+    users_processed: int,
+    rows_written: int
+) -> None:
+    """
+    Record a finished batch.
+
+    Call inside the transaction that writes the batch, so the checkpoint
+    moves only when the batch is committed.
+    """
+    await conn.execute(ADVANCE_SQL, checkpoint.job_name, last_user_id, users_processed, rows_written)
+    checkpoint.last_user_id = last_user_id
+    checkpoint.users_processed += users_processed
+    checkpoint.rows_written += rows_written
+
+
+async def complete_run(conn: asyncpg.Connection, checkpoint: JobCheckpoint) -> None:
+    """Mark the run finished; the next start_run begins a new one"""
+    await conn.execute(COMPLETE_SQL, checkpoint.job_name)
+
+
+async def prune_deletions(conn: asyncpg.Connection, table: str) -> None:
+    """
+    Drop deletion log entries seen by all jobs reading the log.
+
+    A job that has not completed a run yet reads everything on its first
+    run and needs no deletions.
+    """
+    await conn.execute(PRUNE_DELETIONS_SQL.format(table=table), list(DELETION_LOGS[table]))
@@ -0,0 +1,64 @@
+"""Bulk transfer between Postgres and pandas DataFrames over COPY"""
+
+import io
+from typing import Any, Callable, Iterable, List, Sequence
+
+import asyncpg
+import pandas as pd
+
+
+async def copy_frame(
+    conn: asyncpg.Connection,
+    query: str,
+    *args: Any,
+    dates: Sequence[str] = (),
+    booleans: Sequence[str] = ()
+) -> pd.DataFrame:
+    """
+    Run a query through COPY ... TO STDOUT (CSV) and parse it into a DataFrame.
+
+    Columns listed in `dates` are parsed as datetime64, `booleans` from
+    Postgres' t/f. Arguments are inlined by asyncpg, so they must not be
+    None.
+    """
+    buffer = io.BytesIO()
+    await conn.copy_from_query(query, *args, output=buffer, format="csv", header=True)
+    buffer.seek(0)
+    frame = pd.read_csv(buffer)
+    # Converted here rather than with parse_dates so empty results are typed too
+    for column in dates:
+        frame[column] = pd.to_datetime(frame[column])
+    for column in booleans:
+        frame[column] = frame[column].eq("t")
+    return frame
+
+
+def frame_records(frame: pd.DataFrame, columns: Iterable[str]) -> List[tuple]:
+    """
+    Rows of a DataFrame as tuples of plain Python values for COPY.
+
+    NaN/NaT become None (NULL), datetime64 columns become dates and numpy
+    scalars become Python numbers.
+    """
+    columns = list(columns)
+    values = {}
+    for column in columns:
+        series = frame[column]
+        if pd.api.types.is_datetime64_any_dtype(series):
+            series = series.dt.date
+        series = series.astype(object)
+        values[column] = series.where(series.notna(), None).tolist()
+    return list(zip(*(values[column] for column in columns)))
+
+
+def group_objects(frame: pd.DataFrame, keys: List[str], build: Callable[[pd.DataFrame], Any]) -> pd.Series:
+    """
+    One Python object per group of a DataFrame, e.g. a JSON list or dict
+    built from the group's rows, indexed by the group keys.
+
+    Unlike groupby().apply(), an empty frame gives an empty Series.
+    """
+    if frame.empty:
+        index = frame.set_index(keys).index if len(keys) > 1 else pd.Index([], name=keys[0])
+        return pd.Series(index=index, dtype=object)
+    return frame.groupby(keys).apply(build, include_groups=False)
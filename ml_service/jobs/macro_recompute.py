@@ -0,0 +1,227 @@
+"""
+Nightly recomputation of macro targets from the latest logged weight.
+
+user_macro_targets is written at onboarding from the quiz weight, so targets
+drift as users log new weights. This job walks all users in id order in
+keyset batches over a single session-level connection, picks those whose
+latest weight_history entry differs from the weight their AI-generated
+targets were last computed from (macro_target_inputs), and recomputes their
+targets with the vectorized engine in utils.batch_calculations. Each batch is
+COPYed into a temporary staging table and merged into user_macro_targets
+(effective from the run date) in one transaction together with the
+checkpoint, so an interrupted run resumes after the last committed batch.
+
+Users whose current targets were set manually or by a coach are left alone.
+
+Run with: python -m jobs.macro_recompute
+"""
+
+import asyncio
+import time
+from typing import Any, List, Optional
+
+import asyncpg
+import numpy as np
+
+from config.logging_config import logger, log_error
+from config.settings import settings
+from jobs.checkpoints import JobCheckpoint, advance, complete_run, start_run
+from services.database import db_service
+from utils.batch_calculations import (
+    OCCUPATION_DESK,
+    calculate_nutrition_profiles,
+    encode_dietary_styles,
+    encode_exercise_frequencies,
+    encode_genders,
+    encode_goals,
+)
+
+JOB_NAME = "macro_recompute"
+
+# Only AI-generated targets are recomputed; notes set on recomputed rows
+TARGET_SOURCE = "ai_generated"
+TARGET_NOTES = "Recomputed from latest logged weight"
+
+# Users after $1 (in id order) whose latest logged weight differs from the
+# weight their current AI-generated targets were computed from. Goal, diet
+# and exercise frequency come from the latest quiz answers (legacy rows hold
+# the answers as a JSON string scalar)
+CANDIDATES_SQL = """
+    SELECT
+        p.id AS user_id,
+        w.weight,
+        p.height,
+        p.age,
+        p.gender,
+        qr.answers->>'mainGoal' AS main_goal,
+        qr.answers->>'dietaryStyle' AS dietary_style,
+        qr.answers->>'exerciseFrequency' AS exercise_frequency
+    FROM profiles p
+    JOIN LATERAL (
+        SELECT weight FROM weight_history
+        WHERE user_id = p.id
+        ORDER BY log_date DESC, created_at DESC
+        LIMIT 1
+    ) w ON true
+    JOIN user_macro_targets t ON t.user_id = p.id AND t.source = $3
+    LEFT JOIN LATERAL (
+        SELECT CASE jsonb_typeof(answers)
+                   WHEN 'string' THEN (answers #>> '{}')::jsonb
+                   ELSE answers
+               END AS answers
+        FROM quiz_results
+        WHERE user_id = p.id
+        ORDER BY created_at DESC
+        LIMIT 1
+    ) qr ON true
+    LEFT JOIN macro_target_inputs i ON i.user_id = p.id
+    WHERE p.id > COALESCE($1::uuid, '00000000-0000-0000-0000-000000000000'::uuid)
+      AND i.weight IS DISTINCT FROM w.weight
+    ORDER BY p.id
+    LIMIT $2
+"""
+
+STAGING_TABLE = "macro_targets_staging"
+
+STAGING_COLUMNS = (
+    "user_id",
+    "weight",
+    "daily_calories",
+    "daily_protein_g",
+    "daily_carbs_g",
+    "daily_fats_g",
+)
+
+CREATE_STAGING_SQL = f"""
+    CREATE TEMPORARY TABLE IF NOT EXISTS {STAGING_TABLE} (
+        user_id uuid PRIMARY KEY,
+        weight double precision NOT NULL,
+        daily_calories integer NOT NULL,
+        daily_protein_g double precision NOT NULL,
+        daily_carbs_g double precision NOT NULL,
+        daily_fats_g double precision NOT NULL
+    ) ON COMMIT DELETE ROWS
+"""
+
+# Replace each user's targets when the recomputed ones differ (effective
+# from the run date, $1), and remember the weight they were computed from.
+# Targets changed to a manual or coach-assigned source meanwhile are kept
+MERGE_SQL = f"""
+    WITH merged AS (
+        UPDATE user_macro_targets m SET
+            effective_date = $1,
+            daily_calories = s.daily_calories,
+            daily_protein_g = s.daily_protein_g,
+            daily_carbs_g = s.daily_carbs_g,
+            daily_fats_g = s.daily_fats_g,
+            notes = $3,
+            created_at = NOW()
+        FROM {STAGING_TABLE} s
+        WHERE m.user_id = s.user_id
+          AND m.source = $2
+          AND (m.daily_calories, m.daily_protein_g, m.daily_carbs_g, m.daily_fats_g)
+              IS DISTINCT FROM
+              (s.daily_calories, s.daily_protein_g, s.daily_carbs_g, s.daily_fats_g)
+        RETURNING 1
+    ), inputs AS (
+        INSERT INTO macro_target_inputs (user_id, weight, computed_at)
+        SELECT user_id, weight, now() FROM {STAGING_TABLE}
+        ON CONFLICT (user_id) DO UPDATE SET
+            weight = EXCLUDED.weight,
+            computed_at = EXCLUDED.computed_at
+    )
+    SELECT count(*) FROM merged
+"""
+
+
+def compute_targets(rows: List[Any]) -> List[tuple]:
+    """
+    Staging records (in STAGING_COLUMNS order) for a batch of candidate rows.
+
+    Same inputs and calculation as onboarding, with the weight replaced by
+    the latest logged one (including onboarding's fixed desk-job
+    occupation). Rows without a height or age are skipped.
+    """
+    rows = [row for row in rows if row["height"] and row["age"]]
+    if not rows:
+        return []
+
+    def column(name: str) -> List[Any]:
+        return [row[name] for row in rows]
+
+    weight = np.array(column("weight"), dtype=np.float64)
+    profiles = calculate_nutrition_profiles(
+        weight=weight,
+        height=np.array(column("height"), dtype=np.float64),
+        age=np.array(column("age"), dtype=np.int64),
+        gender_code=encode_genders(column("gender")),
+        frequency_code=encode_exercise_frequencies(column("exercise_frequency")),
+        occupation_code=np.full(len(rows), OCCUPATION_DESK),
+        goal_code=encode_goals(column("main_goal")),
+        diet_code=encode_dietary_styles(column("dietary_style")),
+    )
+
+    return list(zip(
+        column("user_id"),
+        weight.tolist(),
+        profiles["goalCalories"].tolist(),
+        profiles["protein_g"].astype(np.float64).tolist(),
+        profiles["carbs_g"].astype(np.float64).tolist(),
+        profiles["fat_g"].astype(np.float64).tolist(),
+    ))
+
+
+async def _run_batch(conn: asyncpg.Connection, checkpoint: JobCheckpoint, batch_size: int) -> bool:
+    """Recompute one batch of candidates; False once every user has been visited"""
+    rows = await conn.fetch(
+        CANDIDATES_SQL, checkpoint.last_user_id, batch_size, TARGET_SOURCE
+    )
+    if not rows:
+        return False
+
+    records = compute_targets(rows)
+    async with conn.transaction():
+        written = 0
+        if records:
+            await conn.copy_records_to_table(STAGING_TABLE, records=records, columns=STAGING_COLUMNS)
+            written = await conn.fetchval(MERGE_SQL, checkpoint.run_date, TARGET_SOURCE, TARGET_NOTES)
+        await advance(conn, checkpoint, str(rows[-1]["user_id"]), len(rows), written)
+
+    return len(rows) == batch_size
+
+
+async def run(batch_size: Optional[int] = None) -> JobCheckpoint:
+    """Run (or resume) today's recomputation over the whole user base"""
+    batch_size = batch_size or settings.MACRO_RECOMPUTE_BATCH_SIZE
+    conn = await db_service.connect_session()
+    try:
+        await conn.execute(CREATE_STAGING_SQL)
+        checkpoint = await start_run(conn, JOB_NAME)
+        if checkpoint.resumed:
+            logger.info(
+                f"Resuming {JOB_NAME} run of {checkpoint.run_date} after user {checkpoint.last_user_id} "
+                f"({checkpoint.users_processed} users processed)"
+            )
+
+        started = time.perf_counter()
+        while await _run_batch(conn, checkpoint, batch_size):
+            logger.info(
+                f"{JOB_NAME}: {checkpoint.users_processed} users processed, "
+                f"{checkpoint.rows_written} targets updated"
+            )
+
+        await complete_run(conn, checkpoint)
+        logger.info(
+            f"{JOB_NAME} finished in {time.perf_counter() - started:.1f}s: "
+            f"{checkpoint.users_processed} users processed, {checkpoint.rows_written} targets updated"
+        )
+        return checkpoint
+    except Exception as e:
+        log_error(e, f"{JOB_NAME} job")
+        raise
+    finally:
+        await conn.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
@@ -0,0 +1,472 @@
+"""
+Batch nutrition trends and period analytics.
+
+Replaces the per-user calculate_nutrition_trends() database function with a
+job that runs off the OLTP hot path. Users whose daily_nutrition_logs
+changed (or were deleted) since the job's watermark are collected into a
+temporary table once per run, then processed in keyset batches over a
+single session-level connection: each batch's daily totals and meal items
+are bulk-loaded with COPY into DataFrames, and rolling averages, variance,
+calorie/macro adherence, logging streaks and food stats are computed
+vectorized across all users in the batch. Results are COPYed into staging
+tables and merged into nutrition_trends and nutrition_analytics (weekly and
+monthly periods) in one transaction with the checkpoint.
+
+Only trend dates from a user's first changed day onwards, and the analysis
+periods containing them, are recomputed.
+
+Run with: python -m jobs.nutrition_analytics
+"""
+
+import asyncio
+import time
+from datetime import date, timedelta
+from typing import Optional
+
+import asyncpg
+import numpy as np
+import pandas as pd
+
+from config.logging_config import logger, log_error
+from config.settings import settings
+from jobs.checkpoints import JobCheckpoint, advance, complete_run, prune_deletions, start_run
+from jobs.frames import copy_frame, frame_records, group_objects
+from services.database import db_service
+
+JOB_NAME = "nutrition_analytics"
+
+# A day is on target within this fraction of the calorie target, and meets
+# its macros when protein, carbs and fats are all within MACRO_TOLERANCE
+CALORIE_TOLERANCE = 0.10
+MACRO_TOLERANCE = 0.15
+
+# Relative change of the 7-day vs 30-day average reported as a trend
+TREND_THRESHOLD = 0.05
+
+MAIN_MEALS = ("breakfast", "lunch", "dinner")
+MOST_COMMON_FOODS = 5
+WEEKDAYS = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+
+# Changed users with the first changed day and the first day their
+# recomputation needs: 29 days of trend history or the start of the month
+DIRTY_TABLE = "nutrition_analytics_dirty"
+
+CREATE_DIRTY_SQL = f"""
+    CREATE TEMPORARY TABLE IF NOT EXISTS {DIRTY_TABLE} (
+        user_id uuid PRIMARY KEY,
+        first_changed date NOT NULL,
+        window_start date NOT NULL
+    )
+"""
+
+# $1 watermark (NULL on the first run: everything in range), ($2, $3] day
+# range. Days from the watermark's date on were not complete at the last run,
+# so they are new to this one whenever they were changed
+COLLECT_DIRTY_SQL = f"""
+    INSERT INTO {DIRTY_TABLE} (user_id, first_changed, window_start)
+    SELECT
+        user_id,
+        MIN(log_date),
+        LEAST(MIN(log_date) - 29, date_trunc('month', MIN(log_date))::date)
+    FROM (
+        SELECT user_id, log_date FROM daily_nutrition_logs
+        WHERE ($1::timestamptz IS NULL OR updated_at > $1 OR log_date >= $1::date)
+          AND log_date > $2 AND log_date <= $3
+        UNION ALL
+        SELECT user_id, log_date FROM nutrition_log_deletions
+        WHERE ($1::timestamptz IS NULL OR deleted_at > $1 OR log_date >= $1::date)
+          AND log_date > $2 AND log_date <= $3
+    ) changes
+    GROUP BY user_id
+"""
+
+BATCH_USERS_SQL = f"""
+    SELECT user_id FROM {DIRTY_TABLE}
+    WHERE user_id > COALESCE($1::uuid, '00000000-0000-0000-0000-000000000000'::uuid)
+    ORDER BY user_id
+    LIMIT $2
+"""
+
+# Daily totals of users in ($1, $2] through $3, with their macro targets
+DAYS_SQL = f"""
+    SELECT
+        n.user_id,
+        n.log_date,
+        d.first_changed,
+        SUM(n.total_calories) AS calories,
+        SUM(n.total_protein) AS protein,
+        SUM(n.total_carbs) AS carbs,
+        SUM(n.total_fats) AS fats,
+        COUNT(*) AS meals,
+        bool_or(n.meal_type = 'breakfast') AS breakfast,
+        bool_or(n.meal_type = 'lunch') AS lunch,
+        bool_or(n.meal_type = 'dinner') AS dinner,
+        MAX(t.daily_calories) AS target_calories,
+        MAX(t.daily_protein_g) AS target_protein,
+        MAX(t.daily_carbs_g) AS target_carbs,
+        MAX(t.daily_fats_g) AS target_fats
+    FROM {DIRTY_TABLE} d
+    JOIN daily_nutrition_logs n
+      ON n.user_id = d.user_id AND n.log_date >= d.window_start AND n.log_date <= $3
+    LEFT JOIN user_macro_targets t ON t.user_id = d.user_id
+    WHERE d.user_id > $1 AND d.user_id <= $2
+    GROUP BY n.user_id, n.log_date, d.first_changed
+"""
+
+# Meal items of the analysis periods being recomputed
+ITEMS_SQL = f"""
+    SELECT
+        n.user_id,
+        n.log_date,
+        COALESCE(mi.meal_type, n.meal_type) AS meal_type,
+        lower(mi.food_name) AS food_name,
+        EXTRACT(hour FROM mi.logged_at)::int AS hour
+    FROM {DIRTY_TABLE} d
+    JOIN daily_nutrition_logs n
+      ON n.user_id = d.user_id
+     AND n.log_date >= date_trunc('month', d.first_changed)::date - 6
+     AND n.log_date <= $3
+    JOIN meal_items mi ON mi.nutrition_log_id = n.id
+    WHERE d.user_id > $1 AND d.user_id <= $2
+"""
+
+TREND_COLUMNS = (
+    "user_id", "trend_date",
+    "avg_calories_7d", "avg_calories_30d",
+    "avg_protein_7d", "avg_protein_30d",
+    "avg_carbs_7d", "avg_carbs_30d",
+    "avg_fats_7d", "avg_fats_30d",
+    "calories_variance_7d", "calories_variance_30d",
+    "protein_percentage", "carbs_percentage", "fats_percentage",
+    "calories_trend",
+)
+
+ANALYTICS_COLUMNS = (
+    "user_id", "analysis_period", "period_start_date", "period_end_date",
+    "avg_daily_calories", "calories_std_deviation",
+    "avg_daily_protein", "avg_daily_carbs", "avg_daily_fats",
+    "most_common_meal_times", "meal_frequency",
+    "days_tracked", "total_possible_days", "tracking_adherence_percentage",
+    "goal_adherence_percentage", "macro_adherence_percentage",
+    "days_over_calories", "days_under_calories", "days_on_target",
+    "best_day_of_week", "worst_day_of_week", "common_skip_meal",
+    "unique_foods_logged", "most_common_foods",
+    "current_streak", "longest_streak",
+)
+
+TRENDS_STAGING = "nutrition_trends_staging"
+ANALYTICS_STAGING = "nutrition_analytics_staging"
+
+CREATE_STAGING_SQL = (
+    f"CREATE TEMPORARY TABLE IF NOT EXISTS {TRENDS_STAGING} "
+    f"(LIKE nutrition_trends INCLUDING DEFAULTS) ON COMMIT DELETE ROWS",
+    f"CREATE TEMPORARY TABLE IF NOT EXISTS {ANALYTICS_STAGING} "
+    f"(LIKE nutrition_analytics INCLUDING DEFAULTS) ON COMMIT DELETE ROWS",
+)
+
+# Trend rows of users in ($1, $2] from their first changed day through $3
+# are replaced; rows for days that no longer have logs are removed
+MERGE_TRENDS_SQL = f"""
+    WITH removed AS (
+        DELETE FROM nutrition_trends t
+        USING {DIRTY_TABLE} d
+        WHERE t.user_id = d.user_id
+          AND d.user_id > $1 AND d.user_id <= $2
+          AND t.trend_date >= d.first_changed AND t.trend_date <= $3
+          AND NOT EXISTS (
+              SELECT 1 FROM {TRENDS_STAGING} s
+              WHERE s.user_id = t.user_id AND s.trend_date = t.trend_date
+          )
+    )
+    INSERT INTO nutrition_trends ({", ".join(TREND_COLUMNS)})
+    SELECT {", ".join(TREND_COLUMNS)} FROM {TRENDS_STAGING}
+    ON CONFLICT (user_id, trend_date) DO UPDATE SET
+        {", ".join(f"{c} = EXCLUDED.{c}" for c in TREND_COLUMNS[2:])}
+"""
+
+MERGE_ANALYTICS_SQL = f"""
+    INSERT INTO nutrition_analytics ({", ".join(ANALYTICS_COLUMNS)}, analysis_date)
+    SELECT {", ".join(ANALYTICS_COLUMNS)}, CURRENT_DATE FROM {ANALYTICS_STAGING}
+    ON CONFLICT (user_id, analysis_period, period_start_date) DO UPDATE SET
+        {", ".join(f"{c} = EXCLUDED.{c}" for c in ANALYTICS_COLUMNS[3:])},
+        analysis_date = EXCLUDED.analysis_date
+"""
+
+def _round_half_up(values: pd.Series) -> pd.Series:
+    """Round like a Postgres float-to-integer cast"""
+    return np.floor(values + 0.5).astype("Int64")
+
+
+def compute_trends(days: pd.DataFrame) -> pd.DataFrame:
+    """
+    nutrition_trends rows from daily totals (one row per user and logged day).
+
+    Averages and standard deviation run over the logged days in the 7 and
+    30 calendar days ending at each trend date; trend rows are produced for
+    logged days from each user's first_changed day on.
+    """
+    days = days.sort_values(["user_id", "log_date"]).reset_index(drop=True)
+    trends = days[["user_id", "log_date"]].rename(columns={"log_date": "trend_date"})
+
+    # Groups come back in sorted user order, which is also the row order
+    for window in (7, 30):
+        rolling = days.groupby("user_id").rolling(f"{window}D", on="log_date")
+        means = rolling[["calories", "protein", "carbs", "fats"]].mean()
+        trends[f"avg_calories_{window}d"] = _round_half_up(pd.Series(means["calories"].to_numpy()))
+        for macro in ("protein", "carbs", "fats"):
+            trends[f"avg_{macro}_{window}d"] = means[macro].to_numpy()
+        trends[f"calories_variance_{window}d"] = rolling["calories"].std().to_numpy()
+
+    macro_calories = pd.DataFrame({
+        "protein": trends["avg_protein_7d"] * 4,
+        "carbs": trends["avg_carbs_7d"] * 4,
+        "fats": trends["avg_fats_7d"] * 9,
+    })
+    total = macro_calories.sum(axis=1).where(lambda total: total > 0)
+    for macro in ("protein", "carbs", "fats"):
+        trends[f"{macro}_percentage"] = macro_calories[macro] / total * 100
+
+    ratio = trends["avg_calories_7d"].astype(float) / trends["avg_calories_30d"].astype(float)
+    trends["calories_trend"] = np.select(
+        [ratio > 1 + TREND_THRESHOLD, ratio < 1 - TREND_THRESHOLD],
+        ["increasing", "decreasing"],
+        default="stable",
+    )
+    trends.loc[ratio.isna(), "calories_trend"] = None
+
+    return trends[days["log_date"] >= days["first_changed"]].reset_index(drop=True)
+
+
+def _period_starts(log_dates: pd.Series, period: str) -> pd.Series:
+    """Monday of the week or first day of the month of each date"""
+    if period == "weekly":
+        return log_dates - pd.to_timedelta(log_dates.dt.weekday, unit="D")
+    return log_dates.dt.to_period("M").dt.start_time
+
+
+def _period_ends(starts: pd.Series, period: str) -> pd.Series:
+    """Last day of each period"""
+    if period == "weekly":
+        return starts + pd.Timedelta(days=6)
+    return starts + pd.offsets.MonthEnd(0)
+
+
+def _streaks(days: pd.DataFrame, keys: list, period_last: pd.Series) -> pd.DataFrame:
+    """
+    Longest run of consecutive logged days per period, and the run ending
+    on the period's last elapsed day (0 when that day was not logged).
+    """
+    days = days.sort_values(keys + ["log_date"])
+    gap = days["log_date"].diff().dt.days.ne(1) | days[keys].ne(days[keys].shift()).any(axis=1)
+    runs = days.assign(run=gap.cumsum())
+    lengths = runs.groupby(keys + ["run"]).agg(length=("log_date", "size"), last=("log_date", "max"))
+    lengths = lengths.reset_index()
+
+    streaks = lengths.groupby(keys).agg(longest_streak=("length", "max"))
+    last_run = lengths.sort_values("last").drop_duplicates(keys, keep="last").set_index(keys)
+    current = last_run["length"].where(last_run["last"] == period_last.reindex(last_run.index), 0)
+    streaks["current_streak"] = current
+    return streaks
+
+
+def _top_foods(items: pd.DataFrame, keys: list) -> pd.DataFrame:
+    """Unique foods, the most common foods and the usual hour of each meal per period"""
+    foods = items.dropna(subset=["food_name"])
+    stats = foods.groupby(keys).agg(unique_foods_logged=("food_name", "nunique"))
+
+    counts = foods.groupby(keys + ["food_name"]).size().rename("count").reset_index()
+    counts = counts.sort_values(keys + ["count", "food_name"], ascending=[True] * len(keys) + [False, True])
+    top = counts.groupby(keys).head(MOST_COMMON_FOODS)
+    stats["most_common_foods"] = group_objects(
+        top, keys, lambda g: [{"food": f, "count": int(c)} for f, c in zip(g["food_name"], g["count"])]
+    )
+
+    hours = items.dropna(subset=["meal_type", "hour"])
+    hour_counts = hours.groupby(keys + ["meal_type", "hour"]).size().rename("count").reset_index()
+    usual = hour_counts.sort_values(keys + ["meal_type", "count"]).drop_duplicates(
+        keys + ["meal_type"], keep="last"
+    )
+    meal_times = group_objects(usual, keys, lambda g: {m: int(h) for m, h in zip(g["meal_type"], g["hour"])})
+    stats = stats.join(meal_times.rename("most_common_meal_times"), how="outer")
+    return stats
+
+
+def compute_period_analytics(days: pd.DataFrame, items: pd.DataFrame, through: date) -> pd.DataFrame:
+    """
+    nutrition_analytics rows (weekly and monthly) for the periods containing
+    each user's changed days.
+
+    Averages, standard deviation and adherence are over logged days; a
+    period's possible days end at `through` for the current period.
+    """
+    through = pd.Timestamp(through)
+    keys = ["user_id", "period_start_date"]
+
+    within = lambda frame, tolerance, actual, target: (
+        (frame[actual] - frame[target]).abs() <= tolerance * frame[target]
+    )
+    days = days.assign(
+        on_target=within(days, CALORIE_TOLERANCE, "calories", "target_calories"),
+        over=days["calories"] > (1 + CALORIE_TOLERANCE) * days["target_calories"],
+        under=days["calories"] < (1 - CALORIE_TOLERANCE) * days["target_calories"],
+        macros_met=(
+            within(days, MACRO_TOLERANCE, "protein", "target_protein")
+            & within(days, MACRO_TOLERANCE, "carbs", "target_carbs")
+            & within(days, MACRO_TOLERANCE, "fats", "target_fats")
+        ),
+        deviation=(days["calories"] - days["target_calories"]).abs() / days["target_calories"],
+    )
+
+    results = []
+    for period in ("weekly", "monthly"):
+        frame = days.assign(period_start_date=_period_starts(days["log_date"], period))
+        first_period = _period_starts(frame["first_changed"], period)
+        frame = frame[frame["period_start_date"] >= first_period]
+        if frame.empty:
+            continue
+
+        grouped = frame.groupby(keys)
+        stats = grouped.agg(
+            days_tracked=("log_date", "size"),
+            avg_daily_calories=("calories", "mean"),
+            calories_std_deviation=("calories", "std"),
+            avg_daily_protein=("protein", "mean"),
+            avg_daily_carbs=("carbs", "mean"),
+            avg_daily_fats=("fats", "mean"),
+            meal_frequency=("meals", "mean"),
+            days_on_target=("on_target", "sum"),
+            days_over_calories=("over", "sum"),
+            days_under_calories=("under", "sum"),
+            days_macros_met=("macros_met", "sum"),
+            has_target=("target_calories", "count"),
+            **{f"{meal}_days": (meal, "sum") for meal in MAIN_MEALS},
+        )
+
+        starts = stats.index.get_level_values("period_start_date").to_series(index=stats.index)
+        stats["period_end_date"] = _period_ends(starts, period)
+        last_day = stats["period_end_date"].clip(upper=through)
+        stats["total_possible_days"] = (last_day - starts).dt.days + 1
+        stats["tracking_adherence_percentage"] = stats["days_tracked"] / stats["total_possible_days"] * 100
+
+        has_target = stats["has_target"] > 0
+        for column in ("days_on_target", "days_over_calories", "days_under_calories"):
+            stats[column] = stats[column].where(has_target)
+        stats["goal_adherence_percentage"] = (stats["days_on_target"] / stats["days_tracked"] * 100).where(has_target)
+        stats["macro_adherence_percentage"] = (stats["days_macros_met"] / stats["days_tracked"] * 100).where(has_target)
+        stats["avg_daily_calories"] = _round_half_up(stats["avg_daily_calories"])
+
+        # Weekdays closest to and furthest from the calorie target on average
+        weekday = frame.dropna(subset=["deviation"]).assign(weekday=lambda f: f["log_date"].dt.weekday)
+        by_weekday = weekday.groupby(keys + ["weekday"])["deviation"].mean().rename("deviation").reset_index()
+        by_weekday = by_weekday.sort_values(keys + ["deviation", "weekday"])
+        best = by_weekday.drop_duplicates(keys, keep="first").set_index(keys)["weekday"]
+        worst = by_weekday.drop_duplicates(keys, keep="last").set_index(keys)["weekday"]
+        stats["best_day_of_week"] = best.map(lambda d: WEEKDAYS[d])
+        stats["worst_day_of_week"] = worst.map(lambda d: WEEKDAYS[d])
+
+        # Main meal logged on the fewest days, if any was skipped
+        meal_days = stats[[f"{meal}_days" for meal in MAIN_MEALS]].to_numpy()
+        skipped = meal_days.argmin(axis=1)
+        stats["common_skip_meal"] = np.where(
+            meal_days.min(axis=1) < stats["days_tracked"].to_numpy(),
+            np.array(MAIN_MEALS, dtype=object)[skipped],
+            None,
+        )
+
+        stats = stats.join(_streaks(frame, keys, last_day))
+
+        period_items = items.assign(period_start_date=_period_starts(items["log_date"], period))
+        period_items = period_items.merge(stats[[]].reset_index(), on=keys)
+        stats = stats.join(_top_foods(period_items, keys))
+        stats["unique_foods_logged"] = stats["unique_foods_logged"].fillna(0)
+        for column, empty in (("most_common_foods", []), ("most_common_meal_times", {})):
+            stats[column] = [value if isinstance(value, (list, dict)) else empty for value in stats[column]]
+
+        results.append(stats.reset_index().assign(analysis_period=period))
+
+    if not results:
+        return pd.DataFrame(columns=ANALYTICS_COLUMNS)
+    return pd.concat(results, ignore_index=True)[list(ANALYTICS_COLUMNS)]
+
+
+async def _run_batch(
+    conn: asyncpg.Connection,
+    checkpoint: JobCheckpoint,
+    batch_size: int,
+    through: date
+) -> bool:
+    """Recompute one batch of changed users; False once all have been processed"""
+    user_ids = [row["user_id"] for row in await conn.fetch(BATCH_USERS_SQL, checkpoint.last_user_id, batch_size)]
+    if not user_ids:
+        return False
+
+    # Keyset bounds of the batch; COPY inlines arguments, so no NULLs
+    low = checkpoint.last_user_id or "00000000-0000-0000-0000-000000000000"
+    high = str(user_ids[-1])
+    days = await copy_frame(
+        conn, DAYS_SQL, low, high, through,
+        dates=("log_date", "first_changed"), booleans=MAIN_MEALS,
+    )
+    items = await copy_frame(conn, ITEMS_SQL, low, high, through, dates=("log_date",))
+
+    trends = compute_trends(days) if not days.empty else pd.DataFrame(columns=TREND_COLUMNS)
+    analytics = compute_period_analytics(days, items, through) if not days.empty else pd.DataFrame(columns=ANALYTICS_COLUMNS)
+
+    async with conn.transaction():
+        if len(trends):
+            await conn.copy_records_to_table(
+                TRENDS_STAGING, records=frame_records(trends, TREND_COLUMNS), columns=TREND_COLUMNS
+            )
+        await conn.execute(MERGE_TRENDS_SQL, low, high, through)
+        if len(analytics):
+            await conn.copy_records_to_table(
+                ANALYTICS_STAGING, records=frame_records(analytics, ANALYTICS_COLUMNS), columns=ANALYTICS_COLUMNS
+            )
+            await conn.execute(MERGE_ANALYTICS_SQL)
+        await advance(conn, checkpoint, high, len(user_ids), len(trends) + len(analytics))
+
+    return len(user_ids) == batch_size
+
+
+async def run(batch_size: Optional[int] = None) -> JobCheckpoint:
+    """Run (or resume) today's analytics update for users with changed logs"""
+    batch_size = batch_size or settings.NUTRITION_ANALYTICS_BATCH_SIZE
+    conn = await db_service.connect_session()
+    try:
+        for statement in (CREATE_DIRTY_SQL, *CREATE_STAGING_SQL):
+            await conn.execute(statement)
+        checkpoint = await start_run(conn, JOB_NAME)
+        if checkpoint.resumed:
+            logger.info(
+                f"Resuming {JOB_NAME} run of {checkpoint.run_date} after user {checkpoint.last_user_id} "
+                f"({checkpoint.users_processed} users processed)"
+            )
+
+        # Only completed days are analyzed
+        through = checkpoint.run_date - timedelta(days=1)
+        since = through - timedelta(days=settings.NUTRITION_ANALYTICS_LOOKBACK_DAYS)
+        await conn.execute(COLLECT_DIRTY_SQL, checkpoint.watermark, since, through)
+
+        started = time.perf_counter()
+        while await _run_batch(conn, checkpoint, batch_size, through):
+            logger.info(
+                f"{JOB_NAME}: {checkpoint.users_processed} users processed, "
+                f"{checkpoint.rows_written} rows written"
+            )
+
+        await prune_deletions(conn, "nutrition_log_deletions")
+        await complete_run(conn, checkpoint)
+        logger.info(
+            f"{JOB_NAME} finished in {time.perf_counter() - started:.1f}s: "
+            f"{checkpoint.users_processed} users processed, {checkpoint.rows_written} rows written"
+        )
+        return checkpoint
+    except Exception as e:
+        log_error(e, f"{JOB_NAME} job")
+        raise
+    finally:
+        await conn.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
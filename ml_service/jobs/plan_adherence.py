@@ -0,0 +1,541 @@
+"""
+Batch meal and workout plan adherence.
+
+Replaces the per-call calculate_meal_plan_adherence() and
+get_current_week_adherence() database functions, which parsed plan JSON
+inside Postgres for every user and day. Each current
+plan's targets are extracted from plan_data once per plan version into
+compact arrays (plan_adherence_targets). Users whose nutrition logs or
+workout sessions changed since the job's watermark are then scored in keyset
+batches over a single session-level connection: their logs and sessions are
+bulk-loaded with COPY into DataFrames, joined with the targets and scored
+vectorized, and the results are COPYed into staging tables and merged into
+meal_plan_adherence (per day) and workout_plan_adherence (per week) in one
+transaction with the checkpoint. Work grows with changed logs, not with the
+number of plans times days.
+
+Only days with nutrition logs and weeks with workout sessions get adherence
+rows. The week a plan version starts in is scored against that version.
+
+Run with: python -m jobs.plan_adherence
+"""
+
+import asyncio
+import re
+import time
+from datetime import date, timedelta
+from typing import Any, Dict, Optional
+
+import asyncpg
+import numpy as np
+import pandas as pd
+
+from config.logging_config import logger, log_error
+from config.settings import settings
+from jobs.checkpoints import JobCheckpoint, advance, complete_run, prune_deletions, start_run
+from jobs.frames import copy_frame, frame_records, group_objects
+from services.database import db_service
+
+JOB_NAME = "plan_adherence"
+
+MEAL_TYPES = ("breakfast", "lunch", "dinner", "snack")
+WEEKDAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+
+# A planned meal is followed when the day's logs of its type come from the
+# plan or are within this fraction of its planned calories
+MEAL_CALORIE_TOLERANCE = 0.20
+
+TARGET_COLUMNS = (
+    "plan_id", "plan_type", "user_id", "plan_version",
+    "meal_types", "meal_calories", "meal_protein", "daily_calories", "daily_protein",
+    "workout_weekdays",
+)
+
+MEAL_COLUMNS = (
+    "user_id", "meal_plan_id", "tracking_date",
+    "planned_meals", "logged_meals", "meals_followed", "meals_total",
+    "planned_calories", "actual_calories", "calories_variance",
+    "planned_protein", "actual_protein", "protein_variance",
+)
+
+WORKOUT_COLUMNS = (
+    "user_id", "workout_plan_id", "tracking_week_start",
+    "planned_workouts", "completed_workouts", "skipped_workouts",
+    "total_volume_kg", "total_duration_minutes",
+)
+
+# Current completed plans whose targets are missing or from an older
+# version, with only the plan_data parts scoring needs
+STALE_PLANS_SQL = """
+    SELECT
+        'meal' AS plan_type,
+        p.id AS plan_id,
+        p.user_id,
+        p.generated_at AS plan_version,
+        (
+            SELECT jsonb_agg(jsonb_build_array(m->'meal_type', m->'total_calories', m->'total_protein'))
+            FROM jsonb_array_elements(
+                CASE WHEN jsonb_typeof(p.plan_data->'meals') = 'array' THEN p.plan_data->'meals' END
+            ) m
+        ) AS meals,
+        p.plan_data->'daily_totals'->'calories' AS daily_calories,
+        p.plan_data->'daily_totals'->'protein' AS daily_protein,
+        NULL::jsonb AS training_days
+    FROM user_current_plans c
+    JOIN ai_meal_plans p ON p.id = c.meal_plan_id
+    LEFT JOIN plan_adherence_targets t ON t.plan_id = p.id
+    WHERE p.status = 'completed' AND p.is_active AND p.generated_at IS NOT NULL
+      AND t.plan_version IS DISTINCT FROM p.generated_at
+    UNION ALL
+    SELECT
+        'workout',
+        p.id,
+        p.user_id,
+        p.generated_at,
+        NULL,
+        NULL,
+        NULL,
+        jsonb_path_query_array(
+            p.plan_data,
+            '$.weekly_plan[*] ? (@.exercises.size() > 0 && !(@.workout_type like_regex "^rest" flag "i")).day'
+        )
+    FROM user_current_plans c
+    JOIN ai_workout_plans p ON p.id = c.workout_plan_id
+    LEFT JOIN plan_adherence_targets t ON t.plan_id = p.id
+    WHERE p.status = 'completed' AND p.is_active AND p.generated_at IS NOT NULL
+      AND t.plan_version IS DISTINCT FROM p.generated_at
+"""
+
+TARGETS_STAGING = "plan_adherence_targets_staging"
+MEAL_STAGING = "meal_plan_adherence_staging"
+WORKOUT_STAGING = "workout_plan_adherence_staging"
+
+CREATE_STAGING_SQL = tuple(
+    f"CREATE TEMPORARY TABLE IF NOT EXISTS {staging} (LIKE {table} INCLUDING DEFAULTS) ON COMMIT DELETE ROWS"
+    for staging, table in (
+        (TARGETS_STAGING, "plan_adherence_targets"),
+        (MEAL_STAGING, "meal_plan_adherence"),
+        (WORKOUT_STAGING, "workout_plan_adherence"),
+    )
+)
+
+MERGE_TARGETS_SQL = f"""
+    INSERT INTO plan_adherence_targets ({", ".join(TARGET_COLUMNS)})
+    SELECT {", ".join(TARGET_COLUMNS)} FROM {TARGETS_STAGING}
+    ON CONFLICT (plan_id) DO UPDATE SET
+        {", ".join(f"{c} = EXCLUDED.{c}" for c in TARGET_COLUMNS[1:])},
+        updated_at = now()
+"""
+
+# Changed users, the current plans they are scored against and the first
+# day (meals) and week (workouts) to score
+DIRTY_TABLE = "plan_adherence_dirty"
+
+CREATE_DIRTY_SQL = f"""
+    CREATE TEMPORARY TABLE IF NOT EXISTS {DIRTY_TABLE} (
+        user_id uuid PRIMARY KEY,
+        meals_from date,
+        workouts_from date,
+        meal_plan_id uuid,
+        workout_plan_id uuid
+    )
+"""
+
+# $1 watermark (NULL on the first run: everything in range), ($2, $3] date
+# range. Dates from the watermark's date on were not complete at the last
+# run, so they are new to this one whenever they were changed
+COLLECT_MEALS_SQL = f"""
+    INSERT INTO {DIRTY_TABLE} (user_id, meals_from)
+    SELECT user_id, MIN(log_date)
+    FROM (
+        SELECT user_id, log_date FROM daily_nutrition_logs
+        WHERE ($1::timestamptz IS NULL OR updated_at > $1 OR log_date >= $1::date)
+          AND log_date > $2 AND log_date <= $3
+        UNION ALL
+        SELECT user_id, log_date FROM nutrition_log_deletions
+        WHERE ($1::timestamptz IS NULL OR deleted_at > $1 OR log_date >= $1::date)
+          AND log_date > $2 AND log_date <= $3
+    ) changes
+    GROUP BY user_id
+    ON CONFLICT (user_id) DO UPDATE SET meals_from = LEAST({DIRTY_TABLE}.meals_from, EXCLUDED.meals_from)
+"""
+
+COLLECT_WORKOUTS_SQL = f"""
+    INSERT INTO {DIRTY_TABLE} (user_id, workouts_from)
+    SELECT user_id, MIN(session_date)
+    FROM (
+        SELECT user_id, session_date FROM workout_sessions
+        WHERE ($1::timestamptz IS NULL OR updated_at > $1 OR session_date >= $1::date)
+          AND session_date > $2 AND session_date <= $3
+        UNION ALL
+        SELECT user_id, session_date FROM workout_session_deletions
+        WHERE ($1::timestamptz IS NULL OR deleted_at > $1 OR session_date >= $1::date)
+          AND session_date > $2 AND session_date <= $3
+    ) changes
+    GROUP BY user_id
+    ON CONFLICT (user_id) DO UPDATE SET workouts_from = LEAST({DIRTY_TABLE}.workouts_from, EXCLUDED.workouts_from)
+"""
+
+# Users with a new plan version are rescored from its first day ($1: the
+# first day in range)
+COLLECT_NEW_VERSIONS_SQL = f"""
+    INSERT INTO {DIRTY_TABLE} (user_id, meals_from, workouts_from)
+    SELECT
+        user_id,
+        MIN(GREATEST(plan_version::date, $1)) FILTER (WHERE plan_type = 'meal'),
+        MIN(GREATEST(plan_version::date, $1)) FILTER (WHERE plan_type = 'workout')
+    FROM {TARGETS_STAGING}
+    GROUP BY user_id
+    ON CONFLICT (user_id) DO UPDATE SET
+        meals_from = LEAST({DIRTY_TABLE}.meals_from, EXCLUDED.meals_from),
+        workouts_from = LEAST({DIRTY_TABLE}.workouts_from, EXCLUDED.workouts_from)
+"""
+
+# Days before a plan version belong to the previous version and are kept;
+# workouts are scored in whole weeks
+RESOLVE_PLANS_SQL = f"""
+    UPDATE {DIRTY_TABLE} d
+    SET meal_plan_id = tm.plan_id,
+        meals_from = GREATEST(d.meals_from, tm.plan_version::date),
+        workout_plan_id = tw.plan_id,
+        workouts_from = GREATEST(
+            date_trunc('week', d.workouts_from)::date,
+            date_trunc('week', tw.plan_version)::date
+        )
+    FROM user_current_plans c
+    LEFT JOIN plan_adherence_targets tm ON tm.plan_id = c.meal_plan_id
+    LEFT JOIN plan_adherence_targets tw ON tw.plan_id = c.workout_plan_id
+    WHERE c.user_id = d.user_id
+"""
+
+BATCH_USERS_SQL = f"""
+    SELECT user_id FROM {DIRTY_TABLE}
+    WHERE user_id > COALESCE($1::uuid, '00000000-0000-0000-0000-000000000000'::uuid)
+      AND (meal_plan_id IS NOT NULL OR workout_plan_id IS NOT NULL)
+    ORDER BY user_id
+    LIMIT $2
+"""
+
+# Logged calories and protein per meal type and day of users in ($1, $2]
+# through $3
+MEAL_LOGS_SQL = f"""
+    SELECT
+        n.user_id,
+        d.meal_plan_id,
+        n.log_date AS tracking_date,
+        lower(n.meal_type) AS meal_type,
+        SUM(n.total_calories) AS calories,
+        SUM(n.total_protein) AS protein,
+        bool_or(EXISTS (
+            SELECT 1 FROM meal_items mi WHERE mi.nutrition_log_id = n.id AND mi.from_ai_plan
+        )) AS from_ai_plan
+    FROM {DIRTY_TABLE} d
+    JOIN daily_nutrition_logs n
+      ON n.user_id = d.user_id AND n.log_date >= d.meals_from AND n.log_date <= $3
+    WHERE d.user_id > $1 AND d.user_id <= $2 AND d.meal_plan_id IS NOT NULL
+    GROUP BY n.user_id, d.meal_plan_id, n.log_date, lower(n.meal_type)
+"""
+
+MEAL_TARGETS_SQL = f"""
+    SELECT
+        t.plan_id AS meal_plan_id,
+        t.daily_calories,
+        t.daily_protein,
+        m.position,
+        m.meal_type,
+        m.calories,
+        m.protein
+    FROM {DIRTY_TABLE} d
+    JOIN plan_adherence_targets t ON t.plan_id = d.meal_plan_id
+    LEFT JOIN LATERAL unnest(t.meal_types, t.meal_calories, t.meal_protein)
+        WITH ORDINALITY AS m(meal_type, calories, protein, position) ON true
+    WHERE d.user_id > $1 AND d.user_id <= $2 AND d.meals_from <= $3
+"""
+
+WORKOUT_SESSIONS_SQL = f"""
+    SELECT
+        w.user_id,
+        d.workout_plan_id,
+        w.session_date,
+        w.status,
+        w.total_volume_kg,
+        w.duration_minutes
+    FROM {DIRTY_TABLE} d
+    JOIN workout_sessions w
+      ON w.user_id = d.user_id AND w.session_date >= d.workouts_from AND w.session_date <= $3
+    WHERE d.user_id > $1 AND d.user_id <= $2 AND d.workout_plan_id IS NOT NULL
+"""
+
+WORKOUT_TARGETS_SQL = f"""
+    SELECT t.plan_id AS workout_plan_id, unnest(t.workout_weekdays) AS weekday
+    FROM {DIRTY_TABLE} d
+    JOIN plan_adherence_targets t ON t.plan_id = d.workout_plan_id
+    WHERE d.user_id > $1 AND d.user_id <= $2 AND d.workouts_from <= $3
+"""
+
+# Scored rows of users in ($1, $2] replace those of their current plan from
+# the first scored day/week through $3; rows without logs any more go
+MERGE_MEALS_SQL = f"""
+    WITH removed AS (
+        DELETE FROM meal_plan_adherence a
+        USING {DIRTY_TABLE} d
+        WHERE a.user_id = d.user_id AND a.meal_plan_id = d.meal_plan_id
+          AND d.user_id > $1 AND d.user_id <= $2
+          AND a.tracking_date >= d.meals_from AND a.tracking_date <= $3
+          AND NOT EXISTS (
+              SELECT 1 FROM {MEAL_STAGING} s
+              WHERE s.meal_plan_id = a.meal_plan_id AND s.tracking_date = a.tracking_date
+          )
+    )
+    INSERT INTO meal_plan_adherence ({", ".join(MEAL_COLUMNS)})
+    SELECT {", ".join(MEAL_COLUMNS)} FROM {MEAL_STAGING}
+    ON CONFLICT (user_id, meal_plan_id, tracking_date) DO UPDATE SET
+        {", ".join(f"{c} = EXCLUDED.{c}" for c in MEAL_COLUMNS[3:])}
+"""
+
+MERGE_WORKOUTS_SQL = f"""
+    WITH removed AS (
+        DELETE FROM workout_plan_adherence a
+        USING {DIRTY_TABLE} d
+        WHERE a.user_id = d.user_id AND a.workout_plan_id = d.workout_plan_id
+          AND d.user_id > $1 AND d.user_id <= $2
+          AND a.tracking_week_start >= d.workouts_from AND a.tracking_week_start <= $3
+          AND NOT EXISTS (
+              SELECT 1 FROM {WORKOUT_STAGING} s
+              WHERE s.workout_plan_id = a.workout_plan_id AND s.tracking_week_start = a.tracking_week_start
+          )
+    )
+    INSERT INTO workout_plan_adherence ({", ".join(WORKOUT_COLUMNS)})
+    SELECT {", ".join(WORKOUT_COLUMNS)} FROM {WORKOUT_STAGING}
+    ON CONFLICT (user_id, workout_plan_id, tracking_week_start) DO UPDATE SET
+        {", ".join(f"{c} = EXCLUDED.{c}" for c in WORKOUT_COLUMNS[3:])}
+"""
+
+
+def _number(value: Any) -> Optional[float]:
+    """A plan value as a number: JSON numbers, or the first number in a string like '450 kcal'"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        match = re.search(r"-?\d+(?:\.\d+)?", value.replace(",", ""))
+        return float(match.group()) if match else None
+    return None
+
+
+def _meal_type(value: Any) -> str:
+    """Normalize a plan meal type ('Morning Snack', 'Lunch') to a log meal_type"""
+    text = str(value or "").strip().lower()
+    return next((meal_type for meal_type in MEAL_TYPES if meal_type in text), text)
+
+
+def plan_targets(row: Dict[str, Any]) -> tuple:
+    """
+    plan_adherence_targets record of one plan version.
+
+    Daily targets fall back to the sum of the meals when daily_totals is
+    missing or not numeric; unknown weekday names are ignored.
+    """
+    meals = row.get("meals") or []
+    meal_types = [_meal_type(meal[0]) for meal in meals]
+    meal_calories = [_number(meal[1]) or 0.0 for meal in meals]
+    meal_protein = [_number(meal[2]) or 0.0 for meal in meals]
+
+    daily_calories = _number(row.get("daily_calories"))
+    daily_protein = _number(row.get("daily_protein"))
+    if row["plan_type"] == "meal":
+        daily_calories = round(daily_calories if daily_calories is not None else sum(meal_calories))
+        daily_protein = daily_protein if daily_protein is not None else sum(meal_protein)
+
+    weekdays = None
+    if row["plan_type"] == "workout":
+        names = [str(day).strip().lower() for day in row.get("training_days") or []]
+        weekdays = sorted({WEEKDAYS.index(name) + 1 for name in names if name in WEEKDAYS})
+
+    return (
+        row["plan_id"], row["plan_type"], row["user_id"], row["plan_version"],
+        meal_types if row["plan_type"] == "meal" else None,
+        meal_calories if row["plan_type"] == "meal" else None,
+        meal_protein if row["plan_type"] == "meal" else None,
+        daily_calories, daily_protein, weekdays,
+    )
+
+
+def score_meals(logs: pd.DataFrame, targets: pd.DataFrame) -> pd.DataFrame:
+    """
+    meal_plan_adherence rows, one per user and logged day.
+
+    Planned meals of the same type (e.g. two snacks) are compared with the
+    day's logs of that type together.
+    """
+    day_keys = ["user_id", "meal_plan_id", "tracking_date"]
+    plans = targets.drop_duplicates("meal_plan_id").set_index("meal_plan_id")
+    meals = targets.dropna(subset=["meal_type"]).sort_values(["meal_plan_id", "position"])
+    by_type = meals.groupby(["meal_plan_id", "meal_type"]).agg(
+        planned_count=("position", "size"), planned_calories=("calories", "sum")
+    ).reset_index()
+
+    typed = logs.merge(by_type, on=["meal_plan_id", "meal_type"])
+    within = (typed["calories"] - typed["planned_calories"]).abs() <= MEAL_CALORIE_TOLERANCE * typed["planned_calories"]
+    typed["followed"] = typed["planned_count"].where(typed["from_ai_plan"] | within, 0)
+
+    days = logs.groupby(day_keys).agg(actual_calories=("calories", "sum"), actual_protein=("protein", "sum"))
+    days["meals_followed"] = typed.groupby(day_keys)["followed"].sum()
+    days["logged_meals"] = group_objects(logs, day_keys, lambda g: [
+        {"meal_type": t, "calories": float(c), "protein": float(p), "from_ai_plan": bool(a)}
+        for t, c, p, a in zip(g["meal_type"], g["calories"].fillna(0), g["protein"].fillna(0), g["from_ai_plan"])
+    ])
+    days = days.reset_index()
+
+    plan_ids = days["meal_plan_id"]
+    planned_meals = group_objects(meals, ["meal_plan_id"], lambda g: [
+        {"meal_type": t, "calories": float(c), "protein": float(p)}
+        for t, c, p in zip(g["meal_type"], g["calories"], g["protein"])
+    ])
+    days["planned_meals"] = [planned_meals.get(plan_id, []) for plan_id in plan_ids]
+    days["meals_total"] = plan_ids.map(meals.groupby("meal_plan_id").size()).fillna(0).astype(int)
+    days["meals_followed"] = days["meals_followed"].fillna(0).astype(int)
+
+    days["planned_calories"] = plan_ids.map(plans["daily_calories"]).astype("Int64")
+    days["actual_calories"] = np.floor(days["actual_calories"].fillna(0) + 0.5).astype("Int64")
+    days["calories_variance"] = days["actual_calories"] - days["planned_calories"]
+    days["planned_protein"] = plan_ids.map(plans["daily_protein"])
+    days["actual_protein"] = days["actual_protein"].fillna(0)
+    days["protein_variance"] = days["actual_protein"] - days["planned_protein"]
+    return days[list(MEAL_COLUMNS)]
+
+
+def score_workouts(sessions: pd.DataFrame, targets: pd.DataFrame, through: date) -> pd.DataFrame:
+    """
+    workout_plan_adherence rows, one per user and week with sessions.
+
+    Planned workouts count the plan's training days of the week up to
+    `through`; days with a completed session count as completed, capped at
+    the planned number.
+    """
+    week_keys = ["user_id", "workout_plan_id", "tracking_week_start"]
+    sessions = sessions.assign(
+        tracking_week_start=sessions["session_date"] - pd.to_timedelta(sessions["session_date"].dt.weekday, unit="D")
+    )
+    completed = sessions[sessions["status"] == "completed"]
+
+    weeks = sessions.groupby(week_keys).agg(skipped_workouts=("status", lambda status: int((status == "skipped").sum())))
+    weeks = weeks.join(completed.groupby(week_keys).agg(
+        completed_days=("session_date", "nunique"),
+        total_volume_kg=("total_volume_kg", "sum"),
+        total_duration_minutes=("duration_minutes", "sum"),
+    )).reset_index()
+
+    planned_days = weeks[week_keys].merge(targets, on="workout_plan_id")
+    planned_days = planned_days[
+        planned_days["tracking_week_start"] + pd.to_timedelta(planned_days["weekday"] - 1, unit="D")
+        <= pd.Timestamp(through)
+    ]
+    planned = planned_days.groupby(week_keys).size().rename("planned_workouts")
+    weeks = weeks.merge(planned, left_on=week_keys, right_index=True, how="left")
+
+    weeks["planned_workouts"] = weeks["planned_workouts"].fillna(0).astype(int)
+    weeks["completed_workouts"] = np.minimum(weeks["completed_days"].fillna(0), weeks["planned_workouts"]).astype(int)
+    weeks["total_volume_kg"] = weeks["total_volume_kg"].fillna(0)
+    weeks["total_duration_minutes"] = weeks["total_duration_minutes"].fillna(0).astype(int)
+    return weeks[list(WORKOUT_COLUMNS)]
+
+
+async def refresh_targets(conn: asyncpg.Connection, first_day: date) -> int:
+    """Extract targets of current plans with a new version; returns the number of plans"""
+    rows = await conn.fetch(STALE_PLANS_SQL)
+    if not rows:
+        return 0
+    records = [plan_targets(dict(row)) for row in rows]
+    async with conn.transaction():
+        await conn.copy_records_to_table(TARGETS_STAGING, records=records, columns=TARGET_COLUMNS)
+        await conn.execute(MERGE_TARGETS_SQL)
+        await conn.execute(COLLECT_NEW_VERSIONS_SQL, first_day)
+    return len(records)
+
+
+async def _run_batch(
+    conn: asyncpg.Connection,
+    checkpoint: JobCheckpoint,
+    batch_size: int,
+    through: date
+) -> bool:
+    """Score one batch of changed users; False once all have been processed"""
+    user_ids = [row["user_id"] for row in await conn.fetch(BATCH_USERS_SQL, checkpoint.last_user_id, batch_size)]
+    if not user_ids:
+        return False
+
+    # Keyset bounds of the batch; COPY inlines arguments, so no NULLs
+    low = checkpoint.last_user_id or "00000000-0000-0000-0000-000000000000"
+    high = str(user_ids[-1])
+    logs = await copy_frame(
+        conn, MEAL_LOGS_SQL, low, high, through, dates=("tracking_date",), booleans=("from_ai_plan",)
+    )
+    sessions = await copy_frame(conn, WORKOUT_SESSIONS_SQL, low, high, through, dates=("session_date",))
+
+    outputs = []
+    if not logs.empty:
+        meal_targets = await copy_frame(conn, MEAL_TARGETS_SQL, low, high, through)
+        outputs.append((MEAL_STAGING, score_meals(logs, meal_targets), MEAL_COLUMNS))
+    if not sessions.empty:
+        workout_targets = await copy_frame(conn, WORKOUT_TARGETS_SQL, low, high, through)
+        outputs.append((WORKOUT_STAGING, score_workouts(sessions, workout_targets, through), WORKOUT_COLUMNS))
+
+    async with conn.transaction():
+        for staging, frame, columns in outputs:
+            await conn.copy_records_to_table(staging, records=frame_records(frame, columns), columns=columns)
+        await conn.execute(MERGE_MEALS_SQL, low, high, through)
+        await conn.execute(MERGE_WORKOUTS_SQL, low, high, through)
+        await advance(conn, checkpoint, high, len(user_ids), sum(len(frame) for _, frame, _ in outputs))
+
+    return len(user_ids) == batch_size
+
+
+async def run(batch_size: Optional[int] = None) -> JobCheckpoint:
+    """Run (or resume) today's adherence scoring for users with changed logs"""
+    batch_size = batch_size or settings.PLAN_ADHERENCE_BATCH_SIZE
+    conn = await db_service.connect_session()
+    try:
+        for statement in (CREATE_DIRTY_SQL, *CREATE_STAGING_SQL):
+            await conn.execute(statement)
+        checkpoint = await start_run(conn, JOB_NAME)
+        if checkpoint.resumed:
+            logger.info(
+                f"Resuming {JOB_NAME} run of {checkpoint.run_date} after user {checkpoint.last_user_id} "
+                f"({checkpoint.users_processed} users processed)"
+            )
+
+        # Only completed days are scored
+        through = checkpoint.run_date - timedelta(days=1)
+        since = through - timedelta(days=settings.PLAN_ADHERENCE_LOOKBACK_DAYS)
+        await conn.execute(COLLECT_MEALS_SQL, checkpoint.watermark, since, through)
+        await conn.execute(COLLECT_WORKOUTS_SQL, checkpoint.watermark, since, through)
+        refreshed = await refresh_targets(conn, since + timedelta(days=1))
+        await conn.execute(RESOLVE_PLANS_SQL)
+        logger.info(f"{JOB_NAME}: targets extracted for {refreshed} new plan versions")
+
+        started = time.perf_counter()
+        while await _run_batch(conn, checkpoint, batch_size, through):
+            logger.info(
+                f"{JOB_NAME}: {checkpoint.users_processed} users processed, "
+                f"{checkpoint.rows_written} rows written"
+            )
+
+        for table in ("nutrition_log_deletions", "workout_session_deletions"):
+            await prune_deletions(conn, table)
+        await complete_run(conn, checkpoint)
+        logger.info(
+            f"{JOB_NAME} finished in {time.perf_counter() - started:.1f}s: "
+            f"{checkpoint.users_processed} users processed, {checkpoint.rows_written} rows written"
+        )
+        return checkpoint
+    except Exception as e:
+        log_error(e, f"{JOB_NAME} job")
+        raise
+    finally:
+        await conn.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
@@ -0,0 +1,569 @@
+"""
+Batch strength analytics.
+
+Produces user_exercise_progress, progressive_overload_log, estimated 1RM and
+the other exercise_personal_records, and weekly workout_analytics from
+exercise_sets, none of which had a producer besides the per-set PR trigger.
+Users whose workout sessions changed (any set insert, edit or delete updates
+its session) or were deleted since the job's watermark are collected once per
+run and processed in keyset batches over a single session-level connection:
+each batch's working sets are bulk-loaded with COPY into DataFrames and every
+metric is computed vectorized across all users in the batch. Results are
+COPYed into staging tables and merged in one transaction with the
+checkpoint.
+
+Progress and overload rows from a user's first changed session date on, and
+the weeks containing them, are recomputed; personal records are recomputed
+from the user's full history, so edited and deleted sets are reflected.
+
+Run with: python -m jobs.strength_analytics
+"""
+
+import asyncio
+import time
+from datetime import date, timedelta
+from typing import Optional
+
+import asyncpg
+import numpy as np
+import pandas as pd
+
+from config.logging_config import logger, log_error
+from config.settings import settings
+from jobs.checkpoints import JobCheckpoint, advance, complete_run, prune_deletions, start_run
+from jobs.frames import copy_frame, frame_records, group_objects
+from services.database import db_service
+
+JOB_NAME = "strength_analytics"
+
+# Epley's estimate is unreliable beyond this many reps
+MAX_E1RM_REPS = 12
+
+# Double progression: add weight once the top set reaches the top of the
+# rep range, then build back up from its bottom
+REP_RANGE = (8, 12)
+WEIGHT_INCREMENT_KG = 2.5
+
+# Relative week-over-week change reported as a trend
+TREND_THRESHOLD = 0.05
+
+TOP_EXERCISES = 5
+
+# Changed users with their first changed session date
+DIRTY_TABLE = "strength_analytics_dirty"
+
+CREATE_DIRTY_SQL = f"""
+    CREATE TEMPORARY TABLE IF NOT EXISTS {DIRTY_TABLE} (
+        user_id uuid PRIMARY KEY,
+        first_changed date NOT NULL
+    )
+"""
+
+# $1 watermark (NULL on the first run: everything in range), ($2, $3] date
+# range. Dates from the watermark's date on were not complete at the last
+# run, so they are new to this one whenever they were changed
+COLLECT_DIRTY_SQL = f"""
+    INSERT INTO {DIRTY_TABLE} (user_id, first_changed)
+    SELECT user_id, MIN(session_date)
+    FROM (
+        SELECT user_id, session_date FROM workout_sessions
+        WHERE ($1::timestamptz IS NULL OR updated_at > $1 OR session_date >= $1::date)
+          AND session_date > $2 AND session_date <= $3
+        UNION ALL
+        SELECT user_id, session_date FROM workout_session_deletions
+        WHERE ($1::timestamptz IS NULL OR deleted_at > $1 OR session_date >= $1::date)
+          AND session_date > $2 AND session_date <= $3
+    ) changes
+    GROUP BY user_id
+"""
+
+BATCH_USERS_SQL = f"""
+    SELECT user_id FROM {DIRTY_TABLE}
+    WHERE user_id > COALESCE($1::uuid, '00000000-0000-0000-0000-000000000000'::uuid)
+    ORDER BY user_id
+    LIMIT $2
+"""
+
+# All working sets of completed sessions of users in ($1, $2] through $3
+SETS_SQL = f"""
+    SELECT
+        s.id AS set_id,
+        s.user_id,
+        s.workout_session_id AS session_id,
+        w.session_date,
+        d.first_changed,
+        s.exercise_id,
+        s.exercise_name,
+        s.exercise_category,
+        s.set_number,
+        s.reps,
+        s.weight_kg,
+        s.duration_seconds,
+        s.distance_meters,
+        s.rpe,
+        s.rest_seconds,
+        s.is_failure
+    FROM {DIRTY_TABLE} d
+    JOIN workout_sessions w
+      ON w.user_id = d.user_id AND w.status = 'completed' AND w.session_date <= $3
+    JOIN exercise_sets s ON s.workout_session_id = w.id AND s.is_warmup = FALSE
+    WHERE d.user_id > $1 AND d.user_id <= $2
+"""
+
+# Completed sessions of the weeks being recomputed
+SESSIONS_SQL = f"""
+    SELECT
+        w.user_id,
+        w.id AS session_id,
+        w.session_date,
+        w.duration_minutes,
+        w.workout_type
+    FROM {DIRTY_TABLE} d
+    JOIN workout_sessions w
+      ON w.user_id = d.user_id
+     AND w.status = 'completed'
+     AND w.session_date >= date_trunc('week', d.first_changed)::date
+     AND w.session_date <= $3
+    WHERE d.user_id > $1 AND d.user_id <= $2
+"""
+
+MUSCLES_SQL = """
+    SELECT id AS exercise_id, lower(unnest(muscle_groups)) AS muscle_group
+    FROM exercise_library
+"""
+
+PROGRESS_COLUMNS = ("user_id", "exercise_id", "workout_date", "sets", "max_weight", "max_reps", "max_volume")
+
+OVERLOAD_COLUMNS = (
+    "user_id", "exercise_id", "log_date",
+    "previous_best_weight", "current_weight", "weight_increase", "weight_increase_percentage",
+    "previous_best_reps", "current_reps", "reps_increase",
+    "previous_best_volume", "current_volume", "volume_increase", "volume_increase_percentage",
+    "suggested_next_weight", "suggested_next_reps",
+)
+
+RECORD_COLUMNS = (
+    "user_id", "exercise_id",
+    "max_weight_kg", "max_weight_date", "max_weight_set_id",
+    "max_reps", "max_reps_date", "max_reps_set_id",
+    "max_volume_kg", "max_volume_date", "max_volume_set_id",
+    "best_1rm_kg", "best_1rm_date",
+    "max_distance_meters", "max_distance_date",
+)
+
+ANALYTICS_COLUMNS = (
+    "user_id", "analysis_period", "period_start_date", "period_end_date",
+    "total_workouts", "total_workout_minutes", "total_volume_kg", "total_sets", "total_reps",
+    "avg_workout_duration", "avg_volume_per_workout", "avg_rest_between_sets", "avg_rpe",
+    "sessions_to_failure", "total_prs_achieved",
+    "workout_type_distribution", "muscle_group_distribution",
+    "strength_trend", "volume_trend", "top_exercises_by_volume",
+    "total_distance_meters", "total_cardio_minutes",
+)
+
+PROGRESS_STAGING = "user_exercise_progress_staging"
+OVERLOAD_STAGING = "progressive_overload_log_staging"
+RECORDS_STAGING = "exercise_personal_records_staging"
+ANALYTICS_STAGING = "workout_analytics_staging"
+
+CREATE_STAGING_SQL = tuple(
+    f"CREATE TEMPORARY TABLE IF NOT EXISTS {staging} (LIKE {table} INCLUDING DEFAULTS) ON COMMIT DELETE ROWS"
+    for staging, table in (
+        (PROGRESS_STAGING, "user_exercise_progress"),
+        (OVERLOAD_STAGING, "progressive_overload_log"),
+        (RECORDS_STAGING, "exercise_personal_records"),
+        (ANALYTICS_STAGING, "workout_analytics"),
+    )
+)
+
+
+def _replace_sql(table: str, staging: str, columns: tuple, keys: tuple, scope: str) -> str:
+    """
+    Upsert the staged rows of `table`; rows of users in ($1, $2] matching
+    `scope` (a condition on t and d, through $3) that were not staged are
+    deleted.
+    """
+    matches = " AND ".join(f"s.{key} = t.{key}" for key in keys)
+    return f"""
+        WITH removed AS (
+            DELETE FROM {table} t
+            USING {DIRTY_TABLE} d
+            WHERE t.user_id = d.user_id
+              AND d.user_id > $1 AND d.user_id <= $2
+              AND {scope}
+              AND NOT EXISTS (SELECT 1 FROM {staging} s WHERE {matches})
+        )
+        INSERT INTO {table} ({", ".join(columns)})
+        SELECT {", ".join(columns)} FROM {staging}
+        ON CONFLICT ({", ".join(keys)}) DO UPDATE SET
+            {", ".join(f"{c} = EXCLUDED.{c}" for c in columns if c not in keys)}
+    """
+
+
+MERGE_PROGRESS_SQL = _replace_sql(
+    "user_exercise_progress", PROGRESS_STAGING, PROGRESS_COLUMNS, ("user_id", "exercise_id", "workout_date"),
+    "t.workout_date >= d.first_changed AND t.workout_date <= $3",
+)
+
+MERGE_OVERLOAD_SQL = _replace_sql(
+    "progressive_overload_log", OVERLOAD_STAGING, OVERLOAD_COLUMNS, ("user_id", "exercise_id", "log_date"),
+    "t.log_date >= d.first_changed AND t.log_date <= $3",
+)
+
+MERGE_ANALYTICS_SQL = _replace_sql(
+    "workout_analytics", ANALYTICS_STAGING, ANALYTICS_COLUMNS, ("user_id", "analysis_period", "period_start_date"),
+    "t.analysis_period = 'weekly' "
+    "AND t.period_start_date >= date_trunc('week', d.first_changed)::date AND t.period_start_date <= $3",
+)
+
+# Records are recomputed from full history; best_time_seconds is left to the app
+MERGE_RECORDS_SQL = f"""
+    INSERT INTO exercise_personal_records ({", ".join(RECORD_COLUMNS)})
+    SELECT {", ".join(RECORD_COLUMNS)} FROM {RECORDS_STAGING}
+    ON CONFLICT (user_id, exercise_id) DO UPDATE SET
+        {", ".join(f"{c} = EXCLUDED.{c}" for c in RECORD_COLUMNS[2:])},
+        updated_at = now()
+"""
+
+def estimated_1rm(weight: pd.Series, reps: pd.Series) -> pd.Series:
+    """Epley estimate of the one-rep max; NaN without a load or beyond MAX_E1RM_REPS"""
+    valid = (weight > 0) & (reps >= 1) & (reps <= MAX_E1RM_REPS)
+    estimate = weight.where(reps == 1, weight * (1 + reps / 30))
+    return estimate.where(valid)
+
+
+def _prior_best(frame: pd.DataFrame, column: str, keys: list) -> pd.Series:
+    """Best value of `column` in the rows before each row of its group"""
+    grouped = frame.groupby(keys, sort=False)[column]
+    running = grouped.cummax().groupby([frame[key] for key in keys], sort=False).ffill()
+    return running.groupby([frame[key] for key in keys], sort=False).shift()
+
+
+def prepare_sets(sets: pd.DataFrame) -> pd.DataFrame:
+    """
+    Add set volume, estimated 1RM, the week and PR flags to working sets.
+
+    A set is a weight, reps or volume PR when it beats every earlier set of
+    the exercise, in session date and set order (as the insert trigger
+    flags them, but over the corrected history).
+    """
+    sets = sets.sort_values(["user_id", "exercise_id", "session_date", "set_number"]).reset_index(drop=True)
+    sets["volume"] = sets["weight_kg"].fillna(0) * sets["reps"].fillna(0)
+    sets["e1rm"] = estimated_1rm(sets["weight_kg"], sets["reps"])
+    sets["week"] = sets["session_date"] - pd.to_timedelta(sets["session_date"].dt.weekday, unit="D")
+
+    keys = ["user_id", "exercise_id"]
+    exercise = sets["exercise_id"].notna()
+    sets["is_pr"] = False
+    if exercise.any():
+        tracked = sets[exercise]
+        is_pr = (
+            (tracked["weight_kg"].notna() & ~(tracked["weight_kg"] <= _prior_best(tracked, "weight_kg", keys)))
+            | (tracked["reps"].notna() & ~(tracked["reps"] <= _prior_best(tracked, "reps", keys)))
+            | ((tracked["volume"] > 0) & ~(tracked["volume"] <= _prior_best(tracked, "volume", keys)))
+        )
+        sets.loc[exercise, "is_pr"] = is_pr
+    return sets
+
+
+def compute_progress(sets: pd.DataFrame) -> pd.DataFrame:
+    """user_exercise_progress rows: each exercise's sets and bests per changed workout date"""
+    sets = sets[sets["exercise_id"].notna() & (sets["session_date"] >= sets["first_changed"])]
+    keys = ["user_id", "exercise_id", "session_date"]
+    logged = sets[["set_number", "reps", "weight_kg", "rpe"]].astype(
+        {"set_number": "Int64", "reps": "Int64", "rpe": "Int64"}
+    ).astype(object)
+    sets = sets.assign(set=logged.where(logged.notna(), None).to_dict("records"))
+
+    grouped = sets.groupby(keys)
+    progress = grouped.agg(
+        max_weight=("weight_kg", "max"),
+        max_reps=("reps", "max"),
+        max_volume=("volume", "max"),
+        sets=("set", list),
+    )
+    progress["max_reps"] = progress["max_reps"].astype("Int64")
+    return progress.reset_index().rename(columns={"session_date": "workout_date"})[list(PROGRESS_COLUMNS)]
+
+
+def compute_overload(sets: pd.DataFrame) -> pd.DataFrame:
+    """
+    progressive_overload_log rows per exercise and changed workout date.
+
+    Current values are the day's heaviest weight, most reps and total
+    volume, compared with the best of any earlier day; the suggestion
+    applies double progression to the day's top set.
+    """
+    sets = sets[sets["exercise_id"].notna()]
+    keys = ["user_id", "exercise_id"]
+    day_keys = keys + ["session_date"]
+
+    days = sets.groupby(day_keys).agg(
+        first_changed=("first_changed", "first"),
+        current_weight=("weight_kg", "max"),
+        current_reps=("reps", "max"),
+        current_volume=("volume", "sum"),
+    ).reset_index()
+    top_sets = sets.sort_values(day_keys + ["weight_kg", "reps"], na_position="first").drop_duplicates(
+        day_keys, keep="last"
+    )
+    days = days.merge(top_sets[day_keys + ["weight_kg", "reps"]], on=day_keys, how="left")
+
+    for metric in ("weight", "reps", "volume"):
+        days[f"previous_best_{metric}"] = _prior_best(days, f"current_{metric}", keys)
+    days["weight_increase"] = days["current_weight"] - days["previous_best_weight"]
+    days["weight_increase_percentage"] = (
+        days["weight_increase"] / days["previous_best_weight"].where(days["previous_best_weight"] > 0) * 100
+    )
+    days["reps_increase"] = days["current_reps"] - days["previous_best_reps"]
+    days["volume_increase"] = days["current_volume"] - days["previous_best_volume"]
+    days["volume_increase_percentage"] = (
+        days["volume_increase"] / days["previous_best_volume"].where(days["previous_best_volume"] > 0) * 100
+    )
+
+    loaded = days["weight_kg"] > 0
+    progress_load = loaded & (days["reps"] >= REP_RANGE[1])
+    days["suggested_next_weight"] = days["weight_kg"].where(loaded).where(
+        ~progress_load, days["weight_kg"] + WEIGHT_INCREMENT_KG
+    )
+    days["suggested_next_reps"] = np.where(progress_load, REP_RANGE[0], days["reps"] + 1)
+    days.loc[days["reps"].isna(), "suggested_next_reps"] = np.nan
+
+    for column in ("previous_best_reps", "current_reps", "reps_increase", "suggested_next_reps"):
+        days[column] = days[column].astype("Int64")
+    days = days[days["session_date"] >= days["first_changed"]]
+    return days.rename(columns={"session_date": "log_date"})[list(OVERLOAD_COLUMNS)].reset_index(drop=True)
+
+
+def _best(sets: pd.DataFrame, column: str, keys: list) -> pd.DataFrame:
+    """Highest value of `column` per group with the first set and date reaching it"""
+    ranked = sets.dropna(subset=[column]).sort_values(
+        keys + [column, "session_date", "set_number"], ascending=[True] * len(keys) + [False, True, True]
+    )
+    return ranked.drop_duplicates(keys).set_index(keys)[[column, "session_date", "set_id"]]
+
+
+def compute_personal_records(sets: pd.DataFrame) -> pd.DataFrame:
+    """exercise_personal_records rows from each exercise's full set history"""
+    sets = sets[sets["exercise_id"].notna()]
+    keys = ["user_id", "exercise_id"]
+    records = pd.DataFrame(index=sets.groupby(keys).size().index)
+
+    for column, record, prefix, with_set in (
+        ("weight_kg", "max_weight_kg", "max_weight", True),
+        ("reps", "max_reps", "max_reps", True),
+        ("volume", "max_volume_kg", "max_volume", True),
+        ("e1rm", "best_1rm_kg", "best_1rm", False),
+        ("distance_meters", "max_distance_meters", "max_distance", False),
+    ):
+        candidates = sets if column != "volume" else sets[sets["volume"] > 0]
+        best = _best(candidates, column, keys)
+        records[record] = best[column]
+        records[f"{prefix}_date"] = best["session_date"]
+        if with_set:
+            records[f"{prefix}_set_id"] = best["set_id"]
+
+    records["max_reps"] = records["max_reps"].astype("Int64")
+    return records.reset_index()[list(RECORD_COLUMNS)]
+
+
+def _trend(ratio: pd.Series) -> pd.Series:
+    """increasing/decreasing/stable for a week-over-week ratio, None without one"""
+    trend = pd.Series(
+        np.select([ratio > 1 + TREND_THRESHOLD, ratio < 1 - TREND_THRESHOLD], ["increasing", "decreasing"], "stable"),
+        index=ratio.index,
+        dtype=object,
+    )
+    return trend.where(ratio.notna(), None)
+
+
+def _previous_week(frame: pd.DataFrame, column: str, keys: list) -> pd.Series:
+    """`column` of the same keys one week earlier, aligned to frame's index"""
+    previous = frame[keys + ["week", column]].assign(week=frame["week"] + pd.Timedelta(days=7))
+    return frame[keys + ["week"]].merge(previous, on=keys + ["week"], how="left")[column].set_axis(frame.index)
+
+
+def _weekly_set_stats(sets: pd.DataFrame, weeks: pd.Index, muscles: pd.DataFrame) -> pd.DataFrame:
+    """Set totals, trends, muscle groups and top exercises for the given (user_id, week)s"""
+    keys = ["user_id", "week"]
+    # Trends also need the week before each recomputed one
+    first_week = pd.Series(weeks.get_level_values("week"), index=weeks.get_level_values("user_id")).groupby(level=0).min()
+    sets = sets[sets["week"] >= sets["user_id"].map(first_week) - pd.Timedelta(days=7)]
+
+    weekly_sets = sets.groupby(keys).agg(
+        total_volume_kg=("volume", "sum"),
+        total_sets=("set_id", "size"),
+        total_reps=("reps", "sum"),
+        avg_rest_between_sets=("rest_seconds", "mean"),
+        avg_rpe=("rpe", "mean"),
+        total_prs_achieved=("is_pr", "sum"),
+        total_distance_meters=("distance_meters", "sum"),
+    )
+    failed = sets[sets["is_failure"]].groupby(keys)["session_id"].nunique().rename("sessions_to_failure")
+    cardio = sets[sets["exercise_category"].str.lower().eq("cardio")]
+    cardio_minutes = (cardio.groupby(keys)["duration_seconds"].sum() / 60).rename("total_cardio_minutes")
+    weekly_sets = weekly_sets.join([failed, cardio_minutes])
+
+    volumes = weekly_sets["total_volume_kg"].reset_index()
+    previous_volume = _previous_week(volumes, "total_volume_kg", ["user_id"])
+    weekly_sets["volume_trend"] = _trend(
+        volumes["total_volume_kg"] / previous_volume.where(previous_volume > 0)
+    ).set_axis(weekly_sets.index)
+
+    strength = sets.groupby(keys + ["exercise_id"])["e1rm"].max().dropna().reset_index()
+    strength["ratio"] = strength["e1rm"] / _previous_week(strength, "e1rm", ["user_id", "exercise_id"])
+    weekly_sets["strength_trend"] = _trend(strength.groupby(keys)["ratio"].mean().reindex(weekly_sets.index))
+
+    muscle_sets = sets.merge(muscles, on="exercise_id")
+    by_muscle = muscle_sets.groupby(keys + ["muscle_group"]).agg(
+        sets=("set_id", "size"), volume_kg=("volume", "sum")
+    ).reset_index()
+    weekly_sets["muscle_group_distribution"] = group_objects(by_muscle, keys, lambda g: {
+        muscle: {"sets": int(count), "volume_kg": float(volume)}
+        for muscle, count, volume in zip(g["muscle_group"], g["sets"], g["volume_kg"])
+    })
+
+    by_exercise = sets.groupby(keys + ["exercise_name"])["volume"].sum().rename("volume_kg").reset_index()
+    by_exercise = by_exercise[by_exercise["volume_kg"] > 0].sort_values(
+        keys + ["volume_kg", "exercise_name"], ascending=[True, True, False, True]
+    )
+    weekly_sets["top_exercises_by_volume"] = group_objects(
+        by_exercise.groupby(keys).head(TOP_EXERCISES), keys,
+        lambda g: [{"exercise_name": n, "volume_kg": float(v)} for n, v in zip(g["exercise_name"], g["volume_kg"])],
+    )
+
+    return weekly_sets.reindex(weeks)
+
+
+def compute_weekly_analytics(sets: pd.DataFrame, sessions: pd.DataFrame, muscles: pd.DataFrame) -> pd.DataFrame:
+    """
+    Weekly workout_analytics rows for the weeks containing changed sessions.
+
+    Volume trend compares a week's total volume with the previous week's;
+    strength trend averages the change in best estimated 1RM of exercises
+    trained in both weeks.
+    """
+    keys = ["user_id", "week"]
+    sessions = sessions.assign(
+        week=sessions["session_date"] - pd.to_timedelta(sessions["session_date"].dt.weekday, unit="D")
+    )
+    analytics = sessions.groupby(keys).agg(
+        total_workouts=("session_id", "size"),
+        total_workout_minutes=("duration_minutes", "sum"),
+        avg_workout_duration=("duration_minutes", "mean"),
+    )
+    analytics["workout_type_distribution"] = sessions.groupby(keys)["workout_type"].agg(
+        lambda types: types.value_counts().to_dict()
+    )
+
+    if not sets.empty:
+        analytics = analytics.join(_weekly_set_stats(sets, analytics.index, muscles), how="left")
+    analytics = analytics.reindex(
+        columns=[*analytics.columns, *(column for column in ANALYTICS_COLUMNS[4:] if column not in analytics)]
+    )
+    for column in ("total_volume_kg", "total_sets", "total_reps", "total_prs_achieved", "sessions_to_failure",
+                   "total_distance_meters", "total_cardio_minutes"):
+        analytics[column] = analytics[column].fillna(0)
+    for column, empty in (
+        ("workout_type_distribution", dict),
+        ("muscle_group_distribution", dict),
+        ("top_exercises_by_volume", list),
+    ):
+        analytics[column] = [value if isinstance(value, (dict, list)) else empty() for value in analytics[column]]
+    analytics["avg_volume_per_workout"] = analytics["total_volume_kg"] / analytics["total_workouts"]
+    for column in ("total_workout_minutes", "avg_workout_duration", "avg_rest_between_sets", "total_cardio_minutes"):
+        analytics[column] = np.floor(analytics[column] + 0.5).astype("Int64")
+    for column in ("total_sets", "total_reps", "total_prs_achieved", "sessions_to_failure"):
+        analytics[column] = analytics[column].astype("Int64")
+
+    analytics = analytics.reset_index().rename(columns={"week": "period_start_date"})
+    analytics["period_end_date"] = analytics["period_start_date"] + pd.Timedelta(days=6)
+    analytics["analysis_period"] = "weekly"
+    return analytics[list(ANALYTICS_COLUMNS)]
+
+
+async def _run_batch(
+    conn: asyncpg.Connection,
+    checkpoint: JobCheckpoint,
+    batch_size: int,
+    through: date,
+    muscles: pd.DataFrame
+) -> bool:
+    """Recompute one batch of changed users; False once all have been processed"""
+    user_ids = [row["user_id"] for row in await conn.fetch(BATCH_USERS_SQL, checkpoint.last_user_id, batch_size)]
+    if not user_ids:
+        return False
+
+    # Keyset bounds of the batch; COPY inlines arguments, so no NULLs
+    low = checkpoint.last_user_id or "00000000-0000-0000-0000-000000000000"
+    high = str(user_ids[-1])
+    sets = await copy_frame(
+        conn, SETS_SQL, low, high, through,
+        dates=("session_date", "first_changed"), booleans=("is_failure",),
+    )
+    sessions = await copy_frame(conn, SESSIONS_SQL, low, high, through, dates=("session_date",))
+
+    outputs = {}
+    if not sets.empty:
+        sets = prepare_sets(sets)
+        outputs[PROGRESS_STAGING] = (compute_progress(sets), PROGRESS_COLUMNS)
+        outputs[OVERLOAD_STAGING] = (compute_overload(sets), OVERLOAD_COLUMNS)
+        outputs[RECORDS_STAGING] = (compute_personal_records(sets), RECORD_COLUMNS)
+    if not sessions.empty:
+        outputs[ANALYTICS_STAGING] = (compute_weekly_analytics(sets, sessions, muscles), ANALYTICS_COLUMNS)
+
+    async with conn.transaction():
+        for staging, (frame, columns) in outputs.items():
+            if len(frame):
+                await conn.copy_records_to_table(staging, records=frame_records(frame, columns), columns=columns)
+        for statement in (MERGE_PROGRESS_SQL, MERGE_OVERLOAD_SQL, MERGE_ANALYTICS_SQL):
+            await conn.execute(statement, low, high, through)
+        await conn.execute(MERGE_RECORDS_SQL)
+        await advance(conn, checkpoint, high, len(user_ids), sum(len(frame) for frame, _ in outputs.values()))
+
+    return len(user_ids) == batch_size
+
+
+async def run(batch_size: Optional[int] = None) -> JobCheckpoint:
+    """Run (or resume) today's strength analytics update for users with changed sessions"""
+    batch_size = batch_size or settings.STRENGTH_ANALYTICS_BATCH_SIZE
+    conn = await db_service.connect_session()
+    try:
+        for statement in (CREATE_DIRTY_SQL, *CREATE_STAGING_SQL):
+            await conn.execute(statement)
+        checkpoint = await start_run(conn, JOB_NAME)
+        if checkpoint.resumed:
+            logger.info(
+                f"Resuming {JOB_NAME} run of {checkpoint.run_date} after user {checkpoint.last_user_id} "
+                f"({checkpoint.users_processed} users processed)"
+            )
+
+        # Only completed days are analyzed
+        through = checkpoint.run_date - timedelta(days=1)
+        since = through - timedelta(days=settings.STRENGTH_ANALYTICS_LOOKBACK_DAYS)
+        await conn.execute(COLLECT_DIRTY_SQL, checkpoint.watermark, since, through)
+        muscles = await copy_frame(conn, MUSCLES_SQL)
+
+        started = time.perf_counter()
+        while await _run_batch(conn, checkpoint, batch_size, through, muscles):
+            logger.info(
+                f"{JOB_NAME}: {checkpoint.users_processed} users processed, "
+                f"{checkpoint.rows_written} rows written"
+            )
+
+        await prune_deletions(conn, "workout_session_deletions")
+        await complete_run(conn, checkpoint)
+        logger.info(
+            f"{JOB_NAME} finished in {time.perf_counter() - started:.1f}s: "
+            f"{checkpoint.users_processed} users processed, {checkpoint.rows_written} rows written"
+        )
+        return checkpoint
+    except Exception as e:
+        log_error(e, f"{JOB_NAME} job")
+        raise
+    finally:
+        await conn.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
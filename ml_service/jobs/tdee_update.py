@@ -0,0 +1,164 @@
+"""
+Nightly update of the adaptive TDEE estimator state.
+
+Folds every completed day (up to yesterday) that a user's
+tdee_estimator_state has not seen yet into it: the day's total logged
+calories from daily_nutrition_logs and its weight_history entry. Users are
+walked in id order in keyset batches over a single session-level
+connection; each batch reads only its users' new days (at most
+TDEE_LOOKBACK_DAYS back, which also bounds the first run), updates the
+states in O(1) per day with services.tdee_estimator, and writes them back
+through a temporary staging table in one transaction with the checkpoint.
+
+Logs added or edited after their day has been folded are not picked up.
+
+Run with: python -m jobs.tdee_update
+"""
+
+import asyncio
+import time
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional
+
+import asyncpg
+
+from config.logging_config import logger, log_error
+from config.settings import settings
+from jobs.checkpoints import JobCheckpoint, advance, complete_run, start_run
+from services.database import db_service
+from services.tdee_estimator import STATE_COLUMNS, TdeeState, observe_day
+
+JOB_NAME = "tdee_update"
+
+BATCH_USERS_SQL = """
+    SELECT id FROM profiles
+    WHERE id > COALESCE($1::uuid, '00000000-0000-0000-0000-000000000000'::uuid)
+    ORDER BY id
+    LIMIT $2
+"""
+
+# Unseen days in ($2, $3] for users $1 with their current state, in day order
+NEW_DAYS_SQL = f"""
+    WITH days AS (
+        SELECT user_id, log_date, SUM(total_calories) AS calories, NULL::float8 AS weight
+        FROM daily_nutrition_logs
+        WHERE user_id = ANY($1::uuid[]) AND log_date > $2 AND log_date <= $3
+        GROUP BY user_id, log_date
+        UNION ALL
+        SELECT user_id, log_date, NULL, weight
+        FROM weight_history
+        WHERE user_id = ANY($1::uuid[]) AND log_date > $2 AND log_date <= $3
+    )
+    SELECT
+        d.user_id,
+        d.log_date,
+        MAX(d.calories) AS calories,
+        MAX(d.weight) AS weight,
+        {", ".join(f"s.{column}" for column in STATE_COLUMNS)}
+    FROM days d
+    LEFT JOIN tdee_estimator_state s ON s.user_id = d.user_id
+    WHERE s.observed_through IS NULL OR d.log_date > s.observed_through
+    GROUP BY d.user_id, d.log_date, s.user_id
+    ORDER BY d.user_id, d.log_date
+"""
+
+STAGING_TABLE = "tdee_state_staging"
+
+CREATE_STAGING_SQL = f"""
+    CREATE TEMPORARY TABLE IF NOT EXISTS {STAGING_TABLE}
+    (LIKE tdee_estimator_state INCLUDING DEFAULTS)
+    ON COMMIT DELETE ROWS
+"""
+
+MERGE_SQL = f"""
+    INSERT INTO tdee_estimator_state (user_id, {", ".join(STATE_COLUMNS)}, updated_at)
+    SELECT user_id, {", ".join(STATE_COLUMNS)}, now() FROM {STAGING_TABLE}
+    ON CONFLICT (user_id) DO UPDATE SET
+        {", ".join(f"{column} = EXCLUDED.{column}" for column in STATE_COLUMNS)},
+        updated_at = EXCLUDED.updated_at
+"""
+
+
+def fold_days(rows: List[Any]) -> Dict[Any, TdeeState]:
+    """
+    Updated state per user from NEW_DAYS_SQL rows (grouped by user, in day order).
+
+    A user's first row carries their stored state, or NULLs for a new user.
+    """
+    states: Dict[Any, TdeeState] = {}
+    for row in rows:
+        state = states.get(row["user_id"])
+        if state is None:
+            state = TdeeState.from_record(row) if row["intake_days"] is not None else TdeeState()
+            states[row["user_id"]] = state
+        observe_day(state, row["log_date"], row["calories"], row["weight"])
+    return states
+
+
+async def _run_batch(
+    conn: asyncpg.Connection,
+    checkpoint: JobCheckpoint,
+    batch_size: int,
+    through: date
+) -> bool:
+    """Update one batch of users; False once every user has been visited"""
+    user_ids = [row["id"] for row in await conn.fetch(BATCH_USERS_SQL, checkpoint.last_user_id, batch_size)]
+    if not user_ids:
+        return False
+
+    since = through - timedelta(days=settings.TDEE_LOOKBACK_DAYS)
+    states = fold_days(await conn.fetch(NEW_DAYS_SQL, user_ids, since, through))
+
+    async with conn.transaction():
+        if states:
+            await conn.copy_records_to_table(
+                STAGING_TABLE,
+                records=[
+                    (user_id, *(getattr(state, column) for column in STATE_COLUMNS))
+                    for user_id, state in states.items()
+                ],
+                columns=("user_id", *STATE_COLUMNS),
+            )
+            await conn.execute(MERGE_SQL)
+        await advance(conn, checkpoint, str(user_ids[-1]), len(user_ids), len(states))
+
+    return len(user_ids) == batch_size
+
+
+async def run(batch_size: Optional[int] = None) -> JobCheckpoint:
+    """Run (or resume) today's update over the whole user base"""
+    batch_size = batch_size or settings.TDEE_UPDATE_BATCH_SIZE
+    conn = await db_service.connect_session()
+    try:
+        await conn.execute(CREATE_STAGING_SQL)
+        checkpoint = await start_run(conn, JOB_NAME)
+        if checkpoint.resumed:
+            logger.info(
+                f"Resuming {JOB_NAME} run of {checkpoint.run_date} after user {checkpoint.last_user_id} "
+                f"({checkpoint.users_processed} users processed)"
+            )
+
+        # Only completed days are folded
+        through = checkpoint.run_date - timedelta(days=1)
+        started = time.perf_counter()
+        while await _run_batch(conn, checkpoint, batch_size, through):
+            logger.info(
+                f"{JOB_NAME}: {checkpoint.users_processed} users processed, "
+                f"{checkpoint.rows_written} states updated"
+            )
+
+        await complete_run(conn, checkpoint)
+        logger.info(
+            f"{JOB_NAME} finished in {time.perf_counter() - started:.1f}s: "
+            f"{checkpoint.users_processed} users processed, {checkpoint.rows_written} states updated"
+        )
+        return checkpoint
+    except Exception as e:
+        log_error(e, f"{JOB_NAME} job")
+        raise
+    finally:
+        await conn.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
@@ -6,10 +6,14 @@ from .quiz import (
     Macros,
     Calculations
 )
+from .plans import BulkUserIdsRequest
+from .exports import DataExportRequest
 
 __all__ = [
     "QuickOnboardingData",
     "UnifiedGeneratePlansRequest",
     "Macros",
-    "Calculations"
+    "Calculations",
+    "BulkUserIdsRequest",
+    "DataExportRequest"
 ]
@@ -0,0 +1,19 @@
+# ml_service/models/exports.py
+
+"""Pydantic models for data export requests"""
+
+from datetime import date
+from typing import Literal, Optional
+
+from pydantic import BaseModel
+
+
+class DataExportRequest(BaseModel):
+    """Request for a new data_exports archive"""
+    user_id: str
+    export_type: Literal["full", "plans", "nutrition", "workouts", "body"] = "full"
+    export_format: Literal["csv", "json"] = "csv"  # json: NDJSON for every table
+    date_range_start: Optional[date] = None
+    date_range_end: Optional[date] = None
+    include_photos: bool = False
+    include_analytics: bool = False
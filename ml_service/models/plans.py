@@ -0,0 +1,19 @@
+# ml_service/models/plans.py
+
+"""Pydantic models for plan status and tier requests"""
+
+from typing import List
+from uuid import UUID
+
+from pydantic import BaseModel, Field
+
+from config.settings import settings
+
+
+class BulkUserIdsRequest(BaseModel):
+    """User IDs for the bulk plan status/tier endpoints"""
+    user_ids: List[UUID] = Field(..., min_length=1, max_length=settings.BULK_MAX_USER_IDS)
+
+    def unique_user_ids(self) -> List[str]:
+        """Requested IDs as strings, duplicates removed, request order kept"""
+        return list(dict.fromkeys(str(user_id) for user_id in self.user_ids))
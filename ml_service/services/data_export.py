@@ -0,0 +1,340 @@
+"""User data exports streamed from Postgres with COPY"""
+
+import asyncio
+import os
+import zipfile
+from dataclasses import dataclass
+from datetime import date, datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from config.settings import settings
+from config.logging_config import logger, log_database_operation, log_error
+from services.database import db_service
+from utils import json_codec
+
+# COPY options that pass one JSON document per row through verbatim: with
+# quote/delimiter bytes that JSON text never contains, CSV mode neither
+# quotes nor escapes anything (text mode would double every backslash)
+NDJSON_COPY_OPTIONS = {"format": "csv", "quote": "\x01", "delimiter": "\x02"}
+
+EXPORT_CATEGORIES = ("plans", "nutrition", "workouts", "body")
+
+
+@dataclass(frozen=True)
+class ExportSource:
+    """One table of user data written to the export archive"""
+    name: str
+    table: str
+    category: str
+    # Column the export's date range applies to (None: exported in full)
+    date_column: Optional[str] = None
+    # Expression building one NDJSON line from a row t
+    document: str = "to_jsonb(t)"
+    # Always written as NDJSON, e.g. rows holding JSON documents
+    documents: bool = False
+
+
+# Plan rows with chunked sections reassembled
+PLAN_DOCUMENT = "to_jsonb(t) || jsonb_build_object('plan_data', assemble_plan_data(t.plan_data))"
+
+EXPORT_SOURCES = (
+    ExportSource("quiz_results", "quiz_results", "plans", "created_at", documents=True),
+    ExportSource(
+        "meal_plans", "ai_meal_plans", "plans", "created_at",
+        document=PLAN_DOCUMENT, documents=True,
+    ),
+    ExportSource(
+        "workout_plans", "ai_workout_plans", "plans", "created_at",
+        document=PLAN_DOCUMENT, documents=True,
+    ),
+    ExportSource("macro_targets", "user_macro_targets", "plans", "effective_date"),
+    ExportSource("daily_nutrition_logs", "daily_nutrition_logs", "nutrition", "log_date"),
+    ExportSource("daily_water_intake", "daily_water_intake", "nutrition", "log_date"),
+    ExportSource("water_intake_logs", "water_intake_logs", "nutrition", "log_date"),
+    ExportSource("workout_sessions", "workout_sessions", "workouts", "session_date"),
+    ExportSource("exercise_sets", "exercise_sets", "workouts", "created_at"),
+    ExportSource("cardio_sessions", "cardio_sessions", "workouts", "session_date"),
+    ExportSource("personal_records", "exercise_personal_records", "workouts"),
+    ExportSource("weight_history", "weight_history", "body", "log_date"),
+    ExportSource("body_measurements", "body_measurements_simple", "body", "measurement_date"),
+    ExportSource("nutrition_analytics", "nutrition_analytics", "analytics", "analysis_date"),
+    ExportSource("workout_analytics", "workout_analytics", "analytics", "analysis_date"),
+    ExportSource("weekly_summaries", "weekly_summaries", "analytics", "week_start_date"),
+    # Photo metadata and storage paths; the images stay in storage
+    ExportSource("meal_photos", "meal_photo_logs", "photos", "created_at"),
+)
+
+EXPORT_SQL = """
+    SELECT id, user_id, export_type, export_format, date_range_start, date_range_end,
+           include_photos, include_analytics, status
+    FROM data_exports
+    WHERE id = $1::uuid
+"""
+
+
+def select_sources(export_type: str, include_analytics: bool, include_photos: bool) -> List[ExportSource]:
+    """Sources covered by an export type ("full" or one of EXPORT_CATEGORIES)"""
+    categories = set(EXPORT_CATEGORIES) if export_type in (None, "full") else {export_type}
+    if include_analytics:
+        categories.add("analytics")
+    if include_photos:
+        categories.add("photos")
+    return [source for source in EXPORT_SOURCES if source.category in categories]
+
+
+def source_query(
+    source: ExportSource,
+    as_json: bool,
+    user_id: str,
+    date_range_start: Optional[date] = None,
+    date_range_end: Optional[date] = None,
+) -> Tuple[str, List[Any]]:
+    """
+    Query and arguments selecting one user's rows of a source.
+
+    The date range is inclusive on both ends; open ends add no condition
+    (COPY inlines the arguments, so a NULL bound cannot be tested in SQL).
+    """
+    conditions = ["t.user_id = $1::uuid"]
+    args: List[Any] = [user_id]
+    order = ""
+    if source.date_column:
+        column = f"t.{source.date_column}"
+        if date_range_start is not None:
+            args.append(date_range_start)
+            conditions.append(f"{column} >= ${len(args)}::date")
+        if date_range_end is not None:
+            args.append(date_range_end)
+            conditions.append(f"{column} < ${len(args)}::date + 1")
+        order = f" ORDER BY {column}"
+
+    columns = source.document if as_json else "t.*"
+    return f"SELECT {columns} FROM {source.table} t WHERE {' AND '.join(conditions)}{order}", args
+
+
+class _ArchiveWriter:
+    """Writes COPY output into a zip member from a worker thread"""
+
+    def __init__(self, archive: zipfile.ZipFile, member: str):
+        self._stream = archive.open(member, "w", force_zip64=True)
+
+    async def write(self, chunk: bytes) -> None:
+        # Deflate off the event loop; COPY waits for each chunk, which keeps
+        # memory bounded by the chunk size whatever the table size
+        await asyncio.to_thread(self._stream.write, chunk)
+
+    async def close(self) -> None:
+        await asyncio.to_thread(self._stream.close)
+
+
+class DataExportService:
+    """
+    Builds data_exports archives: one zip per export holding a CSV or NDJSON
+    file per table plus a manifest.
+
+    Rows never pass through Python objects: each table is streamed with
+    COPY ... TO STDOUT straight into the compressed archive, one table per
+    pooled (read) connection, and data_exports progress is updated after
+    every table.
+    """
+
+    def __init__(self):
+        """Initialize the service"""
+        self._slots = asyncio.Semaphore(settings.EXPORT_MAX_CONCURRENT)
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def archive_path(self, export_id: str) -> str:
+        """Location of an export's finished archive"""
+        return os.path.join(settings.EXPORT_DIR, f"{export_id}.zip")
+
+    async def create_export(
+        self,
+        user_id: str,
+        export_type: str = "full",
+        export_format: str = "csv",
+        date_range_start: Optional[date] = None,
+        date_range_end: Optional[date] = None,
+        include_photos: bool = False,
+        include_analytics: bool = False,
+    ) -> str:
+        """Insert a pending data_exports row and start building it; returns the export ID"""
+        async with db_service.get_connection() as conn:
+            export_id = await conn.fetchval(
+                """
+                INSERT INTO data_exports
+                (user_id, export_type, export_format, date_range_start, date_range_end,
+                 include_photos, include_analytics, status)
+                VALUES ($1, $2, $3, $4, $5, $6, $7, 'pending')
+                RETURNING id
+                """,
+                user_id, export_type, export_format, date_range_start, date_range_end,
+                include_photos, include_analytics,
+            )
+
+        export_id = str(export_id)
+        log_database_operation("INSERT", "data_exports", user_id, success=True)
+        self.start(export_id)
+        return export_id
+
+    def start(self, export_id: str) -> None:
+        """Run an export in the background unless it is already running"""
+        if export_id in self._tasks:
+            return
+        task = asyncio.create_task(self.run_export(export_id))
+        self._tasks[export_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(export_id, None))
+
+    async def close(self) -> None:
+        """Cancel running exports"""
+        for task in list(self._tasks.values()):
+            task.cancel()
+        await asyncio.gather(*list(self._tasks.values()), return_exceptions=True)
+
+    async def run_export(self, export_id: str) -> bool:
+        """Build one export archive, recording progress and the outcome in data_exports"""
+        async with self._slots:
+            async with db_service.get_connection() as conn:
+                export = await conn.fetchrow(EXPORT_SQL, export_id)
+            if export is None:
+                logger.warning(f"[Export] Unknown export {export_id}")
+                return False
+
+            user_id = str(export["user_id"])
+            part_path = self.archive_path(export_id) + ".part"
+            try:
+                await self._update(export_id, status="processing", started_at=datetime.now(timezone.utc),
+                                   progress_percent=0, rows_exported=0, error_message=None)
+                os.makedirs(settings.EXPORT_DIR, exist_ok=True)
+
+                rows = await self._write_archive(export, part_path)
+                os.replace(part_path, self.archive_path(export_id))
+
+                await self._update(
+                    export_id,
+                    status="completed",
+                    progress_percent=100,
+                    rows_exported=rows,
+                    file_size_bytes=os.path.getsize(self.archive_path(export_id)),
+                    file_url=f"/exports/{export_id}/download",
+                    completed_at=datetime.now(timezone.utc),
+                )
+                logger.info(f"[Export] {export_id} for user {user_id}: {rows} rows")
+                return True
+
+            except asyncio.CancelledError:
+                await asyncio.shield(self._fail(export_id, user_id, part_path, "Export cancelled"))
+                raise
+            except Exception as e:
+                log_error(e, f"Data export {export_id}", user_id)
+                await self._fail(export_id, user_id, part_path, str(e))
+                return False
+
+    async def _write_archive(self, export: Any, path: str) -> int:
+        """Stream every selected source into a new zip at path; returns the row count"""
+        user_id = str(export["user_id"])
+        as_json = export["export_format"] == "json"
+        sources = select_sources(export["export_type"], export["include_analytics"], export["include_photos"])
+        manifest: Dict[str, Any] = {
+            "export_id": str(export["id"]),
+            "user_id": user_id,
+            "export_type": export["export_type"],
+            "date_range_start": export["date_range_start"],
+            "date_range_end": export["date_range_end"],
+            "generated_at": datetime.now(timezone.utc),
+            "files": {},
+        }
+        total_rows = 0
+
+        archive = await asyncio.to_thread(
+            zipfile.ZipFile, path, "w", zipfile.ZIP_DEFLATED, True, settings.EXPORT_COMPRESSION_LEVEL
+        )
+        try:
+            for done, source in enumerate(sources, start=1):
+                documents = as_json or source.documents
+                member = f"{source.name}.{'ndjson' if documents else 'csv'}"
+                rows = await self._copy_source(archive, member, source, documents, export)
+                manifest["files"][member] = {"table": source.table, "rows": rows}
+                total_rows += rows
+                await self._update(
+                    str(export["id"]),
+                    progress_percent=done * 100 // (len(sources) + 1),
+                    rows_exported=total_rows,
+                )
+
+            await asyncio.to_thread(archive.writestr, "manifest.json", json_codec.dumps_bytes(manifest))
+        finally:
+            await asyncio.to_thread(archive.close)
+        return total_rows
+
+    async def _copy_source(
+        self,
+        archive: zipfile.ZipFile,
+        member: str,
+        source: ExportSource,
+        documents: bool,
+        export: Any,
+    ) -> int:
+        """COPY one source into an archive member; returns the number of rows"""
+        user_id = str(export["user_id"])
+        options = NDJSON_COPY_OPTIONS if documents else {"format": "csv", "header": True}
+        query, args = source_query(
+            source, documents, user_id, export["date_range_start"], export["date_range_end"]
+        )
+        writer = _ArchiveWriter(archive, member)
+        try:
+            async with db_service.read_connection(user_id) as conn:
+                status = await conn.copy_from_query(
+                    query,
+                    *args,
+                    output=writer.write,
+                    **options,
+                )
+        finally:
+            await writer.close()
+        # Status tag: "COPY <rows>"
+        return int(status.split()[-1])
+
+    async def _fail(self, export_id: str, user_id: str, part_path: str, error: str) -> None:
+        """Mark an export failed and remove its partial archive"""
+        try:
+            os.remove(part_path)
+        except FileNotFoundError:
+            pass
+        try:
+            await self._update(export_id, status="failed", error_message=error[:1000])
+        except Exception as e:
+            log_error(e, f"Failed to record data export failure {export_id}", user_id)
+
+    async def _update(self, export_id: str, **values: Any) -> None:
+        """Update data_exports columns of one export"""
+        assignments = ", ".join(f"{column} = ${i}" for i, column in enumerate(values, start=2))
+        async with db_service.get_connection() as conn:
+            await conn.execute(
+                f"UPDATE data_exports SET {assignments} WHERE id = $1::uuid",
+                export_id, *values.values(),
+            )
+
+    async def get_export(self, export_id: str) -> Optional[Dict[str, Any]]:
+        """Status, progress and file details of an export"""
+        async with db_service.get_connection() as conn:
+            row = await conn.fetchrow(
+                """
+                SELECT id, user_id, status, progress_percent, rows_exported, file_size_bytes,
+                       file_url, error_message, download_count, started_at, completed_at, expires_at
+                FROM data_exports
+                WHERE id = $1::uuid
+                """,
+                export_id,
+            )
+        return dict(row) if row else None
+
+    async def record_download(self, export_id: str) -> None:
+        """Count a download of a completed export"""
+        async with db_service.get_connection() as conn:
+            await conn.execute(
+                "UPDATE data_exports SET download_count = download_count + 1 WHERE id = $1::uuid",
+                export_id,
+            )
+
+
+data_export_service = DataExportService()
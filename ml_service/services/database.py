@@ -2,14 +2,312 @@
 
 """Database service for managing connections and operations"""
 
-import json
-from typing import Optional, Any, Dict
+import asyncio
+import re
+import time
+from functools import partial
+from typing import Optional, Any, Dict, Iterable, List
 import asyncpg
 from contextlib import asynccontextmanager
 from datetime import datetime
 
 from config.settings import settings
 from config.logging_config import logger, log_database_operation, log_error
+from services.db_statements import StatementRegistry
+from services.plan_status_cache import PlanStatusCache
+from services.plan_storage import split_plan
+from services.plan_status_hub import PlanStatusHub
+from services.pool_metrics import AdaptiveLimiter, PoolMetrics, next_pool_limit
+from services.profile_repository import ProfileRepository
+from services.regeneration_quota import RegenerationQuotaCache, billing_period_start
+from services.tdee_estimator import STATE_COLUMNS as TDEE_STATE_COLUMNS, TdeeState
+from utils import json_codec
+
+# Postgres NOTIFY channel carrying plan status changes
+PLAN_STATUS_CHANNEL = "plan_status"
+
+# Postgres NOTIFY channel carrying IDs of users whose profile data changed
+PROFILE_CHANGED_CHANNEL = "profile_changed"
+
+# NOTIFY payloads are capped at 8000 bytes by Postgres
+MAX_NOTIFY_ERROR_LENGTH = 1000
+
+# Errors raised when a pooled connection was dropped by the server or pooler
+STALE_CONNECTION_ERRORS = (
+    asyncpg.exceptions.ConnectionDoesNotExistError,
+    asyncpg.exceptions.InterfaceError,
+    asyncio.TimeoutError,
+    ConnectionError,
+    OSError,
+)
+
+PLAN_STATUS_SQL = """
+    SELECT
+        m.status AS meal_status,
+        m.error_message AS meal_error,
+        m.generated_at AS meal_generated_at,
+        w.status AS workout_status,
+        w.error_message AS workout_error,
+        w.generated_at AS workout_generated_at
+    FROM (SELECT $1::uuid AS user_id) u
+    LEFT JOIN user_current_plans c ON c.user_id = u.user_id
+    LEFT JOIN ai_meal_plans m ON m.id = c.meal_plan_id
+    LEFT JOIN ai_workout_plans w ON w.id = c.workout_plan_id
+"""
+
+# Reads the denormalized tier columns, never plan_data
+PLAN_TIERS_SQL = """
+    SELECT
+        m.tier AS meal_tier,
+        m.completeness AS meal_completeness,
+        w.tier AS workout_tier,
+        w.completeness AS workout_completeness
+    FROM (SELECT $1::uuid AS user_id) u
+    LEFT JOIN user_current_plans c ON c.user_id = u.user_id
+    LEFT JOIN ai_meal_plans m ON m.id = c.meal_plan_id
+    LEFT JOIN ai_workout_plans w ON w.id = c.workout_plan_id
+"""
+
+# Bulk variants for dashboards: one row per user in $1 that has a plan pointer.
+# user_current_plans holds a single row per user, so no DISTINCT ON is needed.
+BULK_PLAN_STATUS_SQL = """
+    SELECT
+        c.user_id,
+        m.status AS meal_status,
+        m.error_message AS meal_error,
+        m.generated_at AS meal_generated_at,
+        w.status AS workout_status,
+        w.error_message AS workout_error,
+        w.generated_at AS workout_generated_at
+    FROM user_current_plans c
+    LEFT JOIN ai_meal_plans m ON m.id = c.meal_plan_id
+    LEFT JOIN ai_workout_plans w ON w.id = c.workout_plan_id
+    WHERE c.user_id = ANY($1::uuid[])
+"""
+
+BULK_PLAN_TIERS_SQL = """
+    SELECT
+        c.user_id,
+        m.tier AS meal_tier,
+        m.completeness AS meal_completeness,
+        w.tier AS workout_tier,
+        w.completeness AS workout_completeness
+    FROM user_current_plans c
+    LEFT JOIN ai_meal_plans m ON m.id = c.meal_plan_id
+    LEFT JOIN ai_workout_plans w ON w.id = c.workout_plan_id
+    WHERE c.user_id = ANY($1::uuid[])
+"""
+
+# Generation placeholders for both plan types plus their "generating" NOTIFY.
+# Parameters: $1 user_id, $2 quiz_result_id, $3 NOTIFY channel.
+PLAN_PLACEHOLDER_CTES = """
+    meal_placeholder AS (
+        INSERT INTO ai_meal_plans
+        (user_id, quiz_result_id, plan_data, status, is_active, daily_calories)
+        VALUES ($1::uuid, $2::uuid, NULL, 'generating', false, 0)
+        ON CONFLICT (user_id, quiz_result_id)
+        DO UPDATE SET status = 'generating', updated_at = NOW()
+        RETURNING id
+    ),
+    workout_placeholder AS (
+        INSERT INTO ai_workout_plans
+        (user_id, quiz_result_id, plan_data, status, is_active)
+        VALUES ($1::uuid, $2::uuid, NULL, 'generating', false)
+        ON CONFLICT (user_id, quiz_result_id)
+        DO UPDATE SET status = 'generating', updated_at = NOW()
+        RETURNING id
+    )
+"""
+
+PLAN_PLACEHOLDER_NOTIFY = """
+    SELECT
+        pg_notify($3::text, json_build_object(
+            'user_id', $1::uuid::text, 'plan_type', 'meal', 'status', 'generating',
+            'error_message', NULL, 'generated_at', NULL
+        )::text),
+        pg_notify($3::text, json_build_object(
+            'user_id', $1::uuid::text, 'plan_type', 'workout', 'status', 'generating',
+            'error_message', NULL, 'generated_at', NULL
+        )::text)
+"""
+
+INIT_PLAN_STATUS_SQL = f"WITH {PLAN_PLACEHOLDER_CTES} {PLAN_PLACEHOLDER_NOTIFY}"
+
+# Everything /generate-plans writes before returning, as one statement:
+# quiz calculations, today's macro targets and both plan placeholders.
+# A user has one macro target row (user_macro_targets_user_id_key), so
+# onboarding again replaces it and moves it to today.
+# Extra parameters: $4 calculations, $5 daily_calories, $6 protein_g,
+# $7 carbs_g, $8 fats_g, $9 water_ml, $10 source, $11 notes.
+ONBOARDING_SQL = f"""
+    WITH quiz AS (
+        UPDATE quiz_results
+        SET calculations = $4::jsonb
+        WHERE id = $2::uuid
+        RETURNING id
+    ),
+    targets AS (
+        INSERT INTO user_macro_targets
+        (user_id, effective_date, daily_calories, daily_protein_g,
+         daily_carbs_g, daily_fats_g, daily_water_ml, source, notes)
+        VALUES ($1::uuid, CURRENT_DATE, $5, $6, $7, $8, $9, $10, $11)
+        ON CONFLICT (user_id)
+        DO UPDATE SET
+            effective_date = EXCLUDED.effective_date,
+            daily_calories = EXCLUDED.daily_calories,
+            daily_protein_g = EXCLUDED.daily_protein_g,
+            daily_carbs_g = EXCLUDED.daily_carbs_g,
+            daily_fats_g = EXCLUDED.daily_fats_g,
+            daily_water_ml = EXCLUDED.daily_water_ml,
+            source = EXCLUDED.source,
+            notes = EXCLUDED.notes,
+            created_at = NOW()
+        RETURNING id
+    ),
+    {PLAN_PLACEHOLDER_CTES}
+    {PLAN_PLACEHOLDER_NOTIFY}
+"""
+
+# Profile, extended profile and latest quiz answers used for personalization
+# (the columns of ProfileSnapshot)
+USER_PROFILE_SQL = """
+    SELECT
+        p.weight, p.target_weight, p.age, p.gender, p.height,
+        upe.cooking_skill, upe.cooking_time, upe.grocery_budget, upe.meals_per_day,
+        upe.food_allergies, upe.disliked_foods, upe.meal_prep_preference,
+        upe.gym_access, upe.equipment_available, upe.workout_location_preference,
+        upe.injuries_limitations, upe.fitness_experience, upe.health_conditions,
+        upe.medications, upe.sleep_quality, upe.stress_level, upe.dietary_restrictions,
+        qr.answers as quiz_answers
+    FROM profiles p
+    LEFT JOIN user_profile_extended upe ON p.id = upe.user_id
+    LEFT JOIN LATERAL (
+        SELECT answers FROM quiz_results
+        WHERE user_id = p.id
+        ORDER BY created_at DESC
+        LIMIT 1
+    ) qr ON true
+    WHERE p.id = $1
+"""
+
+# Active subscription tier and regeneration usage for one billing period
+REGENERATION_USAGE_SQL = """
+    SELECT
+        COALESCE(s.tier, 'free') AS tier,
+        COALESCE(st.ai_generations_per_month, 0) AS ai_generations_per_month,
+        COALESCE(u.meal_plan_regenerations, 0) AS meal_regens,
+        COALESCE(u.workout_plan_regenerations, 0) AS workout_regens
+    FROM (SELECT $1::uuid AS user_id) x
+    LEFT JOIN LATERAL (
+        SELECT s.tier
+        FROM subscriptions s
+        WHERE s.user_id = x.user_id AND s.status = 'active'
+        LIMIT 1
+    ) s ON true
+    LEFT JOIN subscription_tiers st ON st.tier = COALESCE(s.tier, 'free')
+    LEFT JOIN plan_regeneration_usage u
+        ON u.user_id = x.user_id AND u.period_start = $2
+"""
+
+# Atomic check-and-reserve of manual regenerations for both plan types
+RESERVE_REGENERATIONS_SQL = """
+    SELECT reserved, tier, monthly_limit, meal_usage, workout_usage
+    FROM reserve_plan_regenerations($1::uuid, $2::boolean, $3::boolean)
+"""
+
+# Replay lag of a streaming replica in seconds; 0 when fully caught up
+REPLICA_LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END::float8
+"""
+
+# Adaptive TDEE estimator state for one user
+TDEE_STATE_SQL = f"""
+    SELECT {", ".join(TDEE_STATE_COLUMNS)}
+    FROM tdee_estimator_state
+    WHERE user_id = $1
+"""
+
+# Per-gram macros of foods by lowercased name, for macro verification of
+# generated meal plans; verified and unbranded entries win
+FOOD_REFERENCE_SQL = """
+    SELECT DISTINCT ON (lower(food_name))
+        lower(food_name) AS name,
+        calories / serving_qty AS calories,
+        protein / serving_qty AS protein,
+        carbs / serving_qty AS carbs,
+        fats / serving_qty AS fats,
+        fiber / serving_qty AS fiber
+    FROM food_database
+    WHERE lower(food_name) = ANY($1::text[])
+      AND lower(serving_unit) IN ('g', 'gram', 'grams')
+      AND serving_qty > 0
+      AND calories IS NOT NULL
+    ORDER BY lower(food_name), verified DESC, brand_name IS NULL DESC, updated_at DESC
+"""
+
+# Library recipes (and, without a dietary filter, the user's own meal
+# templates) usable by the BASIC meal plan solver, per serving; recipes
+# tagged with one of the given allergen tags, and recipes or templates whose
+# name or ingredients match one of the LIKE patterns, are left out
+MEAL_CANDIDATES_SQL = """
+    (
+        SELECT id, 'recipe' AS source, name, meal_type AS meal_types,
+               calories_per_serving AS calories, protein_per_serving AS protein,
+               carbs_per_serving AS carbs, fats_per_serving AS fats,
+               dietary_tags AS tags, ingredients, instructions,
+               prep_time_minutes, total_time_minutes
+        FROM recipe_database
+        WHERE (created_by IS NULL OR verified)
+          AND meal_type IS NOT NULL
+          AND calories_per_serving > 0
+          AND protein_per_serving IS NOT NULL
+          AND carbs_per_serving IS NOT NULL
+          AND fats_per_serving IS NOT NULL
+          AND ($2::text[] IS NULL OR dietary_tags && $2::text[])
+          AND NOT coalesce(allergen_tags && $3::text[], false)
+          AND NOT lower(name || ' ' || coalesce(ingredients::text, '')) LIKE ANY ($4::text[])
+        ORDER BY verified DESC NULLS LAST, id
+        LIMIT 5000
+    )
+    UNION ALL
+    SELECT id, 'template', name, ARRAY[lower(meal_type)],
+           total_calories, total_protein, total_carbs, total_fats,
+           NULL, foods, NULL, NULL, NULL
+    FROM meal_templates
+    WHERE user_id = $1
+      AND $2::text[] IS NULL
+      AND meal_type IS NOT NULL
+      AND total_calories > 0
+      AND total_protein IS NOT NULL
+      AND total_carbs IS NOT NULL
+      AND total_fats IS NOT NULL
+      AND NOT lower(name || ' ' || coalesce(foods::text, '')) LIKE ANY ($4::text[])
+"""
+
+# Exercises available to the rule-based workout plan assembler
+EXERCISE_LIBRARY_SQL = """
+    SELECT id, name, description, category, muscle_groups, equipment, difficulty,
+           instructions, alternatives, verified
+    FROM exercise_library
+    WHERE muscle_groups IS NOT NULL
+    ORDER BY id
+"""
+
+# Hot statements that can run on the read replica
+REPLICA_STATEMENTS = (
+    "plan_status", "plan_tiers", "bulk_plan_status", "bulk_plan_tiers", "regeneration_usage", "tdee_state",
+    "food_reference", "meal_candidates", "exercise_library"
+)
+
+# Length of the SQL prefix used to label ad-hoc queries in pool metrics
+QUERY_LABEL_LENGTH = 120
+
+# Users tracked for read-your-writes before expired entries are pruned
+MAX_READ_YOUR_WRITES_ENTRIES = 10000
 
 
 class DatabaseService:
@@ -18,6 +316,68 @@ class DatabaseService:
     def __init__(self):
         """Initialize database service"""
         self.pool: Optional[asyncpg.Pool] = None
+        self.status_hub = PlanStatusHub()
+        self.status_cache = PlanStatusCache(
+            max_size=settings.PLAN_STATUS_CACHE_SIZE,
+            ttl_seconds=settings.PLAN_STATUS_CACHE_TTL_SECONDS
+        )
+        self._listen_conn: Optional[asyncpg.Connection] = None
+        self._listener_task: Optional[asyncio.Task] = None
+        self._closing = False
+        self.statements = StatementRegistry(
+            self._hot_statements(),
+            enabled=settings.db_pool_mode == "direct"
+        )
+        # Backend PID → monotonic time the connection was last released
+        self._last_used: Dict[int, float] = {}
+        # Optional read replica for read-only queries
+        self.replica_pool: Optional[asyncpg.Pool] = None
+        self.replica_lag: Optional[float] = None
+        self._replica_lag_task: Optional[asyncio.Task] = None
+        # User ID → monotonic time until which the user's reads stay on the primary
+        self._read_your_writes: Dict[str, float] = {}
+        self.profiles = ProfileRepository(
+            self._load_user_profile,
+            max_size=settings.PROFILE_CACHE_SIZE,
+            ttl_seconds=settings.PROFILE_CACHE_TTL_SECONDS
+        )
+        self.regeneration_quota = RegenerationQuotaCache(
+            max_size=settings.REGENERATION_QUOTA_CACHE_SIZE,
+            ttl_seconds=settings.REGENERATION_QUOTA_CACHE_TTL_SECONDS
+        )
+        # Pool instrumentation and optional adaptive connection limit
+        self.pool_metrics = PoolMetrics()
+        self.replica_metrics = PoolMetrics()
+        self.pool_limiter: Optional[AdaptiveLimiter] = None
+        self._pool_adapt_task: Optional[asyncio.Task] = None
+
+    def _connect_kwargs(self) -> Dict[str, Any]:
+        """Connection parameters shared by the pool and the listener connection"""
+        return {
+            "user": settings.DB_USER,
+            "password": settings.DB_PASSWORD,
+            "host": settings.DB_HOST,
+            "port": settings.DB_PORT,
+            "database": settings.DB_NAME,
+        }
+
+    def _session_connect_kwargs(self) -> Dict[str, Any]:
+        """Connection parameters for a session-level (direct or session pooler) connection"""
+        session_kwargs = {**self._connect_kwargs(), "port": settings.db_listen_port}
+        if settings.DB_LISTEN_HOST:
+            session_kwargs["host"] = settings.DB_LISTEN_HOST
+        return session_kwargs
+
+    async def connect_session(self) -> asyncpg.Connection:
+        """
+        Open a standalone session-level connection outside the pools.
+
+        For batch jobs that need session state (temporary tables, COPY)
+        and run on a single connection. The caller closes it.
+        """
+        conn = await asyncpg.connect(**self._session_connect_kwargs())
+        await json_codec.register_json_codecs(conn)
+        return conn
 
     async def initialize(self) -> None:
         """Initialize database connection pool"""
@@ -26,70 +386,442 @@ class DatabaseService:
                 logger.warning("Database credentials not fully configured. Skipping DB initialization.")
                 return
 
+            self._closing = False
+            pool_mode = settings.db_pool_mode
+            pool_kwargs = self._pool_kwargs(pool_mode)
+            if settings.DB_POOL_ADAPTIVE:
+                # Create the pool at its upper bound; the limiter decides how much of it is used
+                pool_kwargs["max_size"] = max(settings.DB_POOL_ADAPTIVE_MAX_SIZE, settings.DB_POOL_MAX_SIZE)
+                self.pool_limiter = AdaptiveLimiter(settings.DB_POOL_MAX_SIZE)
+
             self.pool = await asyncpg.create_pool(
-                user=settings.DB_USER,
-                password=settings.DB_PASSWORD,
-                host=settings.DB_HOST,
-                port=settings.DB_PORT,
-                database=settings.DB_NAME,
-                min_size=settings.DB_POOL_MIN_SIZE,
-                max_size=settings.DB_POOL_MAX_SIZE
+                **self._connect_kwargs(),
+                **pool_kwargs,
+                init=self._init_connection,
+                setup=self._check_connection_health
             )
-            logger.info("Database connection pool initialized successfully")
+            logger.info(f"Database connection pool initialized successfully ({pool_mode} mode)")
+
+            if self.pool_limiter:
+                self._pool_adapt_task = asyncio.create_task(self._adapt_pool_limit())
+
+            await self._start_listener()
+
+            if settings.DB_REPLICA_HOST:
+                await self._start_replica()
 
         except Exception as e:
             log_error(e, "Database pool initialization")
             raise
 
+    def _pool_kwargs(self, pool_mode: str) -> Dict[str, Any]:
+        """Pool sizing and connection lifecycle options for a pool mode"""
+        return {
+            "min_size": settings.DB_POOL_MIN_SIZE,
+            "max_size": settings.DB_POOL_MAX_SIZE,
+            # Transaction poolers cannot reuse named prepared statements
+            "statement_cache_size": (
+                0 if pool_mode == "transaction"
+                else max(settings.DB_STATEMENT_CACHE_SIZE, len(self.statements))
+            ),
+            "max_queries": settings.DB_MAX_QUERIES,
+            # Recycle idle connections before the pooler/server drops them
+            "max_inactive_connection_lifetime": settings.DB_MAX_INACTIVE_CONNECTION_LIFETIME,
+        }
+
+    async def _start_replica(self) -> None:
+        """
+        Open the read replica pool and start monitoring its replay lag.
+
+        The replica is optional: when it cannot be reached the service keeps
+        running and all reads go to the primary.
+        """
+        try:
+            self.replica_pool = await asyncpg.create_pool(
+                **{**self._connect_kwargs(), "host": settings.DB_REPLICA_HOST, "port": settings.db_replica_port},
+                **self._pool_kwargs(settings.db_replica_pool_mode),
+                init=self._init_replica_connection,
+                setup=self._check_connection_health
+            )
+            await self._check_replica_lag()
+            self._replica_lag_task = asyncio.create_task(self._monitor_replica_lag())
+            logger.info(
+                f"Read replica pool initialized ({settings.db_replica_pool_mode} mode, "
+                f"lag {self.replica_lag}s)"
+            )
+        except Exception as e:
+            log_error(e, "Read replica pool initialization")
+            self.replica_pool = None
+
     async def close(self) -> None:
         """Close database connection pool"""
+        self._closing = True
+
+        if self._listener_task:
+            self._listener_task.cancel()
+            self._listener_task = None
+
+        if self._replica_lag_task:
+            self._replica_lag_task.cancel()
+            self._replica_lag_task = None
+
+        if self._pool_adapt_task:
+            self._pool_adapt_task.cancel()
+            self._pool_adapt_task = None
+
+        if self._listen_conn and not self._listen_conn.is_closed():
+            await self._listen_conn.close()
+            self._listen_conn = None
+            logger.info("Plan status listener closed")
+
+        if self.replica_pool:
+            await self.replica_pool.close()
+            self.replica_pool = None
+            logger.info("Read replica pool closed")
+
         if self.pool:
             await self.pool.close()
             logger.info("Database connection pool closed")
 
+    async def _init_connection(self, conn: asyncpg.Connection) -> None:
+        """Per-connection setup run once when the pool opens a connection"""
+        pid = conn.get_server_pid()
+        conn.add_termination_listener(lambda _conn: self._last_used.pop(pid, None))
+        if settings.DB_QUERY_METRICS:
+            conn.add_query_logger(partial(self._record_query, self.pool_metrics))
+        # Codecs must be registered before statements are prepared
+        await json_codec.register_json_codecs(conn)
+        await self.statements.prepare_connection(conn)
+
+    async def _init_replica_connection(self, conn: asyncpg.Connection) -> None:
+        """Per-connection setup for the read replica pool"""
+        pid = conn.get_server_pid()
+        conn.add_termination_listener(lambda _conn: self._last_used.pop(pid, None))
+        if settings.DB_QUERY_METRICS:
+            conn.add_query_logger(partial(self._record_query, self.replica_metrics))
+        await json_codec.register_json_codecs(conn)
+        if settings.db_replica_pool_mode == "direct":
+            await self.statements.prepare_connection(conn, REPLICA_STATEMENTS)
+
+    async def _check_connection_health(self, conn: asyncpg.Connection) -> None:
+        """
+        Ping connections that sat idle long enough to have been dropped.
+
+        Raising here makes asyncpg close the connection; get_connection then
+        retries the acquire on a fresh one.
+        """
+        last_used = self._last_used.get(conn.get_server_pid())
+        if last_used is None or time.monotonic() - last_used < settings.DB_HEALTH_CHECK_IDLE_SECONDS:
+            return
+        await conn.fetchval("SELECT 1", timeout=settings.DB_HEALTH_CHECK_TIMEOUT)
+
+    def _hot_statements(self) -> Dict[str, str]:
+        """Statements on the plan generation and status polling hot paths"""
+        return {
+            "plan_status": PLAN_STATUS_SQL,
+            "plan_tiers": PLAN_TIERS_SQL,
+            "bulk_plan_status": BULK_PLAN_STATUS_SQL,
+            "bulk_plan_tiers": BULK_PLAN_TIERS_SQL,
+            "regeneration_usage": REGENERATION_USAGE_SQL,
+            "reserve_regenerations": RESERVE_REGENERATIONS_SQL,
+            "tdee_state": TDEE_STATE_SQL,
+            "food_reference": FOOD_REFERENCE_SQL,
+            "meal_candidates": MEAL_CANDIDATES_SQL,
+            "exercise_library": EXERCISE_LIBRARY_SQL,
+            "commit_meal_plan": self._commit_plan_sql("meal"),
+            "commit_workout_plan": self._commit_plan_sql("workout"),
+            "update_meal_status": self._update_status_sql("meal"),
+            "update_workout_status": self._update_status_sql("workout"),
+            "notify_plan_status": "SELECT pg_notify($1, $2)",
+            "init_plan_status": INIT_PLAN_STATUS_SQL,
+            "save_onboarding": ONBOARDING_SQL,
+        }
+
+    async def _start_listener(self) -> None:
+        """Open the dedicated LISTEN connection feeding the plan status hub"""
+        try:
+            self._listen_conn = await asyncpg.connect(**self._session_connect_kwargs())
+            await self._listen_conn.add_listener(PLAN_STATUS_CHANNEL, self._on_plan_status_notification)
+            await self._listen_conn.add_listener(PROFILE_CHANGED_CHANNEL, self._on_profile_changed)
+            self._listen_conn.add_termination_listener(self._on_listener_terminated)
+            self.profiles.caching = True
+            logger.info(
+                f"Listening for plan status and profile events on channels "
+                f"'{PLAN_STATUS_CHANNEL}', '{PROFILE_CHANGED_CHANNEL}'"
+            )
+        except Exception as e:
+            # Streaming degrades to snapshot-only; polling keeps working
+            log_error(e, "Plan status listener initialization")
+            self._listen_conn = None
+
+    def _on_listener_terminated(self, connection: asyncpg.Connection) -> None:
+        """Schedule a reconnect when the LISTEN connection drops unexpectedly"""
+        if self._closing:
+            return
+        logger.warning("Plan status listener connection lost. Reconnecting...")
+        self._listen_conn = None
+        # Events from other instances may be missed while disconnected
+        self.status_cache.clear()
+        self.profiles.caching = False
+        self.profiles.clear()
+        if not self._listener_task or self._listener_task.done():
+            self._listener_task = asyncio.get_running_loop().create_task(self._reconnect_listener())
+
+    async def _reconnect_listener(self) -> None:
+        """Reconnect the LISTEN connection with exponential backoff"""
+        delay = 1.0
+        while not self._closing and self._listen_conn is None:
+            await asyncio.sleep(delay)
+            await self._start_listener()
+            delay = min(delay * 2, 30.0)
+
+    def _on_plan_status_notification(
+        self,
+        connection: asyncpg.Connection,
+        pid: int,
+        channel: str,
+        payload: str
+    ) -> None:
+        """Apply a NOTIFY payload to the status cache and fan it out to subscribers"""
+        try:
+            event = json_codec.loads(payload)
+        except ValueError:
+            logger.warning(f"Ignoring malformed plan status payload: {payload[:200]}")
+            return
+
+        # Another instance wrote this user's plans; keep their reads off the replica
+        self._record_write(event.get("user_id"))
+        self.status_cache.apply_event(event)
+        self.status_hub.publish(event)
+
+    def _on_profile_changed(
+        self,
+        connection: asyncpg.Connection,
+        pid: int,
+        channel: str,
+        payload: str
+    ) -> None:
+        """Invalidate a cached profile snapshot; payload is the user ID"""
+        self.profiles.invalidate(payload)
+        # The next load must see the change even if the replica has not replayed it
+        self._record_write(payload)
+
+    @staticmethod
+    def _status_event(
+        user_id: str,
+        plan_type: str,
+        status: str,
+        error_message: Optional[str] = None,
+        generated_at: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Build the plan status event shared by the cache and NOTIFY payloads"""
+        return {
+            "user_id": str(user_id),
+            "plan_type": plan_type,
+            "status": status,
+            "error_message": error_message[:MAX_NOTIFY_ERROR_LENGTH] if error_message else None,
+            "generated_at": generated_at,
+        }
+
+    async def _notify_plan_status(
+        self,
+        conn: asyncpg.Connection,
+        user_id: str,
+        plan_type: str,
+        status: str,
+        error_message: Optional[str] = None
+    ) -> None:
+        """Write a plan status change through to the local cache and emit it to other instances"""
+        payload = self._status_event(user_id, plan_type, status, error_message)
+        self.status_cache.apply_event(payload)
+        await self.statements.execute(conn, "notify_plan_status", PLAN_STATUS_CHANNEL, json_codec.dumps(payload))
+
+    async def _check_replica_lag(self) -> None:
+        """Measure replica replay lag; None marks the replica as unavailable"""
+        try:
+            self.replica_lag = await self.replica_pool.fetchval(
+                REPLICA_LAG_SQL, timeout=settings.DB_HEALTH_CHECK_TIMEOUT
+            )
+        except Exception as e:
+            if self.replica_lag is not None:
+                logger.warning(f"Read replica unavailable, routing reads to primary: {e!r}")
+            self.replica_lag = None
+
+    async def _monitor_replica_lag(self) -> None:
+        """Poll replica lag so reads fall back to the primary while it lags"""
+        while True:
+            await asyncio.sleep(settings.DB_REPLICA_LAG_CHECK_SECONDS)
+            await self._check_replica_lag()
+
+    def _record_write(self, user_id: str) -> None:
+        """Pin a user's reads to the primary until the replica has their write"""
+        if not self.replica_pool:
+            return
+
+        now = time.monotonic()
+        if len(self._read_your_writes) >= MAX_READ_YOUR_WRITES_ENTRIES:
+            self._read_your_writes = {
+                uid: until for uid, until in self._read_your_writes.items() if until > now
+            }
+        self._read_your_writes[str(user_id)] = now + settings.DB_READ_YOUR_WRITES_SECONDS
+
+    def _use_replica(self, user_id: Optional[str], user_ids: Iterable[str] = ()) -> bool:
+        """Whether a read for this user (or all of user_ids) can be served by the replica"""
+        if not self.replica_pool or self.replica_lag is None:
+            return False
+        if self.replica_lag > settings.DB_REPLICA_MAX_LAG_SECONDS:
+            return False
+
+        now = time.monotonic()
+        for uid in (user_id, *user_ids) if user_id is not None else user_ids:
+            pinned_until = self._read_your_writes.get(str(uid))
+            if pinned_until is not None and pinned_until > now:
+                return False
+        return True
+
+    def _record_query(self, metrics: PoolMetrics, record: Any) -> None:
+        """Query logger callback: time every query, labelled by hot statement name or SQL prefix"""
+        label = self.statements.name_for(record.query)
+        if label is None:
+            label = re.sub(r"\s+", " ", record.query).strip()[:QUERY_LABEL_LENGTH]
+        metrics.record_query(label, record.elapsed * 1000, failed=record.exception is not None)
+
+    async def _adapt_pool_limit(self) -> None:
+        """Periodically resize the in-use connection limit from observed acquire latency"""
+        max_size = self.pool.get_max_size()
+        min_size = max(1, settings.DB_POOL_MIN_SIZE)
+        while True:
+            await asyncio.sleep(settings.DB_POOL_ADAPTIVE_INTERVAL_SECONDS)
+            window = self.pool_metrics.take_window()
+            current = self.pool_limiter.limit
+            limit = next_pool_limit(current, window, min_size, max_size, settings.DB_POOL_ADAPTIVE_GROW_WAIT_MS)
+            if limit != current:
+                logger.info(
+                    f"Database connection limit {current} → {limit} "
+                    f"(p95 acquire {window['p95_ms']}ms, peak in use {window['peak_in_use']})"
+                )
+                self.pool_limiter.set_limit(limit)
+
+    async def _acquire(self, pool: asyncpg.Pool, timeout: float) -> asyncpg.Connection:
+        """Acquire a pooled connection, replacing ones dropped while idle"""
+        deadline = time.monotonic() + timeout
+        try:
+            return await pool.acquire(timeout=timeout)
+        except STALE_CONNECTION_ERRORS as e:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise asyncio.TimeoutError("Timed out waiting for a database connection") from e
+            # One dead connection usually means the pooler recycled them all
+            logger.warning(f"Discarded stale database connection ({e!r}); recycling pool")
+            await pool.expire_connections()
+            return await pool.acquire(timeout=remaining)
+
+    @asynccontextmanager
+    async def _pooled_connection(
+        self,
+        pool: asyncpg.Pool,
+        metrics: PoolMetrics,
+        limiter: Optional[AdaptiveLimiter] = None
+    ):
+        """Acquire from a pool, recording acquire latency, checkout duration and failures"""
+        start = time.perf_counter()
+        metrics.start_acquire(limiter.limit if limiter else pool.get_max_size())
+        try:
+            if limiter:
+                await asyncio.wait_for(limiter.acquire(), settings.DB_ACQUIRE_TIMEOUT)
+            try:
+                remaining = settings.DB_ACQUIRE_TIMEOUT - (time.perf_counter() - start)
+                connection = await self._acquire(pool, max(remaining, 0.001))
+            except BaseException:
+                if limiter:
+                    limiter.release()
+                raise
+        except BaseException as e:
+            metrics.record_failed_acquire(timed_out=isinstance(e, asyncio.TimeoutError))
+            raise
+
+        acquired = time.perf_counter()
+        metrics.record_acquire((acquired - start) * 1000)
+        try:
+            yield connection
+        finally:
+            metrics.record_release((time.perf_counter() - acquired) * 1000)
+            if not connection.is_closed():
+                self._last_used[connection.get_server_pid()] = time.monotonic()
+            await pool.release(connection)
+            if limiter:
+                limiter.release()
+
     @asynccontextmanager
     async def get_connection(self):
         """Context manager for database connections"""
         if not self.pool:
             raise Exception("Database pool not initialized")
 
-        async with self.pool.acquire() as connection:
+        async with self._pooled_connection(self.pool, self.pool_metrics, self.pool_limiter) as connection:
             yield connection
 
+    @asynccontextmanager
+    async def read_connection(self, user_id: Optional[str] = None, user_ids: Iterable[str] = ()):
+        """
+        Context manager for read-only queries.
+
+        Uses the read replica when one is configured, reachable and within
+        DB_REPLICA_MAX_LAG_SECONDS, unless user_id (or any of user_ids) wrote
+        through this service within DB_READ_YOUR_WRITES_SECONDS; otherwise
+        uses the primary.
+        """
+        if not self._use_replica(user_id, user_ids):
+            async with self.get_connection() as connection:
+                yield connection
+            return
+
+        async with self._pooled_connection(self.replica_pool, self.replica_metrics) as connection:
+            yield connection
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """Pool sizes, limits and metrics for the primary and (if configured) replica pools"""
+        stats: Dict[str, Any] = {}
+        if self.pool:
+            stats["primary"] = {
+                **self._pool_sizes(self.pool),
+                "limit": self.pool_limiter.limit if self.pool_limiter else self.pool.get_max_size(),
+                "limiter_waiting": self.pool_limiter.waiting if self.pool_limiter else 0,
+                **self.pool_metrics.snapshot(),
+            }
+        if self.replica_pool:
+            stats["replica"] = {
+                **self._pool_sizes(self.replica_pool),
+                "lag_seconds": self.replica_lag,
+                **self.replica_metrics.snapshot(),
+            }
+        return stats
+
+    @staticmethod
+    def _pool_sizes(pool: asyncpg.Pool) -> Dict[str, int]:
+        return {
+            "size": pool.get_size(),
+            "idle": pool.get_idle_size(),
+            "min_size": pool.get_min_size(),
+            "max_size": pool.get_max_size(),
+        }
+
     async def initialize_plan_status(self, user_id: str, quiz_result_id: str) -> bool:
-        """Initialize plan generation status records with placeholder values"""
+        """Initialize plan generation status records with placeholder values in one statement"""
         try:
             if not self.pool:
                 logger.warning("Database not initialized. Skipping status initialization.")
                 return False
 
             async with self.get_connection() as conn:
-                # Initialize meal plan with generating status and placeholder values
-                await conn.execute(
-                    """
-                    INSERT INTO ai_meal_plans 
-                    (user_id, quiz_result_id, plan_data, status, is_active, daily_calories)
-                    VALUES ($1, $2, NULL, 'generating', false, 0)
-                    ON CONFLICT (user_id, quiz_result_id) 
-                    DO UPDATE SET status = 'generating', updated_at = NOW()
-                    """,
-                    user_id,
-                    quiz_result_id
-                )
-                
-                # Initialize workout plan with generating status and placeholder values
-                await conn.execute(
-                    """
-                    INSERT INTO ai_workout_plans 
-                    (user_id, quiz_result_id, plan_data, status, is_active)
-                    VALUES ($1, $2, NULL, 'generating', false)
-                    ON CONFLICT (user_id, quiz_result_id)
-                    DO UPDATE SET status = 'generating', updated_at = NOW()
-                    """,
-                    user_id,
-                    quiz_result_id
+                await self.statements.execute(
+                    conn, "init_plan_status", user_id, quiz_result_id, PLAN_STATUS_CHANNEL
                 )
 
+            for plan_type in ("meal", "workout"):
+                self.status_cache.apply_event(self._status_event(user_id, plan_type, "generating"))
+
+            self._record_write(user_id)
             log_database_operation("INSERT", "plan_status_init", user_id, success=True)
             return True
 
@@ -97,116 +829,222 @@ class DatabaseService:
             log_error(e, "Failed to initialize plan status", user_id)
             return False
 
-    async def save_meal_plan(
+    @staticmethod
+    def _commit_plan_sql(plan_type: str) -> str:
+        """
+        Build the single-statement plan commit for a plan table.
+
+        One round-trip, one implicit transaction:
+        - locks the user's current plan row (the generation placeholder or the
+          plan being regenerated) and overwrites it, or inserts when none exists;
+          inserts move the user_current_plans pointer via trigger
+        - stores the tier and completeness columns next to plan_data, compares
+          the new tier against the tier of the most recent saved plan and
+          records a tier_unlock_events row when it changed
+        - marks the plan completed and emits the plan_status NOTIFY, which
+          Postgres delivers only once the statement commits
+
+        With PLAN_CHUNKED_STORAGE the same statement also stores the plan's
+        shared sections in plan_chunks (skipping hashes already stored).
+
+        Parameters: $1 user_id, $2 plan_data, $3 quiz_result_id, $4 new tier,
+        $5 completeness, $6 regeneration reason, $7 NOTIFY channel, for meal
+        plans $8 daily_calories and, with chunked storage, the chunks as a
+        hash → {section, content} object after those.
+        """
+        table = "ai_meal_plans" if plan_type == "meal" else "ai_workout_plans"
+        pointer = f"{plan_type}_plan_id"
+        is_meal = plan_type == "meal"
+        calories_set = "daily_calories = $8," if is_meal else ""
+        calories_column = "daily_calories," if is_meal else ""
+        calories_value = "$8," if is_meal else ""
+        meal_regenerated = "true" if is_meal else "false"
+        workout_regenerated = "false" if is_meal else "true"
+        store_chunks = ""
+        if settings.PLAN_CHUNKED_STORAGE:
+            store_chunks = f"""
+            chunks AS (
+                INSERT INTO plan_chunks (hash, section, content)
+                SELECT key, value->>'section', value->'content'
+                FROM jsonb_each(${9 if is_meal else 8}::jsonb)
+                ON CONFLICT (hash) DO NOTHING
+            ),"""
+
+        return f"""
+            WITH {store_chunks}
+            target AS (
+                SELECT p.id, p.tier
+                FROM user_current_plans c
+                JOIN {table} p ON p.id = c.{pointer}
+                WHERE c.user_id = $1::uuid
+                FOR UPDATE OF p
+            ),
+            previous AS (
+                -- Fresh placeholders have no tier yet; only then look further back
+                SELECT COALESCE(
+                    (SELECT tier FROM target),
+                    (SELECT tier FROM {table}
+                     WHERE user_id = $1 AND tier IS NOT NULL
+                     ORDER BY created_at DESC
+                     LIMIT 1)
+                ) AS tier
+            ),
+            updated AS (
+                UPDATE {table} p
+                SET plan_data = $2::jsonb,
+                    tier = $4::text,
+                    completeness = $5::float8,
+                    {calories_set}
+                    quiz_result_id = $3::uuid,
+                    status = 'completed',
+                    is_active = true,
+                    generated_at = NOW(),
+                    updated_at = NOW(),
+                    error_message = NULL
+                FROM target
+                WHERE p.id = target.id
+                RETURNING p.generated_at
+            ),
+            inserted AS (
+                INSERT INTO {table}
+                (user_id, quiz_result_id, plan_data, tier, completeness,
+                 {calories_column} status, is_active, generated_at)
+                SELECT $1, $3, $2, $4, $5, {calories_value} 'completed', true, NOW()
+                WHERE NOT EXISTS (SELECT 1 FROM target)
+                RETURNING generated_at
+            ),
+            committed AS (
+                SELECT generated_at FROM updated
+                UNION ALL
+                SELECT generated_at FROM inserted
+            ),
+            tier_change AS (
+                SELECT COALESCE((SELECT tier FROM previous), 'BASIC') AS old_tier
+            ),
+            unlock AS (
+                INSERT INTO tier_unlock_events
+                (user_id, old_tier, new_tier, completeness_percentage,
+                 meal_plan_regenerated, workout_plan_regenerated, regeneration_accepted_at)
+                SELECT $1, old_tier, $4::text, $5::float8, {meal_regenerated}, {workout_regenerated}, NOW()
+                FROM tier_change
+                WHERE $6::text <> 'initial_generation' AND old_tier <> $4
+                RETURNING old_tier
+            )
+            SELECT
+                c.generated_at,
+                (SELECT old_tier FROM unlock) AS unlocked_from_tier,
+                pg_notify($7::text, json_build_object(
+                    'user_id', $1::uuid::text,
+                    'plan_type', '{plan_type}',
+                    'status', 'completed',
+                    'error_message', NULL,
+                    'generated_at', c.generated_at
+                )::text)
+            FROM committed c
+        """
+
+    async def _commit_plan(
         self,
+        plan_type: str,
         user_id: str,
         quiz_result_id: str,
         plan_data: Dict[str, Any],
-        daily_calories: int,
+        regeneration_reason: str,
+        daily_calories: Optional[int] = None,
     ) -> bool:
-        """Save meal plan to database with completed status"""
+        """Save a generated plan, its completed status and any tier unlock atomically"""
+        table = "ai_meal_plans" if plan_type == "meal" else "ai_workout_plans"
+
         try:
             if not self.pool:
-                logger.warning("Database not initialized. Skipping meal plan save.")
+                logger.warning(f"Database not initialized. Skipping {plan_type} plan save.")
                 return False
 
+            metadata = plan_data.get("_metadata", {})
+            stored_plan, chunks = plan_data, None
+            if settings.PLAN_CHUNKED_STORAGE:
+                stored_plan, chunks = split_plan(plan_type, plan_data, settings.PLAN_CHUNK_MIN_BYTES)
+
+            args = [
+                user_id,
+                stored_plan,
+                quiz_result_id,
+                metadata.get("tier", "BASIC"),
+                float(metadata.get("completeness", 0.0)),
+                regeneration_reason,
+                PLAN_STATUS_CHANNEL,
+            ]
+            if plan_type == "meal":
+                args.append(daily_calories)
+            if chunks is not None:
+                args.append(chunks)
+
             async with self.get_connection() as conn:
-                # First, try to update existing plan for this user
-                result = await conn.execute(
-                    """
-                    UPDATE ai_meal_plans
-                    SET plan_data = $1,
-                        daily_calories = $2,
-                        quiz_result_id = $3,
-                        status = 'completed',
-                        is_active = true,
-                        generated_at = NOW(),
-                        updated_at = NOW(),
-                        error_message = NULL
-                    WHERE user_id = $4
-                    AND id = (SELECT id FROM ai_meal_plans WHERE user_id = $4 ORDER BY created_at DESC LIMIT 1)
-                    """,
-                    json.dumps(plan_data),
-                    daily_calories,
-                    quiz_result_id,
-                    user_id
+                row = await self.statements.fetchrow(conn, f"commit_{plan_type}_plan", *args)
+
+            generated_at = row["generated_at"].isoformat() if row and row["generated_at"] else None
+            self.status_cache.apply_event(
+                self._status_event(user_id, plan_type, "completed", generated_at=generated_at)
+            )
+
+            if row and row["unlocked_from_tier"]:
+                logger.info(
+                    f"[Tier Unlock] User {user_id} {plan_type} plan: "
+                    f"{row['unlocked_from_tier']} → {metadata.get('tier', 'BASIC')}"
                 )
 
-                # If no row was updated, insert a new plan
-                if result == "UPDATE 0":
-                    await conn.execute(
-                        """
-                        INSERT INTO ai_meal_plans
-                        (user_id, quiz_result_id, plan_data, daily_calories, status, is_active, generated_at)
-                        VALUES ($1, $2, $3, $4, 'completed', true, NOW())
-                        """,
-                        user_id,
-                        quiz_result_id,
-                        json.dumps(plan_data),
-                        daily_calories
-                    )
-
-            log_database_operation("UPSERT", "ai_meal_plans", user_id, success=True)
+            self._record_write(user_id)
+            log_database_operation("UPSERT", table, user_id, success=True)
             return True
 
         except Exception as e:
-            log_error(e, "Failed to save meal plan", user_id)
-            await self.update_plan_status(user_id, "meal", "failed", str(e))
+            log_error(e, f"Failed to save {plan_type} plan", user_id)
+            await self.update_plan_status(user_id, plan_type, "failed", str(e))
             return False
 
+    async def save_meal_plan(
+        self,
+        user_id: str,
+        quiz_result_id: str,
+        plan_data: Dict[str, Any],
+        daily_calories: int,
+        regeneration_reason: str = "initial_generation",
+    ) -> bool:
+        """Save meal plan to database with completed status"""
+        return await self._commit_plan(
+            "meal",
+            user_id,
+            quiz_result_id,
+            plan_data,
+            regeneration_reason,
+            daily_calories=daily_calories,
+        )
+
     async def save_workout_plan(
         self,
         user_id: str,
         quiz_result_id: str,
         plan_data: Dict[str, Any],
+        regeneration_reason: str = "initial_generation",
     ) -> bool:
         """Save workout plan to database with completed status"""
-        try:
-            if not self.pool:
-                logger.warning("Database not initialized. Skipping workout plan save.")
-                return False
-
-            async with self.get_connection() as conn:
-                # First, try to update existing plan for this user
-                result = await conn.execute(
-                    """
-                    UPDATE ai_workout_plans
-                    SET plan_data = $1,
-                        quiz_result_id = $2,
-                        status = 'completed',
-                        is_active = true,
-                        generated_at = NOW(),
-                        updated_at = NOW(),
-                        error_message = NULL
-                    WHERE user_id = $3
-                    AND id = (SELECT id FROM ai_workout_plans WHERE user_id = $3 ORDER BY created_at DESC LIMIT 1)
-                    """,
-                    json.dumps(plan_data),
-                    quiz_result_id,
-                    user_id
-                )
+        return await self._commit_plan(
+            "workout",
+            user_id,
+            quiz_result_id,
+            plan_data,
+            regeneration_reason,
+        )
 
-                # If no row was updated, insert a new plan
-                if result == "UPDATE 0":
-                    await conn.execute(
-                        """
-                        INSERT INTO ai_workout_plans
-                        (user_id, quiz_result_id, plan_data, status, is_active, generated_at)
-                        VALUES ($1, $2, $3, 'completed', true, NOW())
-                        RETURNING id
-                        """,
-                        user_id,
-                        quiz_result_id,
-                        json.dumps(plan_data)
-                    )
-
-            log_database_operation("UPSERT", "ai_workout_plans", user_id, success=True)
-            return True
-
-        except Exception as e:
-            log_error(e, "Failed to save workout plan", user_id)
-            await self.update_plan_status(user_id, "workout", "failed", str(e))
-            return False
+    @staticmethod
+    def _update_status_sql(plan_type: str) -> str:
+        """Status update for the user's current plan row"""
+        table = "ai_meal_plans" if plan_type == "meal" else "ai_workout_plans"
+        return f"""
+            UPDATE {table}
+            SET status = $1, error_message = $2, updated_at = NOW()
+            WHERE id = (SELECT {plan_type}_plan_id FROM user_current_plans WHERE user_id = $3::uuid)
+        """
 
     async def update_plan_status(
         self,
@@ -215,7 +1053,13 @@ class DatabaseService:
         status: str,
         error_message: Optional[str] = None
     ) -> bool:
-        """Update plan generation status"""
+        """
+        Update plan generation status.
+
+        Returns:
+            True if the user's current plan row was updated, False when there
+            is none (nothing is cached or notified then) or the update failed
+        """
         try:
             if not self.pool:
                 return False
@@ -223,18 +1067,20 @@ class DatabaseService:
             table = "ai_meal_plans" if plan_type == "meal" else "ai_workout_plans"
 
             async with self.get_connection() as conn:
-                await conn.execute(
-                    f"""
-                    UPDATE {table}
-                    SET status = $1, error_message = $2, updated_at = NOW()
-                    WHERE user_id = $3
-                    AND id = (SELECT id FROM {table} WHERE user_id = $3 ORDER BY created_at DESC LIMIT 1)
-                    """,
+                result = await self.statements.execute(
+                    conn,
+                    f"update_{plan_type}_status",
                     status,
                     error_message,
                     user_id
                 )
+                if int(result.split()[-1]) == 0:
+                    logger.warning(f"No current {plan_type} plan to set status '{status}' on for user {user_id}")
+                    return False
+
+                await self._notify_plan_status(conn, user_id, plan_type, status, error_message)
 
+            self._record_write(user_id)
             log_database_operation("UPDATE", f"{table}_status", user_id, success=True)
             return True
 
@@ -243,47 +1089,322 @@ class DatabaseService:
             return False
 
     async def get_plan_status(self, user_id: str) -> Optional[Dict[str, Any]]:
-        """Get current plan generation status for user"""
+        """
+        Get current plan generation status for user.
+
+        Served from the write-through status cache while the LISTEN connection
+        is up (it keeps other instances' writes in sync). Misses load both plan
+        types with a single query.
+        """
         try:
             if not self.pool:
                 return None
 
+            cache_enabled = self._listen_conn is not None
+            if cache_enabled:
+                cached = self.status_cache.get(user_id)
+                if cached is not None:
+                    return cached
+
+            # Status changes applied during the read keep its result out of the cache
+            version = self.status_cache.version(user_id)
+            async with self.read_connection(user_id) as conn:
+                row = await self.statements.fetchrow(conn, "plan_status", user_id)
+
+            status = self._status_from_row(row)
+
+            if cache_enabled:
+                self.status_cache.put(user_id, status, version)
+
+            return status
+
+        except Exception as e:
+            log_error(e, "Failed to get plan status", user_id)
+            return None
+
+    async def get_plan_statuses(self, user_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Plan generation status of many users, keyed by user ID.
+
+        Cached users are answered from the status cache; the rest are loaded
+        with a single query. Users without plans get the not_started status.
+        """
+        statuses: Dict[str, Dict[str, Any]] = {}
+        cache_enabled = self._listen_conn is not None
+        misses = []
+        for user_id in user_ids:
+            cached = self.status_cache.get(user_id) if cache_enabled else None
+            if cached is not None:
+                statuses[user_id] = cached
+            else:
+                misses.append(user_id)
+
+        if misses:
+            versions = {user_id: self.status_cache.version(user_id) for user_id in misses}
+            async with self.read_connection(user_ids=misses) as conn:
+                rows = await self.statements.fetch(conn, "bulk_plan_status", misses)
+
+            loaded = {str(row["user_id"]): self._status_from_row(row) for row in rows}
+            for user_id in misses:
+                status = loaded.get(user_id) or self._status_from_row(None)
+                statuses[user_id] = status
+                if cache_enabled:
+                    self.status_cache.put(user_id, status, versions[user_id])
+
+        return statuses
+
+    @staticmethod
+    def _status_from_row(row: Optional[asyncpg.Record]) -> Dict[str, Any]:
+        """Plan status dict from a plan status row (None for a user without plans)"""
+        row = row or {}
+        meal_generated_at = row.get("meal_generated_at")
+        workout_generated_at = row.get("workout_generated_at")
+        return {
+            "meal_plan_status": row.get("meal_status") or "not_started",
+            "meal_plan_error": row.get("meal_error"),
+            "meal_plan_generated_at": meal_generated_at.isoformat() if meal_generated_at else None,
+            "workout_plan_status": row.get("workout_status") or "not_started",
+            "workout_plan_error": row.get("workout_error"),
+            "workout_plan_generated_at": workout_generated_at.isoformat() if workout_generated_at else None
+        }
+
+    async def get_plan_tiers(self, user_id: str) -> Dict[str, Any]:
+        """Tier and completeness of the user's latest meal and workout plans"""
+        async with self.read_connection(user_id) as conn:
+            row = await self.statements.fetchrow(conn, "plan_tiers", user_id)
+
+        return self._tiers_from_row(row)
+
+    async def get_plan_tiers_bulk(self, user_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Tiers of many users' latest plans with a single query, keyed by user ID"""
+        async with self.read_connection(user_ids=user_ids) as conn:
+            rows = await self.statements.fetch(conn, "bulk_plan_tiers", user_ids)
+
+        loaded = {str(row["user_id"]): row for row in rows}
+        return {user_id: self._tiers_from_row(loaded.get(user_id)) for user_id in user_ids}
+
+    @staticmethod
+    def _tiers_from_row(row: Optional[asyncpg.Record]) -> Dict[str, Any]:
+        """Plan tiers dict from a plan tiers row (None for a user without plans)"""
+        row = row or {}
+        return {
+            "meal_tier": row.get("meal_tier") or "BASIC",
+            "meal_completeness": row.get("meal_completeness") or 0.0,
+            "workout_tier": row.get("workout_tier") or "BASIC",
+            "workout_completeness": row.get("workout_completeness") or 0.0,
+        }
+
+    async def save_onboarding(
+        self,
+        user_id: str,
+        quiz_result_id: str,
+        calculations: Dict[str, Any],
+        daily_calories: int,
+        daily_protein_g: float,
+        daily_carbs_g: float,
+        daily_fats_g: float,
+        daily_water_ml: int = 2000,
+        source: str = 'ai_generated',
+        notes: Optional[str] = None
+    ) -> bool:
+        """
+        Save onboarding results and start plan generation in one round-trip.
+
+        Combines update_quiz_calculations, save_macro_targets (for today) and
+        initialize_plan_status into a single statement, so the writes share
+        one connection and one transaction and either all land or none do.
+
+        Returns:
+            True if successful, False otherwise
+        """
+        try:
+            if not self.pool:
+                logger.warning("Database not initialized. Skipping onboarding save.")
+                return False
+
             async with self.get_connection() as conn:
-                meal_status = await conn.fetchrow(
-                    """
-                    SELECT status, error_message, generated_at
-                    FROM ai_meal_plans
-                    WHERE user_id = $1
-                    ORDER BY created_at DESC
-                    LIMIT 1
-                    """,
-                    user_id
-                )
-                
-                workout_status = await conn.fetchrow(
-                    """
-                    SELECT status, error_message, generated_at
-                    FROM ai_workout_plans
-                    WHERE user_id = $1
-                    ORDER BY created_at DESC
-                    LIMIT 1
-                    """,
-                    user_id
+                await self.statements.execute(
+                    conn,
+                    "save_onboarding",
+                    user_id,
+                    quiz_result_id,
+                    PLAN_STATUS_CHANNEL,
+                    calculations,
+                    daily_calories,
+                    daily_protein_g,
+                    daily_carbs_g,
+                    daily_fats_g,
+                    daily_water_ml,
+                    source,
+                    notes
                 )
 
-            return {
-                "meal_plan_status": meal_status["status"] if meal_status else "not_started",
-                "meal_plan_error": meal_status["error_message"] if meal_status else None,
-                "meal_plan_generated_at": meal_status["generated_at"].isoformat() if meal_status and meal_status["generated_at"] else None,
-                "workout_plan_status": workout_status["status"] if workout_status else "not_started",
-                "workout_plan_error": workout_status["error_message"] if workout_status else None,
-                "workout_plan_generated_at": workout_status["generated_at"].isoformat() if workout_status and workout_status["generated_at"] else None
-            }
+            for plan_type in ("meal", "workout"):
+                self.status_cache.apply_event(self._status_event(user_id, plan_type, "generating"))
+
+            self._record_write(user_id)
+            log_database_operation("UPSERT", "onboarding", user_id, success=True)
+            return True
 
         except Exception as e:
-            log_error(e, "Failed to get plan status", user_id)
+            log_error(e, "Failed to save onboarding", user_id)
+            log_database_operation("UPSERT", "onboarding", user_id, success=False)
+            return False
+
+    async def get_regeneration_usage(self, user_id: str, period_start: datetime) -> Dict[str, Any]:
+        """
+        Subscription tier, monthly generation limit and usage for a billing period.
+
+        Served from the regeneration quota cache when it holds the period.
+        """
+        usage = self.regeneration_quota.get(user_id, period_start)
+        if usage is not None:
+            return usage
+
+        async with self.read_connection(user_id) as conn:
+            row = await self.statements.fetchrow(conn, "regeneration_usage", user_id, period_start)
+
+        usage = {
+            "tier": row["tier"],
+            "monthly_limit": row["ai_generations_per_month"],
+            "meal_usage": row["meal_regens"],
+            "workout_usage": row["workout_regens"],
+        }
+        self.regeneration_quota.put(user_id, period_start, usage)
+        return usage
+
+    async def reserve_regenerations(self, user_id: str, meal: bool, workout: bool) -> Dict[str, Any]:
+        """
+        Atomically check the monthly quota and count manual regenerations.
+
+        Reserves every requested plan type or none; "reserved" in the result
+        says which. A single reserve_plan_regenerations() call checks and
+        increments usage under a row lock, so concurrent requests cannot
+        overshoot the quota. It always runs, even when the cache shows the
+        user at the limit, since the cache cannot see subscription changes;
+        its result refreshes the cache.
+        """
+        period_start = billing_period_start()
+        async with self.get_connection() as conn:
+            row = await self.statements.fetchrow(conn, "reserve_regenerations", user_id, meal, workout)
+
+        usage = {
+            "tier": row["tier"],
+            "monthly_limit": row["monthly_limit"],
+            "meal_usage": row["meal_usage"],
+            "workout_usage": row["workout_usage"],
+        }
+        self.regeneration_quota.put(user_id, period_start, usage)
+        if row["reserved"]:
+            self._record_write(user_id)
+            log_database_operation("UPSERT", "plan_regeneration_usage", user_id, success=True)
+        return {"reserved": row["reserved"], **usage}
+
+    async def get_tdee_state(self, user_id: str) -> Optional[TdeeState]:
+        """
+        Adaptive TDEE estimator state for a user.
+
+        None when the user has no state yet or the database is unavailable,
+        in which case callers plan with the static TDEE.
+        """
+        try:
+            if not self.pool:
+                return None
+
+            async with self.read_connection(user_id) as conn:
+                row = await self.statements.fetchrow(conn, "tdee_state", user_id)
+            return TdeeState.from_record(row) if row else None
+
+        except Exception as e:
+            log_error(e, "Failed to load TDEE estimator state", user_id)
             return None
 
+    async def get_food_references(self, names: List[str]) -> Dict[str, Dict[str, float]]:
+        """
+        Per-gram macros of the foods in food_database with the given
+        lowercased names (only gram-based entries), keyed by name.
+
+        Empty when the database is unavailable, in which case meal plans are
+        verified against the model's own per-food numbers.
+        """
+        try:
+            if not self.pool or not names:
+                return {}
+
+            async with self.read_connection() as conn:
+                rows = await self.statements.fetch(conn, "food_reference", sorted(set(names)))
+            return {row["name"]: {k: v for k, v in row.items() if k != "name"} for row in rows}
+
+        except Exception as e:
+            log_error(e, "Failed to load food references")
+            return {}
+
+    async def get_meal_candidates(
+        self,
+        user_id: str,
+        dietary_tags: Optional[Iterable[str]] = None,
+        allergen_tags: Iterable[str] = (),
+        excluded_keywords: Iterable[str] = ()
+    ) -> List[Dict[str, Any]]:
+        """
+        Recipes and meal templates for the BASIC meal plan solver, with
+        per-serving macros. Recipes must carry one of dietary_tags when
+        given and none of allergen_tags, and no candidate may mention one of
+        excluded_keywords in its name or ingredients; the user's templates
+        are only included without a dietary filter.
+
+        Empty when the database is unavailable, in which case the plan is
+        generated by the model.
+        """
+        try:
+            if not self.pool:
+                return []
+
+            async with self.read_connection(user_id) as conn:
+                rows = await self.statements.fetch(
+                    conn, "meal_candidates", user_id, list(dietary_tags) if dietary_tags else None,
+                    sorted({tag.lower() for tag in allergen_tags}),
+                    # Backslash is LIKE's default escape character
+                    [
+                        "%" + re.sub(r"([\\%_])", r"\\\1", keyword.lower()) + "%"
+                        for keyword in excluded_keywords
+                    ]
+                )
+            return [dict(row) for row in rows]
+
+        except Exception as e:
+            log_error(e, "Failed to load meal plan candidates", user_id)
+            return []
+
+    async def get_exercise_library(self) -> List[Dict[str, Any]]:
+        """
+        exercise_library rows for the rule-based workout plan assembler.
+
+        Empty when the database is unavailable, in which case the plan is
+        generated by the model.
+        """
+        try:
+            if not self.pool:
+                return []
+
+            async with self.read_connection() as conn:
+                rows = await self.statements.fetch(conn, "exercise_library")
+            return [dict(row) for row in rows]
+
+        except Exception as e:
+            log_error(e, "Failed to load exercise library")
+            return []
+
+    async def _load_user_profile(self, user_id: str) -> Optional[asyncpg.Record]:
+        """
+        Profile, extended profile and latest quiz answers for a user.
+
+        Loader behind self.profiles; use self.profiles.get() instead. Users
+        with a recent profile_changed event are read from the primary.
+        """
+        async with self.read_connection(user_id) as conn:
+            return await conn.fetchrow(USER_PROFILE_SQL, user_id)
+
     async def update_quiz_calculations(self, quiz_result_id: str, calculations: Dict[str, Any]) -> bool:
         """Update quiz result with calculations"""
         try:
@@ -298,7 +1419,7 @@ class DatabaseService:
                     SET calculations = $1
                     WHERE id = $2
                     """,
-                    json.dumps(calculations),
+                    calculations,
                     quiz_result_id
                 )
 
@@ -376,6 +1497,7 @@ class DatabaseService:
                     notes
                 )
 
+            self._record_write(user_id)
             log_database_operation("UPSERT", "user_macro_targets", user_id, success=True)
             logger.info(f"Saved macro targets for user {user_id}: {daily_calories} cal, "
                        f"{daily_protein_g}g protein, {daily_carbs_g}g carbs, {daily_fats_g}g fats")
@@ -0,0 +1,91 @@
+"""Registry of hot SQL statements with per-connection preparation"""
+
+from typing import Any, Dict, Iterable, List, Optional
+
+import asyncpg
+
+from config.logging_config import logger
+
+
+# asyncpg versions whose private Connection._get_statement(query, timeout)
+# cache warming is tested against (requirements.txt pins one of them)
+WARMING_ASYNCPG_VERSIONS = ("0.29.",)
+
+
+def supports_cache_warming() -> bool:
+    """Whether the installed asyncpg is one the statement cache warming is tested with"""
+    return asyncpg.__version__.startswith(WARMING_ASYNCPG_VERSIONS)
+
+
+class StatementRegistry:
+    """
+    Named hot statements, prepared once per connection in direct mode.
+
+    In direct mode every registered statement is parsed into the connection's
+    asyncpg statement cache as soon as the pool opens the connection, so the
+    first request on a fresh connection does not pay for Parse/Describe.
+
+    Behind a transaction pooler (Supavisor/PgBouncer port 6543) consecutive
+    transactions may land on different server backends, so named prepared
+    statements cannot be reused. In that mode the registry does not prepare
+    anything and the pool runs with statement_cache_size=0, which makes
+    asyncpg use unnamed statements only (pooler-safe).
+
+    Warming uses an asyncpg internal, so it is only enabled on the asyncpg
+    versions in WARMING_ASYNCPG_VERSIONS; elsewhere statements are cached
+    lazily on first use as usual.
+    """
+
+    def __init__(self, statements: Dict[str, str], enabled: bool = True):
+        """Initialize registry with a name → SQL mapping"""
+        self._statements = statements
+        self._names = {sql: name for name, sql in statements.items()}
+        self.enabled = enabled and supports_cache_warming()
+        self.prepared_connections = 0
+
+    def __len__(self) -> int:
+        return len(self._statements)
+
+    def sql(self, name: str) -> str:
+        """SQL text of a registered statement"""
+        return self._statements[name]
+
+    def name_for(self, sql: str) -> Optional[str]:
+        """Name of a registered statement given its SQL text"""
+        return self._names.get(sql)
+
+    async def prepare_connection(self, conn: asyncpg.Connection, names: Optional[Iterable[str]] = None) -> None:
+        """Prepare registered statements (all of them by default) on a freshly opened connection"""
+        if not self.enabled:
+            return
+
+        for name in names if names is not None else self._statements:
+            sql = self._statements[name]
+            try:
+                # PreparedStatement objects are invalidated when the connection
+                # goes back to the pool, and the public prepare() bypasses the
+                # statement cache, so warm the connection's own cache instead;
+                # fetch()/execute() look statements up there.
+                await conn._get_statement(sql, None)
+            except asyncpg.PostgresError as e:
+                # A missing table or column must not take the whole pool down
+                logger.warning(f"Could not prepare hot statement '{name}': {e}")
+            except (AttributeError, TypeError) as e:
+                # asyncpg internals changed: run cold rather than fail connections
+                logger.warning(f"Statement cache warming unavailable, disabling it: {e}")
+                self.enabled = False
+                return
+
+        self.prepared_connections += 1
+
+    async def fetchrow(self, conn: asyncpg.Connection, name: str, *args: Any) -> Optional[asyncpg.Record]:
+        """Run a registered statement and return its first row"""
+        return await conn.fetchrow(self._statements[name], *args)
+
+    async def fetch(self, conn: asyncpg.Connection, name: str, *args: Any) -> List[asyncpg.Record]:
+        """Run a registered statement and return all rows"""
+        return await conn.fetch(self._statements[name], *args)
+
+    async def execute(self, conn: asyncpg.Connection, name: str, *args: Any) -> str:
+        """Run a registered statement and return its status tag"""
+        return await conn.execute(self._statements[name], *args)
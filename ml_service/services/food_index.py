@@ -0,0 +1,475 @@
+"""
+In-memory food and recipe index for grounding generated meal plans.
+
+Generated plans name foods in free text. This index resolves those names to
+food_database and recipe_database rows without a database round trip:
+exact lookup of the normalized name first, then fuzzy matching by shared
+words and character trigrams. Matches carry the row's nutrients and serving
+so portions can be converted to grams.
+
+Rows are stored column-wise in typed arrays and the postings lists of the
+word and trigram inverted indexes are int32 arrays, so the index stays
+compact. It is loaded in full at startup and once a day (which also drops
+deleted rows) and refreshed from updated_at in between.
+"""
+
+import asyncio
+import re
+import sys
+import time
+from array import array
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from fractions import Fraction
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from config.logging_config import logger, log_error
+from config.settings import settings
+from services.database import db_service
+
+NUTRIENTS = ("calories", "protein", "carbs", "fats", "fiber")
+
+KINDS = ("food", "recipe")
+
+# Fuzzy matches scoring below this are rejected
+MIN_MATCH_SCORE = 0.5
+
+# Weight of the trigram similarity in the fuzzy score (the rest is words)
+TRIGRAM_WEIGHT = 0.6
+
+# Weight of a row's terms missing from the query, relative to query terms
+# missing from the row: database names carry extra detail ('Greek yogurt,
+# plain, nonfat'), generated names rarely do
+EXTRA_TERM_WEIGHT = 0.25
+
+# Resolved names kept between refreshes
+MATCH_CACHE_SIZE = 50000
+
+# Rows changed while a refresh was reading may commit with an earlier
+# updated_at; each refresh re-reads this far back
+REFRESH_OVERLAP = timedelta(minutes=1)
+
+FULL_RELOAD_SECONDS = 24 * 3600
+
+# Grams per unit of mass, and milliliters per unit of volume (converted
+# at the density of water)
+MASS_UNITS = {"g": 1.0, "kg": 1000.0, "mg": 0.001, "oz": 28.3495, "lb": 453.592}
+VOLUME_UNITS = {"ml": 1.0, "l": 1000.0, "tsp": 4.92892, "tbsp": 14.7868, "cup": 240.0, "fl oz": 29.5735}
+
+UNIT_ALIASES = {
+    "gram": "g", "grams": "g", "gr": "g", "kilogram": "kg", "kilograms": "kg", "kgs": "kg",
+    "milligram": "mg", "milligrams": "mg", "ounce": "oz", "ounces": "oz",
+    "pound": "lb", "pounds": "lb", "lbs": "lb",
+    "milliliter": "ml", "milliliters": "ml", "millilitre": "ml", "millilitres": "ml", "mls": "ml",
+    "liter": "l", "liters": "l", "litre": "l", "litres": "l",
+    "teaspoon": "tsp", "teaspoons": "tsp", "tsps": "tsp",
+    "tablespoon": "tbsp", "tablespoons": "tbsp", "tbsps": "tbsp", "tbs": "tbsp",
+    "cups": "cup", "fluid ounce": "fl oz", "fluid ounces": "fl oz",
+    "servings": "serving", "portion": "serving", "portions": "serving",
+}
+
+# Words that do not tell foods apart
+STOP_WORDS = frozenset(("a", "an", "and", "the", "of", "with", "fresh", "chopped", "sliced", "diced", "minced"))
+
+FOODS_SQL = """
+    SELECT id, food_name AS name, brand_name IS NULL AS generic, COALESCE(verified, false) AS verified,
+           serving_qty, serving_unit, calories, protein, carbs, fats, fiber, updated_at,
+           true AS active
+    FROM food_database
+    WHERE $1::timestamptz IS NULL OR updated_at > $1
+"""
+
+# Only shared recipes; recipes users keep for themselves are not matched
+RECIPES_SQL = """
+    SELECT id, name, true AS generic, COALESCE(verified, false) AS verified,
+           1.0::float8 AS serving_qty, 'serving' AS serving_unit,
+           calories_per_serving AS calories, protein_per_serving AS protein,
+           carbs_per_serving AS carbs, fats_per_serving AS fats, NULL::float8 AS fiber, updated_at,
+           created_by IS NULL OR COALESCE(verified, false) AS active
+    FROM recipe_database
+    WHERE $1::timestamptz IS NULL OR updated_at > $1
+"""
+
+_QUANTITY_PATTERN = re.compile(r"\s*(\d+\s+\d+/\d+|\d+/\d+|\d+(?:\.\d+)?)\s*([a-z]+(?:\s+(?:oz|ounces?))?)?")
+
+
+def _singular(word: str) -> str:
+    """Crude singular of an English word ('eggs' → 'egg', 'berries' → 'berry')"""
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 4 and word.endswith(("oes", "ches", "shes", "xes", "sses")):
+        return word[:-2]
+    if len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+
+def normalize_name(name: Any) -> str:
+    """
+    Matching key of a food name: lowercase words without punctuation,
+    parenthesized notes or filler words, in singular form.
+    """
+    text = re.sub(r"\([^)]*\)", " ", str(name or "").lower())
+    words = re.findall(r"[a-z0-9]+", text.replace("'", ""))
+    return " ".join(_singular(word) for word in words if word not in STOP_WORDS)
+
+
+def _trigrams(key: str) -> set:
+    """Character trigrams of a normalized name, with word boundaries marked"""
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def normalize_unit(unit: Any) -> str:
+    """Canonical spelling of a unit ('Tablespoons' → 'tbsp')"""
+    text = " ".join(str(unit or "").lower().replace(".", " ").split())
+    return UNIT_ALIASES.get(text, text)
+
+
+def unit_grams(unit: Any) -> Optional[float]:
+    """Grams in one unit of mass or volume (volumes at the density of water)"""
+    unit = normalize_unit(unit)
+    return MASS_UNITS.get(unit, VOLUME_UNITS.get(unit))
+
+
+def parse_quantity(portion: Any) -> Optional[Tuple[float, str]]:
+    """Leading quantity and unit of a portion text ('1 1/2 cups cooked' → (1.5, 'cup'))"""
+    match = _QUANTITY_PATTERN.match(str(portion or "").lower())
+    if not match:
+        return None
+    quantity = float(sum(Fraction(part) for part in match.group(1).split()))
+    return quantity, normalize_unit(match.group(2))
+
+
+@dataclass(frozen=True)
+class FoodMatch:
+    """A food or recipe row matched to a name (shared between lookups)"""
+    id: str
+    kind: str
+    name: str
+    score: float
+    serving_qty: Optional[float]
+    serving_unit: str
+    serving_grams: Optional[float]
+    nutrients: Dict[str, Optional[float]]
+
+    def grams(self, quantity: float, unit: Any) -> Optional[float]:
+        """Weight of a quantity of this food in any mass, volume or its own serving unit"""
+        unit = normalize_unit(unit)
+        per_unit = unit_grams(unit)
+        if per_unit is None and self.serving_grams and self.serving_qty:
+            if unit in ("", "serving", self.serving_unit):
+                per_unit = self.serving_grams / self.serving_qty
+        return quantity * per_unit if per_unit is not None else None
+
+    def per_gram(self) -> Optional[Dict[str, float]]:
+        """Nutrients per gram, when the serving's weight is known"""
+        if not self.serving_grams or self.nutrients.get("calories") is None:
+            return None
+        return {
+            nutrient: value / self.serving_grams
+            for nutrient, value in self.nutrients.items() if value is not None
+        }
+
+
+class _IndexData:
+    """Column-wise rows plus exact-name, word and trigram indexes"""
+
+    def __init__(self):
+        self.ids: List[str] = []
+        self.names: List[str] = []
+        # Index into KINDS; -1 for rows not (or no longer) in the name indexes
+        self.kinds = array("b")
+        # Preference among rows with the same key: verified, then unbranded
+        self.ranks = array("b")
+        self.serving_qty = array("f")
+        self.serving_units: List[str] = []
+        self.serving_grams = array("f")
+        self.nutrients = {nutrient: array("f") for nutrient in NUTRIENTS}
+        self.trigram_counts = array("H")
+        self.word_counts = array("H")
+        self.rows: Dict[str, int] = {}
+        self.by_key: Dict[str, int] = {}
+        self.words: Dict[str, array] = {}
+        self.trigrams: Dict[str, array] = {}
+        self.watermarks: Dict[str, Optional[datetime]] = {kind: None for kind in KINDS}
+        self.counts = {kind: 0 for kind in KINDS}
+
+    def apply(self, kind: str, record: Any) -> None:
+        """Add, update or (when no longer active) remove one food or recipe row"""
+        watermark = self.watermarks[kind]
+        if record["updated_at"] and (watermark is None or record["updated_at"] > watermark):
+            self.watermarks[kind] = record["updated_at"]
+
+        row_id = str(record["id"])
+        row = self.rows.get(row_id)
+        key = normalize_name(record["name"])
+        if row is not None:
+            self._unlink(row)
+        if not record["active"] or not key:
+            return
+
+        if row is None:
+            row = len(self.ids)
+            self.rows[row_id] = row
+            self.ids.append(row_id)
+            self.names.append("")
+            self.serving_units.append("")
+            self.kinds.append(-1)
+            for column in (self.ranks, self.trigram_counts, self.word_counts):
+                column.append(0)
+            for column in (self.serving_qty, self.serving_grams, *self.nutrients.values()):
+                column.append(np.nan)
+
+        serving_qty = record["serving_qty"]
+        serving_unit = normalize_unit(record["serving_unit"])
+        per_unit = unit_grams(serving_unit)
+        self.names[row] = record["name"]
+        self.kinds[row] = KINDS.index(kind)
+        self.ranks[row] = 2 * bool(record["verified"]) + bool(record["generic"])
+        self.serving_qty[row] = serving_qty if serving_qty is not None else np.nan
+        self.serving_units[row] = serving_unit
+        self.serving_grams[row] = serving_qty * per_unit if serving_qty and per_unit else np.nan
+        for nutrient in NUTRIENTS:
+            value = record[nutrient]
+            self.nutrients[nutrient][row] = value if value is not None else np.nan
+        self._link(row, key)
+        self.counts[kind] += 1
+
+    def _link(self, row: int, key: str) -> None:
+        """Add a row to the name indexes under its normalized name"""
+        best = self.by_key.get(key)
+        if best is None or (self.ranks[row], -self.kinds[row]) > (self.ranks[best], -self.kinds[best]):
+            self.by_key[key] = row
+        words = set(key.split())
+        grams = _trigrams(key)
+        for word in words:
+            self.words.setdefault(word, array("i")).append(row)
+        for gram in grams:
+            self.trigrams.setdefault(gram, array("i")).append(row)
+        self.word_counts[row] = min(len(words), 65535)
+        self.trigram_counts[row] = min(len(grams), 65535)
+
+    def _unlink(self, row: int) -> None:
+        """Remove a row from the name indexes (its columns stay, unreachable)"""
+        if self.kinds[row] < 0:
+            return
+        self.counts[KINDS[self.kinds[row]]] -= 1
+        self.kinds[row] = -1
+        key = normalize_name(self.names[row])
+        for word in set(key.split()):
+            self.words[word].remove(row)
+        for gram in _trigrams(key):
+            self.trigrams[gram].remove(row)
+        if self.by_key.get(key) == row:
+            del self.by_key[key]
+            # Another row with the same key takes over
+            first = key.split()[0]
+            same = [other for other in self.words.get(first, ()) if normalize_name(self.names[other]) == key]
+            if same:
+                self.by_key[key] = max(same, key=lambda other: (self.ranks[other], -self.kinds[other]))
+
+    def _similarity(self, postings: Dict[str, array], terms: set, counts: array) -> np.ndarray:
+        """
+        Similarity of every row's terms with the query's (0 for rows sharing
+        none): shared terms over query terms plus down-weighted extra terms.
+        """
+        lists = [np.frombuffer(postings[term], dtype=np.int32) for term in terms if term in postings]
+        similarity = np.zeros(len(self.ids))
+        if not lists:
+            return similarity
+        shared = np.bincount(np.concatenate(lists), minlength=len(self.ids))
+        rows = np.flatnonzero(shared)
+        shared = shared[rows]
+        sizes = np.frombuffer(counts, dtype=np.uint16)[rows]
+        similarity[rows] = shared / (len(terms) + EXTRA_TERM_WEIGHT * (sizes - shared))
+        return similarity
+
+    def match(self, key: str) -> Optional[Tuple[int, float]]:
+        """Best row for a normalized name and its score (1.0 for an exact match)"""
+        row = self.by_key.get(key)
+        if row is not None:
+            return row, 1.0
+
+        scores = (
+            TRIGRAM_WEIGHT * self._similarity(self.trigrams, _trigrams(key), self.trigram_counts)
+            + (1 - TRIGRAM_WEIGHT) * self._similarity(self.words, set(key.split()), self.word_counts)
+        )
+        if not len(scores):
+            return None
+        # Ties go to verified, unbranded foods
+        best = int(np.argmax(scores + 0.001 * np.frombuffer(self.ranks, dtype=np.int8)))
+        if scores[best] < MIN_MATCH_SCORE:
+            return None
+        return best, float(scores[best])
+
+    def result(self, row: int, score: float) -> FoodMatch:
+        """Match object for a row"""
+        def value(column: array) -> Optional[float]:
+            number = float(column[row])
+            return None if np.isnan(number) else number
+
+        return FoodMatch(
+            id=self.ids[row],
+            kind=KINDS[self.kinds[row]],
+            name=self.names[row],
+            score=round(score, 3),
+            serving_qty=value(self.serving_qty),
+            serving_unit=self.serving_units[row],
+            serving_grams=value(self.serving_grams),
+            nutrients={nutrient: value(column) for nutrient, column in self.nutrients.items()},
+        )
+
+    def memory_bytes(self) -> int:
+        """Approximate memory held by the rows and indexes"""
+        def container(items: Iterable[Any], size: int) -> int:
+            return size + sum(sys.getsizeof(item) for item in items)
+
+        columns = [self.kinds, self.ranks, self.serving_qty, self.serving_grams, self.trigram_counts,
+                   self.word_counts, *self.nutrients.values()]
+        total = sum(sys.getsizeof(column) for column in columns)
+        for strings in (self.ids, self.names, self.serving_units):
+            total += container(strings, sys.getsizeof(strings))
+        total += container(self.rows, sys.getsizeof(self.rows))
+        total += sys.getsizeof(self.by_key)
+        for postings in (self.words, self.trigrams):
+            total += sys.getsizeof(postings) + sum(
+                sys.getsizeof(term) + sys.getsizeof(rows) for term, rows in postings.items()
+            )
+        return total
+
+
+class FoodIndex:
+    """Startup-loaded food/recipe name index with periodic incremental refresh"""
+
+    def __init__(self):
+        self._data: Optional[_IndexData] = None
+        self._cache: Dict[str, Optional[FoodMatch]] = {}
+        self._refresh_task: Optional[asyncio.Task] = None
+        self.loaded_at: Optional[datetime] = None
+        self.refreshed_at: Optional[datetime] = None
+        self.load_seconds: Optional[float] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._data is not None
+
+    async def load(self, conn: Any) -> None:
+        """Build the index from all food and recipe rows and swap it in"""
+        started = time.perf_counter()
+        data = _IndexData()
+        await self._read(conn, data)
+        self._data = data
+        self._cache.clear()
+        self.loaded_at = self.refreshed_at = datetime.now()
+        self.load_seconds = round(time.perf_counter() - started, 3)
+        stats = self.stats()
+        logger.info(
+            f"Food index loaded in {self.load_seconds}s: {stats['foods']} foods, "
+            f"{stats['recipes']} recipes, {stats['memory_bytes'] / 2 ** 20:.1f} MiB"
+        )
+
+    async def refresh(self, conn: Any) -> None:
+        """Apply rows changed since the last load or refresh"""
+        if self._data is None:
+            await self.load(conn)
+            return
+        if await self._read(conn, self._data, REFRESH_OVERLAP):
+            self._cache.clear()
+        self.refreshed_at = datetime.now()
+
+    async def _read(self, conn: Any, data: _IndexData, overlap: Optional[timedelta] = None) -> int:
+        """Apply food and recipe rows updated after the data's watermarks; returns the number read"""
+        count = 0
+        for kind, sql in (("food", FOODS_SQL), ("recipe", RECIPES_SQL)):
+            since = data.watermarks[kind]
+            rows = await conn.fetch(sql, since - overlap if since and overlap else since)
+            for record in rows:
+                data.apply(kind, record)
+            count += len(rows)
+        return count
+
+    async def start(self) -> None:
+        """Load the index and keep it refreshed in the background"""
+        if not settings.FOOD_INDEX_ENABLED or not db_service.pool:
+            return
+        try:
+            async with db_service.read_connection() as conn:
+                await self.load(conn)
+        except Exception as e:
+            log_error(e, "Food index load")
+        self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def _refresh_loop(self) -> None:
+        """Refresh incrementally, with a full reload once a day"""
+        while True:
+            await asyncio.sleep(settings.FOOD_INDEX_REFRESH_SECONDS)
+            try:
+                async with db_service.read_connection() as conn:
+                    if self.loaded_at and (datetime.now() - self.loaded_at).total_seconds() >= FULL_RELOAD_SECONDS:
+                        await self.load(conn)
+                    else:
+                        await self.refresh(conn)
+            except Exception as e:
+                log_error(e, "Food index refresh")
+
+    async def close(self) -> None:
+        """Stop background refreshes"""
+        if self._refresh_task:
+            self._refresh_task.cancel()
+            self._refresh_task = None
+
+    def match(self, name: Any) -> Optional[FoodMatch]:
+        """Food or recipe best matching a free-text name, or None"""
+        data = self._data
+        key = normalize_name(name)
+        if data is None or not key:
+            return None
+        if key not in self._cache:
+            if len(self._cache) >= MATCH_CACHE_SIZE:
+                self._cache.clear()
+            found = data.match(key)
+            self._cache[key] = data.result(*found) if found else None
+        return self._cache[key]
+
+    def ground(self, food: Dict[str, Any]) -> Optional[FoodMatch]:
+        """
+        Link a generated plan food to its food_database/recipe_database row.
+
+        Sets food_id (or recipe_id) and, when the food has no grams, derives
+        them from its portion text.
+        """
+        found = self.match(food.get("name"))
+        if found is None:
+            return None
+        food[f"{found.kind}_id"] = found.id
+        if not food.get("grams"):
+            quantity = parse_quantity(food.get("portion"))
+            grams = found.grams(*quantity) if quantity else None
+            if grams:
+                food["grams"] = round(grams)
+        return found
+
+    def stats(self) -> Dict[str, Any]:
+        """Size, memory footprint and freshness of the index"""
+        data = self._data
+        if data is None:
+            return {"loaded": False}
+        return {
+            "loaded": True,
+            "foods": data.counts["food"],
+            "recipes": data.counts["recipe"],
+            "names": len(data.by_key),
+            "words": len(data.words),
+            "trigrams": len(data.trigrams),
+            "cached_matches": len(self._cache),
+            "memory_bytes": data.memory_bytes(),
+            "load_seconds": self.load_seconds,
+            "loaded_at": self.loaded_at.isoformat(),
+            "refreshed_at": self.refreshed_at.isoformat(),
+        }
+
+
+food_index = FoodIndex()
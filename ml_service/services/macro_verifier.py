@@ -0,0 +1,206 @@
+"""
+Local macro verification and portion rescaling of generated meal plans.
+
+The model's per-food and daily macros are not trusted: each food's macros
+are recomputed from its grams and per-gram values, taken from food_database
+when the food is found there (otherwise from the model's own numbers for
+that food). When the recomputed daily totals miss the calorie/macro targets
+by more than MACRO_TOLERANCE, per-food portion scaling factors are solved
+with a small regularized least-squares problem, so the day lands on target
+with portions changed as little as possible. Meal and daily totals are then
+rewritten from the corrected foods. Runs in milliseconds, without another
+model call.
+"""
+
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+MACROS = ("calories", "protein", "carbs", "fats")
+
+# Daily totals within this fraction of every target are left unscaled
+MACRO_TOLERANCE = 0.05
+
+# Relative weight of each macro's error in the fit; calories matter most
+MACRO_WEIGHTS = np.array([2.0, 1.0, 1.0, 1.0])
+
+# Penalty on changing a portion, relative to the squared relative macro
+# errors; small, so it mainly picks the least change among exact fits
+PORTION_REGULARIZATION = 0.005
+
+# Portions are scaled within these factors of what the model proposed
+MIN_SCALE, MAX_SCALE = 0.5, 2.0
+
+_GRAMS_PATTERN = re.compile(r"(\d+(?:\.\d+)?)\s*(?:g|grams?)\b", re.IGNORECASE)
+
+
+def _number(value: Any) -> Optional[float]:
+    """A plan value as a number: JSON numbers, or the first number in a string like '30g'"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        match = re.search(r"\d+(?:\.\d+)?", value.replace(",", ""))
+        return float(match.group()) if match else None
+    return None
+
+
+def food_grams(food: Dict[str, Any]) -> Optional[float]:
+    """Weight of a planned food: its grams field, else a gram amount in its portion text"""
+    grams = _number(food.get("grams"))
+    if grams is None:
+        match = _GRAMS_PATTERN.search(str(food.get("portion") or ""))
+        grams = float(match.group(1)) if match else None
+    return grams if grams and grams > 0 else None
+
+
+def normalize_food_name(name: Any) -> str:
+    """Lookup key of a food name: lowercase with collapsed whitespace"""
+    return " ".join(str(name or "").lower().split())
+
+
+def daily_targets(nutrition: Dict[str, Any]) -> np.ndarray:
+    """Calorie and macro targets (NaN where unknown) from the nutrition dict given to the prompt builders"""
+    macros = nutrition.get("macros") or {}
+    values = (nutrition.get("goalCalories"), macros.get("protein_g"), macros.get("carbs_g"), macros.get("fat_g"))
+    return np.array([float(v) if v else np.nan for v in values])
+
+
+def solve_portion_scales(
+    amounts: np.ndarray,
+    fixed: np.ndarray,
+    targets: np.ndarray
+) -> np.ndarray:
+    """
+    Per-food scaling factors that bring the daily totals closest to the targets.
+
+    amounts holds each scalable food's macros at its current portion (one
+    column per food), fixed the totals that cannot be scaled. Minimizes the
+    weighted relative error of every known target plus a penalty on moving
+    factors away from 1, within [MIN_SCALE, MAX_SCALE]: factors that end up
+    outside the bounds are clamped and the rest re-solved.
+    """
+    count = amounts.shape[1]
+    scales = np.ones(count)
+    known = ~np.isnan(targets)
+    if not count or not known.any():
+        return scales
+
+    weights = MACRO_WEIGHTS[known] / targets[known]
+    design = amounts[known] * weights[:, None]
+    goal = (targets[known] - fixed[known]) * weights
+    penalty = np.sqrt(PORTION_REGULARIZATION)
+
+    free = np.ones(count, dtype=bool)
+    for _ in range(count):
+        rows = np.vstack([design[:, free], penalty * np.eye(free.sum())])
+        rhs = np.concatenate([goal - design[:, ~free] @ scales[~free], np.full(free.sum(), penalty)])
+        scales[free] = np.linalg.lstsq(rows, rhs, rcond=None)[0]
+        outside = free & ((scales < MIN_SCALE) | (scales > MAX_SCALE))
+        scales = np.clip(scales, MIN_SCALE, MAX_SCALE)
+        if not outside.any():
+            break
+        free &= ~outside
+        if not free.any():
+            break
+    return scales
+
+
+def _deviations(totals: np.ndarray, targets: np.ndarray) -> Dict[str, Optional[float]]:
+    """Relative deviation of each daily total from its target, rounded to 0.1%"""
+    return {
+        macro: None if np.isnan(target) else round(float((total - target) / target), 3)
+        for macro, total, target in zip(MACROS, totals, targets)
+    }
+
+
+def verify_meal_plan(
+    plan: Dict[str, Any],
+    nutrition: Dict[str, Any],
+    reference: Dict[str, Dict[str, float]]
+) -> Dict[str, Any]:
+    """
+    Recompute a generated meal plan's macros and rescale portions in place.
+
+    `reference` maps normalized food names to per-gram calories, protein,
+    carbs and fats (and optionally fiber). Foods without a known weight keep
+    their stated macros and are not scaled; meals without foods keep their
+    stated totals. Returns a report for the plan's _metadata.
+    """
+    meals = [meal for meal in plan.get("meals") or [] if isinstance(meal, dict)]
+    targets = daily_targets(nutrition)
+
+    scalable: List[Tuple[Dict[str, Any], float, np.ndarray, Optional[float]]] = []
+    fixed = np.zeros(len(MACROS))
+    matched = total = 0
+    for meal in meals:
+        foods = [food for food in meal.get("foods") or [] if isinstance(food, dict)]
+        if not foods:
+            fixed += [_number(meal.get(f"total_{macro}")) or 0.0 for macro in MACROS]
+        for food in foods:
+            total += 1
+            grams = food_grams(food)
+            known = reference.get(normalize_food_name(food.get("name")))
+            stated = np.array([_number(food.get(macro)) or 0.0 for macro in MACROS])
+            if grams is None:
+                fixed += stated
+                continue
+            if known:
+                matched += 1
+                per_gram = np.array([known.get(macro) or 0.0 for macro in MACROS])
+                fiber = known.get("fiber")
+            else:
+                per_gram = stated / grams
+                fiber = None if _number(food.get("fiber")) is None else _number(food["fiber"]) / grams
+            scalable.append((food, grams, per_gram, fiber))
+
+    amounts = np.array([per_gram * grams for _, grams, per_gram, _ in scalable]).reshape(-1, len(MACROS)).T
+    totals = amounts.sum(axis=1) + fixed
+    before = _deviations(totals, targets)
+
+    known = ~np.isnan(targets)
+    off_target = bool(np.any(np.abs(totals[known] - targets[known]) > MACRO_TOLERANCE * targets[known]))
+    scales = solve_portion_scales(amounts, fixed, targets) if off_target else np.ones(len(scalable))
+
+    for (food, grams, per_gram, fiber), scale in zip(scalable, scales):
+        new_grams = round(grams * scale)
+        if new_grams != round(grams):
+            food["portion"] = f"{new_grams}g"
+        food["grams"] = new_grams
+        for macro, value in zip(MACROS, per_gram * new_grams):
+            food[macro] = round(float(value)) if macro == "calories" else round(float(value), 1)
+        if fiber is not None:
+            food["fiber"] = round(fiber * new_grams, 1)
+
+    daily = np.zeros(len(MACROS))
+    for meal in meals:
+        foods = [food for food in meal.get("foods") or [] if isinstance(food, dict)]
+        if foods:
+            for macro in MACROS:
+                meal[f"total_{macro}"] = sum(_number(food.get(macro)) or 0.0 for food in foods)
+            meal["total_calories"] = round(meal["total_calories"])
+            for macro in MACROS[1:]:
+                meal[f"total_{macro}"] = round(meal[f"total_{macro}"], 1)
+            if any(_number(food.get("fiber")) is not None for food in foods):
+                meal["total_fiber"] = round(sum(_number(food.get("fiber")) or 0.0 for food in foods), 1)
+        daily += [_number(meal.get(f"total_{macro}")) or 0.0 for macro in MACROS]
+
+    daily_totals = plan.get("daily_totals")
+    if not isinstance(daily_totals, dict):
+        daily_totals = plan["daily_totals"] = {}
+    daily_totals.update({macro: round(float(value)) for macro, value in zip(MACROS, daily)})
+    if any(isinstance(meal.get("total_fiber"), (int, float)) for meal in meals):
+        daily_totals["fiber"] = round(sum(_number(meal.get("total_fiber")) or 0.0 for meal in meals))
+
+    after = _deviations(daily, targets)
+    return {
+        "method": "least_squares" if off_target else "recomputed",
+        "foods": total,
+        "matched_foods": matched,
+        "scaled_foods": int(np.sum(np.abs(scales - 1) > 0.005)),
+        "deviation_before": before,
+        "deviation_after": after,
+        "within_tolerance": all(d is None or abs(d) <= MACRO_TOLERANCE for d in after.values()),
+    }
@@ -0,0 +1,349 @@
+"""
+Deterministic meal plan solver for the BASIC tier.
+
+The BASIC prompt only varies by goal, dietary style, calories and macros,
+so BASIC plans are assembled from recipe_database (and the user's own
+meal_templates) instead of a model call. Each meal slot gets a calorie share
+of the day; every candidate is portioned to its slot in quarter servings and
+scored by how far its macros are from the slot's share of the targets. The
+best few candidates per slot are then combined exhaustively (vectorized) and
+the day closest to the daily targets wins. Output uses the plan_data shape
+of generated plans.
+
+The same inputs always give the same plan; a small per-user tie-breaker
+spreads users with the same targets over equally good recipes.
+"""
+
+import itertools
+import re
+import zlib
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+MACROS = ("calories", "protein", "carbs", "fats")
+
+# Relative weight of each macro's error; calories matter most
+MACRO_WEIGHTS = np.array([2.0, 1.0, 1.0, 1.0])
+
+# Meal slots and their share of the day's calories by meals per day
+MEAL_SLOTS: Dict[int, Tuple[Tuple[str, float], ...]] = {
+    3: (("breakfast", 0.30), ("lunch", 0.35), ("dinner", 0.35)),
+    4: (("breakfast", 0.25), ("lunch", 0.30), ("snack", 0.15), ("dinner", 0.30)),
+    5: (("breakfast", 0.25), ("snack", 0.10), ("lunch", 0.25), ("snack", 0.10), ("dinner", 0.30)),
+    6: (("breakfast", 0.20), ("snack", 0.10), ("lunch", 0.25), ("snack", 0.10), ("dinner", 0.25), ("snack", 0.10)),
+}
+
+MEAL_TIMINGS = {
+    "breakfast": ("7:00 AM - 8:00 AM",),
+    "lunch": ("12:00 PM - 1:00 PM",),
+    "dinner": ("6:30 PM - 7:30 PM",),
+    "snack": ("3:30 PM - 4:00 PM", "10:00 AM - 10:30 AM", "8:30 PM - 9:00 PM"),
+}
+
+# Portions are whole quarter servings within these bounds
+MIN_SERVINGS, MAX_SERVINGS, SERVING_STEP = 0.5, 2.0, 0.25
+
+# Candidates kept per slot for the combined search, and the most day
+# combinations it may evaluate
+MAX_CANDIDATES_PER_SLOT = 8
+MAX_COMBINATIONS = 50000
+
+# Largest per-user tie-breaker, in units of the weighted squared error
+TIE_BREAK = 1e-4
+
+# Days within this fraction of every target count as on target
+TARGET_TOLERANCE = 0.05
+
+# Recipe dietary_tags acceptable for a dietary style (styles without an
+# entry accept every recipe)
+DIETARY_TAGS = {
+    "vegan": ("vegan",),
+    "vegetarian": ("vegetarian", "vegan"),
+    "pescatarian": ("pescatarian", "vegetarian", "vegan"),
+    "keto": ("keto",),
+    "paleo": ("paleo",),
+    "gluten-free": ("gluten-free",),
+}
+
+# Allergies the solver can keep out of a plan (the profile form's choices):
+# recipe allergen_tags spellings, which also name the allergy in a profile,
+# and ingredient keywords marking it in recipe and template ingredients. A
+# plan for any other allergy is left to the model, which reads the user's
+# own wording
+ALLERGENS = {
+    "dairy": (("dairy", "milk", "lactose"),
+              ("milk", "cheese", "butter", "cream", "yogurt", "yoghurt", "whey", "casein", "ghee", "kefir")),
+    "gluten": (("gluten", "wheat"),
+               ("wheat", "flour", "bread", "pasta", "barley", "rye", "couscous", "noodle", "tortilla", "seitan",
+                "cracker", "bulgur", "semolina", "spelt")),
+    "nuts": (("nuts", "nut", "tree nuts", "tree nut", "tree_nuts"),
+             ("almond", "walnut", "cashew", "pecan", "pistachio", "hazelnut", "macadamia", "brazil nut",
+              "pine nut", "nut butter", "marzipan", "praline")),
+    "peanuts": (("peanuts", "peanut"), ("peanut", "groundnut")),
+    "shellfish": (("shellfish", "crustaceans", "molluscs"),
+                  ("shrimp", "prawn", "crab", "lobster", "clam", "mussel", "oyster", "scallop", "crayfish",
+                   "squid", "calamari", "octopus")),
+    "eggs": (("eggs", "egg"), ("egg", "mayonnaise", "mayo", "meringue")),
+    "soy": (("soy", "soya", "soybeans"), ("soy", "soya", "tofu", "tempeh", "edamame", "miso")),
+    "fish": (("fish",),
+             ("fish", "salmon", "tuna", "cod", "tilapia", "sardine", "anchov", "mackerel", "trout", "halibut",
+              "haddock", "pollock", "herring")),
+}
+
+# Profile allergy entries meaning no allergy
+NO_ALLERGY = ("", "none", "no", "n/a")
+
+# Shopping list section of an ingredient by keyword; the rest are staples
+SHOPPING_SECTIONS = (
+    ("proteins", ("chicken", "beef", "turkey", "pork", "egg", "salmon", "tuna", "fish", "shrimp", "tofu",
+                  "tempeh", "lentil", "bean", "chickpea", "yogurt", "cottage", "whey", "cheese")),
+    ("carbs", ("rice", "pasta", "bread", "oat", "potato", "quinoa", "tortilla", "noodle", "couscous", "granola")),
+    ("vegetables", ("spinach", "broccoli", "pepper", "tomato", "onion", "carrot", "lettuce", "kale", "cucumber",
+                    "zucchini", "mushroom", "garlic", "greens", "asparagus", "cauliflower", "apple", "banana",
+                    "berry", "berries", "orange", "mango", "grape", "pear", "peach", "lemon")),
+    ("fats", ("oil", "avocado", "nut", "almond", "walnut", "peanut", "butter", "seed", "olive")),
+)
+
+
+def dietary_tags(style: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """Recipe tags acceptable for a dietary style, or None when any recipe fits"""
+    text = (style or "").lower().replace("_", "-")
+    return next((tags for key, tags in DIETARY_TAGS.items() if key in text), None)
+
+
+def food_exclusions(
+    allergies: Optional[Iterable[str]],
+    disliked_foods: Optional[Iterable[str]] = None
+) -> Optional[Tuple[Tuple[str, ...], Tuple[str, ...]]]:
+    """
+    Recipe allergen_tags and lowercased ingredient keywords that keep a
+    user's allergies and disliked foods out of a plan, or None when some
+    allergy is not in ALLERGENS and the solver cannot guarantee it
+    """
+    tags, keywords = set(), set()
+    for allergy in allergies or ():
+        text = allergy.strip().lower().replace("-", " ")
+        if text in NO_ALLERGY:
+            continue
+        match = next((entry for key, entry in ALLERGENS.items() if text == key or text in entry[0]), None)
+        if match is None:
+            return None
+        tags.update(match[0])
+        keywords.update(match[1])
+
+    keywords.update(food.strip().lower() for food in disliked_foods or () if food.strip())
+    return tuple(sorted(tags)), tuple(sorted(keywords))
+
+
+def meal_slots(meals_per_day: Optional[int]) -> Tuple[Tuple[str, float], ...]:
+    """Meal slots for a number of meals per day (clamped to 3-6)"""
+    return MEAL_SLOTS[min(6, max(3, int(meals_per_day or 3)))]
+
+
+def _tie_breaker(seed: str, candidate_id: Any) -> float:
+    """Stable pseudo-random offset in [0, TIE_BREAK) for a user and candidate"""
+    return zlib.crc32(f"{seed}:{candidate_id}".encode()) / 2 ** 32 * TIE_BREAK
+
+
+def choose_meals(
+    candidates: Sequence[Dict[str, Any]],
+    targets: np.ndarray,
+    slots: Sequence[Tuple[str, float]],
+    seed: str = ""
+) -> Optional[List[Tuple[int, float]]]:
+    """
+    Candidate index and servings for each slot, or None when a slot has no
+    candidate of its meal type.
+
+    A candidate is used at most once per day.
+    """
+    macros = np.array([[float(c[macro]) for macro in MACROS] for c in candidates]).reshape(-1, len(MACROS))
+    meal_types = [{str(t).lower() for t in c.get("meal_types") or ()} for c in candidates]
+    jitter = np.array([_tie_breaker(seed, c["id"]) for c in candidates])
+    weights = MACRO_WEIGHTS / targets ** 2
+
+    per_slot = max(2, min(MAX_CANDIDATES_PER_SLOT, int(MAX_COMBINATIONS ** (1 / len(slots)))))
+    options = []
+    for meal_type, share in slots:
+        eligible = np.flatnonzero([meal_type in types for types in meal_types])
+        if not len(eligible):
+            return None
+        slot_target = targets * share
+        servings = np.clip(
+            np.round(slot_target[0] / macros[eligible, 0] / SERVING_STEP) * SERVING_STEP, MIN_SERVINGS, MAX_SERVINGS
+        )
+        amounts = macros[eligible] * servings[:, None]
+        error = ((amounts - slot_target) ** 2) @ weights + jitter[eligible]
+        best = np.argsort(error, kind="stable")[:per_slot]
+        options.append((eligible[best], servings[best], amounts[best]))
+
+    # Every combination of the kept candidates, scored on the whole day
+    picks = np.indices([len(option[0]) for option in options]).reshape(len(options), -1).T
+    ids = np.stack([option[0][picks[:, slot]] for slot, option in enumerate(options)], axis=1)
+    totals = sum(option[2][picks[:, slot]] for slot, option in enumerate(options))
+    error = ((totals - targets) ** 2) @ weights + jitter[ids].sum(axis=1)
+    distinct = np.ones(len(ids), dtype=bool)
+    for first, second in itertools.combinations(range(len(options)), 2):
+        distinct &= ids[:, first] != ids[:, second]
+    if not distinct.any():
+        return None
+    best = int(np.argmin(np.where(distinct, error, np.inf)))
+    return [(int(ids[best, slot]), float(option[1][picks[best, slot]])) for slot, option in enumerate(options)]
+
+
+def _amount(value: Any, factor: float) -> str:
+    """A quantity scaled by a serving factor, without needless decimals"""
+    number = float(value) * factor
+    return f"{number:g}" if number >= 10 else f"{round(number, 2):g}"
+
+
+def _ingredient(item: Any, factor: float) -> Optional[str]:
+    """Ingredient line of a recipe ingredient (text or {name, quantity, unit}) scaled to the portion"""
+    if isinstance(item, str):
+        return item
+    if not isinstance(item, dict):
+        return None
+    name = item.get("name") or item.get("item") or item.get("ingredient")
+    if not name:
+        return None
+    quantity = item.get("quantity", item.get("amount", item.get("qty")))
+    if isinstance(quantity, (int, float)) and not isinstance(quantity, bool):
+        unit = item.get("unit") or ""
+        return " ".join(part for part in (_amount(quantity, factor), unit, name) if part)
+    return str(name)
+
+
+def _instructions(value: Any) -> str:
+    """Recipe instructions (a list of steps or text) as one text"""
+    if isinstance(value, list):
+        steps = [str(step.get("text", "")) if isinstance(step, dict) else str(step) for step in value]
+        return " ".join(step.strip() for step in steps if step.strip())
+    return str(value or "")
+
+
+def _foods(candidate: Dict[str, Any], servings: float, totals: Dict[str, float]) -> List[Dict[str, Any]]:
+    """Loggable foods of a chosen meal: template foods scaled, or the recipe as one food"""
+    if candidate["source"] == "template":
+        foods = []
+        for food in candidate.get("ingredients") or []:
+            if not isinstance(food, dict):
+                continue
+            scaled = {"name": food.get("food_name") or food.get("name") or candidate["name"]}
+            if isinstance(food.get("serving_qty"), (int, float)):
+                scaled["portion"] = f"{_amount(food['serving_qty'], servings)} {food.get('serving_unit') or ''}".strip()
+            for macro in MACROS:
+                value = food.get(macro)
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    scaled[macro] = round(value * servings) if macro == "calories" else round(value * servings, 1)
+            if food.get("food_id"):
+                scaled["food_id"] = food["food_id"]
+            foods.append(scaled)
+        if foods:
+            return foods
+
+    portion = f"{servings:g} serving" + ("" if servings == 1 else "s")
+    food = {"name": candidate["name"], "portion": portion, **totals}
+    if candidate["source"] == "recipe":
+        food["recipe_id"] = str(candidate["id"])
+    return [food]
+
+
+def _shopping_list(ingredients: Sequence[str]) -> Dict[str, List[str]]:
+    """Ingredient names grouped into the shopping list sections of generated plans"""
+    sections: Dict[str, List[str]] = {name: [] for name, _ in SHOPPING_SECTIONS}
+    sections["pantry_staples"] = []
+    for ingredient in dict.fromkeys(ingredients):
+        text = ingredient.lower()
+        section = next(
+            (name for name, words in SHOPPING_SECTIONS if any(re.search(rf"\b{word}", text) for word in words)),
+            "pantry_staples"
+        )
+        sections[section].append(ingredient)
+    return sections
+
+
+def build_plan(
+    candidates: Sequence[Dict[str, Any]],
+    chosen: Sequence[Tuple[int, float]],
+    slots: Sequence[Tuple[str, float]]
+) -> Dict[str, Any]:
+    """plan_data of the chosen meals, in the shape of generated meal plans"""
+    meals = []
+    ingredients: List[str] = []
+    snacks = 0
+    for (index, servings), (meal_type, _) in zip(chosen, slots):
+        candidate = candidates[index]
+        totals = {macro: float(candidate[macro]) * servings for macro in MACROS}
+        totals = {macro: round(value) if macro == "calories" else round(value, 1) for macro, value in totals.items()}
+        lines = (
+            [line for line in (_ingredient(item, servings) for item in candidate.get("ingredients") or []) if line]
+            if candidate["source"] == "recipe" else []
+        )
+        ingredients.extend(lines)
+        timings = MEAL_TIMINGS[meal_type]
+        timing = timings[snacks % len(timings)] if meal_type == "snack" else timings[0]
+        snacks += meal_type == "snack"
+
+        meals.append({
+            "meal_type": meal_type,
+            "meal_name": candidate["name"],
+            "prep_time_minutes": candidate.get("total_time_minutes") or candidate.get("prep_time_minutes"),
+            "difficulty": "easy",
+            "meal_timing": timing,
+            **{f"total_{macro}": value for macro, value in totals.items()},
+            "tags": list(candidate.get("tags") or []),
+            "foods": _foods(candidate, servings, totals),
+            "recipe": " ".join(
+                part for part in (
+                    f"Ingredients: {', '.join(lines)}." if lines else "", _instructions(candidate.get("instructions"))
+                ) if part
+            ),
+            "tips": [],
+        })
+
+    daily = {macro: sum(meal[f"total_{macro}"] for meal in meals) for macro in MACROS}
+    return {
+        "meals": meals,
+        "daily_totals": {macro: round(value) for macro, value in daily.items()},
+        "shopping_list": {
+            **_shopping_list(ingredients),
+            "estimated_cost": None,
+        },
+        "meal_prep_strategy": None,
+        "notes": "Built from our recipe library to match your targets. As you share more preferences, "
+                 "we'll personalize it further!",
+    }
+
+
+def solve_meal_plan(
+    candidates: Sequence[Dict[str, Any]],
+    nutrition: Dict[str, Any],
+    meals_per_day: Optional[int],
+    seed: str = ""
+) -> Optional[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """
+    A day of meals meeting the nutrition targets, and a report for the
+    plan's _metadata; None when the candidates cannot fill every slot.
+    """
+    macros = nutrition.get("macros") or {}
+    targets = np.array([
+        nutrition.get("goalCalories") or 2000, macros.get("protein_g") or 150,
+        macros.get("carbs_g") or 200, macros.get("fat_g") or 60,
+    ], dtype=float)
+    candidates = [c for c in candidates if all(c.get(macro) is not None for macro in MACROS) and c["calories"] > 0]
+    slots = meal_slots(meals_per_day)
+
+    chosen = choose_meals(candidates, targets, slots, seed) if candidates else None
+    if chosen is None:
+        return None
+
+    plan = build_plan(candidates, chosen, slots)
+    totals = np.array([plan["daily_totals"][macro] for macro in MACROS], dtype=float)
+    deviation = (totals - targets) / targets
+    report = {
+        "candidates": len(candidates),
+        "deviation": {macro: round(float(value), 3) for macro, value in zip(MACROS, deviation)},
+        "within_tolerance": bool(np.all(np.abs(deviation) <= TARGET_TOLERANCE)),
+    }
+    return plan, report
@@ -0,0 +1,116 @@
+"""Bounded in-process cache of plan generation status"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+# Load version of a user: (epoch, per-user change counter)
+Version = Tuple[int, int]
+
+
+class PlanStatusCache:
+    """
+    Write-through LRU cache for plan status snapshots with TTL eviction.
+
+    DatabaseService is the only writer of plan status, so every write updates
+    the cache directly and every other instance receives the same change via
+    the plan_status NOTIFY channel. The TTL bounds staleness for writes made
+    outside the service.
+
+    Loads on a miss take version() before reading and pass it to put(): a
+    change applied while the read was in flight bumps the version, and the
+    now-stale snapshot is not cached.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl_seconds: float = 300.0):
+        """Initialize an empty cache"""
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        # Bumped on every change so loads racing with it are not cached; the
+        # epoch covers changes forgotten when _versions is reset
+        self._versions: Dict[str, int] = {}
+        self._epoch = 0
+        self._max_size = max_size
+        self._ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Return a copy of the cached snapshot, or None on miss/expiry"""
+        entry = self._entries.get(user_id)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, snapshot = entry
+        if expires_at < time.monotonic():
+            del self._entries[user_id]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(user_id)
+        self.hits += 1
+        return dict(snapshot)
+
+    def version(self, user_id: str) -> Version:
+        """Current load version of a user, to pass to put() after reading their status"""
+        return self._epoch, self._versions.get(user_id, 0)
+
+    def put(self, user_id: str, snapshot: Dict[str, Any], version: Optional[Version] = None) -> bool:
+        """
+        Store a full snapshot, evicting the least recently used entry when full.
+
+        With a version from before the read, the snapshot is dropped (and
+        False returned) if the user's status changed since.
+        """
+        if version is not None and version != self.version(user_id):
+            return False
+        self._entries[user_id] = (time.monotonic() + self._ttl_seconds, dict(snapshot))
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+        return True
+
+    def _bump(self, user_id: str) -> None:
+        """Mark a user's status as changed for loads in flight"""
+        if user_id in self._versions or len(self._versions) < self._max_size:
+            self._versions[user_id] = self._versions.get(user_id, 0) + 1
+        else:
+            # Too many tracked users: start over
+            self._versions.clear()
+            self._epoch += 1
+
+    def apply_event(self, event: Dict[str, Any]) -> None:
+        """
+        Apply a single plan status change to a cached snapshot.
+
+        Users without a cached snapshot are left alone: the next read loads
+        both plan types together instead of caching half a snapshot. Loads
+        in flight for the user are not cached either way.
+        """
+        user_id = str(event.get("user_id"))
+        plan_type = event.get("plan_type")
+        self._bump(user_id)
+        entry = self._entries.get(user_id)
+        if entry is None or plan_type not in ("meal", "workout"):
+            return
+
+        _, snapshot = entry
+        snapshot[f"{plan_type}_plan_status"] = event.get("status")
+        snapshot[f"{plan_type}_plan_error"] = event.get("error_message")
+        if event.get("generated_at"):
+            snapshot[f"{plan_type}_plan_generated_at"] = event["generated_at"]
+        self.put(user_id, snapshot)
+
+    def invalidate(self, user_id: str) -> None:
+        """Drop a single user's snapshot"""
+        self._entries.pop(user_id, None)
+        self._bump(user_id)
+
+    def clear(self) -> None:
+        """Drop every snapshot"""
+        self._entries.clear()
+        self._versions.clear()
+        self._epoch += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
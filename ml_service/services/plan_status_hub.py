@@ -0,0 +1,92 @@
+"""In-process fan-out of plan status events to streaming clients"""
+
+import asyncio
+from typing import Any, Dict, List, Set
+
+from config.logging_config import logger
+
+TERMINAL_STATUSES = ("completed", "failed")
+
+
+class PlanStatusHub:
+    """
+    Distributes plan status events to per-user subscriber queues.
+
+    Events arrive from the single LISTEN connection owned by DatabaseService,
+    so the database sees one listener per instance regardless of how many
+    clients are streaming.
+    """
+
+    def __init__(self, max_queue_size: int = 32):
+        """Initialize hub with an empty subscriber registry"""
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._max_queue_size = max_queue_size
+
+    def subscribe(self, user_id: str) -> asyncio.Queue:
+        """Register a new subscriber queue for a user"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self._max_queue_size)
+        self._subscribers.setdefault(user_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, user_id: str, queue: asyncio.Queue) -> None:
+        """Remove a subscriber queue, dropping the user entry when empty"""
+        queues = self._subscribers.get(user_id)
+        if not queues:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self._subscribers[user_id]
+
+    def publish(self, event: Dict[str, Any]) -> int:
+        """
+        Deliver an event to every subscriber of the event's user.
+
+        Slow consumers never block the listener: when a queue is full one
+        pending event is dropped to make room, preferring an event a later
+        one for the same plan supersedes, so a completed/failed status is
+        never lost while it is still the plan's latest.
+
+        Returns:
+            Number of queues the event was delivered to
+        """
+        queues = self._subscribers.get(str(event.get("user_id")))
+        if not queues:
+            return 0
+
+        for queue in queues:
+            if queue.full():
+                pending: List[Dict[str, Any]] = []
+                while not queue.empty():
+                    pending.append(queue.get_nowait())
+                dropped = pending.pop(self._droppable_index(pending, event))
+                for kept in pending:
+                    queue.put_nowait(kept)
+                logger.debug(
+                    f"Plan status queue full for user {event.get('user_id')}, "
+                    f"dropped {dropped.get('plan_type')} {dropped.get('status')} event"
+                )
+            queue.put_nowait(event)
+
+        return len(queues)
+
+    @staticmethod
+    def _droppable_index(pending: List[Dict[str, Any]], event: Dict[str, Any]) -> int:
+        """
+        Pick the pending event that is cheapest to lose.
+
+        In order of preference: the oldest event superseded by a later one for
+        the same plan, the oldest non-terminal event, the oldest event.
+        """
+        later = pending + [event]
+        for index, candidate in enumerate(pending):
+            if any(e.get("plan_type") == candidate.get("plan_type") for e in later[index + 1:]):
+                return index
+        for index, candidate in enumerate(pending):
+            if candidate.get("status") not in TERMINAL_STATUSES:
+                return index
+        return 0
+
+    @property
+    def subscriber_count(self) -> int:
+        """Total number of active subscriber queues"""
+        return sum(len(queues) for queues in self._subscribers.values())
@@ -0,0 +1,50 @@
+"""Content-addressed storage of shared plan sections"""
+
+import hashlib
+from typing import Any, Dict, Tuple
+
+from utils import json_codec
+
+# Top-level plan sections stored as plan_chunks rows and referenced by hash.
+# Only generic guidance repeated across users belongs here: chunks have no
+# owner and outlive the plans and users referencing them, so per-user or
+# health-related sections (personalized_tips, injury_prevention,
+# periodization_plan) always stay inline.
+CHUNKED_SECTIONS = {
+    "meal": ("meal_prep_strategy", "hydration_plan"),
+    "workout": ("nutrition_timing", "progression_tracking", "lifestyle_integration"),
+}
+
+# Key of the reference object replacing a chunked section: {"$chunk": "<sha256>"}
+CHUNK_REF_KEY = "$chunk"
+
+
+def split_plan(
+    plan_type: str,
+    plan_data: Dict[str, Any],
+    min_bytes: int = 256
+) -> Tuple[Dict[str, Any], Dict[str, Dict[str, Any]]]:
+    """
+    Split a plan into the document stored in plan_data and its chunks.
+
+    Sections listed in CHUNKED_SECTIONS whose JSON is at least min_bytes
+    long are replaced by a {"$chunk": hash} reference; smaller ones stay
+    inline since the reference would save nothing. Returns the stored
+    document and a hash → {"section", "content"} mapping for plan_chunks.
+    """
+    stored = dict(plan_data)
+    chunks: Dict[str, Dict[str, Any]] = {}
+    for section in CHUNKED_SECTIONS[plan_type]:
+        content = stored.get(section)
+        if content is None:
+            continue
+
+        canonical = json_codec.dumps_canonical_bytes(content)
+        if len(canonical) < min_bytes:
+            continue
+
+        digest = hashlib.sha256(canonical).hexdigest()
+        chunks[digest] = {"section": section, "content": content}
+        stored[section] = {CHUNK_REF_KEY: digest}
+
+    return stored, chunks
@@ -0,0 +1,246 @@
+"""Connection pool instrumentation and adaptive concurrency limiting"""
+
+import asyncio
+from bisect import bisect_left
+from collections import deque
+from typing import Any, Deque, Dict, List
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is open-ended
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+# Distinct query texts tracked before further ones are grouped under "other"
+MAX_TRACKED_QUERIES = 200
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram with approximate percentiles"""
+
+    def __init__(self):
+        """Initialize an empty histogram"""
+        self.counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, elapsed_ms: float) -> None:
+        """Record one observation"""
+        self.counts[bisect_left(LATENCY_BUCKETS_MS, elapsed_ms)] += 1
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+
+    def percentile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th percentile (0 < q <= 1)"""
+        if not self.count:
+            return 0.0
+
+        rank = q * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                return float(LATENCY_BUCKETS_MS[i]) if i < len(LATENCY_BUCKETS_MS) else self.max_ms
+        return self.max_ms
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Counts per bucket plus summary statistics"""
+        labels = [f"le_{bound}ms" for bound in LATENCY_BUCKETS_MS] + ["inf"]
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "p50_ms": self.percentile(0.50),
+            "p95_ms": self.percentile(0.95),
+            "p99_ms": self.percentile(0.99),
+            "max_ms": round(self.max_ms, 3),
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+
+class PoolMetrics:
+    """
+    Acquire, checkout and query timings for one connection pool.
+
+    Acquire latency covers everything between asking for a connection and
+    getting one (limiter queue, pool queue, connect, health check), which is
+    what separates pool starvation from slow Postgres queries.
+    """
+
+    def __init__(self):
+        """Initialize empty metrics"""
+        self.acquire = LatencyHistogram()
+        self.checkout = LatencyHistogram()
+        self.acquires = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.in_use = 0
+        self.pending = 0
+        self.peak_in_use = 0
+        self._queries: Dict[str, Dict[str, float]] = {}
+        self._window = LatencyHistogram()
+        self._window_peak_in_use = 0
+
+    def start_acquire(self, capacity: int) -> bool:
+        """Register a caller asking for a connection; True when it has to queue"""
+        waited = self.in_use + self.pending >= capacity
+        self.pending += 1
+        if waited:
+            self.waits += 1
+        return waited
+
+    def record_acquire(self, elapsed_ms: float) -> None:
+        """Record a successful acquire"""
+        self.pending -= 1
+        self.acquires += 1
+        self.acquire.observe(elapsed_ms)
+        self._window.observe(elapsed_ms)
+        self.in_use += 1
+        self.peak_in_use = max(self.peak_in_use, self.in_use)
+        self._window_peak_in_use = max(self._window_peak_in_use, self.in_use)
+
+    def record_failed_acquire(self, timed_out: bool) -> None:
+        """Record an acquire that raised"""
+        self.pending -= 1
+        if timed_out:
+            self.timeouts += 1
+        else:
+            self.errors += 1
+
+    def record_release(self, held_ms: float) -> None:
+        """Record a connection going back to the pool"""
+        self.in_use -= 1
+        self.checkout.observe(held_ms)
+
+    def record_query(self, name: str, elapsed_ms: float, failed: bool = False) -> None:
+        """Aggregate timing for one executed query"""
+        if name not in self._queries and len(self._queries) >= MAX_TRACKED_QUERIES:
+            name = "other"
+
+        stats = self._queries.get(name)
+        if stats is None:
+            stats = self._queries[name] = {"calls": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0}
+        stats["calls"] += 1
+        stats["total_ms"] += elapsed_ms
+        stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+        if failed:
+            stats["errors"] += 1
+
+    def take_window(self) -> Dict[str, float]:
+        """Acquire stats since the previous call, for the adaptive controller"""
+        window = {
+            "acquires": self._window.count,
+            "p95_ms": self._window.percentile(0.95),
+            "peak_in_use": max(self._window_peak_in_use, self.in_use),
+        }
+        self._window = LatencyHistogram()
+        self._window_peak_in_use = self.in_use
+        return window
+
+    def snapshot(self, top_queries: int = 20) -> Dict[str, Any]:
+        """Metrics as a JSON-serializable dict, slowest queries (by total time) first"""
+        queries: List[Dict[str, Any]] = [
+            {
+                "query": name,
+                "calls": int(stats["calls"]),
+                "errors": int(stats["errors"]),
+                "total_ms": round(stats["total_ms"], 3),
+                "avg_ms": round(stats["total_ms"] / stats["calls"], 3),
+                "max_ms": round(stats["max_ms"], 3),
+            }
+            for name, stats in self._queries.items()
+        ]
+        queries.sort(key=lambda q: q["total_ms"], reverse=True)
+
+        return {
+            "acquires": self.acquires,
+            "waits": self.waits,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+            "in_use": self.in_use,
+            "pending": self.pending,
+            "peak_in_use": self.peak_in_use,
+            "acquire_latency": self.acquire.snapshot(),
+            "checkout_duration": self.checkout.snapshot(),
+            "queries": queries[:top_queries],
+        }
+
+
+class AdaptiveLimiter:
+    """
+    Cap on concurrently checked-out connections that can change at runtime.
+
+    asyncpg pools cannot be resized after creation, so with adaptive sizing
+    the pool is created at its upper bound and this limiter decides how many
+    connections may be in use. Connections above the limit are never handed
+    out and get closed by max_inactive_connection_lifetime.
+    """
+
+    def __init__(self, limit: int):
+        """Initialize with the starting limit"""
+        self.limit = limit
+        self.in_use = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def waiting(self) -> int:
+        """Number of callers queued for a slot"""
+        return len(self._waiters)
+
+    async def acquire(self) -> None:
+        """Take a slot, waiting in FIFO order when the limit is reached"""
+        if self.in_use < self.limit and not self._waiters:
+            self.in_use += 1
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as we were cancelled
+                self.release()
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+            raise
+
+    def release(self) -> None:
+        """Give a slot back and wake the next waiter"""
+        self.in_use -= 1
+        self._wake()
+
+    def set_limit(self, limit: int) -> None:
+        """Change the limit; slots above a lowered limit drain as they are released"""
+        self.limit = limit
+        self._wake()
+
+    def _wake(self) -> None:
+        while self._waiters and self.in_use < self.limit:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_use += 1
+                waiter.set_result(None)
+
+
+def next_pool_limit(
+    limit: int,
+    window: Dict[str, float],
+    min_size: int,
+    max_size: int,
+    grow_wait_ms: float,
+    step: int = 2,
+) -> int:
+    """
+    Pick the connection limit for the next interval from the last window.
+
+    Grows while the p95 acquire latency shows callers queueing for
+    connections; shrinks when less than half the limit was ever in use.
+    """
+    if not window["acquires"]:
+        return limit
+    if window["p95_ms"] >= grow_wait_ms and limit < max_size:
+        return min(max_size, limit + step)
+    if window["peak_in_use"] < limit // 2 and limit > min_size:
+        return max(min_size, limit - step)
+    return limit
+
@@ -0,0 +1,171 @@
+"""Cached user profile snapshots for personalization"""
+
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, fields
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from services.profile_completeness import UserProfileData
+from utils import json_codec
+
+
+@dataclass(frozen=True)
+class ProfileSnapshot:
+    """
+    Profile, extended profile and latest quiz answers of one user.
+
+    Snapshots are shared between requests through the cache: treat them
+    (including their list fields) as read-only.
+    """
+    user_id: str
+
+    # From the latest quiz
+    main_goal: Optional[str] = None
+    dietary_style: Optional[str] = None
+    activity_level: Optional[str] = None
+    exercise_frequency: Optional[str] = None
+
+    # From profiles
+    weight: Optional[float] = None
+    target_weight: Optional[float] = None
+    age: Optional[int] = None
+    gender: Optional[str] = None
+    height: Optional[float] = None
+
+    # From user_profile_extended
+    cooking_skill: Optional[str] = None
+    cooking_time: Optional[str] = None
+    grocery_budget: Optional[str] = None
+    meals_per_day: Optional[int] = None
+    food_allergies: Optional[List[str]] = None
+    disliked_foods: Optional[List[str]] = None
+    meal_prep_preference: Optional[str] = None
+    gym_access: Optional[bool] = None
+    equipment_available: Optional[List[str]] = None
+    workout_location_preference: Optional[str] = None
+    injuries_limitations: Optional[List[str]] = None
+    fitness_experience: Optional[str] = None
+    health_conditions: Optional[List[str]] = None
+    medications: Optional[List[str]] = None
+    sleep_quality: Optional[int] = None
+    stress_level: Optional[int] = None
+    dietary_restrictions: Optional[List[str]] = None
+
+    @classmethod
+    def from_record(cls, user_id: str, record: Any) -> "ProfileSnapshot":
+        """Build a snapshot from a USER_PROFILE_SQL row"""
+        answers = _as_dict(record["quiz_answers"])
+
+        columns = {
+            f.name: record[f.name]
+            for f in fields(cls)
+            if f.name not in _QUIZ_FIELDS and f.name != "user_id"
+        }
+        return cls(
+            user_id=str(user_id),
+            main_goal=answers.get("mainGoal"),
+            dietary_style=answers.get("dietaryStyle"),
+            activity_level=answers.get("activityLevel"),
+            exercise_frequency=answers.get("exerciseFrequency"),
+            **columns,
+        )
+
+    def to_profile_data(self) -> UserProfileData:
+        """Profile in the shape ProfileCompletenessService analyzes"""
+        values = {
+            f.name: getattr(self, f.name)
+            for f in fields(UserProfileData)
+            if f.name != "current_weight"
+        }
+        # Copy lists so the analysis cannot touch the cached snapshot
+        values = {k: list(v) if isinstance(v, list) else v for k, v in values.items()}
+        return UserProfileData(current_weight=self.weight, **values)
+
+
+def _as_dict(value: Any) -> Dict[str, Any]:
+    """Quiz answers as a dict, unwrapping legacy rows stored as a JSON string scalar"""
+    if isinstance(value, str):
+        try:
+            value = json_codec.loads(value)
+        except ValueError:
+            return {}
+    return value if isinstance(value, dict) else {}
+
+
+# Snapshot fields read from quiz answers rather than columns
+_QUIZ_FIELDS = ("main_goal", "dietary_style", "activity_level", "exercise_frequency")
+
+
+class ProfileRepository:
+    """
+    Per-user ProfileSnapshot cache in front of the profile query.
+
+    Entries live for at most ttl_seconds. While `caching` is on, the
+    database's profile_changed NOTIFY feed invalidates a user as soon as
+    their profile, extended profile or quiz results change; DatabaseService
+    turns caching off whenever that feed is down.
+    """
+
+    def __init__(
+        self,
+        load: Callable[[str], Awaitable[Optional[Any]]],
+        max_size: int = 10000,
+        ttl_seconds: float = 300.0
+    ):
+        """Initialize with a loader returning a profile row (or None) for a user ID"""
+        self._load = load
+        self._entries: "OrderedDict[str, Tuple[float, ProfileSnapshot]]" = OrderedDict()
+        # Bumped on invalidation so loads racing with a change are not cached;
+        # the epoch covers invalidations forgotten when _versions is reset
+        self._versions: Dict[str, int] = {}
+        self._epoch = 0
+        self._max_size = max_size
+        self._ttl_seconds = ttl_seconds
+        self.caching = False
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, user_id: str) -> Optional[ProfileSnapshot]:
+        """Snapshot for a user, or None if the profile does not exist"""
+        user_id = str(user_id)
+        entry = self._entries.get(user_id)
+        if entry is not None and self.caching:
+            expires_at, snapshot = entry
+            if expires_at >= time.monotonic():
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return snapshot
+            del self._entries[user_id]
+
+        self.misses += 1
+        version = (self._epoch, self._versions.get(user_id, 0))
+        record = await self._load(user_id)
+        if record is None:
+            return None
+
+        snapshot = ProfileSnapshot.from_record(user_id, record)
+        if self.caching and (self._epoch, self._versions.get(user_id, 0)) == version:
+            self._entries[user_id] = (time.monotonic() + self._ttl_seconds, snapshot)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+        return snapshot
+
+    def invalidate(self, user_id: str) -> None:
+        """Drop a user's snapshot after their profile changed"""
+        user_id = str(user_id)
+        self._entries.pop(user_id, None)
+        if user_id in self._versions or len(self._versions) < self._max_size:
+            self._versions[user_id] = self._versions.get(user_id, 0) + 1
+        else:
+            # Too many tracked users: start over
+            self.clear()
+
+    def clear(self) -> None:
+        """Drop every snapshot"""
+        self._entries.clear()
+        self._versions.clear()
+        self._epoch += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
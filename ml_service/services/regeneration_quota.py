@@ -0,0 +1,58 @@
+"""In-process view of monthly manual regeneration quotas"""
+
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Tuple
+
+
+def billing_period_start() -> datetime:
+    """Start of the current monthly billing period (UTC)"""
+    return datetime.now(timezone.utc).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+class RegenerationQuotaCache:
+    """
+    LRU cache of each user's tier, limit and regeneration usage for the
+    current billing period.
+
+    plan_regeneration_usage stays the source of truth: reservations are made
+    atomically in the database and their results are written back here, so
+    repeated eligibility checks are answered from memory. Entries expire
+    after ttl_seconds to pick up subscription changes and other instances'
+    reservations, and never carry over into a new billing period.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl_seconds: float = 60.0):
+        """Initialize an empty cache"""
+        self._entries: "OrderedDict[str, Tuple[float, datetime, Dict[str, Any]]]" = OrderedDict()
+        self._max_size = max_size
+        self._ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: str, period_start: datetime) -> Optional[Dict[str, Any]]:
+        """Return a copy of the user's usage for period_start, or None"""
+        entry = self._entries.get(user_id)
+        if entry is None or entry[0] < time.monotonic() or entry[1] != period_start:
+            self._entries.pop(user_id, None)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(user_id)
+        self.hits += 1
+        return dict(entry[2])
+
+    def put(self, user_id: str, period_start: datetime, usage: Dict[str, Any]) -> None:
+        """Store a user's usage, evicting the least recently used entry when full"""
+        self._entries[user_id] = (time.monotonic() + self._ttl_seconds, period_start, dict(usage))
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: str) -> None:
+        """Drop a single user's entry"""
+        self._entries.pop(user_id, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
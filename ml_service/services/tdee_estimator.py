@@ -0,0 +1,136 @@
+"""
+Adaptive energy expenditure (TDEE) estimate from logged intake and weight.
+
+calculate_tdee multiplies BMR by a fixed activity factor. This estimator
+learns a user's actual expenditure from energy balance instead: average
+daily intake minus the energy stored or released by the change in the
+smoothed weight trend (KCAL_PER_KG per kg). All averages are exponential,
+so each logged day updates a small fixed-size state in O(1) without
+rescanning history, and the state is persisted in tdee_estimator_state.
+
+Until there are enough observations the estimate falls back to the static
+calculate_tdee value, and it blends towards the learned value as
+confidence grows.
+"""
+
+from dataclasses import asdict, dataclass, fields
+from datetime import date
+from typing import Any, Dict, Optional
+
+# Energy content of a kilogram of body weight change
+KCAL_PER_KG = 7700
+
+# Smoothing per day for intake, weight trend and expenditure
+INTAKE_ALPHA = 0.1
+WEIGHT_ALPHA = 0.1
+TDEE_ALPHA = 0.05
+
+# Days logging fewer calories are treated as incomplete and ignored
+MIN_LOGGED_CALORIES = 800
+
+# Logged intake days needed before weight changes update the estimate
+MIN_INTAKE_DAYS = 7
+
+# Expenditure updates after which the learned value fully replaces the static one
+FULL_CONFIDENCE_UPDATES = 14
+
+# Plausible expenditure range; observations outside it are clamped
+MIN_TDEE, MAX_TDEE = 1000.0, 6000.0
+
+# Counters stop here, which also bounds them for smallint storage
+_MAX_COUNT = 1000
+
+
+@dataclass
+class TdeeState:
+    """Per-user estimator state (one tdee_estimator_state row)"""
+    observed_through: Optional[date] = None
+    intake_avg: Optional[float] = None
+    intake_days: int = 0
+    weight_trend: Optional[float] = None
+    weight_trend_date: Optional[date] = None
+    weight_days: int = 0
+    tdee: Optional[float] = None
+    tdee_updates: int = 0
+
+    @classmethod
+    def from_record(cls, record: Any) -> "TdeeState":
+        """Build a state from a tdee_estimator_state row (or any mapping with its columns)"""
+        return cls(**{f.name: record[f.name] for f in fields(cls)})
+
+    def to_dict(self) -> Dict[str, Any]:
+        """State as a dict keyed by column name"""
+        return asdict(self)
+
+
+# tdee_estimator_state columns holding the state, in TdeeState field order
+STATE_COLUMNS = tuple(f.name for f in fields(TdeeState))
+
+
+def _decay(alpha: float, days: int) -> float:
+    """Smoothing weight for an observation that follows the last one by `days` days"""
+    return 1 - (1 - alpha) ** days
+
+
+def observe_day(
+    state: TdeeState,
+    day: date,
+    calories: Optional[float],
+    weight: Optional[float]
+) -> TdeeState:
+    """
+    Fold one day's total logged calories and/or weight into the state.
+
+    Days must be observed in increasing order; a day at or before
+    observed_through is ignored. Each weight logged after the previous one
+    updates the expenditure estimate with the energy balance over the gap:
+    average intake minus the weight trend change converted to calories per
+    day.
+    """
+    if state.observed_through is not None and day <= state.observed_through:
+        return state
+    state.observed_through = day
+
+    if calories is not None and calories >= MIN_LOGGED_CALORIES:
+        state.intake_days = min(state.intake_days + 1, _MAX_COUNT)
+        if state.intake_avg is None:
+            state.intake_avg = float(calories)
+        else:
+            # Plain running mean until the exponential window fills up
+            alpha = max(INTAKE_ALPHA, 1 / state.intake_days)
+            state.intake_avg += alpha * (calories - state.intake_avg)
+
+    if weight is not None:
+        if state.weight_trend is None:
+            state.weight_trend = float(weight)
+        else:
+            days = (day - state.weight_trend_date).days
+            trend = state.weight_trend + _decay(WEIGHT_ALPHA, days) * (weight - state.weight_trend)
+
+            if state.intake_days >= MIN_INTAKE_DAYS:
+                stored_per_day = (trend - state.weight_trend) * KCAL_PER_KG / days
+                observed = min(MAX_TDEE, max(MIN_TDEE, state.intake_avg - stored_per_day))
+                if state.tdee is None:
+                    state.tdee = observed
+                else:
+                    state.tdee += _decay(TDEE_ALPHA, days) * (observed - state.tdee)
+                state.tdee_updates = min(state.tdee_updates + 1, _MAX_COUNT)
+
+            state.weight_trend = trend
+        state.weight_trend_date = day
+        state.weight_days = min(state.weight_days + 1, _MAX_COUNT)
+
+    return state
+
+
+def estimate_tdee(state: Optional[TdeeState], static_tdee: float) -> float:
+    """
+    TDEE to plan with: the static estimate blended towards the learned one.
+
+    The learned value's weight grows with the number of expenditure updates
+    and reaches 1 after FULL_CONFIDENCE_UPDATES.
+    """
+    if state is None or state.tdee is None:
+        return static_tdee
+    confidence = min(1.0, state.tdee_updates / FULL_CONFIDENCE_UPDATES)
+    return static_tdee + confidence * (state.tdee - static_tdee)
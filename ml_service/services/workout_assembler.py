@@ -0,0 +1,389 @@
+"""
+Rule-based workout plan assembler.
+
+BASIC workout plans only vary by goal and exercise frequency, so they are
+assembled from exercise_library instead of a model call: the goal's defaults
+(WorkoutPlanPromptBuilder._get_defaults_for_goal) give the training split,
+the frequency gives the number of workout days, and every day of the split
+is a list of muscle group slots. Each slot gets the best exercise for that
+muscle group by equipment, difficulty and variety over the week, with the
+goal's set/rep scheme. Output uses the weekly_plan shape of generated plans.
+
+The same inputs always give the same plan; a per-user tie-breaker spreads
+users over equally good exercises. Also used when the model is unavailable.
+"""
+
+import re
+import zlib
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+DIFFICULTIES = ("beginner", "intermediate", "advanced")
+
+# Library muscle_groups values that count for each slot muscle group
+MUSCLE_ALIASES = {
+    "chest": ("chest", "pectorals", "pecs", "upper chest", "lower chest"),
+    "back": ("back", "lats", "latissimus dorsi", "upper back", "middle back", "lower back", "rhomboids", "traps"),
+    "shoulders": ("shoulders", "deltoids", "delts", "front delts", "side delts", "rear delts"),
+    "quadriceps": ("quadriceps", "quads", "legs", "thighs"),
+    "hamstrings": ("hamstrings", "posterior chain"),
+    "glutes": ("glutes", "gluteus maximus", "hips", "hip flexors"),
+    "calves": ("calves",),
+    "biceps": ("biceps", "forearms"),
+    "triceps": ("triceps",),
+    "core": ("core", "abs", "abdominals", "obliques"),
+}
+
+MUSCLE_SLOTS = {alias: slot for slot, aliases in MUSCLE_ALIASES.items() for alias in aliases}
+
+# Library categories of the non-strength slots
+SLOT_CATEGORIES = {
+    "cardio": ("cardio", "conditioning", "hiit", "plyometrics"),
+    "mobility": ("flexibility", "mobility", "stretching", "balance", "yoga"),
+}
+
+# Days of each split as (workout type, muscle group slots); the first two
+# slots of a day favour compound exercises
+SPLITS = {
+    "push/pull/legs": (
+        ("Push Day", ("chest", "shoulders", "chest", "shoulders", "triceps")),
+        ("Pull Day", ("back", "back", "biceps", "shoulders", "core")),
+        ("Leg Day", ("quadriceps", "hamstrings", "glutes", "calves", "core")),
+    ),
+    "full body": (
+        ("Full Body A", ("quadriceps", "chest", "back", "shoulders", "core")),
+        ("Full Body B", ("hamstrings", "back", "chest", "triceps", "core")),
+        ("Full Body C", ("glutes", "shoulders", "back", "biceps", "core")),
+    ),
+}
+
+# Workout days of the week by number of workout days
+WEEKDAYS = {
+    2: ("Monday", "Thursday"),
+    3: ("Monday", "Wednesday", "Friday"),
+    4: ("Monday", "Tuesday", "Thursday", "Friday"),
+    5: ("Monday", "Tuesday", "Wednesday", "Friday", "Saturday"),
+}
+MIN_DAYS, MAX_DAYS = 2, 5
+
+# Days with fewer exercises than this make the plan fall back to the model
+MIN_EXERCISES_PER_DAY = 4
+
+# (sets, reps, rest seconds) of compound and isolation exercises, and tempo, by goal
+REP_SCHEMES = {
+    "lose_weight": {"compound": (3, "12-15", 60), "isolation": (3, "12-15", 45), "tempo": "2-0-1-0"},
+    "gain_muscle": {"compound": (4, "8-10", 90), "isolation": (3, "10-12", 60), "tempo": "3-0-1-0"},
+    "maintain": {"compound": (3, "8-12", 75), "isolation": (3, "10-12", 60), "tempo": "2-0-2-0"},
+    "improve_health": {"compound": (3, "10-12", 60), "isolation": (2, "12-15", 45), "tempo": "2-0-2-0"},
+}
+FINISHER_SCHEMES = {"cardio": (3, "30-45 sec", 30), "mobility": (2, "30-45 sec", 15)}
+
+INTENSITY = {
+    "lose_weight": "Moderate-High",
+    "gain_muscle": "Moderate-High",
+    "maintain": "Moderate",
+    "improve_health": "Low-Moderate",
+}
+
+# Equipment usable at home; exercises needing anything else are gym exercises
+HOME_EQUIPMENT = {
+    "", "none", "bodyweight", "body weight", "body only", "mat", "yoga mat", "dumbbell", "dumbbells",
+    "resistance band", "resistance bands", "band", "kettlebell", "chair", "bench", "step", "wall",
+}
+
+# Score penalties (lower scores win)
+SECONDARY_MUSCLE_PENALTY = 0.5
+ISOLATION_PENALTY = 0.3
+GYM_EQUIPMENT_PENALTY = 0.3
+HARDER_PENALTY = 1.0
+EASIER_PENALTY = 0.3
+UNVERIFIED_PENALTY = 0.1
+REPEAT_PENALTY = 1.0
+
+# Seconds of work per set, for session durations
+SET_SECONDS = 40
+WARMUP_MINUTES = COOLDOWN_MINUTES = 5
+
+# Metabolic equivalents of a strength session, for calories burned
+SESSION_MET = {"Low-Moderate": 3.5, "Moderate": 5.0, "Moderate-High": 6.0}
+
+WARMUPS = {
+    "upper": ["3 min light cardio (march or jog in place)", "Arm circles: 10 each direction",
+              "Band pull-aparts or scapular squeezes: 2x15", "Warm-up set of the first exercise"],
+    "lower": ["3 min light cardio (march or jog in place)", "Leg swings: 10 each leg",
+              "Bodyweight squats: 2x10", "Glute bridges: 2x10"],
+    "full": ["3 min light cardio (march or jog in place)", "Arm circles: 10 each direction",
+             "Bodyweight squats: 2x10", "Hip circles: 10 each direction"],
+}
+COOLDOWNS = {
+    "upper": ["Chest doorway stretch: 30s each side", "Cross-body shoulder stretch: 30s each side",
+              "Child's pose: 60 seconds", "Deep breathing: 1 minute"],
+    "lower": ["Standing quad stretch: 30s each side", "Seated hamstring stretch: 30s each side",
+              "Figure-four glute stretch: 30s each side", "Deep breathing: 1 minute"],
+    "full": ["Standing quad stretch: 30s each side", "Chest doorway stretch: 30s each side",
+             "Child's pose: 60 seconds", "Deep breathing: 1 minute"],
+}
+LOWER_BODY = {"quadriceps", "hamstrings", "glutes", "calves"}
+
+INSTRUCTIONS_MAX_CHARS = 180
+
+
+def workout_days(frequency: Optional[str]) -> Optional[int]:
+    """
+    Workout days per week from a frequency like '3-4 times/week' or 'Daily':
+    the top of the range, within MIN_DAYS-MAX_DAYS. None when not understood.
+    """
+    text = (frequency or "").lower()
+    if "daily" in text or "every day" in text:
+        return MAX_DAYS
+    numbers = [int(n) for n in re.findall(r"\d+", text)]
+    return min(MAX_DAYS, max(MIN_DAYS, max(numbers))) if numbers else None
+
+
+def split_days(training_split: str) -> Tuple[Tuple[str, Tuple[str, ...]], ...]:
+    """Days of a training split description, with its finisher slot (cardio/mobility) appended"""
+    text = training_split.lower()
+    days = SPLITS["push/pull/legs" if "push" in text and "pull" in text else "full body"]
+    finisher = next((slot for slot in SLOT_CATEGORIES if slot in text), None)
+    return tuple((name, slots + ((finisher,) if finisher else ())) for name, slots in days)
+
+
+def _difficulty_rank(value: Any) -> int:
+    """Index of a difficulty in DIFFICULTIES (unknown counts as beginner)"""
+    text = str(value or "").lower()
+    return next((rank for rank, name in enumerate(DIFFICULTIES) if name in text), 0)
+
+
+def _lower(values: Optional[Iterable[Any]]) -> List[str]:
+    """Lowercased, stripped strings of a text[] column"""
+    return [str(value).strip().lower() for value in values or () if value]
+
+
+def _instructions(value: Any) -> str:
+    """Library instructions (a list of steps or text) as one short paragraph"""
+    if isinstance(value, list):
+        value = " ".join(
+            str(step.get("text", "")) if isinstance(step, dict) else str(step) for step in value
+        )
+    text = " ".join(str(value or "").split())
+    return text if len(text) <= INSTRUCTIONS_MAX_CHARS else text[:INSTRUCTIONS_MAX_CHARS - 3].rstrip() + "..."
+
+
+class _Library:
+    """Exercise library rows grouped by slot, with the user's selection rules"""
+
+    def __init__(
+        self,
+        exercises: Sequence[Dict[str, Any]],
+        level: int,
+        gym: Optional[bool],
+        equipment: Iterable[str],
+        seed: str
+    ):
+        available = HOME_EQUIPMENT | set(_lower(equipment))
+        self.uses: Dict[Any, int] = {}
+        # Difficulty rank, home-only equipment and compound flag by exercise id
+        self.traits: Dict[Any, Tuple[int, bool, bool]] = {}
+        # Allowed exercises of each slot as (static penalty, tie-breaker, exercise),
+        # and every exercise of each slot for alternatives
+        self.slots: Dict[str, List[Tuple[float, int, Dict[str, Any]]]] = {}
+        self.members: Dict[str, List[Dict[str, Any]]] = {}
+
+        for exercise in exercises:
+            muscles = _lower(exercise.get("muscle_groups"))
+            gear = _lower(exercise.get("equipment"))
+            rank = _difficulty_rank(exercise.get("difficulty"))
+            home = all(item in HOME_EQUIPMENT for item in gear)
+            self.traits[exercise["id"]] = (rank, home, len(muscles) >= 2)
+
+            category = str(exercise.get("category") or "").lower()
+            finisher = next((slot for slot, names in SLOT_CATEGORIES.items() if category in names), None)
+            if finisher:
+                slots = {finisher: True}
+            else:
+                matched = [MUSCLE_SLOTS[muscle] for muscle in muscles if muscle in MUSCLE_SLOTS]
+                slots = {slot: slot == MUSCLE_SLOTS.get(muscles[0]) for slot in matched}
+            allowed = rank <= level + 1 and (gym is not False or all(item in available for item in gear))
+            gap = rank - level
+            penalty = (
+                (GYM_EQUIPMENT_PENALTY if gym is None and not home else 0)
+                + (HARDER_PENALTY * gap if gap > 0 else EASIER_PENALTY * -gap)
+                + (0 if exercise.get("verified") else UNVERIFIED_PENALTY)
+            )
+            order = zlib.crc32(f"{seed}:{exercise['id']}".encode())
+            for slot, primary in slots.items():
+                self.members.setdefault(slot, []).append((order, exercise))
+                if allowed:
+                    self.slots.setdefault(slot, []).append(
+                        (penalty + (0 if primary else SECONDARY_MUSCLE_PENALTY), order, exercise)
+                    )
+
+        self.members = {
+            slot: [exercise for _, exercise in sorted(members, key=lambda member: member[0])]
+            for slot, members in self.members.items()
+        }
+
+    def is_home(self, exercise: Dict[str, Any]) -> bool:
+        """Whether an exercise needs only home equipment"""
+        return self.traits[exercise["id"]][1]
+
+    def is_compound(self, exercise: Dict[str, Any]) -> bool:
+        """Whether an exercise works several muscle groups"""
+        return self.traits[exercise["id"]][2]
+
+    def pick(self, slot: str, compound_slot: bool, exclude: Iterable[Any]) -> Optional[Dict[str, Any]]:
+        """
+        Best allowed exercise for a slot, counted as used for the rest of the
+        week; compound slots penalize isolation exercises, and every earlier
+        use in the week adds REPEAT_PENALTY.
+        """
+        excluded = set(exclude)
+        options = [
+            (
+                penalty
+                + (ISOLATION_PENALTY if compound_slot and not self.is_compound(exercise) else 0)
+                + REPEAT_PENALTY * self.uses.get(exercise["id"], 0),
+                order,
+                index,
+            )
+            for index, (penalty, order, exercise) in enumerate(self.slots.get(slot, ()))
+            if exercise["id"] not in excluded
+        ]
+        if not options:
+            return None
+        exercise = self.slots[slot][min(options)[2]][2]
+        self.uses[exercise["id"]] = self.uses.get(exercise["id"], 0) + 1
+        return exercise
+
+    def alternatives(self, exercise: Dict[str, Any], slot: str) -> Dict[str, str]:
+        """Home, easier and harder options: the library's own, else other exercises of the slot"""
+        own = exercise.get("alternatives")
+        alternatives = {k: str(v) for k, v in own.items() if v} if isinstance(own, dict) else {}
+        rank = self.traits[exercise["id"]][0]
+        others = [e for e in self.members.get(slot, ()) if e["id"] != exercise["id"]]
+        found = {
+            "home": None if self.is_home(exercise) else next((e for e in others if self.is_home(e)), None),
+            "easier": next((e for e in others if self.traits[e["id"]][0] < rank), None),
+            "harder": next((e for e in others if self.traits[e["id"]][0] > rank), None),
+        }
+        for key, other in found.items():
+            if other and key not in alternatives:
+                alternatives[key] = other["name"]
+        return alternatives
+
+
+def _exercise(
+    library: _Library,
+    exercise: Dict[str, Any],
+    slot: str,
+    scheme: Tuple[int, str, int],
+    category: str,
+    tempo: Optional[str]
+) -> Dict[str, Any]:
+    """A chosen library exercise in the weekly_plan exercise shape"""
+    sets, reps, rest = scheme
+    planned = {
+        "exercise_id": str(exercise["id"]),
+        "name": exercise["name"],
+        "category": category,
+        "sets": sets,
+        "reps": reps,
+        "rest_seconds": rest,
+        "instructions": _instructions(exercise.get("instructions") or exercise.get("description")),
+        "muscle_groups": _lower(exercise.get("muscle_groups")) or [slot],
+        "difficulty": DIFFICULTIES[_difficulty_rank(exercise.get("difficulty"))],
+        "equipment_needed": _lower(exercise.get("equipment")) or ["bodyweight"],
+        "alternatives": library.alternatives(exercise, slot),
+    }
+    if tempo:
+        planned["tempo"] = tempo
+    return planned
+
+
+def assemble_workout_plan(
+    exercises: Sequence[Dict[str, Any]],
+    goal: str,
+    defaults: Dict[str, Any],
+    frequency: Optional[str] = None,
+    experience: Optional[str] = None,
+    gym_access: Optional[bool] = None,
+    equipment: Iterable[str] = (),
+    weight_kg: Optional[float] = None,
+    seed: str = ""
+) -> Optional[Dict[str, Any]]:
+    """
+    A weekly workout plan from exercise_library rows, or None when the
+    library cannot fill MIN_EXERCISES_PER_DAY exercises on some day.
+
+    `defaults` are the prompt builder's defaults for the goal (training
+    split and frequency). Without gym_access, exercises needing only home
+    equipment are preferred; with gym_access False they are required.
+    """
+    days = workout_days(frequency) or workout_days(defaults.get("exercise_frequency")) or 3
+    split = split_days(defaults.get("training_split") or "")
+    schemes = REP_SCHEMES.get(goal, REP_SCHEMES["maintain"])
+    level = _difficulty_rank(experience)
+    intensity = INTENSITY.get(goal, "Moderate")
+    library = _Library(exercises, level, gym_access, equipment, seed)
+
+    weekly_plan = []
+    for day, (workout_type, slots) in zip(WEEKDAYS[days], (split[i % len(split)] for i in range(days))):
+        planned, chosen = [], []
+        for position, slot in enumerate(slots):
+            exercise = library.pick(slot, position < 2, (e["id"] for e in chosen))
+            if not exercise:
+                continue
+            chosen.append(exercise)
+            if slot in SLOT_CATEGORIES:
+                scheme, category, tempo = FINISHER_SCHEMES[slot], "cardio" if slot == "cardio" else "flexibility", None
+            else:
+                kind = "compound" if library.is_compound(exercise) else "isolation"
+                scheme, category, tempo = schemes[kind], kind, schemes["tempo"]
+            if level == 0:
+                scheme = (min(scheme[0], 3), *scheme[1:])
+            planned.append(_exercise(library, exercise, slot, scheme, category, tempo))
+        if len(planned) < MIN_EXERCISES_PER_DAY:
+            return None
+
+        strength_slots = [slot for slot in slots if slot in MUSCLE_ALIASES]
+        region = (
+            "lower" if all(slot in LOWER_BODY | {"core"} for slot in strength_slots)
+            else "upper" if not LOWER_BODY & set(strength_slots) else "full"
+        )
+        work_seconds = sum(e["sets"] * (SET_SECONDS + e["rest_seconds"]) for e in planned)
+        home = all(library.is_home(exercise) for exercise in chosen)
+        duration = WARMUP_MINUTES + COOLDOWN_MINUTES + round(work_seconds / 60 / 5) * 5
+        weekly_plan.append({
+            "day": day,
+            "workout_type": workout_type,
+            "training_location": "Home" if home else "Gym",
+            "focus": ", ".join(dict.fromkeys(slot.title() for slot in slots)),
+            "duration_minutes": duration,
+            "intensity": intensity,
+            "exercises": planned,
+            "warmup": {"duration_minutes": WARMUP_MINUTES, "activities": WARMUPS[region]},
+            "cooldown": {"duration_minutes": COOLDOWN_MINUTES, "activities": COOLDOWNS[region]},
+        })
+
+    total_minutes = sum(day["duration_minutes"] for day in weekly_plan)
+    finisher = next((slot for slot in split[0][1] if slot in SLOT_CATEGORIES), None)
+    return {
+        "weekly_plan": weekly_plan,
+        "weekly_summary": {
+            "total_workout_days": len(weekly_plan),
+            "strength_days": len(weekly_plan),
+            "cardio_days": len(weekly_plan) if finisher == "cardio" else 0,
+            "rest_days": 7 - len(weekly_plan),
+            "total_time_minutes": total_minutes,
+            "total_exercises": sum(len(day["exercises"]) for day in weekly_plan),
+            "difficulty_level": DIFFICULTIES[level],
+            "estimated_weekly_calories_burned": round(
+                SESSION_MET[intensity] * (weight_kg or 70) * total_minutes / 60
+            ),
+            "training_split": defaults.get("training_split"),
+            "progression_strategy": "Add a rep each session; when you hit the top of the rep range on every set, "
+                                    "increase the load and start again at the bottom. Deload every 4th week.",
+            "notes": "Built from our exercise library for your goal. As you share more preferences (equipment, "
+                     "training location, experience level), we'll personalize this plan further. "
+                     "Focus on form over speed.",
+        },
+    }
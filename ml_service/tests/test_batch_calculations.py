@@ -0,0 +1,73 @@
+# tests/test_batch_calculations.py
+
+import random
+
+import numpy as np
+
+from models.quiz import QuickOnboardingData
+from utils.batch_calculations import (
+    calculate_nutrition_profiles,
+    encode_dietary_styles,
+    encode_exercise_frequencies,
+    encode_genders,
+    encode_goals,
+    encode_occupations,
+    round_to,
+)
+from utils.calculations import calculate_nutrition_profile
+
+GENDERS = ["male", "Female", "other"]
+FREQUENCIES = ["Never", "1-2 times/week", "3-4 times/week", "5-6 times/week", "Daily", "sometimes"]
+OCCUPATIONS = ["desk job", "Physical labor", "on feet all day", "student"]
+GOALS = ["weight loss", "extreme weight loss", "body recomposition", "recomposition", "build muscle", "other"]
+DIETS = ["balanced", "keto", "vegan", "vegan keto"]
+
+
+def _random_users(count, seed=7):
+    rng = random.Random(seed)
+    users = []
+    for _ in range(count):
+        weight = round(rng.uniform(40, 180), rng.choice([0, 1, 2]))
+        users.append({
+            "weight": weight,
+            "height": round(rng.uniform(140, 210), rng.choice([0, 1])),
+            "age": rng.randint(16, 85),
+            "gender": rng.choice(GENDERS),
+            "exercise_frequency": rng.choice(FREQUENCIES),
+            "activity_level": rng.choice(OCCUPATIONS),
+            "main_goal": rng.choice(GOALS),
+            "dietary_style": rng.choice(DIETS),
+            "target_weight": rng.choice([0, weight, round(rng.uniform(45, 150), 1)]),
+        })
+    return users
+
+
+def test_batch_profiles_match_scalar_bit_for_bit():
+    """Every batch result equals calculate_nutrition_profile exactly"""
+    users = _random_users(3000)
+    profiles = calculate_nutrition_profiles(
+        np.array([u["weight"] for u in users]),
+        np.array([u["height"] for u in users]),
+        np.array([u["age"] for u in users]),
+        encode_genders(u["gender"] for u in users),
+        encode_exercise_frequencies(u["exercise_frequency"] for u in users),
+        encode_occupations(u["activity_level"] for u in users),
+        encode_goals(u["main_goal"] for u in users),
+        encode_dietary_styles(u["dietary_style"] for u in users),
+        np.array([u["target_weight"] for u in users], dtype=np.float64),
+    )
+
+    for i, user in enumerate(users):
+        expected = calculate_nutrition_profile(QuickOnboardingData(**user))
+        expected.update(expected.pop("macros"))
+        for key, value in expected.items():
+            if value is None:
+                assert np.isnan(profiles[key][i]), (key, user)
+            else:
+                assert float(profiles[key][i]).hex() == float(value).hex(), (key, user)
+
+
+def test_round_to_matches_builtin_round_at_boundaries():
+    """Values whose scaled form lands near .5 round like the builtin"""
+    values = np.array([2.675, 1.115, 0.125, 0.375, 1.005, 1234.565, -0.125, 2.5, 1e-7])
+    assert [float(v).hex() for v in round_to(values, 2)] == [round(v, 2).hex() for v in values.tolist()]
@@ -0,0 +1,28 @@
+# tests/test_data_export.py
+
+from datetime import date
+
+from services.data_export import EXPORT_SOURCES, select_sources, source_query
+
+
+def test_export_type_selects_categories():
+    """Full exports cover every core category; analytics and photos are opt-in"""
+    full = {source.category for source in select_sources("full", False, False)}
+    assert full == {"plans", "nutrition", "workouts", "body"}
+
+    workouts = select_sources("workouts", include_analytics=True, include_photos=False)
+    assert {source.category for source in workouts} == {"workouts", "analytics"}
+
+
+def test_source_query_binds_only_given_date_bounds():
+    """Open-ended ranges add no condition; bounds are inclusive dates"""
+    weight = next(source for source in EXPORT_SOURCES if source.table == "weight_history")
+
+    query, args = source_query(weight, False, "user-1", date_range_end=date(2026, 1, 31))
+    assert args == ["user-1", date(2026, 1, 31)]
+    assert "t.log_date < $2::date + 1" in query
+    assert ">=" not in query
+
+    query, args = source_query(weight, True, "user-1")
+    assert query.startswith("SELECT to_jsonb(t) FROM weight_history t")
+    assert args == ["user-1"]
@@ -0,0 +1,24 @@
+# tests/test_db_statements.py
+
+import asyncio
+import inspect
+
+import asyncpg
+
+from services.db_statements import StatementRegistry, supports_cache_warming
+
+
+def test_pinned_asyncpg_supports_cache_warming():
+    """The pinned asyncpg still has the statement cache entry point warming relies on"""
+    assert supports_cache_warming()
+    assert list(inspect.signature(asyncpg.Connection._get_statement).parameters)[1:3] == ["query", "timeout"]
+
+
+def test_warming_disables_itself_without_the_internal():
+    """A connection without the internal leaves statements cold instead of failing"""
+    registry = StatementRegistry({"one": "SELECT 1"})
+
+    asyncio.run(registry.prepare_connection(object()))
+
+    assert not registry.enabled
+    assert registry.prepared_connections == 0
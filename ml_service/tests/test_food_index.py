@@ -0,0 +1,51 @@
+# tests/test_food_index.py
+
+from datetime import datetime
+
+from services.food_index import _IndexData, normalize_name, parse_quantity
+
+
+def _record(row_id, name, serving_qty=100, serving_unit="g", calories=100.0, verified=False, active=True):
+    """A food_database row as read by the index"""
+    return {
+        "id": row_id, "name": name, "generic": True, "verified": verified,
+        "serving_qty": serving_qty, "serving_unit": serving_unit,
+        "calories": calories, "protein": 10.0, "carbs": 5.0, "fats": 1.0, "fiber": None,
+        "updated_at": datetime(2026, 10, 1), "active": active,
+    }
+
+
+def test_names_and_portions_normalized():
+    """Names lose case, punctuation, notes and plurals; portions parse mixed fractions and unit aliases"""
+    assert normalize_name("Eggs, Large (boiled)") == "egg large"
+    assert normalize_name("Fresh Blueberries") == "blueberry"
+    assert parse_quantity("1 1/2 Cups cooked") == (1.5, "cup")
+    assert parse_quantity("150g") == (150.0, "g")
+    assert parse_quantity("2 tablespoons") == (2.0, "tbsp")
+    assert parse_quantity("a handful") is None
+
+
+def test_exact_fuzzy_and_refreshed_matches():
+    """Exact names win, fuzzy matches need enough overlap, and updates relink rows"""
+    data = _IndexData()
+    data.apply("food", _record("f1", "Chicken Breast, cooked", calories=165.0))
+    data.apply("food", _record("f2", "Brown Rice", serving_qty=1, serving_unit="cups", calories=216.0))
+    data.apply("food", _record("f3", "Greek Yogurt, plain, nonfat", calories=59.0))
+
+    row, score = data.match(normalize_name("chicken breasts cooked"))
+    assert (data.ids[row], score) == ("f1", 1.0)
+
+    rice = data.result(*data.match(normalize_name("brown rice")))
+    assert rice.serving_grams == 240.0
+    assert rice.grams(0.5, "cup") == 120.0
+    assert round(rice.per_gram()["calories"], 2) == 0.9
+
+    row, score = data.match(normalize_name("greek yoghurt"))
+    assert data.ids[row] == "f3" and 0.5 <= score < 1.0
+    assert data.match(normalize_name("salmon fillet")) is None
+
+    data.apply("food", _record("f1", "Chicken Thigh, cooked", calories=209.0))
+    data.apply("food", _record("f3", "Greek Yogurt, plain, nonfat", active=False))
+    assert data.match(normalize_name("chicken breast cooked"))[1] < 1.0
+    assert data.match(normalize_name("greek yogurt")) is None
+    assert data.counts == {"food": 2, "recipe": 0}
@@ -0,0 +1,26 @@
+# tests/test_macro_recompute.py
+
+from jobs.macro_recompute import compute_targets
+from utils.calculations import calculate_bmr, calculate_goal_calories, calculate_macros, calculate_tdee
+
+
+def test_recomputed_targets_match_onboarding_calculation():
+    """Targets equal the scalar onboarding calculation with the logged weight"""
+    rows = [
+        {"user_id": "u1", "weight": 82.4, "height": 180.0, "age": 34, "gender": "male",
+         "main_goal": "Weight Loss", "dietary_style": "keto", "exercise_frequency": "3-4 times/week"},
+        {"user_id": "u2", "weight": 61.0, "height": 165.5, "age": 29, "gender": "female",
+         "main_goal": "build muscle", "dietary_style": None, "exercise_frequency": None},
+        {"user_id": "u3", "weight": 70.0, "height": None, "age": 40, "gender": "male",
+         "main_goal": "maintain", "dietary_style": "vegan", "exercise_frequency": "Daily"},
+    ]
+
+    records = compute_targets(rows)
+
+    assert [record[0] for record in records] == ["u1", "u2"]
+    for row, record in zip(rows, records):
+        bmr = calculate_bmr(row["weight"], row["height"], row["age"], row["gender"])
+        tdee = calculate_tdee(bmr, row["exercise_frequency"] or "Never", "Desk job")
+        calories = calculate_goal_calories(tdee, row["main_goal"], bmr, row["gender"])
+        macros = calculate_macros(calories, row["weight"], row["main_goal"], row["dietary_style"] or "")
+        assert record[1:] == (row["weight"], calories, macros["protein_g"], macros["carbs_g"], macros["fat_g"])
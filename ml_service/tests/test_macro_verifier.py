@@ -0,0 +1,68 @@
+# tests/test_macro_verifier.py
+
+from services.macro_verifier import MACRO_TOLERANCE, verify_meal_plan
+
+NUTRITION = {"goalCalories": 2000, "macros": {"protein_g": 150, "carbs_g": 200, "fat_g": 67}}
+
+# Per-gram values of a few foods, as returned by get_food_references
+REFERENCE = {
+    "chicken breast": {"calories": 1.65, "protein": 0.31, "carbs": 0.0, "fats": 0.036, "fiber": 0.0},
+    "white rice": {"calories": 1.30, "protein": 0.027, "carbs": 0.28, "fats": 0.003, "fiber": 0.004},
+    "olive oil": {"calories": 8.84, "protein": 0.0, "carbs": 0.0, "fats": 1.0, "fiber": 0.0},
+}
+
+
+def _plan():
+    """A day whose stated totals match the targets but whose portions fall short of them"""
+    def food(name, grams, calories):
+        return {"name": name, "portion": f"1 serving / {grams}g", "grams": grams, "calories": calories,
+                "protein": 0, "carbs": 0, "fats": 0}
+
+    return {
+        "meals": [
+            {"meal_type": "lunch", "total_calories": 1000, "foods": [
+                food("Chicken Breast", 200, 500), food("White Rice", 250, 400), food("Olive Oil", 15, 100),
+            ]},
+            {"meal_type": "dinner", "total_calories": 1000, "foods": [
+                food("Chicken  breast", 200, 500), food("White rice", 250, 400), food("Olive oil", 15, 100),
+            ]},
+            {"meal_type": "snack", "total_calories": 200, "total_protein": 20, "total_carbs": 20, "total_fats": 5},
+        ],
+        "daily_totals": {"calories": 2000, "protein": 150, "carbs": 200, "fats": 67, "variance": "± 5%"},
+    }
+
+
+def test_portions_rescaled_to_targets():
+    """Macros come from the reference foods and portions are scaled until the day is within tolerance"""
+    plan = _plan()
+
+    report = verify_meal_plan(plan, NUTRITION, REFERENCE)
+
+    assert report["method"] == "least_squares"
+    assert (report["foods"], report["matched_foods"]) == (6, 6)
+    assert report["deviation_before"]["calories"] < -MACRO_TOLERANCE
+    assert report["within_tolerance"]
+
+    lunch = plan["meals"][0]
+    chicken = lunch["foods"][0]
+    assert chicken["portion"] == f"{chicken['grams']}g"
+    assert chicken["calories"] == round(1.65 * chicken["grams"])
+    assert lunch["total_calories"] == sum(food["calories"] for food in lunch["foods"])
+    totals = plan["daily_totals"]
+    assert totals["calories"] == sum(meal["total_calories"] for meal in plan["meals"])
+    assert abs(totals["calories"] - 2000) <= MACRO_TOLERANCE * 2000
+    assert totals["variance"] == "± 5%"
+
+
+def test_on_target_plan_only_recomputed():
+    """A day already within tolerance keeps its portions; unknown foods use their own numbers"""
+    plan = {"meals": [{"meal_type": "lunch", "foods": [
+        {"name": "Mystery stew", "portion": "1 bowl", "grams": 400,
+         "calories": 2000, "protein": 150, "carbs": 200, "fats": 67},
+    ]}]}
+
+    report = verify_meal_plan(plan, NUTRITION, REFERENCE)
+
+    assert (report["method"], report["matched_foods"], report["scaled_foods"]) == ("recomputed", 0, 0)
+    assert plan["meals"][0]["foods"][0]["portion"] == "1 bowl"
+    assert plan["daily_totals"] == {"calories": 2000, "protein": 150, "carbs": 200, "fats": 67}
@@ -0,0 +1,61 @@
+# tests/test_meal_plan_solver.py
+
+from services.meal_plan_solver import TARGET_TOLERANCE, dietary_tags, food_exclusions, solve_meal_plan
+
+NUTRITION = {"goalCalories": 2000, "macros": {"protein_g": 150, "carbs_g": 200, "fat_g": 67}}
+
+
+def _recipe(id, meal_types, calories, protein, carbs, fats, **extra):
+    """A candidate row as returned by get_meal_candidates"""
+    return {"id": id, "source": "recipe", "name": f"Recipe {id}", "meal_types": meal_types, "calories": calories,
+            "protein": protein, "carbs": carbs, "fats": fats, "tags": [], **extra}
+
+
+CANDIDATES = [
+    _recipe("b1", ["breakfast"], 300, 25, 30, 9, ingredients=[
+        {"name": "rolled oats", "quantity": 40, "unit": "g"}, {"name": "greek yogurt", "quantity": 1, "unit": "cup"},
+    ], instructions=["Mix the oats and yogurt.", "Chill overnight."]),
+    _recipe("b2", ["breakfast"], 450, 10, 70, 15),
+    _recipe("l1", ["lunch", "dinner"], 350, 35, 30, 10, ingredients=["150g chicken breast", "1 cup white rice"]),
+    _recipe("l2", ["lunch", "dinner"], 500, 20, 60, 20),
+    _recipe("d1", ["dinner"], 400, 30, 40, 13),
+    _recipe("s1", ["snack"], 200, 15, 20, 7),
+]
+
+
+def test_day_assembled_within_tolerance():
+    """Each slot gets a distinct meal portioned in quarter servings, landing the day on target"""
+    plan, report = solve_meal_plan(CANDIDATES, NUTRITION, 4, seed="user-1")
+
+    assert [meal["meal_type"] for meal in plan["meals"]] == ["breakfast", "lunch", "snack", "dinner"]
+    assert len({meal["meal_name"] for meal in plan["meals"]}) == 4
+    assert report["within_tolerance"]
+    assert all(abs(d) <= TARGET_TOLERANCE for d in report["deviation"].values())
+    assert plan["daily_totals"]["calories"] == sum(meal["total_calories"] for meal in plan["meals"])
+
+    breakfast = plan["meals"][0]
+    assert breakfast["foods"][0]["recipe_id"] == "b1"
+    assert breakfast["recipe"].startswith("Ingredients: ")
+    assert "rolled oats" in " ".join(plan["shopping_list"]["carbs"])
+    assert solve_meal_plan(CANDIDATES, NUTRITION, 4, seed="user-1")[0] == plan
+
+
+def test_missing_slot_and_dietary_styles():
+    """No plan without a candidate for every slot; dietary styles map to accepted recipe tags"""
+    assert solve_meal_plan([c for c in CANDIDATES if c["id"] != "s1"], NUTRITION, 4) is None
+    assert solve_meal_plan([], NUTRITION, 3) is None
+
+    assert dietary_tags("vegetarian") == ("vegetarian", "vegan")
+    assert dietary_tags("Keto") == ("keto",)
+    assert dietary_tags("balanced") is None
+    assert dietary_tags(None) is None
+
+
+def test_food_exclusions():
+    """Known allergies map to tags and ingredient keywords; any unknown one leaves the plan to the model"""
+    tags, keywords = food_exclusions(["Peanuts", "Tree Nuts", "none"], ["Brussels Sprouts"])
+
+    assert {"peanut", "peanuts", "nuts"} <= set(tags)
+    assert {"peanut", "almond", "brussels sprouts"} <= set(keywords)
+    assert food_exclusions(None) == ((), ())
+    assert food_exclusions(["Dairy", "Kiwi"]) is None
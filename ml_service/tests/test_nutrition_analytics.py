@@ -0,0 +1,86 @@
+# tests/test_nutrition_analytics.py
+
+from datetime import date
+
+import pandas as pd
+
+from jobs.nutrition_analytics import compute_period_analytics, compute_trends
+
+
+def _days(user_id, calories, first_changed="2026-10-01"):
+    """Daily totals for consecutive days from 2026-10-01 with a 2000 kcal target"""
+    count = len(calories)
+    return pd.DataFrame({
+        "user_id": user_id,
+        "log_date": pd.date_range("2026-10-01", periods=count),
+        "first_changed": pd.Timestamp(first_changed),
+        "calories": calories,
+        "protein": [120.0] * count,
+        "carbs": [200.0] * count,
+        "fats": [60.0] * count,
+        "meals": [3] * count,
+        "breakfast": [True] * count,
+        "lunch": [True] * count,
+        "dinner": [False] + [True] * (count - 1),
+        "target_calories": [2000.0] * count,
+        "target_protein": [120.0] * count,
+        "target_carbs": [200.0] * count,
+        "target_fats": [60.0] * count,
+    })
+
+
+def test_trends_average_logged_days_per_user():
+    """Rolling averages stay within each user and start at the first changed day"""
+    days = pd.concat([
+        _days("b", [1000.0, 3000.0]),
+        _days("a", [2000.0, 2200.0, 2400.0], first_changed="2026-10-02"),
+    ])
+
+    trends = compute_trends(days)
+
+    assert list(zip(trends["user_id"], trends["trend_date"].dt.day)) == [("a", 2), ("a", 3), ("b", 1), ("b", 2)]
+    assert list(trends["avg_calories_7d"]) == [2100, 2200, 1000, 2000]
+    assert trends["calories_variance_7d"].iloc[3] == pd.Series([1000.0, 3000.0]).std()
+
+
+def test_period_analytics_adherence_and_streaks():
+    """Weekly adherence counts days within 10% of target; streaks follow logged days"""
+    # Thu 1st to Sun 4th logged, Mon 5th missing, Tue 6th logged
+    days = _days("a", [2000.0, 2500.0, 1900.0, 1500.0, 2000.0])
+    days.loc[4, "log_date"] = pd.Timestamp("2026-10-06")
+    items = pd.DataFrame({
+        "user_id": ["a", "a", "a"],
+        "log_date": pd.to_datetime(["2026-10-01", "2026-10-02", "2026-10-06"]),
+        "meal_type": ["lunch", "lunch", "lunch"],
+        "food_name": ["rice", "rice", "egg"],
+        "hour": [12, 13, 12],
+    })
+
+    analytics = compute_period_analytics(days, items, through=date(2026, 10, 7))
+    weekly = analytics[analytics["analysis_period"] == "weekly"].set_index("period_start_date")
+
+    first_week = weekly.loc[pd.Timestamp("2026-09-28")]
+    assert first_week["days_tracked"] == 4
+    assert first_week["days_on_target"] == 2
+    assert first_week["days_over_calories"] == 1
+    assert first_week["days_under_calories"] == 1
+    assert first_week["common_skip_meal"] == "dinner"
+    assert first_week["longest_streak"] == 4
+    assert first_week["most_common_foods"] == [{"food": "rice", "count": 2}]
+
+    current_week = weekly.loc[pd.Timestamp("2026-10-05")]
+    assert current_week["total_possible_days"] == 3
+    assert current_week["current_streak"] == 0
+    assert current_week["longest_streak"] == 1
+
+
+def test_period_analytics_without_meal_items():
+    """Days logged as totals only get empty food statistics"""
+    items = pd.DataFrame(columns=["user_id", "log_date", "meal_type", "food_name", "hour"])
+    items["log_date"] = pd.to_datetime(items["log_date"])
+
+    analytics = compute_period_analytics(_days("a", [2000.0, 2100.0]), items, through=date(2026, 10, 2))
+
+    assert list(analytics["most_common_foods"]) == [[], []]
+    assert list(analytics["most_common_meal_times"]) == [{}, {}]
+    assert list(analytics["unique_foods_logged"]) == [0, 0]
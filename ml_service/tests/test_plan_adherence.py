@@ -0,0 +1,66 @@
+# tests/test_plan_adherence.py
+
+from datetime import date
+
+import pandas as pd
+
+from jobs.plan_adherence import plan_targets, score_meals, score_workouts
+
+
+def test_plan_targets_normalize_plan_data():
+    """Meal types map to log meal types, numbers are parsed from strings and rest days are ignored"""
+    meal = plan_targets({
+        "plan_id": "p1", "plan_type": "meal", "user_id": "u1", "plan_version": None,
+        "meals": [["Breakfast", 450, "30g"], ["Afternoon Snack", "200 kcal", None]],
+        "daily_calories": None, "daily_protein": "120",
+    })
+    assert meal[4:10] == (["breakfast", "snack"], [450.0, 200.0], [30.0, 0.0], 650, 120.0, None)
+
+    workout = plan_targets({
+        "plan_id": "p2", "plan_type": "workout", "user_id": "u1", "plan_version": None,
+        "training_days": ["Friday", "Monday", "Someday"],
+    })
+    assert workout[4:10] == (None, None, None, None, None, [1, 5])
+
+
+def test_meals_followed_by_source_or_calories():
+    """Planned meals count as followed when logged from the plan or within the calorie tolerance"""
+    targets = pd.DataFrame({
+        "meal_plan_id": "p1", "daily_calories": 1900, "daily_protein": 110.0,
+        "position": [1, 2, 3, 4],
+        "meal_type": ["breakfast", "lunch", "dinner", "snack"],
+        "calories": [500.0, 700.0, 500.0, 200.0],
+        "protein": [30.0, 40.0, 30.0, 10.0],
+    })
+    logs = pd.DataFrame({
+        "user_id": "u1", "meal_plan_id": "p1", "tracking_date": pd.Timestamp("2026-10-05"),
+        "meal_type": ["breakfast", "lunch", "dinner"],
+        "calories": [550.0, 1000.0, 900.0],
+        "protein": [30.0, 50.0, 40.0],
+        "from_ai_plan": [False, False, True],
+    })
+
+    day = score_meals(logs, targets).iloc[0]
+
+    assert (day["meals_followed"], day["meals_total"]) == (2, 4)
+    assert (day["planned_calories"], day["actual_calories"], day["calories_variance"]) == (1900, 2450, 550)
+    assert day["protein_variance"] == 10.0
+    assert [meal["meal_type"] for meal in day["planned_meals"]] == ["breakfast", "lunch", "dinner", "snack"]
+
+
+def test_workouts_count_training_days_through_today():
+    """Only training days up to the last scored day are planned; completed days are capped"""
+    sessions = pd.DataFrame({
+        "user_id": "u1", "workout_plan_id": "p1",
+        "session_date": pd.to_datetime(["2026-10-05", "2026-10-05", "2026-10-06", "2026-10-07"]),
+        "status": ["completed", "completed", "completed", "skipped"],
+        "total_volume_kg": [1000.0, 500.0, 800.0, 0.0],
+        "duration_minutes": [50, 20, 40, 0],
+    })
+    targets = pd.DataFrame({"workout_plan_id": "p1", "weekday": [1, 3, 5]})
+
+    week = score_workouts(sessions, targets, date(2026, 10, 8)).iloc[0]
+
+    assert week["tracking_week_start"] == pd.Timestamp("2026-10-05")
+    assert (week["planned_workouts"], week["completed_workouts"], week["skipped_workouts"]) == (2, 2, 1)
+    assert (week["total_volume_kg"], week["total_duration_minutes"]) == (2300.0, 110)
@@ -0,0 +1,61 @@
+# tests/test_plan_status_cache.py
+
+import time
+
+from services.plan_status_cache import PlanStatusCache
+
+
+SNAPSHOT = {
+    "meal_plan_status": "generating",
+    "meal_plan_error": None,
+    "meal_plan_generated_at": None,
+    "workout_plan_status": "generating",
+    "workout_plan_error": None,
+    "workout_plan_generated_at": None,
+}
+
+
+def test_events_update_cached_snapshots_only():
+    """Write-through events patch cached users and never create half snapshots"""
+    cache = PlanStatusCache()
+    cache.put("user-1", SNAPSHOT)
+
+    cache.apply_event({"user_id": "user-1", "plan_type": "meal", "status": "completed",
+                       "error_message": None, "generated_at": "2026-01-01T00:00:00+00:00"})
+    cache.apply_event({"user_id": "user-2", "plan_type": "meal", "status": "completed"})
+
+    cached = cache.get("user-1")
+    assert cached["meal_plan_status"] == "completed"
+    assert cached["meal_plan_generated_at"] == "2026-01-01T00:00:00+00:00"
+    assert cached["workout_plan_status"] == "generating"
+    assert cache.get("user-2") is None
+
+
+def test_lru_bound_and_ttl_expiry():
+    """Size is bounded by LRU eviction and entries expire after the TTL"""
+    cache = PlanStatusCache(max_size=2, ttl_seconds=60)
+    cache.put("a", SNAPSHOT)
+    cache.put("b", SNAPSHOT)
+    cache.get("a")
+    cache.put("c", SNAPSHOT)
+
+    assert len(cache) == 2
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+
+    expiring = PlanStatusCache(ttl_seconds=0.01)
+    expiring.put("a", SNAPSHOT)
+    time.sleep(0.02)
+    assert expiring.get("a") is None
+
+
+def test_events_during_a_load_keep_it_out_of_the_cache():
+    """A snapshot read before a status change arrived is not cached over it"""
+    cache = PlanStatusCache()
+    version = cache.version("user-1")
+
+    cache.apply_event({"user_id": "user-1", "plan_type": "meal", "status": "completed"})
+
+    assert not cache.put("user-1", SNAPSHOT, version)
+    assert cache.get("user-1") is None
+    assert cache.put("user-1", SNAPSHOT, cache.version("user-1"))
@@ -0,0 +1,54 @@
+# tests/test_plan_status_hub.py
+
+from services.plan_status_hub import PlanStatusHub
+
+
+def test_publish_fans_out_to_user_subscribers():
+    """Events reach every queue of the target user and nobody else"""
+    hub = PlanStatusHub()
+    first = hub.subscribe("user-1")
+    second = hub.subscribe("user-1")
+    other = hub.subscribe("user-2")
+
+    delivered = hub.publish({"user_id": "user-1", "plan_type": "meal", "status": "completed"})
+
+    assert delivered == 2
+    assert first.get_nowait()["status"] == "completed"
+    assert second.get_nowait()["status"] == "completed"
+    assert other.empty()
+
+
+def test_full_queue_keeps_latest_event():
+    """Slow consumers lose the oldest event instead of blocking the listener"""
+    hub = PlanStatusHub(max_queue_size=1)
+    queue = hub.subscribe("user-1")
+
+    hub.publish({"user_id": "user-1", "plan_type": "meal", "status": "generating"})
+    hub.publish({"user_id": "user-1", "plan_type": "meal", "status": "completed"})
+
+    assert queue.qsize() == 1
+    assert queue.get_nowait()["status"] == "completed"
+
+
+def test_full_queue_keeps_terminal_event():
+    """A plan's completed event survives a full queue while other plans keep updating"""
+    hub = PlanStatusHub(max_queue_size=2)
+    queue = hub.subscribe("user-1")
+
+    hub.publish({"user_id": "user-1", "plan_type": "meal", "status": "completed"})
+    hub.publish({"user_id": "user-1", "plan_type": "workout", "status": "generating"})
+    hub.publish({"user_id": "user-1", "plan_type": "workout", "status": "failed"})
+
+    events = [queue.get_nowait() for _ in range(queue.qsize())]
+    assert [(e["plan_type"], e["status"]) for e in events] == [("meal", "completed"), ("workout", "failed")]
+
+
+def test_unsubscribe_removes_empty_users():
+    """Unsubscribing the last queue drops the user entry"""
+    hub = PlanStatusHub()
+    queue = hub.subscribe("user-1")
+
+    hub.unsubscribe("user-1", queue)
+
+    assert hub.subscriber_count == 0
+    assert hub.publish({"user_id": "user-1", "status": "completed"}) == 0
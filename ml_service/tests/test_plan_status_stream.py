@@ -0,0 +1,31 @@
+# tests/test_plan_status_stream.py
+
+import asyncio
+
+from app import _plan_status_updates, settings
+
+
+def _collect(snapshot):
+    """Every update the stream yields for a snapshot with no events arriving"""
+    async def run():
+        return [update async for update in _plan_status_updates("user-1", asyncio.Queue(), snapshot)]
+    return asyncio.run(run())
+
+
+def test_stream_ends_without_generation_in_progress():
+    """Users with no plan being generated get their snapshot and the stream closes"""
+    snapshot = {"meal_plan_status": "completed", "workout_plan_status": "not_started"}
+
+    assert _collect(snapshot) == [snapshot]
+
+
+def test_stream_ends_after_maximum_duration(monkeypatch):
+    """A plan stuck in generating does not keep the stream open forever"""
+    monkeypatch.setattr(settings, "STATUS_STREAM_HEARTBEAT_SECONDS", 0.01)
+    monkeypatch.setattr(settings, "STATUS_STREAM_MAX_SECONDS", 0.05)
+    snapshot = {"meal_plan_status": "generating", "workout_plan_status": "completed"}
+
+    updates = _collect(snapshot)
+
+    assert updates[0] == snapshot
+    assert updates[1:] and all(update is None for update in updates[1:])
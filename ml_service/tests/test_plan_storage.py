@@ -0,0 +1,29 @@
+# tests/test_plan_storage.py
+
+from benchmarks.sample_plans import make_meal_plan
+from services.plan_storage import CHUNK_REF_KEY, split_plan
+
+
+def test_split_replaces_shared_sections_with_refs():
+    """Large shared sections become references to chunks holding their content"""
+    plan = make_meal_plan(seed=1, target_kb=5)
+    plan["personalized_tips"] = ["Drink water"]
+
+    stored, chunks = split_plan("meal", plan, min_bytes=64)
+
+    assert set(stored["meal_prep_strategy"]) == {CHUNK_REF_KEY}
+    assert stored["personalized_tips"] == ["Drink water"]
+    assert stored["meals"] is plan["meals"]
+    ref = stored["meal_prep_strategy"][CHUNK_REF_KEY]
+    assert chunks[ref] == {"section": "meal_prep_strategy", "content": plan["meal_prep_strategy"]}
+
+
+def test_identical_sections_share_a_chunk():
+    """Equal sections hash the same regardless of key order"""
+    strategy = {"batch_cooking": ["Cook rice"] * 20, "storage_tips": ["Freeze"] * 20}
+    reordered = dict(reversed(list(strategy.items())))
+
+    first, _ = split_plan("meal", {"meal_prep_strategy": strategy}, min_bytes=64)
+    second, _ = split_plan("meal", {"meal_prep_strategy": reordered}, min_bytes=64)
+
+    assert first == second
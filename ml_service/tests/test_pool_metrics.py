@@ -0,0 +1,46 @@
+# tests/test_pool_metrics.py
+
+import asyncio
+
+from services.pool_metrics import AdaptiveLimiter, LatencyHistogram, next_pool_limit
+
+
+def test_limit_grows_on_queueing_and_shrinks_when_idle():
+    """The adaptive limit follows acquire latency and stays within bounds"""
+    busy = {"acquires": 100, "p95_ms": 50.0, "peak_in_use": 10}
+    quiet = {"acquires": 100, "p95_ms": 1.0, "peak_in_use": 2}
+
+    assert next_pool_limit(10, busy, min_size=2, max_size=20, grow_wait_ms=25) == 12
+    assert next_pool_limit(20, busy, min_size=2, max_size=20, grow_wait_ms=25) == 20
+    assert next_pool_limit(10, quiet, min_size=2, max_size=20, grow_wait_ms=25) == 8
+    assert next_pool_limit(2, quiet, min_size=2, max_size=20, grow_wait_ms=25) == 2
+    assert next_pool_limit(10, {"acquires": 0, "p95_ms": 0.0, "peak_in_use": 0}, 2, 20, 25) == 10
+
+
+def test_limiter_queues_beyond_limit_and_wakes_on_raise():
+    """Callers above the limit wait until a slot is released or the limit grows"""
+    async def scenario():
+        limiter = AdaptiveLimiter(1)
+        await limiter.acquire()
+        second = asyncio.create_task(limiter.acquire())
+        third = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        assert limiter.waiting == 2
+
+        limiter.release()
+        await second
+        limiter.set_limit(2)
+        await third
+        assert limiter.in_use == 2 and limiter.waiting == 0
+
+    asyncio.run(scenario())
+
+
+def test_histogram_percentiles_use_bucket_bounds():
+    """Percentiles report the upper bound of the bucket they fall in"""
+    histogram = LatencyHistogram()
+    for elapsed_ms in [0.5] * 90 + [40.0] * 10:
+        histogram.observe(elapsed_ms)
+
+    assert histogram.percentile(0.5) == 1.0
+    assert histogram.percentile(0.99) == 50.0
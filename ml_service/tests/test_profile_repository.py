@@ -0,0 +1,57 @@
+# tests/test_profile_repository.py
+
+import asyncio
+
+from services.profile_repository import ProfileRepository
+
+
+def _record(weight):
+    row = {"quiz_answers": {"mainGoal": "lose_weight"}, "weight": weight}
+    return {**{key: None for key in (
+        "target_weight", "age", "gender", "height", "cooking_skill", "cooking_time",
+        "grocery_budget", "meals_per_day", "food_allergies", "disliked_foods",
+        "meal_prep_preference", "gym_access", "equipment_available",
+        "workout_location_preference", "injuries_limitations", "fitness_experience",
+        "health_conditions", "medications", "sleep_quality", "stress_level",
+        "dietary_restrictions",
+    )}, **row}
+
+
+def test_snapshots_are_cached_until_invalidated():
+    """Repeated reads hit memory; a profile_changed invalidation forces a reload"""
+    loads = []
+
+    async def load(user_id):
+        loads.append(user_id)
+        return _record(80.0 - len(loads))
+
+    async def scenario():
+        repository = ProfileRepository(load)
+        repository.caching = True
+
+        first = await repository.get("user-1")
+        assert await repository.get("user-1") is first
+        assert first.main_goal == "lose_weight"
+
+        repository.invalidate("user-1")
+        assert (await repository.get("user-1")).weight == 78.0
+        assert len(loads) == 2
+
+    asyncio.run(scenario())
+
+
+def test_load_racing_an_invalidation_is_not_cached():
+    """A snapshot loaded before a concurrent change must not be served afterwards"""
+    async def scenario():
+        repository = ProfileRepository(None)
+        repository.caching = True
+
+        async def load(user_id):
+            repository.invalidate(user_id)
+            return _record(80.0)
+
+        repository._load = load
+        await repository.get("user-1")
+        assert len(repository) == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,17 @@
+# tests/test_regeneration_quota.py
+
+from datetime import datetime, timezone
+
+from services.regeneration_quota import RegenerationQuotaCache
+
+
+def test_cached_usage_does_not_carry_into_next_period():
+    """Entries are keyed to their billing period"""
+    cache = RegenerationQuotaCache()
+    october = datetime(2026, 10, 1, tzinfo=timezone.utc)
+    usage = {"tier": "free", "monthly_limit": 1, "meal_usage": 1, "workout_usage": 1}
+    cache.put("user-1", october, usage)
+
+    assert cache.get("user-1", october) == usage
+    assert cache.get("user-1", datetime(2026, 11, 1, tzinfo=timezone.utc)) is None
+    assert len(cache) == 0
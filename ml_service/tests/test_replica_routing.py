@@ -0,0 +1,45 @@
+# tests/test_replica_routing.py
+
+from config.settings import settings
+from services.database import DatabaseService
+
+
+def _service_with_replica(lag):
+    service = DatabaseService()
+    service.replica_pool = object()
+    service.replica_lag = lag
+    return service
+
+
+def test_reads_follow_replica_health():
+    """Reads use the replica only while it is reachable and within the lag limit"""
+    assert not DatabaseService()._use_replica("user-1")
+    assert _service_with_replica(0.0)._use_replica("user-1")
+    assert not _service_with_replica(None)._use_replica("user-1")
+    assert not _service_with_replica(settings.DB_REPLICA_MAX_LAG_SECONDS + 1)._use_replica("user-1")
+
+
+def test_recent_writers_read_from_primary():
+    """A user's own writes pin only that user's reads to the primary"""
+    service = _service_with_replica(0.0)
+    service._record_write("user-1")
+
+    assert not service._use_replica("user-1")
+    assert service._use_replica("user-2")
+    assert service._use_replica(None)
+
+
+def test_bulk_reads_use_primary_when_any_user_wrote():
+    """A bulk read goes to the primary if any of its users is pinned"""
+    service = _service_with_replica(0.0)
+    service._record_write("user-2")
+
+    assert service._use_replica(None, ["user-1", "user-3"])
+    assert not service._use_replica(None, ["user-1", "user-2"])
+
+
+def test_read_your_writes_outlasts_replica_lag():
+    """A write pins the user to the primary for at least as long as the replica may lag behind it"""
+    assert settings.DB_READ_YOUR_WRITES_SECONDS >= (
+        settings.DB_REPLICA_MAX_LAG_SECONDS + settings.DB_REPLICA_LAG_CHECK_SECONDS
+    )
@@ -0,0 +1,99 @@
+# tests/test_strength_analytics.py
+
+import numpy as np
+import pandas as pd
+
+from jobs.strength_analytics import (
+    compute_overload,
+    compute_personal_records,
+    compute_weekly_analytics,
+    estimated_1rm,
+    prepare_sets,
+)
+
+
+def _sets(rows, first_changed="2026-10-05"):
+    """Working sets from (session_date, exercise_id, set_number, reps, weight_kg) tuples"""
+    frame = pd.DataFrame(rows, columns=["session_date", "exercise_id", "set_number", "reps", "weight_kg"])
+    session_dates = frame["session_date"]
+    return frame.assign(
+        set_id=[f"set-{i}" for i in range(len(frame))],
+        user_id="u1",
+        session_id="s-" + session_dates,
+        session_date=pd.to_datetime(session_dates),
+        first_changed=pd.Timestamp(first_changed),
+        exercise_name=frame["exercise_id"].str.title(),
+        exercise_category="strength",
+        duration_seconds=np.nan,
+        distance_meters=np.nan,
+        rpe=np.nan,
+        rest_seconds=np.nan,
+        is_failure=False,
+    )
+
+
+def test_estimated_1rm_uses_epley_within_rep_limit():
+    """Singles are their own 1RM; sets beyond the rep limit or without load have none"""
+    weight = pd.Series([100.0, 100.0, 100.0, np.nan])
+    reps = pd.Series([1, 10, 15, 5])
+
+    estimate = estimated_1rm(weight, reps)
+
+    assert estimate.iloc[0] == 100.0
+    assert round(estimate.iloc[1], 2) == 133.33
+    assert estimate.iloc[2:].isna().all()
+
+
+def test_overload_and_records_follow_corrected_history():
+    """Overload compares with earlier days; records and PR flags come from the full history"""
+    sets = prepare_sets(_sets([
+        ("2026-09-29", "bench", 1, 8, 60.0),
+        ("2026-10-01", "bench", 1, 12, 62.5),
+        ("2026-10-01", "bench", 2, 10, 62.5),
+        ("2026-10-06", "bench", 1, 8, 65.0),
+    ]))
+
+    assert list(sets["is_pr"]) == [True, True, False, True]
+
+    overload = compute_overload(sets)
+    assert len(overload) == 1
+    row = overload.iloc[0]
+    assert (row["previous_best_weight"], row["current_weight"], row["weight_increase"]) == (62.5, 65.0, 2.5)
+    assert (row["previous_best_volume"], row["current_volume"]) == (1375.0, 520.0)
+    assert (row["suggested_next_weight"], row["suggested_next_reps"]) == (65.0, 9)
+
+    records = compute_personal_records(sets).iloc[0]
+    assert records["max_weight_kg"] == 65.0
+    assert records["max_reps"] == 12
+    assert records["max_reps_set_id"] == "set-1"
+    assert records["best_1rm_kg"] == 62.5 * (1 + 12 / 30)
+
+
+def test_weekly_analytics_volume_per_muscle_group():
+    """Muscle groups get each set of their exercises; trends compare with the previous week"""
+    sets = prepare_sets(_sets([
+        ("2026-09-29", "bench", 1, 10, 60.0),
+        ("2026-10-06", "bench", 1, 10, 70.0),
+        ("2026-10-06", "squat", 2, 5, 100.0),
+    ]))
+    sessions = pd.DataFrame({
+        "user_id": ["u1"],
+        "session_id": ["s-2026-10-06"],
+        "session_date": pd.to_datetime(["2026-10-06"]),
+        "duration_minutes": [55],
+        "workout_type": ["strength"],
+    })
+    muscles = pd.DataFrame({"exercise_id": ["bench", "bench", "squat"], "muscle_group": ["chest", "triceps", "quads"]})
+
+    week = compute_weekly_analytics(sets, sessions, muscles).iloc[0]
+
+    assert week["period_start_date"] == pd.Timestamp("2026-10-05")
+    assert week["total_volume_kg"] == 1200.0
+    assert week["muscle_group_distribution"] == {
+        "chest": {"sets": 1, "volume_kg": 700.0},
+        "triceps": {"sets": 1, "volume_kg": 700.0},
+        "quads": {"sets": 1, "volume_kg": 500.0},
+    }
+    assert week["volume_trend"] == "increasing"
+    assert week["strength_trend"] == "increasing"
+    assert week["top_exercises_by_volume"][0] == {"exercise_name": "Bench", "volume_kg": 700.0}
@@ -0,0 +1,33 @@
+# tests/test_tdee_estimator.py
+
+from datetime import date, timedelta
+
+from services.tdee_estimator import TdeeState, estimate_tdee, observe_day
+
+
+def test_estimate_converges_to_energy_balance():
+    """Eating 2500 kcal while losing 0.5 kg/week implies a TDEE of about 3050"""
+    state = TdeeState()
+    start = date(2026, 1, 1)
+    for i in range(120):
+        weight = 90 - 0.5 * i / 7 if i % 2 == 0 else None
+        observe_day(state, start + timedelta(days=i), 2500, weight)
+
+    assert abs(estimate_tdee(state, 2200) - 3050) < 25
+    assert state.observed_through == start + timedelta(days=119)
+
+
+def test_static_tdee_until_enough_history():
+    """Without intake history the static estimate is used unchanged"""
+    state = TdeeState()
+    day = date(2026, 1, 1)
+    observe_day(state, day, None, 80.0)
+    observe_day(state, day + timedelta(days=3), 400, 79.5)
+
+    assert state.tdee is None
+    assert estimate_tdee(state, 2200) == 2200
+    assert estimate_tdee(None, 2200) == 2200
+
+    # Days already folded in are ignored
+    observe_day(state, day + timedelta(days=1), 2500, 70.0)
+    assert state.intake_days == 0 and state.weight_days == 2
@@ -0,0 +1,64 @@
+# tests/test_workout_assembler.py
+
+from services.workout_assembler import assemble_workout_plan, workout_days
+from services.workout_prompt_builder import WorkoutPlanPromptBuilder
+
+
+def _exercise(id, muscles, equipment=("bodyweight",), difficulty="beginner", category="strength"):
+    """An exercise_library row as returned by get_exercise_library"""
+    return {"id": id, "name": id.replace("_", " ").title(), "category": category, "muscle_groups": list(muscles),
+            "equipment": list(equipment), "difficulty": difficulty, "instructions": ["Brace.", "Move slowly."],
+            "alternatives": None, "verified": True}
+
+
+LIBRARY = [
+    _exercise("push_up", ("chest", "triceps", "shoulders")),
+    _exercise("bench_press", ("chest", "triceps"), ("barbell", "bench"), "intermediate"),
+    _exercise("dumbbell_fly", ("chest",), ("dumbbells",)),
+    _exercise("pike_push_up", ("shoulders", "triceps")),
+    _exercise("lateral_raise", ("shoulders",), ("dumbbells",)),
+    _exercise("bench_dip", ("triceps",)),
+    _exercise("inverted_row", ("back", "biceps")),
+    _exercise("lat_pulldown", ("lats", "biceps"), ("cable machine",)),
+    _exercise("band_row", ("back",), ("resistance band",)),
+    _exercise("curl", ("biceps",), ("dumbbells",)),
+    _exercise("plank", ("core",)),
+    _exercise("squat", ("quadriceps", "glutes")),
+    _exercise("romanian_deadlift", ("hamstrings", "glutes"), ("dumbbells",)),
+    _exercise("glute_bridge", ("glutes",)),
+    _exercise("calf_raise", ("calves",)),
+    _exercise("pistol_squat", ("quadriceps",), difficulty="advanced"),
+    _exercise("jumping_jacks", ("full body",), category="cardio"),
+]
+
+
+def test_push_pull_legs_week():
+    """gain_muscle defaults give a 5-day push/pull/legs week with the goal's rep scheme and home-first picks"""
+    defaults = WorkoutPlanPromptBuilder._get_defaults_for_goal("gain_muscle")
+
+    plan = assemble_workout_plan(LIBRARY, "gain_muscle", defaults, seed="user-1")
+
+    days = plan["weekly_plan"]
+    assert [day["workout_type"] for day in days] == ["Push Day", "Pull Day", "Leg Day", "Push Day", "Pull Day"]
+    assert plan["weekly_summary"]["rest_days"] == 2
+    push = days[0]["exercises"]
+    assert push[0]["name"] == "Push Up"
+    assert push[0]["category"] == "compound" and (push[0]["sets"], push[0]["reps"]) == (3, "8-10")
+    assert len({exercise["name"] for exercise in push}) == len(push)
+    assert all(e["name"] != "Pistol Squat" for day in days for e in day["exercises"])
+    assert days[0]["training_location"] == "Home"
+    assert assemble_workout_plan(LIBRARY, "gain_muscle", defaults, seed="user-1") == plan
+
+
+def test_frequency_finishers_and_gaps():
+    """Frequency sets the day count, the split adds cardio finishers, and a sparse library gives no plan"""
+    defaults = WorkoutPlanPromptBuilder._get_defaults_for_goal("lose_weight")
+
+    plan = assemble_workout_plan(LIBRARY, "lose_weight", defaults, frequency="2-3 times/week", gym_access=False)
+
+    assert [day["day"] for day in plan["weekly_plan"]] == ["Monday", "Wednesday", "Friday"]
+    assert all(day["exercises"][-1]["category"] == "cardio" for day in plan["weekly_plan"])
+    assert all("barbell" not in e["equipment_needed"] for day in plan["weekly_plan"] for e in day["exercises"])
+    assert assemble_workout_plan(LIBRARY[:3], "lose_weight", defaults) is None
+
+    assert (workout_days("1-2 times/week"), workout_days("Daily"), workout_days("whenever")) == (2, 5, None)
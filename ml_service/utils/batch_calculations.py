@@ -0,0 +1,290 @@
+"""
+Vectorized nutrition calculations over columnar NumPy arrays.
+
+Array versions of utils.calculations for recomputing targets of many users
+at once. String inputs (gender, exercise frequency, occupation, goal,
+dietary style) are encoded to small integer codes first; the encoders
+classify each distinct string with the same rules as the scalar functions,
+so every result is bit-for-bit identical to calling those functions user by
+user.
+"""
+
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+# Gender codes: Mifflin-St Jeor constant and minimum safe calories per code
+GENDER_MALE, GENDER_FEMALE, GENDER_OTHER = 0, 1, 2
+_BMR_GENDER_CONSTANT = np.array([5, -161, -78], dtype=np.float64)
+_SAFE_MIN_CALORIES = np.array([1500, 1200, 1200], dtype=np.float64)
+
+# Exercise frequency codes index this table; unknown frequencies use the last entry
+EXERCISE_FREQUENCIES = ("Never", "1-2 times/week", "3-4 times/week", "5-6 times/week", "Daily")
+_FREQUENCY_MULTIPLIERS = np.array([1.2, 1.375, 1.55, 1.725, 1.9, 1.2])
+
+# Occupation codes: no adjustment, active job (+0.15), desk job (-0.1)
+OCCUPATION_NEUTRAL, OCCUPATION_ACTIVE, OCCUPATION_DESK = 0, 1, 2
+
+# Goal codes are 2 * (index of the first matching goal key, or len(GOAL_KEYS)
+# when none matches) + 1 when the goal mentions "recomposition"
+GOAL_KEYS = (
+    "maintain weight",
+    "mild weight loss",
+    "weight loss",
+    "extreme weight loss",
+    "body recomposition",
+    "build muscle",
+    "improve strength",
+    "improve endurance",
+    "improve flexibility",
+    "general health",
+)
+_GOAL_MULTIPLIERS = np.repeat([1.0, 0.92, 0.84, 0.69, 0.94, 1.12, 1.05, 1.05, 1.0, 1.0, 1.0], 2)
+_PROTEIN_PER_KG = np.tile([1.8, 2.0], len(GOAL_KEYS) + 1)
+
+# Diet codes: default, keto, vegan
+DIET_DEFAULT, DIET_KETO, DIET_VEGAN = 0, 1, 2
+_FAT_PCT = np.array([0.28, 0.35, 0.25])
+
+
+# ---------------------------------------------------------------------------
+# Encoders
+# ---------------------------------------------------------------------------
+
+def _encode(values: Iterable[Optional[str]], classify, default: str = "") -> np.ndarray:
+    """Classify each distinct string once and map the codes back to every row"""
+    if not isinstance(values, np.ndarray):
+        values = np.array(list(values), dtype=object)
+    labels, uniques = pd.factorize(values)
+    # Missing values get label -1, which indexes the trailing default code
+    codes = np.fromiter(
+        (classify(value) for value in [*uniques, default]), dtype=np.int64, count=len(uniques) + 1
+    )
+    return codes[labels]
+
+
+def _gender_code(gender: str) -> int:
+    gender = gender.lower()
+    if gender == "male":
+        return GENDER_MALE
+    if gender == "female":
+        return GENDER_FEMALE
+    return GENDER_OTHER
+
+
+def _frequency_code(exercise_freq: str) -> int:
+    try:
+        return EXERCISE_FREQUENCIES.index(exercise_freq)
+    except ValueError:
+        return len(EXERCISE_FREQUENCIES)
+
+
+def _occupation_code(occupation: str) -> int:
+    occupation = occupation.lower()
+    if any(x in occupation for x in ["physical", "on feet", "active job", "manual"]):
+        return OCCUPATION_ACTIVE
+    if any(x in occupation for x in ["desk", "sedentary"]):
+        return OCCUPATION_DESK
+    return OCCUPATION_NEUTRAL
+
+
+def _goal_code(goal: str) -> int:
+    goal = goal.lower()
+    key_index = next((i for i, key in enumerate(GOAL_KEYS) if key in goal), len(GOAL_KEYS))
+    return 2 * key_index + ("recomposition" in goal)
+
+
+def _diet_code(dietary_style: str) -> int:
+    dietary_style = dietary_style.lower()
+    if "keto" in dietary_style:
+        return DIET_KETO
+    if "vegan" in dietary_style:
+        return DIET_VEGAN
+    return DIET_DEFAULT
+
+
+def encode_genders(genders: Iterable[Optional[str]]) -> np.ndarray:
+    """Gender codes as used by calculate_bmr and calculate_goal_calories"""
+    return _encode(genders, _gender_code)
+
+
+def encode_exercise_frequencies(frequencies: Iterable[Optional[str]]) -> np.ndarray:
+    """Exercise frequency codes as used by calculate_tdee (missing means "Never")"""
+    return _encode(frequencies, _frequency_code, default="Never")
+
+
+def encode_occupations(occupations: Iterable[Optional[str]]) -> np.ndarray:
+    """Occupation codes as used by calculate_tdee"""
+    return _encode(occupations, _occupation_code)
+
+
+def encode_goals(goals: Iterable[Optional[str]]) -> np.ndarray:
+    """Goal codes as used by calculate_goal_calories and calculate_macros"""
+    return _encode(goals, _goal_code)
+
+
+def encode_dietary_styles(dietary_styles: Iterable[Optional[str]]) -> np.ndarray:
+    """Dietary style codes as used by calculate_macros"""
+    return _encode(dietary_styles, _diet_code)
+
+
+# ---------------------------------------------------------------------------
+# Rounding identical to the builtin round()
+# ---------------------------------------------------------------------------
+
+def round_half_even(values: np.ndarray) -> np.ndarray:
+    """round(x) for every element, as int64"""
+    return np.rint(values).astype(np.int64)
+
+
+def round_to(values: np.ndarray, ndigits: int) -> np.ndarray:
+    """
+    round(x, ndigits) for every element.
+
+    np.round scales by 10**ndigits in floating point, which can push a value
+    across a rounding boundary that the builtin (exact decimal) round does
+    not cross. Elements within float error of such a boundary are rounded
+    with the builtin instead.
+    """
+    scale = 10.0 ** ndigits
+    scaled = values * scale
+    result = np.rint(scaled) / scale
+
+    distance = np.abs(scaled - np.floor(scaled) - 0.5)
+    suspect = np.flatnonzero(distance <= np.abs(scaled) * 1e-15 + 1e-300)
+    if suspect.size:
+        result[suspect] = [round(float(v), ndigits) for v in values[suspect]]
+    return result
+
+
+def _square(values: np.ndarray) -> np.ndarray:
+    """x ** 2 as computed by Python floats (libm pow, which x * x can differ from)"""
+    uniques, inverse = np.unique(values, return_inverse=True)
+    squares = np.fromiter((v ** 2 for v in uniques.tolist()), dtype=np.float64, count=len(uniques))
+    return squares[inverse]
+
+
+# ---------------------------------------------------------------------------
+# Calculations
+# ---------------------------------------------------------------------------
+
+def calculate_bmr_batch(
+    weight: np.ndarray,
+    height: np.ndarray,
+    age: np.ndarray,
+    gender_code: np.ndarray
+) -> np.ndarray:
+    """Array version of calculate_bmr (Mifflin-St Jeor)"""
+    return 10 * weight + 6.25 * height - 5 * np.asarray(age, dtype=np.int64) + _BMR_GENDER_CONSTANT[gender_code]
+
+
+def calculate_tdee_batch(
+    bmr: np.ndarray,
+    frequency_code: np.ndarray,
+    occupation_code: np.ndarray
+) -> np.ndarray:
+    """Array version of calculate_tdee"""
+    return bmr * activity_multipliers(frequency_code, occupation_code)
+
+
+def activity_multipliers(frequency_code: np.ndarray, occupation_code: np.ndarray) -> np.ndarray:
+    """Activity multiplier per user, including the occupation adjustment"""
+    multiplier = _FREQUENCY_MULTIPLIERS[frequency_code]
+    multiplier = np.where(occupation_code == OCCUPATION_ACTIVE, np.minimum(1.9, multiplier + 0.15), multiplier)
+    return np.where(occupation_code == OCCUPATION_DESK, np.maximum(1.2, multiplier - 0.1), multiplier)
+
+
+def calculate_goal_calories_batch(
+    tdee: np.ndarray,
+    goal_code: np.ndarray,
+    bmr: np.ndarray,
+    gender_code: np.ndarray
+) -> np.ndarray:
+    """Array version of calculate_goal_calories, with the same safety clamps"""
+    goal_calories = tdee * _GOAL_MULTIPLIERS[goal_code]
+    safe_min = np.maximum(bmr * 1.1, _SAFE_MIN_CALORIES[gender_code])
+    safe_max = tdee + 700
+    return round_half_even(np.maximum(safe_min, np.minimum(goal_calories, safe_max)))
+
+
+def calculate_macros_batch(
+    goal_calories: np.ndarray,
+    weight: np.ndarray,
+    goal_code: np.ndarray,
+    diet_code: np.ndarray
+) -> Dict[str, np.ndarray]:
+    """Array version of calculate_macros; one array per macros key"""
+    goal_calories = np.asarray(goal_calories, dtype=np.int64)
+
+    fat_calories = round_half_even(goal_calories * _FAT_PCT[diet_code])
+    fat_g = round_half_even(fat_calories / 9)
+
+    protein_g = round_half_even(weight * _PROTEIN_PER_KG[goal_code])
+    protein_calories = protein_g * 4
+
+    carbs_g = round_half_even(np.maximum(0, (goal_calories - (protein_calories + fat_calories)) / 4))
+
+    diff = goal_calories - (protein_calories + fat_calories + carbs_g * 4)
+    carbs_g = carbs_g + np.where(diff != 0, round_half_even(diff / 4), 0)
+
+    return {
+        "protein_g": protein_g,
+        "carbs_g": carbs_g,
+        "fat_g": fat_g,
+        "protein_pct_of_calories": round_half_even(protein_calories / goal_calories * 100),
+        "carbs_pct_of_calories": round_half_even(carbs_g * 4 / goal_calories * 100),
+        "fat_pct_of_calories": round_half_even(fat_calories / goal_calories * 100),
+    }
+
+
+def calculate_nutrition_profiles(
+    weight: np.ndarray,
+    height: np.ndarray,
+    age: np.ndarray,
+    gender_code: np.ndarray,
+    frequency_code: np.ndarray,
+    occupation_code: np.ndarray,
+    goal_code: np.ndarray,
+    diet_code: np.ndarray,
+    target_weight: Optional[np.ndarray] = None
+) -> Dict[str, np.ndarray]:
+    """
+    Array version of calculate_nutrition_profile.
+
+    Returns one array per profile key, with the macros flattened in
+    ("protein_g", "carbs_g", ...). Rows without a target weight (NaN or 0)
+    get NaN targetWeight, as do rows whose estimatedWeeks is None in the
+    scalar version.
+    """
+    weight = np.asarray(weight, dtype=np.float64)
+    height = np.asarray(height, dtype=np.float64)
+
+    bmi = weight / _square(height / 100)
+    bmr = calculate_bmr_batch(weight, height, age, gender_code)
+    tdee = calculate_tdee_batch(bmr, frequency_code, occupation_code)
+    goal_calories = calculate_goal_calories_batch(tdee, goal_code, bmr, gender_code)
+    macros = calculate_macros_batch(goal_calories, weight, goal_code, diet_code)
+
+    if target_weight is None:
+        target_weight = np.full(len(weight), np.nan)
+    target_weight = np.asarray(target_weight, dtype=np.float64)
+    has_target = ~np.isnan(target_weight) & (target_weight != 0)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        kg_per_week = (goal_calories - tdee) * 7 / 7700
+        weeks = np.abs((target_weight - weight) / kg_per_week)
+    has_weeks = has_target & (kg_per_week != 0)
+    estimated_weeks = np.full(len(weight), np.nan)
+    estimated_weeks[has_weeks] = np.rint(weeks[has_weeks])
+
+    return {
+        "bmi": round_to(bmi, 1),
+        "bmr": round_to(bmr, 2),
+        "tdee": round_to(tdee, 2),
+        "goalCalories": goal_calories,
+        **macros,
+        "activityMultiplier": round_to(tdee / bmr, 2),
+        "targetWeight": np.where(has_target, np.rint(target_weight), np.nan),
+        "estimatedWeeks": estimated_weeks,
+    }
@@ -0,0 +1,83 @@
+"""Fast JSON serialization and asyncpg JSON/JSONB type codecs"""
+
+import json
+from typing import Any
+
+import asyncpg
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is in requirements.txt
+    orjson = None
+
+# Version byte prefixed to every JSONB value in the binary wire format
+_JSONB_BINARY_VERSION = b"\x01"
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+    def dumps_bytes(value: Any) -> bytes:
+        """Serialize a value to UTF-8 JSON bytes"""
+        return orjson.dumps(value, option=_ORJSON_OPTIONS)
+
+    def dumps_canonical_bytes(value: Any) -> bytes:
+        """Serialize with sorted keys, so equal values give equal bytes"""
+        return orjson.dumps(value, option=_ORJSON_OPTIONS | orjson.OPT_SORT_KEYS)
+
+    def loads(data: Any) -> Any:
+        """Parse JSON from str, bytes or memoryview"""
+        return orjson.loads(data)
+else:
+    def dumps_bytes(value: Any) -> bytes:
+        """Serialize a value to UTF-8 JSON bytes"""
+        return json.dumps(value, separators=(",", ":"), default=str).encode()
+
+    def dumps_canonical_bytes(value: Any) -> bytes:
+        """Serialize with sorted keys, so equal values give equal bytes"""
+        return json.dumps(
+            value, separators=(",", ":"), sort_keys=True, ensure_ascii=False, default=str
+        ).encode()
+
+    def loads(data: Any) -> Any:
+        """Parse JSON from str, bytes or memoryview"""
+        if isinstance(data, memoryview):
+            data = bytes(data)
+        return json.loads(data)
+
+
+def dumps(value: Any) -> str:
+    """Serialize a value to a JSON string"""
+    return dumps_bytes(value).decode()
+
+
+def _encode_jsonb(value: Any) -> bytes:
+    return _JSONB_BINARY_VERSION + dumps_bytes(value)
+
+
+def _decode_jsonb(data: bytes) -> Any:
+    return loads(memoryview(data)[1:])
+
+
+async def register_json_codecs(conn: asyncpg.Connection) -> None:
+    """
+    Make json/jsonb columns and parameters map to Python objects.
+
+    JSONB uses the binary wire format so values go straight between bytes
+    and objects without an intermediate str. Callers pass dicts/lists as
+    parameters and receive dicts/lists back; a str parameter is stored as a
+    JSON string scalar, not parsed.
+    """
+    await conn.set_type_codec(
+        "jsonb",
+        schema="pg_catalog",
+        encoder=_encode_jsonb,
+        decoder=_decode_jsonb,
+        format="binary",
+    )
+    await conn.set_type_codec(
+        "json",
+        schema="pg_catalog",
+        encoder=dumps_bytes,
+        decoder=loads,
+        format="binary",
+    )
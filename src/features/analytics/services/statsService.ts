@@ -218,7 +218,7 @@ export class StatsService {
   static async getActiveWorkoutPlan(userId: string): Promise<AIWorkoutPlan | null> {
     const { data, error } = await supabase
       .from("ai_workout_plans")
-      .select("id, user_id, plan_data, is_active, generated_at")
+      .select("id, user_id, plan_data:plan_document, is_active, generated_at")
       .eq("user_id", userId)
       .eq("is_active", true)
       .order("generated_at", { ascending: false })
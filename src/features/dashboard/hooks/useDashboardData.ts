@@ -5,7 +5,7 @@
  */
 
 import { useAuth } from "@/features/auth";
-import { supabase } from "@/lib/supabase";
+import { PLAN_ROW_COLUMNS, supabase, withPlanDocument } from "@/lib/supabase";
 import type { DailyNutritionLog } from "@/shared/types/food.types";
 import { useQuery } from "@tanstack/react-query";
 
@@ -186,14 +186,14 @@ export function useActiveMealPlan() {
 
       const { data: mealData, error: mealError } = await supabase
         .from("ai_meal_plans")
-        .select("*")
+        .select(PLAN_ROW_COLUMNS)
         .eq("user_id", user.id)
         .order("generated_at", { ascending: false })
         .limit(1)
         .maybeSingle();
 
       if (mealError) throw mealError;
-      return mealData;
+      return withPlanDocument(mealData);
     },
     enabled: !!user?.id,
   });
@@ -212,14 +212,14 @@ export function useActiveWorkoutPlan() {
 
       const { data: mealData, error: mealError } = await supabase
         .from("ai_workout_plans")
-        .select("*")
+        .select(PLAN_ROW_COLUMNS)
         .eq("user_id", user.id)
         .order("generated_at", { ascending: false })
         .limit(1)
         .maybeSingle();
 
       if (mealError) throw mealError;
-      return mealData;
+      return withPlanDocument(mealData);
     },
     enabled: !!user?.id,
   });
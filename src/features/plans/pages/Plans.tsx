@@ -5,7 +5,7 @@
  */
 
 import { useAuth } from '@/features/auth';
-import { supabase } from '@/lib/supabase';
+import { PLAN_ROW_COLUMNS, supabase, withPlanDocument } from '@/lib/supabase';
 import { mlService } from '@/services/ml';
 import { Badge } from '@/shared/components/ui/badge';
 import { Card } from '@/shared/components/ui/card';
@@ -63,26 +63,26 @@ export function Plans() {
       // Fetch latest meal plan
       const { data: mealData, error: mealError } = await supabase
         .from('ai_meal_plans')
-        .select('*')
+        .select(PLAN_ROW_COLUMNS)
         .eq('user_id', user.id)
         .order('generated_at', { ascending: false })
         .limit(1)
         .maybeSingle();
 
       if (mealError) throw mealError;
-      setMealPlan(mealData);
+      setMealPlan(withPlanDocument(mealData));
 
       // Fetch latest workout plan
       const { data: workoutData, error: workoutError } = await supabase
         .from('ai_workout_plans')
-        .select('*')
+        .select(PLAN_ROW_COLUMNS)
         .eq('user_id', user.id)
         .order('generated_at', { ascending: false })
         .limit(1)
         .maybeSingle();
 
       if (workoutError) throw workoutError;
-      setWorkoutPlan(workoutData);
+      setWorkoutPlan(withPlanDocument(workoutData));
 
       // Update plan status
       if (mealData || workoutData) {
@@ -5,4 +5,5 @@
 
 export { supabase, getSupabaseClient } from "./client";
 export { handleSupabaseError, isAuthError } from "./errors";
+export { PLAN_ROW_COLUMNS, withPlanDocument } from "./plans";
 export type { ApiError } from "./errors";
@@ -0,0 +1,17 @@
+/**
+ * Plan Row Helpers
+ * Read ai_meal_plans / ai_workout_plans with chunked sections reassembled
+ */
+
+// Every column plus the plan_document computed field: plan_data with the
+// shared sections stored in plan_chunks put back inline
+export const PLAN_ROW_COLUMNS = "*, plan_document";
+
+type PlanRow = { plan_data?: unknown; plan_document?: unknown };
+
+// Expose the reassembled document under plan_data, its usual name
+export function withPlanDocument<T extends PlanRow>(row: T | null): T | null {
+  if (!row) return row;
+  const { plan_document, ...rest } = row;
+  return { ...rest, plan_data: plan_document ?? row.plan_data } as T;
+}
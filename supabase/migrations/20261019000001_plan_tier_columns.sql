@@ -0,0 +1,28 @@
+-- Denormalized plan tier and completeness
+--
+-- Tier reads (/plan-tiers, tier unlock detection on plan commit) only need
+-- plan_data->'_metadata'->>'tier' and ->>'completeness', but reading them
+-- from JSONB detoasts and decompresses the whole plan. These columns are
+-- written by the ML service together with plan_data and stay NULL on
+-- generation placeholders (plan_data IS NULL).
+
+ALTER TABLE public.ai_meal_plans
+  ADD COLUMN IF NOT EXISTS tier text,
+  ADD COLUMN IF NOT EXISTS completeness double precision;
+
+ALTER TABLE public.ai_workout_plans
+  ADD COLUMN IF NOT EXISTS tier text,
+  ADD COLUMN IF NOT EXISTS completeness double precision;
+
+UPDATE public.ai_meal_plans
+SET tier = COALESCE(plan_data->'_metadata'->>'tier', 'BASIC'),
+    completeness = COALESCE((plan_data->'_metadata'->>'completeness')::double precision, 0)
+WHERE plan_data IS NOT NULL AND tier IS NULL;
+
+UPDATE public.ai_workout_plans
+SET tier = COALESCE(plan_data->'_metadata'->>'tier', 'BASIC'),
+    completeness = COALESCE((plan_data->'_metadata'->>'completeness')::double precision, 0)
+WHERE plan_data IS NOT NULL AND tier IS NULL;
+
+ANALYZE public.ai_meal_plans;
+ANALYZE public.ai_workout_plans;
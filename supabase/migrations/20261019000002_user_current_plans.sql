@@ -0,0 +1,134 @@
+-- Per-user pointer to the current meal and workout plan
+--
+-- "Current plan" used to mean the newest row of the user's plan history
+-- (ORDER BY created_at DESC LIMIT 1), which gets slower as regenerations
+-- accumulate. The pointer is moved by triggers on every plan insert or
+-- delete, so readers resolve the current plan with one primary-key lookup.
+
+CREATE TABLE IF NOT EXISTS public.user_current_plans (
+  user_id uuid PRIMARY KEY REFERENCES public.profiles(id) ON DELETE CASCADE,
+  meal_plan_id uuid REFERENCES public.ai_meal_plans(id) ON DELETE SET NULL,
+  workout_plan_id uuid REFERENCES public.ai_workout_plans(id) ON DELETE SET NULL,
+  updated_at timestamptz NOT NULL DEFAULT now()
+);
+
+ALTER TABLE public.user_current_plans ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Users can view own current plans" ON public.user_current_plans;
+CREATE POLICY "Users can view own current plans"
+  ON public.user_current_plans FOR SELECT
+  USING (auth.uid() = user_id);
+
+-- A newly inserted plan becomes the user's current plan
+CREATE OR REPLACE FUNCTION public.set_current_meal_plan()
+RETURNS trigger
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+  INSERT INTO user_current_plans (user_id, meal_plan_id, updated_at)
+  VALUES (NEW.user_id, NEW.id, now())
+  ON CONFLICT (user_id)
+  DO UPDATE SET meal_plan_id = EXCLUDED.meal_plan_id, updated_at = now();
+  RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION public.set_current_workout_plan()
+RETURNS trigger
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+  INSERT INTO user_current_plans (user_id, workout_plan_id, updated_at)
+  VALUES (NEW.user_id, NEW.id, now())
+  ON CONFLICT (user_id)
+  DO UPDATE SET workout_plan_id = EXCLUDED.workout_plan_id, updated_at = now();
+  RETURN NULL;
+END;
+$$;
+
+-- Deleting the current plan falls back to the newest remaining one. Only
+-- UPDATE here: when the whole profile is being deleted the pointer row is
+-- already gone and must not be recreated.
+CREATE OR REPLACE FUNCTION public.reset_current_meal_plan()
+RETURNS trigger
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+  UPDATE user_current_plans
+  SET meal_plan_id = (
+        SELECT id FROM ai_meal_plans
+        WHERE user_id = OLD.user_id
+        ORDER BY created_at DESC
+        LIMIT 1
+      ),
+      updated_at = now()
+  WHERE user_id = OLD.user_id
+    AND (meal_plan_id IS NULL OR meal_plan_id = OLD.id);
+  RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION public.reset_current_workout_plan()
+RETURNS trigger
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+  UPDATE user_current_plans
+  SET workout_plan_id = (
+        SELECT id FROM ai_workout_plans
+        WHERE user_id = OLD.user_id
+        ORDER BY created_at DESC
+        LIMIT 1
+      ),
+      updated_at = now()
+  WHERE user_id = OLD.user_id
+    AND (workout_plan_id IS NULL OR workout_plan_id = OLD.id);
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trigger_set_current_meal_plan ON public.ai_meal_plans;
+CREATE TRIGGER trigger_set_current_meal_plan
+  AFTER INSERT ON public.ai_meal_plans
+  FOR EACH ROW EXECUTE FUNCTION public.set_current_meal_plan();
+
+DROP TRIGGER IF EXISTS trigger_reset_current_meal_plan ON public.ai_meal_plans;
+CREATE TRIGGER trigger_reset_current_meal_plan
+  AFTER DELETE ON public.ai_meal_plans
+  FOR EACH ROW EXECUTE FUNCTION public.reset_current_meal_plan();
+
+DROP TRIGGER IF EXISTS trigger_set_current_workout_plan ON public.ai_workout_plans;
+CREATE TRIGGER trigger_set_current_workout_plan
+  AFTER INSERT ON public.ai_workout_plans
+  FOR EACH ROW EXECUTE FUNCTION public.set_current_workout_plan();
+
+DROP TRIGGER IF EXISTS trigger_reset_current_workout_plan ON public.ai_workout_plans;
+CREATE TRIGGER trigger_reset_current_workout_plan
+  AFTER DELETE ON public.ai_workout_plans
+  FOR EACH ROW EXECUTE FUNCTION public.reset_current_workout_plan();
+
+-- Backfill from existing plan history
+INSERT INTO public.user_current_plans (user_id, meal_plan_id, workout_plan_id)
+SELECT COALESCE(m.user_id, w.user_id), m.id, w.id
+FROM (
+  SELECT DISTINCT ON (user_id) user_id, id
+  FROM public.ai_meal_plans
+  ORDER BY user_id, created_at DESC
+) m
+FULL OUTER JOIN (
+  SELECT DISTINCT ON (user_id) user_id, id
+  FROM public.ai_workout_plans
+  ORDER BY user_id, created_at DESC
+) w ON w.user_id = m.user_id
+ON CONFLICT (user_id) DO UPDATE
+SET meal_plan_id = EXCLUDED.meal_plan_id,
+    workout_plan_id = EXCLUDED.workout_plan_id,
+    updated_at = now();
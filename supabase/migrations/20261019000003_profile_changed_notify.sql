@@ -0,0 +1,40 @@
+-- profile_changed NOTIFY feed
+--
+-- The ML service caches a per-user snapshot of profiles,
+-- user_profile_extended and the latest quiz_results answers. Every change to
+-- those rows publishes the affected user ID so cached snapshots are dropped
+-- immediately instead of waiting for the cache TTL. The trigger argument
+-- names the column holding the user ID.
+
+CREATE OR REPLACE FUNCTION public.notify_profile_changed()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  changed_row jsonb;
+BEGIN
+  IF TG_OP = 'DELETE' THEN
+    changed_row := to_jsonb(OLD);
+  ELSE
+    changed_row := to_jsonb(NEW);
+  END IF;
+
+  PERFORM pg_notify('profile_changed', changed_row->>TG_ARGV[0]);
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trigger_notify_profile_changed ON public.profiles;
+CREATE TRIGGER trigger_notify_profile_changed
+  AFTER UPDATE OR DELETE ON public.profiles
+  FOR EACH ROW EXECUTE FUNCTION public.notify_profile_changed('id');
+
+DROP TRIGGER IF EXISTS trigger_notify_profile_changed ON public.user_profile_extended;
+CREATE TRIGGER trigger_notify_profile_changed
+  AFTER INSERT OR UPDATE OR DELETE ON public.user_profile_extended
+  FOR EACH ROW EXECUTE FUNCTION public.notify_profile_changed('user_id');
+
+DROP TRIGGER IF EXISTS trigger_notify_profile_changed ON public.quiz_results;
+CREATE TRIGGER trigger_notify_profile_changed
+  AFTER INSERT OR UPDATE OF answers OR DELETE ON public.quiz_results
+  FOR EACH ROW EXECUTE FUNCTION public.notify_profile_changed('user_id');
@@ -0,0 +1,74 @@
+-- Deduplicated, compressed plan storage
+--
+-- Large parts of every generated plan are boilerplate repeated across users
+-- (meal_prep_strategy, hydration_plan, nutrition_timing, ...). With
+-- PLAN_CHUNKED_STORAGE enabled the ML service stores such top-level sections
+-- once in plan_chunks, keyed by the SHA-256 of their canonical JSON, and
+-- writes {"$chunk": "<hash>"} in their place in plan_data. Chunks have no
+-- owner and outlive the plans referencing them, so per-user sections are
+-- never chunked.
+-- assemble_plan_data() puts the original document back together; clients
+-- read plans through the plan_document computed field instead of plan_data.
+--
+-- plan_data and chunk contents use lz4 TOAST compression, which is cheaper
+-- to write and read than the default pglz. It only applies to values written
+-- after this migration.
+
+CREATE TABLE IF NOT EXISTS public.plan_chunks (
+  hash text PRIMARY KEY,
+  section text NOT NULL,
+  content jsonb NOT NULL,
+  created_at timestamptz NOT NULL DEFAULT now()
+);
+
+-- Readable only through assemble_plan_data(): a chunk hash acts as the
+-- capability to read that chunk
+ALTER TABLE public.plan_chunks ENABLE ROW LEVEL SECURITY;
+
+DO $$
+BEGIN
+  ALTER TABLE public.plan_chunks ALTER COLUMN content SET COMPRESSION lz4;
+  ALTER TABLE public.ai_meal_plans ALTER COLUMN plan_data SET COMPRESSION lz4;
+  ALTER TABLE public.ai_workout_plans ALTER COLUMN plan_data SET COMPRESSION lz4;
+EXCEPTION WHEN feature_not_supported THEN
+  RAISE NOTICE 'lz4 TOAST compression is not available, keeping pglz';
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION public.assemble_plan_data(plan jsonb)
+RETURNS jsonb
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+SET search_path = public
+AS $$
+  SELECT CASE
+    WHEN jsonb_typeof(plan) IS DISTINCT FROM 'object' THEN plan
+    ELSE (
+      SELECT COALESCE(
+        jsonb_object_agg(e.key, COALESCE(c.content, e.value)),
+        '{}'::jsonb
+      )
+      FROM jsonb_each(plan) e
+      LEFT JOIN plan_chunks c
+        ON jsonb_typeof(e.value) = 'object'
+       AND c.hash = e.value->>'$chunk'
+    )
+  END
+$$;
+
+CREATE OR REPLACE FUNCTION public.plan_document(public.ai_meal_plans)
+RETURNS jsonb
+LANGUAGE sql
+STABLE
+AS $$
+  SELECT public.assemble_plan_data($1.plan_data)
+$$;
+
+CREATE OR REPLACE FUNCTION public.plan_document(public.ai_workout_plans)
+RETURNS jsonb
+LANGUAGE sql
+STABLE
+AS $$
+  SELECT public.assemble_plan_data($1.plan_data)
+$$;
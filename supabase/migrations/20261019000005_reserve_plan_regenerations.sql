@@ -0,0 +1,78 @@
+-- Atomic check-and-reserve of manual plan regenerations
+--
+-- Replaces the can_regenerate_plan() + track_regeneration() pair (two calls
+-- per plan type, with a race between check and increment) with a single
+-- call covering both plan types. The usage row is locked by the upsert, so
+-- concurrent requests are serialized and can never push usage past the
+-- monthly limit. Either every requested plan type is reserved or none is.
+--
+-- Returns whether the reservation was made plus the tier, monthly limit and
+-- usage after the call, which the ML service caches for eligibility checks.
+
+CREATE OR REPLACE FUNCTION public.reserve_plan_regenerations(
+  p_user_id uuid,
+  p_meal boolean,
+  p_workout boolean
+)
+RETURNS TABLE (
+  reserved boolean,
+  tier text,
+  monthly_limit integer,
+  meal_usage integer,
+  workout_usage integer
+)
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+#variable_conflict use_column
+DECLARE
+  v_period_start timestamptz := date_trunc('month', now());
+  v_meal integer := CASE WHEN p_meal THEN 1 ELSE 0 END;
+  v_workout integer := CASE WHEN p_workout THEN 1 ELSE 0 END;
+  v_tier text;
+  v_unlimited boolean;
+BEGIN
+  SELECT s.tier INTO v_tier
+  FROM subscriptions s
+  WHERE s.user_id = p_user_id AND s.status = 'active'
+  LIMIT 1;
+
+  -- Users without an active subscription get the free tier's limit
+  tier := COALESCE(v_tier, 'free');
+  SELECT COALESCE(MAX(st.ai_generations_per_month), 0) INTO monthly_limit
+  FROM subscription_tiers st
+  WHERE st.tier = COALESCE(v_tier, 'free');
+  v_unlimited := tier IN ('pro', 'premium');
+
+  IF v_meal + v_workout > 0 AND (v_unlimited OR GREATEST(v_meal, v_workout) <= monthly_limit) THEN
+    INSERT INTO plan_regeneration_usage AS u
+      (user_id, period_start, period_end, meal_plan_regenerations, workout_plan_regenerations)
+    VALUES
+      (p_user_id, v_period_start, v_period_start + INTERVAL '1 month', v_meal, v_workout)
+    ON CONFLICT (user_id, period_start) DO UPDATE SET
+      meal_plan_regenerations = u.meal_plan_regenerations + v_meal,
+      workout_plan_regenerations = u.workout_plan_regenerations + v_workout,
+      updated_at = now()
+    WHERE v_unlimited
+       OR (u.meal_plan_regenerations + v_meal <= monthly_limit
+           AND u.workout_plan_regenerations + v_workout <= monthly_limit)
+    RETURNING u.meal_plan_regenerations, u.workout_plan_regenerations
+    INTO meal_usage, workout_usage;
+
+    reserved := FOUND;
+  ELSE
+    reserved := v_meal + v_workout = 0;
+  END IF;
+
+  IF meal_usage IS NULL THEN
+    SELECT COALESCE(u.meal_plan_regenerations, 0), COALESCE(u.workout_plan_regenerations, 0)
+    INTO meal_usage, workout_usage
+    FROM (SELECT 1) x
+    LEFT JOIN plan_regeneration_usage u
+      ON u.user_id = p_user_id AND u.period_start = v_period_start;
+  END IF;
+
+  RETURN NEXT;
+END;
+$$;
@@ -0,0 +1,8 @@
+-- Progress reporting for data exports
+--
+-- The ML service export worker streams each table of a user's data into the
+-- export archive and records how far it got after every table.
+
+ALTER TABLE public.data_exports
+  ADD COLUMN IF NOT EXISTS progress_percent integer NOT NULL DEFAULT 0,
+  ADD COLUMN IF NOT EXISTS rows_exported bigint NOT NULL DEFAULT 0;
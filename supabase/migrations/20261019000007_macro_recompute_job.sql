@@ -0,0 +1,36 @@
+-- Nightly macro target recomputation
+--
+-- batch_job_checkpoints records how far each ML service batch job got in its
+-- current run. Jobs process users in primary key order and advance the
+-- checkpoint in the same transaction as each batch's writes, so a restarted
+-- run continues after the last committed batch.
+--
+-- macro_target_inputs remembers the weight each user's AI-generated macro
+-- targets were last computed from. The nightly job recomputes targets only
+-- for users whose latest weight_history entry differs from it (new, edited
+-- or deleted weight logs alike).
+
+CREATE TABLE IF NOT EXISTS public.batch_job_checkpoints (
+  job_name text PRIMARY KEY,
+  run_date date NOT NULL,
+  last_user_id uuid,
+  users_processed integer NOT NULL DEFAULT 0,
+  rows_written integer NOT NULL DEFAULT 0,
+  started_at timestamptz NOT NULL DEFAULT now(),
+  updated_at timestamptz NOT NULL DEFAULT now(),
+  completed_at timestamptz
+);
+
+CREATE TABLE IF NOT EXISTS public.macro_target_inputs (
+  user_id uuid PRIMARY KEY REFERENCES public.profiles(id) ON DELETE CASCADE,
+  weight double precision NOT NULL,
+  computed_at timestamptz NOT NULL DEFAULT now()
+);
+
+-- Only the ML service (service role) reads or writes job state
+ALTER TABLE public.batch_job_checkpoints ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.macro_target_inputs ENABLE ROW LEVEL SECURITY;
+
+-- Latest weight per user, as looked up by the job
+CREATE INDEX IF NOT EXISTS idx_weight_history_user_latest
+  ON public.weight_history (user_id, log_date DESC, created_at DESC);
@@ -0,0 +1,27 @@
+-- Adaptive TDEE estimator state
+--
+-- One compact row per user holding the exponentially smoothed intake,
+-- weight trend and learned energy expenditure (see
+-- ml_service/services/tdee_estimator.py). The ML service's tdee_update job
+-- folds each completed day's logged calories and weight into it, so a
+-- day's logs are read once and history is never rescanned.
+
+CREATE TABLE IF NOT EXISTS public.tdee_estimator_state (
+  user_id uuid PRIMARY KEY REFERENCES public.profiles(id) ON DELETE CASCADE,
+  observed_through date,
+  intake_avg real,
+  intake_days smallint NOT NULL DEFAULT 0,
+  weight_trend real,
+  weight_trend_date date,
+  weight_days smallint NOT NULL DEFAULT 0,
+  tdee real,
+  tdee_updates smallint NOT NULL DEFAULT 0,
+  updated_at timestamptz NOT NULL DEFAULT now()
+);
+
+-- Only the ML service (service role) reads or writes estimator state
+ALTER TABLE public.tdee_estimator_state ENABLE ROW LEVEL SECURITY;
+
+-- Per-user day lookups by the job
+CREATE INDEX IF NOT EXISTS idx_daily_nutrition_logs_user_date
+  ON public.daily_nutrition_logs (user_id, log_date);
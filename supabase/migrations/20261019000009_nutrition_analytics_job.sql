@@ -0,0 +1,58 @@
+-- Batch nutrition analytics
+--
+-- nutrition_trends and nutrition_analytics are now computed by the ML
+-- service's nutrition_analytics job instead of per-user database functions.
+-- The job only reprocesses users whose nutrition logs changed since its last
+-- completed run, which needs:
+--   * a watermark per batch job (start of its last completed run),
+--   * updated_at on daily_nutrition_logs (meal_items triggers update the
+--     log totals, so created_at alone misses edits),
+--   * a record of deleted logs.
+
+ALTER TABLE public.batch_job_checkpoints
+  ADD COLUMN IF NOT EXISTS watermark timestamptz;
+
+ALTER TABLE public.daily_nutrition_logs
+  ADD COLUMN IF NOT EXISTS updated_at timestamptz NOT NULL DEFAULT now();
+
+DROP TRIGGER IF EXISTS update_daily_nutrition_logs_timestamp ON public.daily_nutrition_logs;
+CREATE TRIGGER update_daily_nutrition_logs_timestamp
+  BEFORE UPDATE ON public.daily_nutrition_logs
+  FOR EACH ROW EXECUTE FUNCTION update_timestamp();
+
+CREATE INDEX IF NOT EXISTS idx_daily_nutrition_logs_updated_at
+  ON public.daily_nutrition_logs (updated_at);
+
+CREATE TABLE IF NOT EXISTS public.nutrition_log_deletions (
+  user_id uuid NOT NULL,
+  log_date date NOT NULL,
+  deleted_at timestamptz NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_nutrition_log_deletions_deleted_at
+  ON public.nutrition_log_deletions (deleted_at);
+
+ALTER TABLE public.nutrition_log_deletions ENABLE ROW LEVEL SECURITY;
+
+CREATE OR REPLACE FUNCTION public.record_nutrition_log_deletion()
+RETURNS trigger
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+  INSERT INTO nutrition_log_deletions (user_id, log_date) VALUES (OLD.user_id, OLD.log_date);
+  RETURN OLD;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS record_nutrition_log_deletion ON public.daily_nutrition_logs;
+CREATE TRIGGER record_nutrition_log_deletion
+  AFTER DELETE ON public.daily_nutrition_logs
+  FOR EACH ROW EXECUTE FUNCTION record_nutrition_log_deletion();
+
+-- Macro adherence and logging streaks per analysis period
+ALTER TABLE public.nutrition_analytics
+  ADD COLUMN IF NOT EXISTS macro_adherence_percentage double precision,
+  ADD COLUMN IF NOT EXISTS current_streak integer,
+  ADD COLUMN IF NOT EXISTS longest_streak integer;
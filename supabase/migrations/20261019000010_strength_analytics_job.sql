@@ -0,0 +1,108 @@
+-- Batch strength analytics
+--
+-- user_exercise_progress, progressive_overload_log, exercise_personal_records
+-- (including estimated 1RM) and weekly workout_analytics are computed by the
+-- ML service's strength_analytics job for users whose workout sessions
+-- changed since its last completed run. Every change to a session's sets
+-- updates the session (its totals and updated_at), so workout_sessions
+-- .updated_at plus a record of deleted sessions is enough to find them.
+
+CREATE INDEX IF NOT EXISTS idx_workout_sessions_updated_at
+  ON public.workout_sessions (updated_at);
+
+CREATE TABLE IF NOT EXISTS public.workout_session_deletions (
+  user_id uuid NOT NULL,
+  session_date date NOT NULL,
+  deleted_at timestamptz NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_workout_session_deletions_deleted_at
+  ON public.workout_session_deletions (deleted_at);
+
+ALTER TABLE public.workout_session_deletions ENABLE ROW LEVEL SECURITY;
+
+CREATE OR REPLACE FUNCTION public.record_workout_session_deletion()
+RETURNS trigger
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+  INSERT INTO workout_session_deletions (user_id, session_date) VALUES (OLD.user_id, OLD.session_date);
+  RETURN OLD;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS record_workout_session_deletion ON public.workout_sessions;
+CREATE TRIGGER record_workout_session_deletion
+  AFTER DELETE ON public.workout_sessions
+  FOR EACH ROW EXECUTE FUNCTION record_workout_session_deletion();
+
+-- Session totals once per statement instead of once per set: saving an
+-- exercise with N sets recomputes each affected session once
+CREATE OR REPLACE FUNCTION public.refresh_workout_session_totals(p_session_ids uuid[])
+RETURNS void
+LANGUAGE sql
+AS $$
+  UPDATE workout_sessions ws
+  SET
+    total_exercises = t.total_exercises,
+    total_sets = t.total_sets,
+    total_reps = t.total_reps,
+    total_volume_kg = t.total_volume_kg,
+    updated_at = now()
+  FROM (
+    SELECT
+      a.id,
+      COUNT(DISTINCT s.exercise_id) AS total_exercises,
+      COUNT(s.id) AS total_sets,
+      COALESCE(SUM(s.reps), 0) AS total_reps,
+      COALESCE(SUM(s.weight_kg * s.reps), 0) AS total_volume_kg
+    FROM (SELECT DISTINCT unnest(p_session_ids) AS id) a
+    LEFT JOIN exercise_sets s ON s.workout_session_id = a.id AND s.is_warmup = FALSE
+    GROUP BY a.id
+  ) t
+  WHERE ws.id = t.id;
+$$;
+
+CREATE OR REPLACE FUNCTION public.update_workout_session_totals_statement()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  IF TG_OP = 'INSERT' THEN
+    PERFORM refresh_workout_session_totals(ARRAY(SELECT workout_session_id FROM new_sets));
+  ELSIF TG_OP = 'DELETE' THEN
+    PERFORM refresh_workout_session_totals(ARRAY(SELECT workout_session_id FROM old_sets));
+  ELSE
+    PERFORM refresh_workout_session_totals(ARRAY(
+      SELECT workout_session_id FROM new_sets
+      UNION
+      SELECT workout_session_id FROM old_sets
+    ));
+  END IF;
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trigger_update_workout_session_totals_insert ON public.exercise_sets;
+DROP TRIGGER IF EXISTS trigger_update_workout_session_totals_update ON public.exercise_sets;
+DROP TRIGGER IF EXISTS trigger_update_workout_session_totals_delete ON public.exercise_sets;
+
+CREATE TRIGGER trigger_update_workout_session_totals_insert
+  AFTER INSERT ON public.exercise_sets
+  REFERENCING NEW TABLE AS new_sets
+  FOR EACH STATEMENT EXECUTE FUNCTION update_workout_session_totals_statement();
+
+CREATE TRIGGER trigger_update_workout_session_totals_update
+  AFTER UPDATE ON public.exercise_sets
+  REFERENCING OLD TABLE AS old_sets NEW TABLE AS new_sets
+  FOR EACH STATEMENT EXECUTE FUNCTION update_workout_session_totals_statement();
+
+CREATE TRIGGER trigger_update_workout_session_totals_delete
+  AFTER DELETE ON public.exercise_sets
+  REFERENCING OLD TABLE AS old_sets
+  FOR EACH STATEMENT EXECUTE FUNCTION update_workout_session_totals_statement();
+
+COMMENT ON COLUMN public.workout_analytics.muscle_group_distribution IS
+  'Working sets and volume per muscle group, e.g. {"chest": {"sets": 12, "volume_kg": 3400}}';
@@ -0,0 +1,29 @@
+-- Batch plan adherence
+--
+-- meal_plan_adherence and workout_plan_adherence are filled by the ML
+-- service's plan_adherence job, which scores changed nutrition logs and
+-- workout sessions against the user's current plans. Each plan version's
+-- targets are extracted from plan_data once into compact arrays here, so
+-- scoring never parses plan JSON.
+
+CREATE TABLE IF NOT EXISTS public.plan_adherence_targets (
+  plan_id uuid PRIMARY KEY,
+  plan_type text NOT NULL CHECK (plan_type IN ('meal', 'workout')),
+  user_id uuid NOT NULL REFERENCES public.profiles(id) ON DELETE CASCADE,
+  -- generated_at of the plan version the targets were extracted from
+  plan_version timestamptz NOT NULL,
+  meal_types text[],
+  meal_calories real[],
+  meal_protein real[],
+  daily_calories integer,
+  daily_protein real,
+  -- ISO weekdays (1 = Monday) with a planned workout
+  workout_weekdays smallint[],
+  updated_at timestamptz NOT NULL DEFAULT now()
+);
+
+ALTER TABLE public.plan_adherence_targets ENABLE ROW LEVEL SECURITY;
+
+-- Meal items of a log, for the "logged from the plan" check
+CREATE INDEX IF NOT EXISTS idx_meal_items_nutrition_log_id
+  ON public.meal_items (nutrition_log_id);
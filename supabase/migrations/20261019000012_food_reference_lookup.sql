@@ -0,0 +1,7 @@
+-- Food lookup by name
+--
+-- The ML service verifies the macros of generated meal plans against
+-- food_database, looking foods up by lowercased name.
+
+CREATE INDEX IF NOT EXISTS idx_food_database_lower_name
+  ON public.food_database (lower(food_name));
@@ -0,0 +1,10 @@
+-- Food index refresh
+--
+-- The ML service keeps an in-memory index of food_database and
+-- recipe_database and refreshes it from rows changed since its last read.
+
+CREATE INDEX IF NOT EXISTS idx_food_database_updated_at
+  ON public.food_database (updated_at);
+
+CREATE INDEX IF NOT EXISTS idx_recipe_database_updated_at
+  ON public.recipe_database (updated_at);